@@ -10,8 +10,10 @@ Enhances concept map specifications by:
 - Providing recommended dimensions sized to fit all content
 """
 
-from typing import Dict, List, Set, Any, Tuple, Optional
+from typing import AsyncGenerator, Dict, List, Set, Any, Tuple, Optional
+import asyncio
 import logging
+import re
 from ..core.base_agent import BaseAgent
 
 logger = logging.getLogger(__name__)
@@ -399,6 +401,10 @@ class ConceptMapAgent(BaseAgent):
         4. Convert triples to concept map data
         5. Enhance and return
         
+        One introduction call and one triple extraction call;
+        generate_from_focus_question_stream() pipelines the same steps
+        paragraph by paragraph for the streaming endpoint.
+        
         Args:
             focus_question: Focus question or text to extract focus question from
             language: Language ('zh' or 'en')
@@ -479,6 +485,147 @@ class ConceptMapAgent(BaseAgent):
                 'spec': None
             }
 
+    async def generate_from_focus_question_stream(
+        self,
+        focus_question: str,
+        language: str = 'zh'
+    ) -> AsyncGenerator[Dict[str, Any], None]:
+        """
+        Streaming focus question workflow.
+        
+        The introduction is streamed paragraph by paragraph; triples are
+        extracted from each paragraph as soon as it is complete, concurrently
+        with the rest of the introduction, and merged incrementally.
+        Paragraphs after the first are sent with the opening sentence (which
+        names the analysis angles) so their layers line up with the first.
+        
+        Yields:
+            {'event': 'introduction', 'text': paragraph}
+            {'event': 'partial', 'spec': spec, 'triple_count': int} - concept map so far
+            {'event': 'complete', 'success': True, 'spec': spec, 'diagram_type': 'concept_map'}
+            {'event': 'error', 'success': False, 'error': str, 'spec': None}
+        """
+        from config.settings import config
+        from services.introduction_service import introduction_service
+        from services.triple_extraction_service import triple_extraction_service, TripleMerger
+        
+        logger.info(f"[ConceptMapAgent] Generating from focus question: {focus_question}, using model: {self.model}")
+        
+        separator = '' if language == 'zh' else ' '
+        events: asyncio.Queue = asyncio.Queue()
+        extractions: List[asyncio.Task] = []
+        paragraphs: List[str] = []
+        
+        async def extract(chunk: str):
+            try:
+                result = await triple_extraction_service.extract_triples(
+                    chunk, language=language, model=self.model, stream=False
+                )
+            except Exception as e:
+                result = {'success': False, 'error': str(e)}
+            await events.put(('triples', result))
+        
+        async def read_introduction():
+            try:
+                async for paragraph in introduction_service.generate_introduction_paragraphs(
+                    focus_question,
+                    language=language,
+                    model=self.model,
+                    max_sentences=config.FOCUS_QUESTION_PARAGRAPH_SENTENCES
+                ):
+                    chunk = paragraph
+                    if paragraphs:
+                        lead = re.split(r'(?<=[。！？!?.])', paragraphs[0], maxsplit=1)[0]
+                        chunk = f"{lead}{separator}{paragraph}"
+                    paragraphs.append(paragraph)
+                    extractions.append(asyncio.create_task(extract(chunk)))
+                    await events.put(('introduction', paragraph))
+            finally:
+                await events.put(('introduction_done', None))
+        
+        reader = asyncio.create_task(read_introduction())
+        merger = TripleMerger()
+        reader_done = False
+        extracted = 0
+        errors = []
+        
+        try:
+            while not reader_done or extracted < len(extractions):
+                kind, value = await events.get()
+                if kind == 'introduction':
+                    yield {'event': 'introduction', 'text': value}
+                elif kind == 'introduction_done':
+                    reader_done = True
+                else:
+                    extracted += 1
+                    if not value.get('success'):
+                        errors.append(value.get('error'))
+                        continue
+                    if merger.add(value['triples']):
+                        spec = await self._spec_from_triples(merger.triples, focus_question, triple_extraction_service)
+                        yield {'event': 'partial', 'spec': spec, 'triple_count': len(merger.triples)}
+            
+            await reader
+            
+            intro_text = '\n\n'.join(paragraphs)
+            if not intro_text:
+                yield {
+                    'event': 'error',
+                    'success': False,
+                    'error': "Failed to generate introduction: Empty response",
+                    'spec': None
+                }
+                return
+            logger.info(f"[ConceptMapAgent] Generated introduction in {len(paragraphs)} paragraphs, length: {len(intro_text)}")
+            
+            if not merger.triples:
+                yield {
+                    'event': 'error',
+                    'success': False,
+                    'error': f"Failed to extract triples: {errors[0] if errors else 'No triples extracted'}",
+                    'spec': None
+                }
+                return
+            logger.info(f"[ConceptMapAgent] Extracted {len(merger.triples)} unique triples")
+            
+            enhanced_spec = await self._spec_from_triples(merger.triples, focus_question, triple_extraction_service)
+            enhanced_spec['_method'] = 'focus_question_workflow'
+            enhanced_spec['_focus_question'] = focus_question
+            enhanced_spec['_introduction'] = intro_text
+            
+            logger.info(f"[ConceptMapAgent] Successfully generated concept map from focus question")
+            yield {
+                'event': 'complete',
+                'success': True,
+                'spec': enhanced_spec,
+                'diagram_type': 'concept_map'
+            }
+            
+        except Exception as e:
+            logger.error(f"[ConceptMapAgent] Focus question generation error: {e}", exc_info=True)
+            yield {
+                'event': 'error',
+                'success': False,
+                'error': f"Focus question generation failed: {str(e)}",
+                'spec': None
+            }
+        finally:
+            # Client gone or failure: stop the introduction stream and pending extractions
+            for task in [reader, *extractions]:
+                if not task.done():
+                    task.cancel()
+
+    async def _spec_from_triples(self, triples, focus_question: str, triple_extraction_service) -> Dict[str, Any]:
+        """Concept map data for the triples, enhanced when possible."""
+        concept_map_data = triple_extraction_service.convert_triples_to_concept_map_data(
+            triples, focus_question=focus_question
+        )
+        enhanced_result = await self.enhance_spec(concept_map_data)
+        if not enhanced_result.get('success'):
+            logger.warning(f"[ConceptMapAgent] Enhancement failed: {enhanced_result.get('error')}")
+            return concept_map_data
+        return enhanced_result.get('spec', concept_map_data)
+
     def generate_simplified_two_stage(self, user_prompt: str, llm_client, language: str = "en") -> Dict:
         """
         Generate concept map using simplified two-stage approach.
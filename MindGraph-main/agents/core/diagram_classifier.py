@@ -0,0 +1,356 @@
+"""
+Local Diagram Type Classifier
+=============================
+
+Detects the diagram type a prompt asks for without an LLM round-trip, so
+generation can start immediately for the common, unambiguous prompts.
+
+Two tiers, both zh/en:
+
+- Keyword rules: an explicit diagram name ("bubble map", "双气泡图"). Names
+  that are the topic rather than the diagram being created ("a bubble map
+  about mind maps", "关于双气泡图的气泡图") are skipped, and longer names win
+  over the names they contain (双气泡图 over 气泡图, 复流程图 over 流程图)
+- Character n-gram naive Bayes: intent without a diagram name ("compare cats
+  and dogs", "制作咖啡的步骤"). Trained at import from the examples and type
+  descriptions in the classification prompts (prompts/main_agent.py) plus a
+  small set of intent phrases
+
+Each prediction carries a confidence; callers short-circuit above a threshold
+and fall back to the LLM classifier otherwise.
+
+@author lycosa9527
+@made_by MindSpring Team
+"""
+
+import logging
+import math
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from prompts.main_agent import CLASSIFICATION_EN, CLASSIFICATION_ZH
+
+logger = logging.getLogger(__name__)
+
+DIAGRAM_TYPES = (
+    'circle_map', 'bubble_map', 'double_bubble_map',
+    'brace_map', 'bridge_map', 'tree_map',
+    'flow_map', 'multi_flow_map',
+    'mind_map'
+)
+
+# Explicit diagram names. Matched longest first, so a name is never read
+# out of a longer one that contains it.
+TYPE_NAMES = {
+    'circle_map': ['circle map', '圆圈图', '圆形图'],
+    'bubble_map': ['bubble map', '气泡图'],
+    'double_bubble_map': ['double bubble map', 'double-bubble map', '双气泡图', '双泡图'],
+    'brace_map': ['brace map', '括号图', '括弧图'],
+    'bridge_map': ['bridge map', '桥形图', '桥型图', '桥接图'],
+    'tree_map': ['tree map', 'treemap', '树形图', '树状图'],
+    'flow_map': ['flow map', 'flowchart', 'flow chart', '流程图'],
+    'multi_flow_map': ['multi-flow map', 'multi flow map', 'multiflow map', '复流程图', '多重流程图'],
+    'mind_map': ['mind map', 'mind-map', 'mindmap', '思维导图', '脑图'],
+}
+
+# Intent phrases added to the prompt-derived training set; the classification
+# prompts describe each type in one line, which is too little on its own.
+INTENT_PHRASES = {
+    'circle_map': [
+        'define', 'defining', 'definition of', 'what is', 'associations with', 'brainstorm words related to',
+        '定义', '联想', '围绕主题联想', '什么是', '相关的词',
+    ],
+    'bubble_map': [
+        'describe', 'describing', 'characteristics of', 'attributes of', 'features of', 'adjectives for',
+        '描述', '特征', '特点', '属性', '形容',
+    ],
+    'double_bubble_map': [
+        'compare', 'comparing', 'compare and contrast', 'similarities and differences', 'versus', ' vs ',
+        'difference between', '比较', '对比', '异同', '相同点和不同点', '区别',
+    ],
+    'brace_map': [
+        'parts of', 'components of', 'made up of', 'break down', 'structure of', 'anatomy of',
+        '组成部分', '组成', '构成', '分解', '部分', '结构',
+    ],
+    'bridge_map': [
+        'analogy', 'analogies', 'is like', 'is to', 'just as', 'relationship pattern',
+        '类比', '就像', '好比', '类似于', '比喻',
+    ],
+    'tree_map': [
+        'classify', 'classification', 'categories', 'categorize', 'types of', 'kinds of', 'hierarchy',
+        '分类', '类别', '种类', '层级', '归类',
+    ],
+    'flow_map': [
+        'steps', 'steps to', 'process of', 'how to make', 'procedure', 'sequence', 'stages of', 'timeline',
+        '步骤', '过程', '流程', '顺序', '如何制作', '阶段',
+    ],
+    'multi_flow_map': [
+        'causes and effects', 'cause and effect', 'causes of', 'effects of', 'consequences of', 'why did',
+        '原因和结果', '因果', '原因', '影响', '后果', '导致',
+    ],
+    'mind_map': [
+        'brainstorm', 'brainstorming', 'overview of', 'ideas about', 'plan', 'notes on',
+        '头脑风暴', '发散思维', '概览', '整理', '规划', '知识点',
+    ],
+}
+
+# English names following one of these are the topic, not the diagram
+_EN_TOPIC_PREFIX = re.compile(
+    r'\b(?:about|of|on|regarding|explaining|explain|introducing|introduce|describing)\s+(?:the\s+|a\s+|an\s+)?$'
+)
+_ZH_TOPIC_PREFIX = ('关于', '介绍', '讲解', '解释')
+
+_NAME_PATTERN = re.compile(
+    '|'.join(
+        re.escape(name) + ('s?' if name.isascii() else '')
+        for name in sorted(
+            (name for names in TYPE_NAMES.values() for name in names), key=len, reverse=True
+        )
+    )
+)
+_NAME_TO_TYPE = {name: diagram_type for diagram_type, names in TYPE_NAMES.items() for name in names}
+
+# Request wording around a diagram name; a prompt that is nothing but these
+# and a name ("生成一个气泡图", "create a mind map") has no topic
+FILLER_WORDS = (
+    'please', 'can you', 'could you', 'help me', 'i want', 'i need', 'show me', 'give me',
+    'generate', 'create', 'make', 'draw', 'build', 'me', 'a', 'an', 'the', 'new',
+    'diagram', 'chart', 'for', 'about', 'of', 'on',
+    '请', '帮我', '给我', '我想', '我要', '生成', '创建', '制作', '绘制', '画', '做',
+    '一个', '一张', '一幅', '关于', '的',
+)
+_FILLER_PATTERN = re.compile(
+    '|'.join(
+        rf'\b{re.escape(word)}\b' if word.isascii() else re.escape(word)
+        for word in sorted(FILLER_WORDS, key=len, reverse=True)
+    )
+)
+_NON_WORD = re.compile(r'[\W_]+')
+
+_EXAMPLE_LINE = re.compile(r'^- "(.+?)" → .* → ([a-z_]+)$')
+_DESCRIPTION_LINE = re.compile(r'^\d+\. ([a-z_]+) \((.+?)\) - (.+)$')
+_EDGE_CASE_LINE = re.compile(r'^- (.+?),\s*(?:use|使用) ([a-z_]+)')
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize(text: str) -> str:
+    return _WHITESPACE.sub(' ', text.lower()).strip()
+
+
+def find_type_mentions(text: str) -> List[Tuple[str, bool]]:
+    """
+    Find explicit diagram names in a normalized prompt.
+
+    Returns:
+        [(diagram_type, is_topic)] in order of appearance; is_topic marks names
+        that describe what the diagram is about rather than the diagram itself
+    """
+    mentions = []
+    for match in _NAME_PATTERN.finditer(text):
+        name = match.group(0)
+        if name.isascii() and name.endswith('s') and name not in _NAME_TO_TYPE:
+            name = name[:-1]
+        mentions.append((_NAME_TO_TYPE[name], _is_topic_mention(text, match)))
+    return mentions
+
+
+def _is_topic_mention(text: str, match: re.Match) -> bool:
+    before, after = text[:match.start()], text[match.end():]
+    if match.group(0).isascii():
+        return bool(_EN_TOPIC_PREFIX.search(before))
+    # "关于X的Y图" / "X的Y图": the name ahead of 的 is a modifier
+    return after.startswith('的') or before.endswith(_ZH_TOPIC_PREFIX)
+
+
+def has_topic(text: str) -> bool:
+    """Whether a normalized prompt says anything beyond the requested diagram's name and request wording."""
+    without_names = _NAME_PATTERN.sub(
+        lambda match: match.group(0) if _is_topic_mention(text, match) else ' ', text
+    )
+    remainder = _FILLER_PATTERN.sub(' ', without_names)
+    return bool(_NON_WORD.sub('', remainder))
+
+
+def load_training_samples() -> List[Tuple[str, str]]:
+    """Labelled (text, diagram_type) samples from the classification prompts and intent phrases."""
+    samples = []
+    for template in (CLASSIFICATION_EN, CLASSIFICATION_ZH):
+        for line in template.splitlines():
+            line = line.strip()
+            for pattern, text_groups in ((_EXAMPLE_LINE, (1,)), (_DESCRIPTION_LINE, (2, 3))):
+                match = pattern.match(line)
+                if match:
+                    label = match.group(2) if pattern is _EXAMPLE_LINE else match.group(1)
+                    if label in DIAGRAM_TYPES:
+                        samples.extend((match.group(g), label) for g in text_groups)
+                    break
+            else:
+                match = _EDGE_CASE_LINE.match(line)
+                if match and match.group(2) in DIAGRAM_TYPES:
+                    samples.append((match.group(1), match.group(2)))
+    for label, phrases in INTENT_PHRASES.items():
+        samples.extend((phrase, label) for phrase in phrases)
+    return samples
+
+
+class NGramNaiveBayes:
+    """
+    Multinomial naive Bayes over character n-grams.
+
+    Character n-grams need no tokenizer, so the same model covers Chinese
+    (no word boundaries) and English.
+    """
+
+    def __init__(self, ngram_range: Tuple[int, int] = (1, 3), alpha: float = 0.1):
+        self.ngram_range = ngram_range
+        self.alpha = alpha
+        self.labels: List[str] = []
+        self._log_prior: Dict[str, float] = {}
+        self._log_likelihood: Dict[str, Dict[str, float]] = {}
+        self._log_unseen: Dict[str, float] = {}
+
+    def ngrams(self, text: str) -> Iterable[str]:
+        padded = f" {normalize(text)} "
+        low, high = self.ngram_range
+        for n in range(low, high + 1):
+            for i in range(len(padded) - n + 1):
+                gram = padded[i:i + n]
+                if gram.strip():
+                    yield gram
+
+    def fit(self, samples: List[Tuple[str, str]]) -> 'NGramNaiveBayes':
+        counts: Dict[str, Counter] = defaultdict(Counter)
+        label_counts = Counter()
+        for text, label in samples:
+            counts[label].update(self.ngrams(text))
+            label_counts[label] += 1
+
+        vocabulary = set()
+        for counter in counts.values():
+            vocabulary.update(counter)
+        total = sum(label_counts.values())
+
+        self.labels = sorted(label_counts)
+        for label in self.labels:
+            denominator = sum(counts[label].values()) + self.alpha * len(vocabulary)
+            self._log_prior[label] = math.log(label_counts[label] / total)
+            self._log_unseen[label] = math.log(self.alpha / denominator)
+            self._log_likelihood[label] = {
+                gram: math.log((count + self.alpha) / denominator) for gram, count in counts[label].items()
+            }
+        self._vocabulary = vocabulary
+        return self
+
+    def predict_proba(self, text: str) -> Dict[str, float]:
+        """
+        Posterior per label, or {} when no n-gram of the text was seen in training.
+
+        Log-likelihoods are scaled by 1/sqrt(known n-grams): overlapping
+        n-grams are far from independent, and unscaled naive Bayes posteriors
+        would be near 1.0 for almost any input.
+        """
+        grams = [gram for gram in self.ngrams(text) if gram in self._vocabulary]
+        if not grams:
+            return {}
+        scale = 1.0 / math.sqrt(len(grams))
+        scores = {}
+        for label in self.labels:
+            likelihood, unseen = self._log_likelihood[label], self._log_unseen[label]
+            scores[label] = self._log_prior[label] + scale * sum(likelihood.get(gram, unseen) for gram in grams)
+        best = max(scores.values())
+        exp_scores = {label: math.exp(score - best) for label, score in scores.items()}
+        total = sum(exp_scores.values())
+        return {label: value / total for label, value in exp_scores.items()}
+
+
+class DiagramTypeClassifier:
+    """Keyword rules first, then the n-gram model."""
+
+    # Confidence for an explicit name: one type named vs. several resolved by position
+    KEYWORD_CONFIDENCE = 0.97
+    RESOLVED_KEYWORD_CONFIDENCE = 0.9
+
+    def __init__(self, model: Optional[NGramNaiveBayes] = None):
+        if model is None:
+            samples = load_training_samples()
+            model = NGramNaiveBayes().fit(samples)
+            logger.debug(f"[DiagramTypeClassifier] Trained on {len(samples)} samples")
+        self.model = model
+        self._lock = threading.Lock()
+        self.stats = Counter()
+        self.total_time = 0.0
+
+    def classify(self, prompt: str) -> Dict[str, Any]:
+        """
+        Classify a prompt.
+
+        Returns:
+            dict: {'diagram_type': str or None, 'confidence': float, 'source': 'keyword'|'ngram'|'none',
+                   'has_topic': bool}
+        """
+        started = time.perf_counter()
+        text = normalize(prompt)
+        mentions = find_type_mentions(text)
+        intended = [diagram_type for diagram_type, is_topic in mentions if not is_topic]
+
+        if intended:
+            confidence = self.KEYWORD_CONFIDENCE if len(set(intended)) == 1 else self.RESOLVED_KEYWORD_CONFIDENCE
+            result = {
+                'diagram_type': intended[0], 'confidence': confidence, 'source': 'keyword',
+                'has_topic': has_topic(text)
+            }
+        elif mentions:
+            # Only topic names ("about mind maps"): leave it to the LLM
+            result = {'diagram_type': None, 'confidence': 0.0, 'source': 'none', 'has_topic': True}
+        else:
+            probabilities = self.model.predict_proba(text)
+            if probabilities:
+                diagram_type = max(probabilities, key=probabilities.get)
+                result = {
+                    'diagram_type': diagram_type, 'confidence': probabilities[diagram_type], 'source': 'ngram',
+                    'has_topic': True
+                }
+            else:
+                result = {'diagram_type': None, 'confidence': 0.0, 'source': 'none', 'has_topic': True}
+
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self.stats[result['source']] += 1
+            self.total_time += elapsed
+        return result
+
+    def record_outcome(self, short_circuited: bool) -> None:
+        """Record whether a classification was used or fell back to the LLM."""
+        with self._lock:
+            self.stats['short_circuited' if short_circuited else 'llm_fallback'] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get classifier statistics."""
+        with self._lock:
+            calls = self.stats['keyword'] + self.stats['ngram'] + self.stats['none']
+            return {
+                'calls': calls,
+                'keyword': self.stats['keyword'],
+                'ngram': self.stats['ngram'],
+                'no_prediction': self.stats['none'],
+                'short_circuited': self.stats['short_circuited'],
+                'llm_fallback': self.stats['llm_fallback'],
+                'avg_latency_us': round(self.total_time / calls * 1e6, 1) if calls else 0.0,
+            }
+
+
+_classifier: Optional[DiagramTypeClassifier] = None
+_classifier_lock = threading.Lock()
+
+
+def get_diagram_classifier() -> DiagramTypeClassifier:
+    """Get the shared classifier (trained on first use)."""
+    global _classifier
+    if _classifier is None:
+        with _classifier_lock:
+            if _classifier is None:
+                _classifier = DiagramTypeClassifier()
+    return _classifier
@@ -11,8 +11,9 @@ Phase 3 (Future): Full LangChain agent with prerequisite testing
 @made_by MindSpring Team
 """
 
+import asyncio
 import logging
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, AsyncIterator
 import json
 
 from agents.main_agent import QwenLLM
@@ -29,8 +30,14 @@ class LearningAgent:
     - Validate answers with semantic similarity
     - Provide progressive hints (3 levels)
     - Analyze misconceptions
+    
+    All LLM-backed methods are async (LLM Service), so they can run inside
+    FastAPI endpoints without blocking the event loop.
     """
     
+    # Default number of questions generated concurrently per session
+    DEFAULT_QUESTION_CONCURRENCY = 4
+    
     def __init__(self, language: str = 'en'):
         """
         Initialize learning agent.
@@ -42,7 +49,7 @@ class LearningAgent:
         self.llm = QwenLLM(model_type='generation')  # Use generation model
         logger.info(f"[LRNG] LearningAgent initialized | Language: {language}")
     
-    def generate_question(
+    async def generate_question(
         self,
         node_id: str,
         diagram_type: str,
@@ -78,7 +85,7 @@ class LearningAgent:
             prompt = self._build_question_prompt(node_id, context, diagram_type, language)
             
             # Generate question with LLM
-            response = self.llm._call(prompt)
+            response = await self.llm._acall(prompt)
             
             # Parse response
             question_text = response.strip()
@@ -107,7 +114,7 @@ class LearningAgent:
                 "difficulty": "easy"
             }
     
-    def validate_answer(
+    async def validate_answer(
         self,
         user_answer: str,
         correct_answer: str,
@@ -145,7 +152,7 @@ class LearningAgent:
                 }
             
             # Use LLM for semantic validation
-            is_correct, confidence = self._semantic_validation(
+            is_correct, confidence = await self._semantic_validation(
                 user_answer, correct_answer, question, context, language
             )
             
@@ -158,7 +165,7 @@ class LearningAgent:
                 }
             else:
                 # Analyze misconception
-                misconception = self._analyze_misconception(
+                misconception = await self._analyze_misconception(
                     user_answer, correct_answer, question, context, language
                 )
                 
@@ -183,7 +190,7 @@ class LearningAgent:
                 "proceed_to_next": is_correct
             }
     
-    def generate_hint(
+    async def generate_hint(
         self,
         correct_answer: str,
         question: str,
@@ -213,7 +220,7 @@ class LearningAgent:
             prompt = self._build_hint_prompt(correct_answer, question, context, hint_level, language)
             
             # Generate hint with LLM
-            response = self.llm._call(prompt)
+            response = await self.llm._acall(prompt)
             
             hint_text = response.strip()
             
@@ -234,7 +241,7 @@ class LearningAgent:
                 "max_hints": 3
             }
     
-    def verify_understanding(
+    async def verify_understanding(
         self,
         user_answer: str,
         correct_answer: str,
@@ -259,7 +266,7 @@ class LearningAgent:
         """
         try:
             # Similar to validate_answer but with understanding focus
-            is_correct, confidence = self._semantic_validation(
+            is_correct, confidence = await self._semantic_validation(
                 user_answer, correct_answer, verification_question, {}, language
             )
             
@@ -282,6 +289,52 @@ class LearningAgent:
                 "message": "Error verifying understanding"
             }
     
+    async def generate_questions(
+        self,
+        node_ids: List[str],
+        diagram_type: str,
+        spec: Dict[str, Any],
+        language: str = 'en',
+        max_concurrency: Optional[int] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Generate questions for several knocked-out nodes concurrently.
+        
+        At most max_concurrency LLM calls run at once. Questions are yielded
+        as soon as each is ready (completion order, not node order); each
+        result carries its node_id.
+        
+        Args:
+            node_ids: Knocked-out node IDs
+            diagram_type: Type of diagram
+            spec: Full diagram specification
+            language: 'en' or 'zh'
+            max_concurrency: Concurrent LLM calls (None uses DEFAULT_QUESTION_CONCURRENCY)
+        
+        Yields:
+            Question dicts as returned by generate_question
+        """
+        semaphore = asyncio.Semaphore(max(1, max_concurrency or self.DEFAULT_QUESTION_CONCURRENCY))
+        
+        async def _generate(node_id: str) -> Dict[str, Any]:
+            async with semaphore:
+                return await self.generate_question(
+                    node_id=node_id,
+                    diagram_type=diagram_type,
+                    spec=spec,
+                    language=language
+                )
+        
+        tasks = [asyncio.create_task(_generate(node_id)) for node_id in node_ids]
+        try:
+            for finished in asyncio.as_completed(tasks):
+                yield await finished
+        finally:
+            # Client went away mid-stream: stop the remaining LLM calls
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+    
     # ========================================================================
     # PRIVATE HELPER METHODS
     # ========================================================================
@@ -485,7 +538,7 @@ Hint:"""
         
         return prompt
     
-    def _semantic_validation(
+    async def _semantic_validation(
         self,
         user_answer: str,
         correct_answer: str,
@@ -540,7 +593,7 @@ Reason: brief explanation (one sentence)
 
 Answer:"""
             
-            response = self.llm._call(prompt)
+            response = await self.llm._acall(prompt)
             
             # Parse response
             lines = response.strip().split('\n')
@@ -564,7 +617,7 @@ Answer:"""
             # Fallback to exact match
             return self._is_exact_match(user_answer, correct_answer), 0.5
     
-    def _analyze_misconception(
+    async def _analyze_misconception(
         self,
         user_answer: str,
         correct_answer: str,
@@ -606,7 +659,7 @@ Diagnosis: [one sentence explaining the student's misunderstanding]
 
 Answer:"""
             
-            response = self.llm._call(prompt)
+            response = await self.llm._acall(prompt)
             
             # Parse response
             lines = response.strip().split('\n')
@@ -59,10 +59,10 @@ class LearningAgentV3:
         logger.info(f"[LRNG-V3] LearningAgentV3 initialized | Language: {language} | Tools: {len(self.tools)}")
     
     def _create_tools(self) -> List:
-        """Create the 5 LangChain tools for the agent."""
+        """Create the 5 LangChain tools for the agent (async; run via agent.ainvoke)."""
         
         @tool
-        def misconception_analyzer(
+        async def misconception_analyzer(
             correct_answer: str,
             student_answer: str,
             question_context: str
@@ -116,7 +116,7 @@ Respond in JSON format:
 
 Analysis:"""
                 
-                response = self.qwen_llm._call(prompt)
+                response = await self.qwen_llm._acall(prompt)
                 
                 # Try to parse as JSON, if fails return as text
                 try:
@@ -131,7 +131,7 @@ Analysis:"""
                 return json.dumps({"error": str(e)})
         
         @tool
-        def prerequisite_identifier(
+        async def prerequisite_identifier(
             misconception: str,
             correct_answer: str,
             student_answer: str
@@ -183,7 +183,7 @@ Respond in JSON format:
 
 Identification:"""
                 
-                response = self.qwen_llm._call(prompt)
+                response = await self.qwen_llm._acall(prompt)
                 
                 try:
                     json.loads(response)
@@ -196,7 +196,7 @@ Identification:"""
                 return json.dumps({"error": str(e)})
         
         @tool
-        def prerequisite_test_generator(
+        async def prerequisite_test_generator(
             prerequisite_concept: str,
             original_question: str,
             test_strategy: str
@@ -266,7 +266,7 @@ Respond in JSON format:
 
 Test question:"""
                 
-                response = self.qwen_llm._call(prompt)
+                response = await self.qwen_llm._acall(prompt)
                 
                 try:
                     json.loads(response)
@@ -279,7 +279,7 @@ Test question:"""
                 return json.dumps({"error": str(e)})
         
         @tool
-        def learning_material_generator(
+        async def learning_material_generator(
             prerequisite_concept: str,
             student_confusion: str
         ) -> str:
@@ -349,7 +349,7 @@ Respond in JSON format:
 
 Teaching material:"""
                 
-                response = self.qwen_llm._call(prompt)
+                response = await self.qwen_llm._acall(prompt)
                 
                 try:
                     json.loads(response)
@@ -362,7 +362,7 @@ Teaching material:"""
                 return json.dumps({"error": str(e)})
         
         @tool
-        def knowledge_base_search(
+        async def knowledge_base_search(
             topic: str,
             misconception_type: str
         ) -> str:
@@ -498,7 +498,7 @@ Question: {input}
         
         return agent_graph
     
-    def process_wrong_answer(
+    async def process_wrong_answer(
         self,
         user_answer: str,
         correct_answer: str,
@@ -538,8 +538,8 @@ Please analyze the misconception and determine if we need to test prerequisite k
                 "messages": [{"role": "user", "content": user_message}]
             }
             
-            # Run agent
-            result = self.agent.invoke(agent_input)
+            # Run agent (async: tools and model calls go through LLM Service on the event loop)
+            result = await self.agent.ainvoke(agent_input)
             
             # Extract final message from result
             messages = result.get("messages", [])
@@ -9,7 +9,7 @@ Custom LangChain LLM implementation that uses existing QwenClient.
 
 from typing import Any, List, Optional
 from langchain_core.language_models.llms import LLM
-from langchain_core.callbacks.manager import CallbackManagerForLLMRun
+from langchain_core.callbacks.manager import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
 import logging
 
 from agents.main_agent import QwenLLM as QwenLLMBase
@@ -73,6 +73,32 @@ class QwenLLM(LLM):
             logger.error(f"[QWEN-LC] Error calling Qwen: {str(e)}", exc_info=True)
             raise
     
+    async def _acall(
+        self,
+        prompt: str,
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> str:
+        """
+        Async version of _call (used by LangChain's ainvoke).
+        
+        Args:
+            prompt: The prompt to send to the LLM
+            stop: List of stop sequences (not used by Qwen currently)
+            run_manager: LangChain async callback manager
+            **kwargs: Additional arguments
+        
+        Returns:
+            Generated text from Qwen
+        """
+        try:
+            return await self.qwen_llm._acall(prompt)
+            
+        except Exception as e:
+            logger.error(f"[QWEN-LC] Error calling Qwen: {str(e)}", exc_info=True)
+            raise
+    
     @property
     def _identifying_params(self) -> dict:
         """Get the identifying parameters."""
@@ -17,6 +17,7 @@ generates the appropriate JSON specification for D3.js rendering.
 """
 
 import os
+import asyncio
 import logging
 import re
 import time
@@ -32,6 +33,7 @@ import yaml
 from config.settings import config
 import json
 from prompts import get_prompt
+from agents.core.diagram_classifier import get_diagram_classifier
 
 # Late imports to avoid circular dependencies
 def _get_concept_map_agent():
@@ -279,8 +281,8 @@ def get_llm_timing_stats():
 class _LegacyLLMStub:
     """Stub for old concept map functions - uses LLM Service"""
     def _call(self, prompt):
-        import asyncio
         from services.llm_service import llm_service
+        from services.async_bridge import async_bridge
         
         async def _async_call():
             try:
@@ -293,57 +295,17 @@ class _LegacyLLMStub:
                 logger.error(f"_LegacyLLMStub: LLM service call failed: {e}", exc_info=True)
                 raise
         
+        # Sync caller: run on the app loop (or the shared background loop) and wait
         try:
-            # Try to get the current event loop (we're in an async context)
-            loop = asyncio.get_running_loop()
-            # We're in an async context, but _call is synchronous
-            # Use a thread pool to run the async call in a separate thread with its own event loop
-            import concurrent.futures
-            import threading
-            
-            result_container = {'result': None, 'exception': None}
-            
-            def run_in_thread():
-                """Run async call in a new thread with its own event loop"""
-                try:
-                    new_loop = asyncio.new_event_loop()
-                    asyncio.set_event_loop(new_loop)
-                    result_container['result'] = new_loop.run_until_complete(_async_call())
-                    new_loop.close()
-                except Exception as e:
-                    result_container['exception'] = e
-                finally:
-                    if 'new_loop' in locals():
-                        new_loop.close()
-            
-            thread = threading.Thread(target=run_in_thread)
-            thread.start()
-            thread.join(timeout=35.0)  # Wait up to 35 seconds
-            
-            if thread.is_alive():
-                logger.error("_LegacyLLMStub: LLM call timed out")
-                raise TimeoutError("LLM call timed out after 35 seconds")
-            
-            if result_container['exception']:
-                raise result_container['exception']
-            
-            if result_container['result'] is None:
-                raise ValueError("LLM call returned None")
-            
-            return result_container['result']
-            
-        except RuntimeError:
-            # No event loop running, create a new one
-            try:
-                loop = asyncio.get_event_loop()
-            except RuntimeError:
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-            try:
-                return loop.run_until_complete(_async_call())
-            finally:
-                if loop.is_closed():
-                    asyncio.set_event_loop(None)
+            result = async_bridge.run(_async_call(), timeout=35.0)
+        except TimeoutError:
+            logger.error("_LegacyLLMStub: LLM call timed out")
+            raise
+        
+        if result is None:
+            raise ValueError("LLM call returned None")
+        
+        return result
 
 # Legacy stubs for old concept map code - now using LLM Service
 llm_classification = _LegacyLLMStub()
@@ -353,7 +315,10 @@ llm = _LegacyLLMStub()
 
 class QwenLLM:
     """
-    Backward-compatible sync wrapper for learning agents that haven't been migrated to async yet.
+    LLM Service wrapper for the learning agents.
+    
+    _acall is the async entry point; _call is a sync wrapper (via async_bridge)
+    for LangChain code paths that still call it synchronously.
     
     Now uses LLM Service instead of direct client (Phase 5 migration).
     Used by: LearningAgent, LearningAgentV3, and qwen_langchain.py
@@ -378,23 +343,30 @@ class QwenLLM:
         Returns:
             str: The LLM response content
         """
-        import asyncio
-        from services.llm_service import llm_service
+        from services.async_bridge import async_bridge
         
-        async def _async_call():
-            return await llm_service.chat(
-                prompt=prompt,
-                model='qwen',
-                timeout=30.0
-            )
+        return async_bridge.run(self._acall(prompt), timeout=35.0)
+    
+    async def _acall(self, prompt: str, stop=None, **tracking):
+        """
+        Async LLM Service call - use this from async code instead of _call.
         
-        try:
-            loop = asyncio.get_event_loop()
-        except RuntimeError:
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
+        Args:
+            prompt: The prompt to send to the LLM
+            stop: Stop sequences (not used, kept for compatibility)
+            **tracking: Token tracking parameters passed to llm_service.chat
+            
+        Returns:
+            str: The LLM response content
+        """
+        from services.llm_service import llm_service
         
-        return loop.run_until_complete(_async_call())
+        return await llm_service.chat(
+            prompt=prompt,
+            model='qwen',
+            timeout=30.0,
+            **tracking
+        )
 
 
 # ============================================================================
@@ -778,7 +750,8 @@ async def _detect_diagram_type_from_prompt(
     endpoint_path=None
 ) -> dict:
     """
-    LLM-based diagram type detection using semantic understanding.
+    Diagram type detection: local classifier first, LLM semantic understanding
+    when the local prediction is not confident enough.
     
     Args:
         user_prompt: User's input prompt
@@ -798,6 +771,28 @@ async def _detect_diagram_type_from_prompt(
         is_too_short = len(prompt_words) < 2
         is_too_long = len(prompt_words) > 100
         
+        # Local classifier (microseconds) - skip the LLM round-trip for clear prompts
+        if config.LOCAL_CLASSIFIER_ENABLED and not is_too_long:
+            classifier = get_diagram_classifier()
+            local = classifier.classify(user_prompt)
+            # A bare diagram name ("气泡图") has no topic: the LLM answers with guidance
+            short_circuit = (
+                local['diagram_type'] is not None
+                and local['has_topic']
+                and local['confidence'] >= config.LOCAL_CLASSIFIER_MIN_CONFIDENCE
+            )
+            classifier.record_outcome(short_circuit)
+            if short_circuit:
+                logger.debug(
+                    f"Local classification: '{user_prompt}' → {local['diagram_type']} "
+                    f"({local['source']}, confidence: {local['confidence']:.2f})"
+                )
+                return {
+                    'diagram_type': local['diagram_type'],
+                    'clarity': 'unclear' if is_too_short else 'clear',
+                    'has_topic': True
+                }
+        
         # Get classification prompt from centralized system
         classification_prompt = get_prompt("classification", language, "generation")
         classification_prompt = classification_prompt.format(user_prompt=user_prompt)
@@ -1767,6 +1762,49 @@ def _clean_prompt_for_learning_sheet(user_prompt: str) -> str:
     return cleaned_prompt
 
 
+async def _extract_topic_from_prompt(
+    user_prompt: str,
+    language: str,
+    model: str = 'qwen',
+    user_id=None,
+    organization_id=None,
+    request_type='diagram_generation',
+    endpoint_path=None,
+    session_id=None
+) -> str:
+    """Extract the main topic of a prompt with the LLM (independent of the diagram type)."""
+    from services.llm_service import llm_service
+    
+    # Use centralized topic extraction prompt
+    topic_extraction_prompt = get_prompt("topic_extraction", language, "generation")
+    topic_extraction_prompt = topic_extraction_prompt.format(user_prompt=user_prompt)
+    
+    main_topic = await llm_service.chat(
+        prompt=topic_extraction_prompt,
+        model=model,
+        max_tokens=50,
+        temperature=0.1,  # Lower temperature for more deterministic extraction
+        # Token tracking parameters
+        user_id=user_id,
+        organization_id=organization_id,
+        request_type=request_type,
+        endpoint_path=endpoint_path,
+        session_id=session_id
+    )
+    return main_topic.strip().strip('"\'')
+
+
+def _discard_speculation(task: asyncio.Task, speculation_id: str):
+    """Cancel (or drop the finished result of) a speculative task and record the miss."""
+    from services.token_tracker import get_token_tracker
+    cancelled = not task.done()
+    if cancelled:
+        task.cancel()
+    elif not task.cancelled() and task.exception():
+        logger.debug(f"Discarded speculative task had failed: {task.exception()}")
+    get_token_tracker().end_speculation(speculation_id, hit=False, cancelled=cancelled)
+
+
 async def agent_graph_workflow_with_styles(
     user_prompt, 
     language='zh', 
@@ -1817,65 +1855,86 @@ async def agent_graph_workflow_with_styles(
             detection_result = {'diagram_type': diagram_type, 'clarity': 'clear', 'has_topic': True}
             logger.debug(f"Using forced diagram type: {diagram_type}")
         else:
-            # LLM-based diagram type detection for semantic understanding
-            detection_start = time.time()
-            detection_result = await _detect_diagram_type_from_prompt(
-                user_prompt, 
-                language, 
-                model,
-                # Token tracking parameters
-                user_id=user_id,
-                organization_id=organization_id,
-                request_type=request_type,
-                endpoint_path=endpoint_path
-            )
-            detection_time = time.time() - detection_start
-            diagram_type = detection_result['diagram_type']
-            logger.info(f"Diagram type detection completed in {detection_time:.2f}s: {diagram_type} (clarity: {detection_result['clarity']})")
+            # Prompt-based generation: detect the type and extract the topic, let frontend use default template.
+            # Topic extraction doesn't depend on the diagram type, so in speculative mode it starts
+            # alongside detection and is only thrown away if detection rejects the prompt.
+            topic_task = None
+            speculation_id = None
+            if config.SPECULATIVE_GENERATION_ENABLED:
+                from services.token_tracker import get_token_tracker
+                token_tracker = get_token_tracker()
+                speculation_id = token_tracker.begin_speculation()
+                topic_task = asyncio.create_task(_extract_topic_from_prompt(
+                    user_prompt,
+                    language,
+                    model,
+                    user_id=user_id,
+                    organization_id=organization_id,
+                    request_type=request_type,
+                    endpoint_path=endpoint_path,
+                    session_id=speculation_id
+                ))
             
-            # Check if prompt is too complex/unclear and should show guidance modal
-            if detection_result['clarity'] == 'very_unclear' and not detection_result['has_topic']:
-                logger.warning(f"Prompt is too complex or unclear: '{user_prompt}'")
-                return {
-                    'success': False,
-                    'error_type': 'prompt_too_complex',
-                    'error': 'Unable to understand the request',
-                    'spec': create_error_response(
-                        'Prompt is too complex or unclear', 
-                        'prompt_too_complex',
-                        {'user_prompt': user_prompt}
-                    ),
-                    'diagram_type': 'mind_map',
-                    'topics': [],
-                    'style_preferences': {},
-                    'language': language,
-                    'show_guidance': True
-                }
-        
-        # Extract main topic from prompt using LLM (only if not forced diagram type)
-        if not forced_diagram_type:
-            # Prompt-based generation: just extract topic, let frontend use default template
-            from services.llm_service import llm_service
-            
-            # Use centralized topic extraction prompt
-            topic_extraction_prompt = get_prompt("topic_extraction", language, "generation")
-            topic_extraction_prompt = topic_extraction_prompt.format(user_prompt=user_prompt)
+            try:
+                # LLM-based diagram type detection for semantic understanding
+                detection_start = time.time()
+                detection_result = await _detect_diagram_type_from_prompt(
+                    user_prompt, 
+                    language, 
+                    model,
+                    # Token tracking parameters
+                    user_id=user_id,
+                    organization_id=organization_id,
+                    request_type=request_type,
+                    endpoint_path=endpoint_path
+                )
+                detection_time = time.time() - detection_start
+                diagram_type = detection_result['diagram_type']
+                logger.info(f"Diagram type detection completed in {detection_time:.2f}s: {diagram_type} (clarity: {detection_result['clarity']})")
+                
+                # Check if prompt is too complex/unclear and should show guidance modal
+                if detection_result['clarity'] == 'very_unclear' and not detection_result['has_topic']:
+                    logger.warning(f"Prompt is too complex or unclear: '{user_prompt}'")
+                    if topic_task:
+                        _discard_speculation(topic_task, speculation_id)
+                        topic_task = None
+                    return {
+                        'success': False,
+                        'error_type': 'prompt_too_complex',
+                        'error': 'Unable to understand the request',
+                        'spec': create_error_response(
+                            'Prompt is too complex or unclear', 
+                            'prompt_too_complex',
+                            {'user_prompt': user_prompt}
+                        ),
+                        'diagram_type': 'mind_map',
+                        'topics': [],
+                        'style_preferences': {},
+                        'language': language,
+                        'show_guidance': True
+                    }
+                
+                topic_start = time.time()
+                if topic_task:
+                    main_topic = await topic_task
+                    topic_task = None
+                    token_tracker.end_speculation(speculation_id, hit=True)
+                else:
+                    main_topic = await _extract_topic_from_prompt(
+                        user_prompt,
+                        language,
+                        model,
+                        user_id=user_id,
+                        organization_id=organization_id,
+                        request_type=request_type,
+                        endpoint_path=endpoint_path
+                    )
+                topic_time = time.time() - topic_start
+            finally:
+                if topic_task:
+                    _discard_speculation(topic_task, speculation_id)
             
-            topic_start = time.time()
-            main_topic = await llm_service.chat(
-                prompt=topic_extraction_prompt,
-                model=model,
-                max_tokens=50,
-                temperature=0.1,  # Lower temperature for more deterministic extraction
-                # Token tracking parameters
-                user_id=user_id,
-                organization_id=organization_id,
-                request_type=request_type,
-                endpoint_path=endpoint_path
-            )
-            topic_time = time.time() - topic_start
-            main_topic = main_topic.strip().strip('"\'')
-            logger.info(f"Topic extraction completed in {topic_time:.2f}s: '{main_topic}'")
+            logger.info(f"Topic extraction completed in {topic_time:.2f}s after detection: '{main_topic}'")
             
             # Return just the topic and diagram type - frontend will load default template
             total_time = time.time() - workflow_start_time
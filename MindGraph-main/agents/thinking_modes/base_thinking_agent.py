@@ -24,6 +24,7 @@ from enum import Enum
 
 from config.settings import config
 from services.llm_service import llm_service
+from services.session_store import get_session_store
 
 logger = logging.getLogger(__name__)
 
@@ -70,14 +71,14 @@ class BaseThinkingAgent(ABC):
         self.llm = llm_service
         self.model = 'qwen-plus'  # Better reasoning than qwen-turbo
         
-        # Session storage (in-memory for MVP)
-        self.sessions: Dict[str, Dict] = {}
+        # Session storage (bounded, shared across workers with the sqlite backend)
+        self.sessions = get_session_store(f"thinking_mode:{diagram_type}")
         
         logger.debug(f"[{self.__class__.__name__}] Initialized for diagram type: {diagram_type}")
     
     # ===== SESSION MANAGEMENT =====
     
-    def _get_or_create_session(
+    async def _get_or_create_session(
         self,
         session_id: str,
         diagram_data: Optional[Dict] = None,
@@ -96,7 +97,8 @@ class BaseThinkingAgent(ABC):
         Returns:
             Session dictionary
         """
-        if session_id not in self.sessions:
+        session = await self.sessions.aget(session_id)
+        if session is None:
             # Detect language from diagram data
             language = 'en'
             if diagram_data:
@@ -114,7 +116,7 @@ class BaseThinkingAgent(ABC):
                 language = self._detect_language(center_text)
                 logger.debug(f"[{self.__class__.__name__}] Language detection from text: '{center_text[:30]}...' → {language}")
             
-            self.sessions[session_id] = {
+            session = {
                 'session_id': session_id,
                 'user_id': user_id,
                 'state': initial_state,
@@ -124,9 +126,10 @@ class BaseThinkingAgent(ABC):
                 'language': language,
                 'node_count': len(diagram_data.get('children', [])) if diagram_data else 0
             }
+            await self.sessions.aset(session_id, session)
             logger.debug(f"[{self.__class__.__name__}] Created session: {session_id} | Language: {language}")
         
-        return self.sessions[session_id]
+        return session
     
     def get_session(self, session_id: str) -> Optional[Dict]:
         """Get session by ID (for external access)"""
@@ -178,7 +181,7 @@ class BaseThinkingAgent(ABC):
             SSE events (message_chunk, diagram_update, state_transition, etc.)
         """
         # Get or create session
-        session = self._get_or_create_session(
+        session = await self._get_or_create_session(
             session_id=session_id,
             diagram_data=diagram_data,
             user_id=user_id,
@@ -202,14 +205,18 @@ class BaseThinkingAgent(ABC):
             f"State: {current_state} | Message: {message[:50] if message else 'None'}..."
         )
         
-        # ReAct Step 1: REASON - Understand user intent
-        intent = await self._reason(session, message, current_state, is_initial_greeting)
-        
-        logger.debug(f"[{self.__class__.__name__}] REASON → Intent: {intent.get('action', 'unknown')}")
-        
-        # ReAct Step 2: ACT - Execute action based on intent
-        async for event in self._act(session, intent, message, current_state):
-            yield event
+        # Handlers update the session in place; write it back when the cycle ends
+        try:
+            # ReAct Step 1: REASON - Understand user intent
+            intent = await self._reason(session, message, current_state, is_initial_greeting)
+            
+            logger.debug(f"[{self.__class__.__name__}] REASON → Intent: {intent.get('action', 'unknown')}")
+            
+            # ReAct Step 2: ACT - Execute action based on intent
+            async for event in self._act(session, intent, message, current_state):
+                yield event
+        finally:
+            await self.sessions.aset(session_id, session)
         
         # ReAct Step 3: OBSERVE - Handled within _act through streaming responses
         # The agent observes results and continues dialogue naturally
@@ -30,12 +30,6 @@ class BraceMapPaletteGenerator(BasePaletteGenerator):
     - subparts: Generate sub-parts for specific part (Stage 3)
     """
     
-    def __init__(self):
-        """Initialize brace map palette generator"""
-        super().__init__()
-        # Track stage data per session
-        self.session_stages = {}  # session_id -> {'stage': str, 'dimension': str, 'part_name': str, 'parts': []}
-    
     async def generate_batch(
         self,
         session_id: str,
@@ -60,20 +54,13 @@ class BraceMapPaletteGenerator(BasePaletteGenerator):
             stage: Generation stage ('dimensions', 'parts', 'subparts')
             stage_data: Stage-specific data (dimension, part_name, parts, etc.)
         """
-        # Store stage info (for backward compatibility and state tracking)
-        if session_id not in self.session_stages:
-            self.session_stages[session_id] = {}
-        self.session_stages[session_id]['stage'] = stage
-        if stage_data:
-            self.session_stages[session_id].update(stage_data)
-        
         logger.debug("[BraceMapPalette] Stage: %s | Session: %s | Topic: '%s'", 
                    stage, session_id[:8], center_topic)
         if stage_data:
             logger.debug("[BraceMapPalette] Stage data: %s", stage_data)
         
         # Pass session_id and stage_data through educational_context so _build_prompt can access them directly
-        # This is better than relying on session_stages lookup (avoids timing/state sync issues)
+        # (_update_session also merges them into the session's stage_info)
         if educational_context is None:
             educational_context = {}
         educational_context = {**educational_context, 
@@ -118,7 +105,7 @@ class BraceMapPaletteGenerator(BasePaletteGenerator):
         """
         Build stage-specific prompt for Brace Map node generation.
         
-        Checks session_stages to determine current stage and builds appropriate prompt.
+        Reads the current stage from educational_context and builds appropriate prompt.
         
         Args:
             center_topic: The whole to be decomposed
@@ -134,16 +121,15 @@ class BraceMapPaletteGenerator(BasePaletteGenerator):
         context_desc = educational_context.get('raw_message', 'General K12 teaching') if educational_context else 'General K12 teaching'
         
         # Get stage and stage_data directly from educational_context (passed through in generate_batch)
-        # This is more reliable than session_stages lookup - avoids state sync issues
         stage = educational_context.get('_stage', 'dimensions') if educational_context else 'dimensions'
         stage_data = educational_context.get('_stage_data', {}) if educational_context else {}
         
-        # Fallback to session_stages for backward compatibility (if not in educational_context)
+        # Fallback to the session's stage info (stage data merged across calls)
         if stage == 'dimensions' and not stage_data:
-            session_id = educational_context.get('_session_id') if educational_context else None
-            if session_id and session_id in self.session_stages:
-                stage = self.session_stages[session_id].get('stage', 'dimensions')
-                stage_data = self.session_stages[session_id]
+            stage_info = educational_context.get('_stage_info') if educational_context else None
+            if stage_info:
+                stage = stage_info.get('stage', 'dimensions')
+                stage_data = stage_info
         
         logger.debug("[BraceMapPalette-Prompt] Building prompt for stage: %s | Stage data: %s", stage, stage_data)
         
@@ -502,18 +488,6 @@ Generate {count} sub-components for "{part_name}":"""
             has_chinese = bool(re.search(r'[\u4e00-\u9fff]', educational_context['raw_message']))
         
         return '你是一个有帮助的K12教育助手。' if has_chinese else 'You are a helpful K12 education assistant.'
-    
-    def end_session(self, session_id: str, reason: str = "complete"):
-        """
-        End session and cleanup stage data.
-        
-        Overrides base class to also clean up session_stages.
-        """
-        # Clean up stage data
-        self.session_stages.pop(session_id, None)
-        
-        # Call parent cleanup
-        super().end_session(session_id, reason)
 
 
 # Global singleton instance for Brace Map
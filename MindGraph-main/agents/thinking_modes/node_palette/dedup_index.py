@@ -0,0 +1,175 @@
+"""
+Node Palette Dedup Index
+========================
+
+Per-session index of normalized node texts for fuzzy deduplication.
+
+A new text is a duplicate when SequenceMatcher(None, new, seen).ratio() is
+above the threshold (0.85) for some seen text. Instead of running
+SequenceMatcher against every seen text, candidates are narrowed with bounds
+that can never reject a true match:
+
+- Length: ratio <= 2 * min(la, lb) / (la + lb), so only a band of lengths
+  can match
+- Prefix filter: ratio <= 2 * (shared characters, with multiplicity) / (la + lb).
+  With every text's characters in one fixed global order, two texts that
+  share enough characters must share one among the first few of each, so
+  only those prefix characters are indexed and probed
+- Bigram prefix filter: matching characters in k blocks share M - k bigrams,
+  which bounds shared bigrams from below for texts of 5+ characters; bigrams
+  are far more selective than single characters, so longer probes use them
+- quick_ratio(), the same character-count bound, before the exact ratio()
+
+Lookups touch a few short posting lists instead of every seen text.
+
+Copyright 2024-2025 北京思源智教科技有限公司 (Beijing Siyuan Zhijiao Technology Co., Ltd.)
+All Rights Reserved
+Proprietary License
+"""
+
+import math
+import zlib
+from collections import defaultdict
+from difflib import SequenceMatcher
+from typing import Dict, List, Optional, Set, Tuple
+
+# English letters from most to least frequent; rarer letters sort first until
+# the index has seen enough text to know its own frequencies
+_LETTER_FREQUENCY = 'etaoinshrdlcumwfgypbvkjxqz'
+_LETTER_RANK = {letter: rank for rank, letter in enumerate(reversed(_LETTER_FREQUENCY))}
+
+Token = Tuple[str, int]
+
+
+def _static_order(token: Token) -> Tuple[int, int, int]:
+    gram, occurrence = token
+    char = gram[0]
+    if char == ' ':
+        return (3, 0, -occurrence)
+    if char in _LETTER_RANK:
+        return (2, _LETTER_RANK[char], -occurrence)
+    if char.isdigit():
+        return (1, ord(char), -occurrence)
+    # CJK and everything else: a fixed pseudo-random order
+    return (0, zlib.crc32(gram.encode('utf-8')), -occurrence)
+
+
+def _tokens(text: str, q: int) -> List[Token]:
+    """q-grams with multiplicity: (gram, 1), (gram, 2), ..."""
+    counts: Dict[str, int] = defaultdict(int)
+    tokens = []
+    for i in range(len(text) - q + 1):
+        gram = text[i:i + q]
+        counts[gram] += 1
+        tokens.append((gram, counts[gram]))
+    return tokens
+
+
+class _PrefixIndex:
+    """
+    Prefix-filter index over the q-grams of every text.
+
+    required(length) is a lower bound on the q-grams a text of that length
+    shares with any match; each text is indexed under its first
+    (q-grams - required + 1) q-grams in the global order, and a probe only
+    needs to look up its own prefix. Rare q-grams sort first: the order
+    follows the q-gram frequencies frozen at the last reindex (every time the
+    index doubles), so it stays fixed between reindexes as the filter requires.
+    """
+
+    def __init__(self, q: int, overlap_per_char: float, slack: int):
+        self.q = q
+        self._overlap_per_char = overlap_per_char
+        self._slack = slack
+        self._postings: Dict[Token, List[int]] = defaultdict(list)
+        self._frequency: Dict[Token, int] = defaultdict(int)
+        self._frozen_frequency: Dict[Token, int] = {}
+        self._next_reindex = 32
+
+    def required(self, length: int) -> int:
+        return math.floor(self._overlap_per_char * length) - self._slack
+
+    def prefix(self, text: str) -> List[Token]:
+        frequency = self._frozen_frequency
+        tokens = sorted(_tokens(text, self.q), key=lambda token: (frequency.get(token, 0), _static_order(token)))
+        required = max(1, self.required(len(text)))
+        return tokens[:max(0, len(tokens) - required + 1)]
+
+    def candidates(self, text: str) -> List[List[int]]:
+        return [self._postings[token] for token in self.prefix(text) if token in self._postings]
+
+    def add(self, texts: List[str]):
+        """Index texts[-1]."""
+        for token in _tokens(texts[-1], self.q):
+            self._frequency[token] += 1
+        if len(texts) >= self._next_reindex:
+            self._frozen_frequency = dict(self._frequency)
+            self._postings = defaultdict(list)
+            for index, text in enumerate(texts):
+                for token in self.prefix(text):
+                    self._postings[token].append(index)
+            self._next_reindex = 2 * len(texts)
+            return
+        for token in self.prefix(texts[-1]):
+            self._postings[token].append(len(texts) - 1)
+
+
+class NodeDedupIndex:
+    """Exact and fuzzy (SequenceMatcher ratio) lookup over one session's node texts."""
+
+    def __init__(self, threshold: float = 0.85):
+        self.threshold = threshold
+        # ratio > threshold bounds the partner length: lb > la * t / (2 - t)
+        self._min_length_factor = threshold / (2 - threshold)
+        # Matching characters M > t / 2 * (la + lb) > t / 2 * (1 + factor) * la
+        char_overlap = threshold / 2 * (1 + self._min_length_factor)
+        # M characters in k matching blocks share M - k bigrams, and k - 1 is at
+        # most the unmatched characters (la - M) + (lb - M), so shared bigrams
+        # >= 3M - la - lb - 1 > (1.5t - 1) * (1 + factor) * la - 1
+        bigram_overlap = (1.5 * threshold - 1) * (1 + self._min_length_factor)
+        # Bounds are loosened (slack) so float rounding can't drop a true match
+        self._chars = _PrefixIndex(1, char_overlap, slack=1)
+        self._bigrams = _PrefixIndex(2, bigram_overlap, slack=2)
+        self._texts: List[str] = []
+        self._exact: Set[str] = set()
+
+    def __len__(self) -> int:
+        return len(self._texts)
+
+    def __contains__(self, text: str) -> bool:
+        return text in self._exact
+
+    def _length_band(self, length: int) -> Tuple[int, int]:
+        low = math.floor(length * self._min_length_factor) - 1
+        high = math.ceil(length / self._min_length_factor) + 1
+        return max(0, low), high
+
+    def find_similar(self, text: str) -> Optional[Tuple[str, float]]:
+        """Return (seen_text, ratio) for a seen text with ratio above the threshold, else None."""
+        # Bigrams are far more selective, but only bound matches of longer texts
+        index = self._bigrams if self._bigrams.required(len(text)) >= 1 else self._chars
+        low, high = self._length_band(len(text))
+        checked: Set[int] = set()
+        for postings in sorted(index.candidates(text), key=len):
+            for position in postings:
+                if position in checked:
+                    continue
+                checked.add(position)
+                seen_text = self._texts[position]
+                if not low <= len(seen_text) <= high:
+                    continue
+                matcher = SequenceMatcher(None, text, seen_text)
+                if matcher.quick_ratio() <= self.threshold:
+                    continue
+                similarity = matcher.ratio()
+                if similarity > self.threshold:
+                    return seen_text, similarity
+        return None
+
+    def add(self, text: str):
+        if text in self._exact:
+            return
+        self._texts.append(text)
+        self._exact.add(text)
+        self._chars.add(self._texts)
+        self._bigrams.add(self._texts)
@@ -31,8 +31,6 @@ class DoubleBubblePaletteGenerator(BasePaletteGenerator):
     
     def __init__(self):
         super().__init__()
-        # Mode-specific session storage
-        self.current_mode = {}  # session_id -> 'similarities' | 'differences'
         # Note: Mode is passed through educational_context to avoid race conditions
         # with parallel catapults (no shared instance state!)
     
@@ -54,15 +52,12 @@ class DoubleBubblePaletteGenerator(BasePaletteGenerator):
         Args:
             mode: 'similarities' for shared attributes, 'differences' for pairs
         """
-        # Store mode for this session
-        self.current_mode[session_id] = mode
-        
         # Pass mode through educational_context to avoid race conditions
         # (Don't use instance variable - it's shared between parallel catapults!)
         if educational_context is None:
             educational_context = {}
         educational_context = dict(educational_context)  # Make a copy
-        educational_context['_mode'] = mode  # Embed mode in context
+        educational_context['_mode'] = mode  # Embed mode in context (_update_session keeps it with the session)
         
         # Call parent's generate_batch (handles LLM streaming)
         async for chunk in super().generate_batch(
@@ -326,11 +321,6 @@ Generate {count} difference pairs:"""
             has_chinese = bool(re.search(r'[\u4e00-\u9fff]', educational_context['raw_message']))
         
         return '你是一个有帮助的K12教育助手。' if has_chinese else 'You are a helpful K12 education assistant.'
-    
-    def end_session(self, session_id: str, reason: str = "complete"):
-        """Clean up session including mode tracking"""
-        super().end_session(session_id, reason)
-        self.current_mode.pop(session_id, None)
 
 
 # Global singleton instance for Double Bubble Map
@@ -32,14 +32,6 @@ class FlowMapPaletteGenerator(BasePaletteGenerator):
     Key feature: Each generated step gets a sequence number for ordering.
     """
     
-    def __init__(self):
-        """Initialize flow map palette generator"""
-        super().__init__()
-        # Track stage data per session
-        self.session_stages = {}  # session_id -> {'stage': str, 'dimension': str, 'step_name': str}
-        # Track step sequence numbers per session
-        self.step_sequences = {}  # session_id -> next_sequence_number
-    
     async def generate_batch(
         self,
         session_id: str,
@@ -64,24 +56,18 @@ class FlowMapPaletteGenerator(BasePaletteGenerator):
             stage: Generation stage ('dimensions', 'steps', 'substeps')
             stage_data: Stage-specific data (dimension, step_name, etc.)
         """
-        # Store stage info
-        if session_id not in self.session_stages:
-            self.session_stages[session_id] = {}
-            # Initialize sequence counter (start at 1)
-            self.step_sequences[session_id] = 1
-        self.session_stages[session_id]['stage'] = stage
-        if stage_data:
-            self.session_stages[session_id].update(stage_data)
-        
         logger.info("[FlowMapPalette] Stage: %s | Session: %s | Topic: '%s'", 
                    stage, session_id[:8], center_topic)
         if stage_data:
             logger.info("[FlowMapPalette] Stage data: %s", stage_data)
         
-        # Pass session_id through educational_context so _build_prompt can access it
+        # Pass stage through educational_context; _update_session stores it with the session
         if educational_context is None:
             educational_context = {}
-        educational_context = {**educational_context, '_session_id': session_id}
+        educational_context = {**educational_context,
+                              '_session_id': session_id,
+                              '_stage': stage,
+                              '_stage_data': stage_data or {}}
         
         # Call base class generate_batch which will use our _build_prompt
         async for event in super().generate_batch(
@@ -110,12 +96,19 @@ class FlowMapPaletteGenerator(BasePaletteGenerator):
                 
                 # CRITICAL: Add sequence number for steps
                 if stage == 'steps':
-                    node['sequence'] = self.step_sequences[session_id]
-                    self.step_sequences[session_id] += 1
+                    session = educational_context['_session']
+                    node['sequence'] = session['next_sequence']
+                    session['next_sequence'] += 1
                     logger.info(f"[FlowMapPalette] Step node tagged with sequence={node['sequence']} | ID: {node.get('id', 'unknown')}")
             
             yield event
     
+    def _update_session(self, session: Dict[str, Any], educational_context: Optional[Dict[str, Any]]) -> None:
+        """Also keep the step sequence counter (starts at 1) in the session."""
+        super()._update_session(session, educational_context)
+        session.setdefault('next_sequence', 1)
+        educational_context['_session'] = session
+    
     def _build_prompt(
         self,
         center_topic: str,
@@ -139,11 +132,8 @@ class FlowMapPaletteGenerator(BasePaletteGenerator):
         language = educational_context.get('language', 'en') if educational_context else 'en'
         context_desc = educational_context.get('raw_message', 'General K12 teaching') if educational_context else 'General K12 teaching'
         
-        # Get session_id from educational_context (passed through from generate_batch)
-        session_id = educational_context.get('_session_id', '') if educational_context else ''
-        
-        # Get current stage and stage_data
-        stage_info = self.session_stages.get(session_id, {})
+        # Get current stage and stage_data (merged into the session by _update_session)
+        stage_info = educational_context.get('_stage_info', {}) if educational_context else {}
         stage = stage_info.get('stage', 'dimensions')
         
         logger.debug(f"[FlowMapPalette-Prompt] Building prompt for stage: {stage}")
@@ -346,19 +336,6 @@ Generate {count} substeps:"""
             has_chinese = bool(re.search(r'[\u4e00-\u9fff]', educational_context['raw_message']))
         
         return '你是一个有帮助的K12教育助手。' if has_chinese else 'You are a helpful K12 education assistant.'
-    
-    def end_session(self, session_id: str, reason: str = "complete"):
-        """
-        End session and cleanup stage data and sequence tracking.
-        
-        Overrides base class to also clean up session_stages and step_sequences.
-        """
-        # Clean up stage data and sequence tracking
-        self.session_stages.pop(session_id, None)
-        self.step_sequences.pop(session_id, None)
-        
-        # Call parent cleanup
-        super().end_session(session_id, reason)
 
 
 # Global singleton instance for Flow Map
@@ -31,12 +31,6 @@ class MindMapPaletteGenerator(BasePaletteGenerator):
     - children: Generate sub-branches for specific branch
     """
     
-    def __init__(self):
-        """Initialize mind map palette generator"""
-        super().__init__()
-        # Track stage data per session
-        self.session_stages = {}  # session_id -> {'stage': str, 'branch_name': str}
-    
     async def generate_batch(
         self,
         session_id: str,
@@ -61,20 +55,13 @@ class MindMapPaletteGenerator(BasePaletteGenerator):
             stage: Generation stage ('branches', 'children')
             stage_data: Stage-specific data (branch_name, etc.)
         """
-        # Store stage info (for backward compatibility and state tracking)
-        if session_id not in self.session_stages:
-            self.session_stages[session_id] = {}
-        self.session_stages[session_id]['stage'] = stage
-        if stage_data:
-            self.session_stages[session_id].update(stage_data)
-        
         logger.debug("[MindMapPalette] Stage: %s | Session: %s | Topic: '%s'", 
                    stage, session_id[:8], center_topic)
         if stage_data:
             logger.debug("[MindMapPalette] Stage data: %s", stage_data)
         
         # Pass session_id and stage_data through educational_context so _build_prompt can access them directly
-        # This is better than relying on session_stages lookup (avoids timing/state sync issues)
+        # (_update_session also merges them into the session's stage_info)
         if educational_context is None:
             educational_context = {}
         educational_context = {**educational_context, 
@@ -119,7 +106,7 @@ class MindMapPaletteGenerator(BasePaletteGenerator):
         """
         Build stage-specific prompt for Mind Map node generation.
         
-        Checks session_stages to determine current stage and builds appropriate prompt.
+        Reads the session's stage info to determine current stage and builds appropriate prompt.
         
         Args:
             center_topic: Central topic
@@ -136,14 +123,14 @@ class MindMapPaletteGenerator(BasePaletteGenerator):
         # Use same context extraction as auto-complete
         context_desc = educational_context.get('raw_message', 'General K12 teaching') if educational_context else 'General K12 teaching'
         
-        # Determine current stage from session_stages
-        session_id = educational_context.get('_session_id') if educational_context else None
+        # Determine current stage from the session's stage info
+        stage_info = educational_context.get('_stage_info') if educational_context else None
         stage = 'branches'  # default
         stage_data = {}
         
-        if session_id and session_id in self.session_stages:
-            stage = self.session_stages[session_id].get('stage', 'branches')
-            stage_data = self.session_stages[session_id]
+        if stage_info:
+            stage = stage_info.get('stage', 'branches')
+            stage_data = stage_info
         
         logger.debug("[MindMapPalette-Prompt] Building prompt for stage: %s", stage)
         
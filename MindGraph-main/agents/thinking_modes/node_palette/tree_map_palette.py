@@ -33,12 +33,6 @@ class TreeMapPaletteGenerator(BasePaletteGenerator):
     - children: Generate children for specific category
     """
     
-    def __init__(self):
-        """Initialize tree map palette generator"""
-        super().__init__()
-        # Track stage data per session
-        self.session_stages = {}  # session_id -> {'stage': str, 'dimension': str, 'categories': []}
-    
     async def generate_batch(
         self,
         session_id: str,
@@ -63,22 +57,18 @@ class TreeMapPaletteGenerator(BasePaletteGenerator):
             stage: Generation stage ('dimensions', 'categories', 'children')
             stage_data: Stage-specific data (dimension, category_name, etc.)
         """
-        # Store stage info
-        if session_id not in self.session_stages:
-            self.session_stages[session_id] = {}
-        self.session_stages[session_id]['stage'] = stage
-        if stage_data:
-            self.session_stages[session_id].update(stage_data)
-        
         logger.debug("[TreeMapPalette] Stage: %s | Session: %s | Topic: '%s'", 
                    stage, session_id[:8], center_topic)
         if stage_data:
             logger.debug("[TreeMapPalette] Stage data: %s", stage_data)
         
-        # Pass session_id through educational_context so _build_prompt can access it
+        # Pass stage through educational_context; _update_session stores it with the session
         if educational_context is None:
             educational_context = {}
-        educational_context = {**educational_context, '_session_id': session_id}
+        educational_context = {**educational_context,
+                              '_session_id': session_id,
+                              '_stage': stage,
+                              '_stage_data': stage_data or {}}
         
         # Call base class generate_batch which will use our _build_prompt
         async for event in super().generate_batch(
@@ -117,7 +107,7 @@ class TreeMapPaletteGenerator(BasePaletteGenerator):
         """
         Build stage-specific prompt for Tree Map node generation.
         
-        Checks session_stages to determine current stage and builds appropriate prompt.
+        Reads the session's stage info to determine current stage and builds appropriate prompt.
         
         Args:
             center_topic: Main topic to classify
@@ -132,16 +122,14 @@ class TreeMapPaletteGenerator(BasePaletteGenerator):
         language = educational_context.get('language', 'en') if educational_context else 'en'
         context_desc = educational_context.get('raw_message', 'General K12 teaching') if educational_context else 'General K12 teaching'
         
-        # Determine current stage from session_stages
-        # Since we're in instance method, we need session_id - but base class doesn't pass it
-        # Workaround: Store in educational_context during generate_batch call
-        session_id = educational_context.get('_session_id') if educational_context else None
+        # Determine current stage from the session's stage info (set by _update_session)
+        stage_info = educational_context.get('_stage_info') if educational_context else None
         stage = 'categories'  # default
         stage_data = {}
         
-        if session_id and session_id in self.session_stages:
-            stage = self.session_stages[session_id].get('stage', 'categories')
-            stage_data = self.session_stages[session_id]
+        if stage_info:
+            stage = stage_info.get('stage', 'categories')
+            stage_data = stage_info
         
         logger.debug("[TreeMapPalette-Prompt] Building prompt for stage: %s", stage)
         
@@ -333,18 +321,6 @@ Generate {count} items for "{category_name}":"""
             has_chinese = bool(re.search(r'[\u4e00-\u9fff]', educational_context['raw_message']))
         
         return '你是一个有帮助的K12教育助手。' if has_chinese else 'You are a helpful K12 education assistant.'
-    
-    def end_session(self, session_id: str, reason: str = "complete"):
-        """
-        End session and cleanup stage data.
-        
-        Overrides base class to also clean up session_stages.
-        """
-        # Clean up stage data
-        self.session_stages.pop(session_id, None)
-        
-        # Call parent cleanup
-        super().end_session(session_id, reason)
 
 
 # Global singleton instance for Tree Map
@@ -21,9 +21,10 @@ import logging
 import time
 import re
 from typing import Dict, List, Set, AsyncGenerator, Tuple, Optional, Any
-from difflib import SequenceMatcher
 
 from services.llm_service import llm_service
+from services.session_store import get_session_store
+from agents.thinking_modes.node_palette.dedup_index import NodeDedupIndex
 from agents.thinking_modes.node_palette.circle_map_palette import get_circle_map_palette_generator
 from agents.thinking_modes.node_palette.bubble_map_palette import get_bubble_map_palette_generator
 
@@ -61,11 +62,9 @@ class NodePaletteGenerator:
         else:
             raise ValueError(f"Unsupported diagram type: {diagram_type}")
         
-        # Session storage
-        self.generated_nodes = {}  # session_id -> List[Dict]
-        self.seen_texts = {}  # session_id -> Set[str] (normalized)
-        self.session_start_times = {}  # session_id -> timestamp
-        self.batch_counts = {}  # session_id -> int (total batches)
+        # Session storage (bounded, shared across workers with the sqlite backend)
+        # session_id -> {'start_time', 'batches', 'nodes': List[Dict], 'seen': NodeDedupIndex (normalized)}
+        self.sessions = get_session_store(f"node_palette:legacy_{diagram_type}")
         
         logger.debug("[NodePalette] Initialized for %s with concurrent multi-LLM architecture", diagram_type)
         logger.debug("[NodePalette] LLMs: %s", ', '.join(self.llm_models))
@@ -96,15 +95,39 @@ class NodePaletteGenerator:
             - {'event': 'batch_complete', 'total_unique': 45, ...}
         """
         # Track session
-        if session_id not in self.session_start_times:
-            self.session_start_times[session_id] = time.time()
-            self.batch_counts[session_id] = 0
+        session = await self.sessions.aget(session_id)
+        if session is None:
+            session = {
+                'start_time': time.time(),
+                'batches': 0,
+                'nodes': [],
+                'seen': NodeDedupIndex(threshold=0.85)
+            }
             logger.debug("[NodePalette] New session: %s | Topic: '%s'", session_id[:8], center_topic)
         
-        batch_num = self.batch_counts[session_id] + 1
-        self.batch_counts[session_id] = batch_num
+        batch_num = session['batches'] + 1
+        session['batches'] = batch_num
         
-        total_before = len(self.generated_nodes.get(session_id, []))
+        # Write the session back even if the client disconnects mid-batch
+        try:
+            async for event in self._generate_batch_events(
+                session_id, session, batch_num, center_topic, educational_context, nodes_per_llm
+            ):
+                yield event
+        finally:
+            await self.sessions.aset(session_id, session)
+    
+    async def _generate_batch_events(
+        self,
+        session_id: str,
+        session: Dict[str, Any],
+        batch_num: int,
+        center_topic: str,
+        educational_context: Optional[Dict[str, Any]],
+        nodes_per_llm: int
+    ) -> AsyncGenerator[Dict, None]:
+        """Stream one batch for a loaded session (see generate_batch)."""
+        total_before = len(session['nodes'])
         logger.debug("[NodePalette] Batch %d starting | Session: %s | Topic: '%s'", 
                    batch_num, session_id[:8], center_topic)
         
@@ -168,7 +191,7 @@ class NodePaletteGenerator:
                             continue
                         
                         # Deduplicate
-                        is_unique, match_type, similarity = self._deduplicate_node(node_text, session_id)
+                        is_unique, match_type, similarity = self._deduplicate_node(node_text, session['seen'])
                         
                         if is_unique:
                             # UNIQUE NODE - yield immediately for progressive rendering!
@@ -188,9 +211,7 @@ class NodePaletteGenerator:
                             )
                             
                             # Store
-                            if session_id not in self.generated_nodes:
-                                self.generated_nodes[session_id] = []
-                            self.generated_nodes[session_id].append(node)
+                            session['nodes'].append(node)
                             
                             # Yield immediately - circle appears NOW!
                             yield {
@@ -207,7 +228,7 @@ class NodePaletteGenerator:
                 if current_lines[llm_name].strip():
                     node_text = current_lines[llm_name].lstrip('0123456789.-、）) ').strip()
                     if node_text and len(node_text) >= 2:
-                        is_unique, match_type, similarity = self._deduplicate_node(node_text, session_id)
+                        is_unique, match_type, similarity = self._deduplicate_node(node_text, session['seen'])
                         if is_unique:
                             node = {
                                 'id': f"{session_id}_{llm_name}_{batch_num}_{llm_unique_counts[llm_name]}",
@@ -224,9 +245,7 @@ class NodePaletteGenerator:
                                 llm_name, batch_num, node['id'], node_text[:50] + ('...' if len(node_text) > 50 else '')
                             )
                             
-                            if session_id not in self.generated_nodes:
-                                self.generated_nodes[session_id] = []
-                            self.generated_nodes[session_id].append(node)
+                            session['nodes'].append(node)
                             yield {
                                 'event': 'node_generated',
                                 'node': node
@@ -268,7 +287,7 @@ class NodePaletteGenerator:
         
         # Batch complete
         batch_duration = time.time() - batch_start_time
-        total_after = len(self.generated_nodes.get(session_id, []))
+        total_after = len(session['nodes'])
         batch_unique = total_after - total_before
         
         logger.debug(
@@ -307,29 +326,23 @@ class NodePaletteGenerator:
         # Gradually increase temperature for diversity
         return min(base_temp + (batch_num - 1) * 0.1, 1.0)
     
-    def _deduplicate_node(self, new_text: str, session_id: str) -> Tuple[bool, str, float]:
+    def _deduplicate_node(self, new_text: str, seen: NodeDedupIndex) -> Tuple[bool, str, float]:
         """
-        Deduplicate node using exact and fuzzy matching.
+        Deduplicate node against the session's index of normalized texts.
         
         Returns:
             (is_unique, match_type, similarity)
         """
         normalized = self._normalize_text(new_text)
         
-        if session_id not in self.seen_texts:
-            self.seen_texts[session_id] = set()
-        
-        seen = self.seen_texts[session_id]
-        
         # Exact match
         if normalized in seen:
             return (False, 'exact', 1.0)
         
-        # Fuzzy match
-        for seen_text in seen:
-            similarity = SequenceMatcher(None, normalized, seen_text).ratio()
-            if similarity > 0.85:
-                return (False, 'fuzzy', similarity)
+        # Fuzzy match (indexed: only texts that can reach the threshold are compared)
+        match = seen.find_similar(normalized)
+        if match:
+            return (False, 'fuzzy', match[1])
         
         # Unique!
         seen.add(normalized)
@@ -344,22 +357,18 @@ class NodePaletteGenerator:
     
     def end_session(self, session_id: str, reason: str = "complete"):
         """End session and cleanup"""
-        if session_id not in self.session_start_times:
+        session = self.sessions.pop(session_id)
+        if session is None:
             return
         
-        elapsed = time.time() - self.session_start_times[session_id]
-        total_nodes = len(self.generated_nodes.get(session_id, []))
-        batches = self.batch_counts.get(session_id, 0)
+        elapsed = time.time() - session['start_time']
+        total_nodes = len(session['nodes'])
+        batches = session['batches']
         
         logger.debug("[NodePalette] Session ended: %s | Reason: %s", session_id[:8], reason)
         logger.debug("[NodePalette]   Duration: %.2fs | Batches: %d | Total nodes: %d", 
                    elapsed, batches, total_nodes)
-        
-        # Cleanup
-        self.session_start_times.pop(session_id, None)
-        self.generated_nodes.pop(session_id, None)
-        self.seen_texts.pop(session_id, None)
-        self.batch_counts.pop(session_id, None)
+
 
 
 # Global singleton instance
@@ -0,0 +1,216 @@
+"""
+Pooled HTTP Sessions for LLM Providers
+======================================
+
+One long-lived aiohttp session per provider, shared by every client that
+talks to that provider. Keep-alive connections and cached DNS lookups are
+reused across calls instead of paying TCP + TLS setup on every request.
+
+Sessions are bound to the event loop that created them; a call from another
+loop (e.g. a sync wrapper running asyncio.run) gets its own session, which is
+closed with the rest at shutdown.
+
+aiohttp speaks HTTP/1.1 only, so multiplexing comes from keep-alive reuse
+across the connector's pool rather than HTTP/2 streams.
+
+@author lycosa9527
+@made_by MindSpring Team
+"""
+
+import asyncio
+import logging
+from threading import Lock
+from typing import Dict, Any, Optional, Tuple
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+
+class HTTPSessionPool:
+    """
+    Lifecycle-managed aiohttp sessions, one per (provider, event loop).
+
+    Connection reuse is counted through aiohttp request tracing so the
+    metrics endpoint can show whether keep-alive is actually working.
+    """
+
+    def __init__(
+        self,
+        limit: int = 200,
+        limit_per_host: int = 100,
+        keepalive_timeout: float = 30.0,
+        dns_cache_ttl: int = 300
+    ):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.dns_cache_ttl = dns_cache_ttl
+        self._sessions: Dict[Tuple[str, int], Tuple[asyncio.AbstractEventLoop, aiohttp.ClientSession]] = {}
+        self._stats: Dict[str, Dict[str, int]] = {}
+        self._closing = set()
+        self._lock = Lock()
+
+    def configure(
+        self,
+        limit: Optional[int] = None,
+        limit_per_host: Optional[int] = None,
+        keepalive_timeout: Optional[float] = None,
+        dns_cache_ttl: Optional[int] = None
+    ) -> None:
+        """Update connector settings. Applies to sessions created afterwards."""
+        if limit is not None:
+            self.limit = limit
+        if limit_per_host is not None:
+            self.limit_per_host = limit_per_host
+        if keepalive_timeout is not None:
+            self.keepalive_timeout = keepalive_timeout
+        if dns_cache_ttl is not None:
+            self.dns_cache_ttl = dns_cache_ttl
+        logger.debug(
+            f"[HTTPSessionPool] Configured: limit={self.limit}, per_host={self.limit_per_host}, "
+            f"keepalive={self.keepalive_timeout}s, dns_ttl={self.dns_cache_ttl}s"
+        )
+
+    def _provider_stats(self, provider: str) -> Dict[str, int]:
+        if provider not in self._stats:
+            self._stats[provider] = {
+                'requests': 0,
+                'connections_created': 0,
+                'connections_reused': 0,
+                'sessions_created': 0,
+            }
+        return self._stats[provider]
+
+    def _trace_config(self, provider: str) -> aiohttp.TraceConfig:
+        """Count requests and new vs reused connections for one provider."""
+        stats = self._provider_stats(provider)
+        trace = aiohttp.TraceConfig()
+
+        async def on_request_start(session, ctx, params):
+            stats['requests'] += 1
+
+        async def on_connection_create_end(session, ctx, params):
+            stats['connections_created'] += 1
+
+        async def on_connection_reuseconn(session, ctx, params):
+            stats['connections_reused'] += 1
+
+        trace.on_request_start.append(on_request_start)
+        trace.on_connection_create_end.append(on_connection_create_end)
+        trace.on_connection_reuseconn.append(on_connection_reuseconn)
+        return trace
+
+    def get_session(self, provider: str) -> aiohttp.ClientSession:
+        """
+        Get the pooled session for a provider on the running event loop.
+
+        Callers must not close the returned session; pass per-request
+        timeouts to session.post(..., timeout=...) instead.
+        """
+        loop = asyncio.get_running_loop()
+        key = (provider, id(loop))
+        with self._lock:
+            entry = self._sessions.get(key)
+            if entry is not None:
+                if entry[0] is loop and not entry[1].closed:
+                    return entry[1]
+                # Stale entry from a finished loop whose id was reused
+                loop.create_task(self._close_session(entry[1]))
+
+            connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                keepalive_timeout=self.keepalive_timeout,
+                ttl_dns_cache=self.dns_cache_ttl,
+                use_dns_cache=True,
+            )
+            session = aiohttp.ClientSession(
+                connector=connector,
+                trace_configs=[self._trace_config(provider)],
+            )
+            self._sessions[key] = (loop, session)
+            self._provider_stats(provider)['sessions_created'] += 1
+
+        logger.debug(f"[HTTPSessionPool] Created session for {provider}")
+        return session
+
+    def close_all(self) -> None:
+        """
+        Detach all sessions and close each on its own loop.
+
+        Safe to call from sync code; closes scheduled on the running loop can
+        be awaited with wait_closed().
+        """
+        with self._lock:
+            entries = list(self._sessions.values())
+            self._sessions.clear()
+
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+
+        for loop, session in entries:
+            if session.closed:
+                continue
+            if loop is not running and not loop.is_closed() and loop.is_running():
+                asyncio.run_coroutine_threadsafe(session.close(), loop)
+            elif running is not None:
+                # Own loop, or an orphan whose loop has already finished
+                task = running.create_task(self._close_session(session))
+                self._closing.add(task)
+                task.add_done_callback(self._closing.discard)
+            else:
+                asyncio.run(self._close_session(session))
+
+        if entries:
+            logger.debug(f"[HTTPSessionPool] Closing {len(entries)} session(s)")
+
+    @staticmethod
+    async def _close_session(session: aiohttp.ClientSession) -> None:
+        try:
+            await session.close()
+        except Exception as e:
+            logger.debug(f"[HTTPSessionPool] Error closing session: {e}")
+
+    async def wait_closed(self) -> None:
+        """Wait for closes scheduled by close_all() on this loop."""
+        if self._closing:
+            await asyncio.gather(*list(self._closing), return_exceptions=True)
+
+    async def close(self) -> None:
+        """Close all sessions and wait for this loop's closes to finish."""
+        self.close_all()
+        await self.wait_closed()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get connection reuse statistics per provider."""
+        with self._lock:
+            open_sessions: Dict[str, int] = {}
+            for (provider, _), (_, session) in self._sessions.items():
+                if not session.closed:
+                    open_sessions[provider] = open_sessions.get(provider, 0) + 1
+
+        providers = {}
+        for provider, stats in self._stats.items():
+            created = stats['connections_created']
+            reused = stats['connections_reused']
+            total = created + reused
+            providers[provider] = {
+                **stats,
+                'open_sessions': open_sessions.get(provider, 0),
+                'reuse_rate_percent': round(reused / total * 100, 2) if total else 0.0,
+            }
+
+        return {
+            'limit': self.limit,
+            'limit_per_host': self.limit_per_host,
+            'keepalive_timeout': self.keepalive_timeout,
+            'dns_cache_ttl': self.dns_cache_ttl,
+            'providers': providers,
+        }
+
+
+# Singleton instance
+http_pool = HTTPSessionPool()
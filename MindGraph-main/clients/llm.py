@@ -15,6 +15,7 @@ from typing import Dict, List, Optional, Any, AsyncGenerator
 from dotenv import load_dotenv
 from openai import AsyncOpenAI, APIError, RateLimitError, APIStatusError
 from config.settings import config
+from clients.http_pool import http_pool
 from services.error_handler import (
     LLMRateLimitError, 
     LLMContentFilterError, 
@@ -23,7 +24,8 @@ from services.error_handler import (
     LLMQuotaExhaustedError,
     LLMModelNotFoundError,
     LLMAccessDeniedError,
-    LLMTimeoutError
+    LLMTimeoutError,
+    parse_retry_after
 )
 from services.dashscope_error_parser import parse_and_raise_dashscope_error
 from services.hunyuan_error_parser import parse_and_raise_hunyuan_error
@@ -92,36 +94,37 @@ class QwenClient:
                 "Content-Type": "application/json"
             }
             
-            async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=self.timeout)) as session:
-                async with session.post(self.api_url, json=payload, headers=headers) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        content = data.get('choices', [{}])[0].get('message', {}).get('content', '')
-                        # Extract usage data (Dashscope uses 'prompt_tokens'/'completion_tokens')
-                        usage = data.get('usage', {})
-                        # Return both content and usage for token tracking
-                        return {
-                            'content': content,
-                            'usage': usage  # Contains prompt_tokens, completion_tokens, total_tokens
-                        }
-                    else:
-                        error_text = await response.text()
-                        logger.error(f"Qwen API error {response.status}: {error_text}")
-                        
-                        # Parse error using comprehensive DashScope error parser
-                        try:
-                            error_data = json.loads(error_text)
-                            # This function always raises an exception, never returns
-                            parse_and_raise_dashscope_error(response.status, error_text, error_data)
-                        except json.JSONDecodeError:
-                            # Fallback for non-JSON errors
-                            if response.status == 429:
-                                raise LLMRateLimitError(f"Qwen rate limit: {error_text}")
-                            elif response.status == 401:
-                                raise LLMAccessDeniedError(f"Unauthorized: {error_text}", provider='qwen', error_code='Unauthorized')
-                            else:
-                                raise LLMProviderError(f"Qwen API error ({response.status}): {error_text}", provider='qwen', error_code=f'HTTP{response.status}')
-                        
+            timeout = aiohttp.ClientTimeout(total=self.timeout)
+            session = http_pool.get_session('dashscope')
+            async with session.post(self.api_url, json=payload, headers=headers, timeout=timeout) as response:
+                if response.status == 200:
+                    data = await response.json()
+                    content = data.get('choices', [{}])[0].get('message', {}).get('content', '')
+                    # Extract usage data (Dashscope uses 'prompt_tokens'/'completion_tokens')
+                    usage = data.get('usage', {})
+                    # Return both content and usage for token tracking
+                    return {
+                        'content': content,
+                        'usage': usage  # Contains prompt_tokens, completion_tokens, total_tokens
+                    }
+                else:
+                    error_text = await response.text()
+                    logger.error(f"Qwen API error {response.status}: {error_text}")
+                    
+                    # Parse error using comprehensive DashScope error parser
+                    try:
+                        error_data = json.loads(error_text)
+                        # This function always raises an exception, never returns
+                        parse_and_raise_dashscope_error(response.status, error_text, error_data, headers=response.headers)
+                    except json.JSONDecodeError:
+                        # Fallback for non-JSON errors
+                        if response.status == 429:
+                            raise LLMRateLimitError(f"Qwen rate limit: {error_text}", retry_after=parse_retry_after(response.headers))
+                        elif response.status == 401:
+                            raise LLMAccessDeniedError(f"Unauthorized: {error_text}", provider='qwen', error_code='Unauthorized')
+                        else:
+                            raise LLMProviderError(f"Qwen API error ({response.status}): {error_text}", provider='qwen', error_code=f'HTTP{response.status}')
+                    
         except asyncio.TimeoutError as e:
             logger.error("Qwen API timeout")
             raise LLMTimeoutError("Qwen API timeout") from e
@@ -178,64 +181,64 @@ class QwenClient:
                 sock_read=self.timeout
             )
             
-            async with aiohttp.ClientSession(timeout=timeout) as session:
-                async with session.post(self.api_url, json=payload, headers=headers) as response:
-                    if response.status != 200:
-                        error_text = await response.text()
-                        logger.error(f"Qwen stream error {response.status}: {error_text}")
-                        
-                        # Parse error using comprehensive DashScope error parser
-                        try:
-                            error_data = json.loads(error_text)
-                            # This function always raises an exception, never returns
-                            parse_and_raise_dashscope_error(response.status, error_text, error_data)
-                        except json.JSONDecodeError:
-                            # Fallback for non-JSON errors
-                            if response.status == 429:
-                                raise LLMRateLimitError(f"Qwen rate limit: {error_text}")
-                            elif response.status == 401:
-                                raise LLMAccessDeniedError(f"Unauthorized: {error_text}", provider='qwen', error_code='Unauthorized')
-                            else:
-                                raise LLMProviderError(f"Qwen stream error ({response.status}): {error_text}", provider='qwen', error_code=f'HTTP{response.status}')
+            session = http_pool.get_session('dashscope')
+            async with session.post(self.api_url, json=payload, headers=headers, timeout=timeout) as response:
+                if response.status != 200:
+                    error_text = await response.text()
+                    logger.error(f"Qwen stream error {response.status}: {error_text}")
                     
-                    # Read SSE stream line by line
-                    last_usage = None
-                    async for line_bytes in response.content:
-                        line = line_bytes.decode('utf-8').strip()
-                        
-                        if not line or not line.startswith('data: '):
-                            continue
-                        
-                        data_content = line[6:]  # Remove 'data: ' prefix
+                    # Parse error using comprehensive DashScope error parser
+                    try:
+                        error_data = json.loads(error_text)
+                        # This function always raises an exception, never returns
+                        parse_and_raise_dashscope_error(response.status, error_text, error_data, headers=response.headers)
+                    except json.JSONDecodeError:
+                        # Fallback for non-JSON errors
+                        if response.status == 429:
+                            raise LLMRateLimitError(f"Qwen rate limit: {error_text}", retry_after=parse_retry_after(response.headers))
+                        elif response.status == 401:
+                            raise LLMAccessDeniedError(f"Unauthorized: {error_text}", provider='qwen', error_code='Unauthorized')
+                        else:
+                            raise LLMProviderError(f"Qwen stream error ({response.status}): {error_text}", provider='qwen', error_code=f'HTTP{response.status}')
+                
+                # Read SSE stream line by line
+                last_usage = None
+                async for line_bytes in response.content:
+                    line = line_bytes.decode('utf-8').strip()
+                    
+                    if not line or not line.startswith('data: '):
+                        continue
+                    
+                    data_content = line[6:]  # Remove 'data: ' prefix
+                    
+                    # Handle [DONE] signal
+                    if data_content.strip() == '[DONE]':
+                        # Yield usage data as final chunk
+                        if last_usage:
+                            yield {'type': 'usage', 'usage': last_usage}
+                        break
+                    
+                    try:
+                        data = json.loads(data_content)
                         
-                        # Handle [DONE] signal
-                        if data_content.strip() == '[DONE]':
-                            # Yield usage data as final chunk
-                            if last_usage:
-                                yield {'type': 'usage', 'usage': last_usage}
-                            break
+                        # Check for usage data (in final chunk)
+                        if 'usage' in data:
+                            last_usage = data.get('usage', {})
+                            # Continue to also yield content if present
                         
-                        try:
-                            data = json.loads(data_content)
-                            
-                            # Check for usage data (in final chunk)
-                            if 'usage' in data:
-                                last_usage = data.get('usage', {})
-                                # Continue to also yield content if present
-                            
-                            # Extract content delta from streaming response
-                            delta = data.get('choices', [{}])[0].get('delta', {})
-                            content = delta.get('content', '')
-                            
-                            if content:
-                                yield {'type': 'token', 'content': content}
+                        # Extract content delta from streaming response
+                        delta = data.get('choices', [{}])[0].get('delta', {})
+                        content = delta.get('content', '')
                         
-                        except json.JSONDecodeError:
-                            continue
+                        if content:
+                            yield {'type': 'token', 'content': content}
                     
-                    # If we didn't get [DONE] but stream ended, yield usage if we have it
-                    if last_usage:
-                        yield {'type': 'usage', 'usage': last_usage}
+                    except json.JSONDecodeError:
+                        continue
+                
+                # If we didn't get [DONE] but stream ended, yield usage if we have it
+                if last_usage:
+                    yield {'type': 'usage', 'usage': last_usage}
         
         except Exception as e:
             logger.error(f"Qwen streaming error: {e}")
@@ -293,36 +296,37 @@ class DeepSeekClient:
             
             logger.debug(f"DeepSeek async API request: {self.model_name}")
             
-            async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=self.timeout)) as session:
-                async with session.post(self.api_url, json=payload, headers=headers) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        content = data.get('choices', [{}])[0].get('message', {}).get('content', '')
-                        logger.debug(f"DeepSeek response length: {len(content)} chars")
-                        # Extract usage data
-                        usage = data.get('usage', {})
-                        return {
-                            'content': content,
-                            'usage': usage
-                        }
-                    else:
-                        error_text = await response.text()
-                        logger.error(f"DeepSeek API error {response.status}: {error_text}")
-                        
-                        # Parse error using comprehensive DashScope error parser
-                        try:
-                            error_data = json.loads(error_text)
-                            # This function always raises an exception, never returns
-                            parse_and_raise_dashscope_error(response.status, error_text, error_data)
-                        except json.JSONDecodeError:
-                            # Fallback for non-JSON errors
-                            if response.status == 429:
-                                raise LLMRateLimitError(f"DeepSeek rate limit: {error_text}")
-                            elif response.status == 401:
-                                raise LLMAccessDeniedError(f"Unauthorized: {error_text}", provider='deepseek', error_code='Unauthorized')
-                            else:
-                                raise LLMProviderError(f"DeepSeek API error ({response.status}): {error_text}", provider='deepseek', error_code=f'HTTP{response.status}')
-                        
+            timeout = aiohttp.ClientTimeout(total=self.timeout)
+            session = http_pool.get_session('dashscope')
+            async with session.post(self.api_url, json=payload, headers=headers, timeout=timeout) as response:
+                if response.status == 200:
+                    data = await response.json()
+                    content = data.get('choices', [{}])[0].get('message', {}).get('content', '')
+                    logger.debug(f"DeepSeek response length: {len(content)} chars")
+                    # Extract usage data
+                    usage = data.get('usage', {})
+                    return {
+                        'content': content,
+                        'usage': usage
+                    }
+                else:
+                    error_text = await response.text()
+                    logger.error(f"DeepSeek API error {response.status}: {error_text}")
+                    
+                    # Parse error using comprehensive DashScope error parser
+                    try:
+                        error_data = json.loads(error_text)
+                        # This function always raises an exception, never returns
+                        parse_and_raise_dashscope_error(response.status, error_text, error_data, headers=response.headers)
+                    except json.JSONDecodeError:
+                        # Fallback for non-JSON errors
+                        if response.status == 429:
+                            raise LLMRateLimitError(f"DeepSeek rate limit: {error_text}", retry_after=parse_retry_after(response.headers))
+                        elif response.status == 401:
+                            raise LLMAccessDeniedError(f"Unauthorized: {error_text}", provider='deepseek', error_code='Unauthorized')
+                        else:
+                            raise LLMProviderError(f"DeepSeek API error ({response.status}): {error_text}", provider='deepseek', error_code=f'HTTP{response.status}')
+                    
         except asyncio.TimeoutError as e:
             logger.error("DeepSeek API timeout")
             raise LLMTimeoutError("DeepSeek API timeout") from e
@@ -377,60 +381,60 @@ class DeepSeekClient:
                 sock_read=self.timeout
             )
             
-            async with aiohttp.ClientSession(timeout=timeout) as session:
-                async with session.post(self.api_url, json=payload, headers=headers) as response:
-                    if response.status != 200:
-                        error_text = await response.text()
-                        logger.error(f"DeepSeek stream error {response.status}: {error_text}")
-                        
-                        # Parse error using comprehensive DashScope error parser
-                        try:
-                            error_data = json.loads(error_text)
-                            # This function always raises an exception, never returns
-                            parse_and_raise_dashscope_error(response.status, error_text, error_data)
-                        except json.JSONDecodeError:
-                            # Fallback for non-JSON errors
-                            if response.status == 429:
-                                raise LLMRateLimitError(f"DeepSeek rate limit: {error_text}")
-                            elif response.status == 401:
-                                raise LLMAccessDeniedError(f"Unauthorized: {error_text}", provider='deepseek', error_code='Unauthorized')
-                            else:
-                                raise LLMProviderError(f"DeepSeek stream error ({response.status}): {error_text}", provider='deepseek', error_code=f'HTTP{response.status}')
+            session = http_pool.get_session('dashscope')
+            async with session.post(self.api_url, json=payload, headers=headers, timeout=timeout) as response:
+                if response.status != 200:
+                    error_text = await response.text()
+                    logger.error(f"DeepSeek stream error {response.status}: {error_text}")
                     
-                    last_usage = None
-                    async for line_bytes in response.content:
-                        line = line_bytes.decode('utf-8').strip()
-                        
-                        if not line or not line.startswith('data: '):
-                            continue
-                        
-                        data_content = line[6:]
+                    # Parse error using comprehensive DashScope error parser
+                    try:
+                        error_data = json.loads(error_text)
+                        # This function always raises an exception, never returns
+                        parse_and_raise_dashscope_error(response.status, error_text, error_data, headers=response.headers)
+                    except json.JSONDecodeError:
+                        # Fallback for non-JSON errors
+                        if response.status == 429:
+                            raise LLMRateLimitError(f"DeepSeek rate limit: {error_text}", retry_after=parse_retry_after(response.headers))
+                        elif response.status == 401:
+                            raise LLMAccessDeniedError(f"Unauthorized: {error_text}", provider='deepseek', error_code='Unauthorized')
+                        else:
+                            raise LLMProviderError(f"DeepSeek stream error ({response.status}): {error_text}", provider='deepseek', error_code=f'HTTP{response.status}')
+                
+                last_usage = None
+                async for line_bytes in response.content:
+                    line = line_bytes.decode('utf-8').strip()
+                    
+                    if not line or not line.startswith('data: '):
+                        continue
+                    
+                    data_content = line[6:]
+                    
+                    if data_content.strip() == '[DONE]':
+                        # Yield usage data as final chunk
+                        if last_usage:
+                            yield {'type': 'usage', 'usage': last_usage}
+                        break
+                    
+                    try:
+                        data = json.loads(data_content)
                         
-                        if data_content.strip() == '[DONE]':
-                            # Yield usage data as final chunk
-                            if last_usage:
-                                yield {'type': 'usage', 'usage': last_usage}
-                            break
+                        # Check for usage data (in final chunk)
+                        if 'usage' in data:
+                            last_usage = data.get('usage', {})
                         
-                        try:
-                            data = json.loads(data_content)
-                            
-                            # Check for usage data (in final chunk)
-                            if 'usage' in data:
-                                last_usage = data.get('usage', {})
-                            
-                            delta = data.get('choices', [{}])[0].get('delta', {})
-                            content = delta.get('content', '')
-                            
-                            if content:
-                                yield {'type': 'token', 'content': content}
+                        delta = data.get('choices', [{}])[0].get('delta', {})
+                        content = delta.get('content', '')
                         
-                        except json.JSONDecodeError:
-                            continue
+                        if content:
+                            yield {'type': 'token', 'content': content}
                     
-                    # If we didn't get [DONE] but stream ended, yield usage if we have it
-                    if last_usage:
-                        yield {'type': 'usage', 'usage': last_usage}
+                    except json.JSONDecodeError:
+                        continue
+                
+                # If we didn't get [DONE] but stream ended, yield usage if we have it
+                if last_usage:
+                    yield {'type': 'usage', 'usage': last_usage}
         
         except Exception as e:
             logger.error(f"DeepSeek streaming error: {e}")
@@ -474,36 +478,37 @@ class KimiClient:
             
             logger.debug(f"Kimi async API request: {self.model_name}")
             
-            async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=self.timeout)) as session:
-                async with session.post(self.api_url, json=payload, headers=headers) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        content = data.get('choices', [{}])[0].get('message', {}).get('content', '')
-                        logger.debug(f"Kimi response length: {len(content)} chars")
-                        # Extract usage data
-                        usage = data.get('usage', {})
-                        return {
-                            'content': content,
-                            'usage': usage
-                        }
-                    else:
-                        error_text = await response.text()
-                        logger.error(f"Kimi API error {response.status}: {error_text}")
-                        
-                        # Parse error using comprehensive DashScope error parser
-                        try:
-                            error_data = json.loads(error_text)
-                            # This function always raises an exception, never returns
-                            parse_and_raise_dashscope_error(response.status, error_text, error_data)
-                        except json.JSONDecodeError:
-                            # Fallback for non-JSON errors
-                            if response.status == 429:
-                                raise LLMRateLimitError(f"Kimi rate limit: {error_text}")
-                            elif response.status == 401:
-                                raise LLMAccessDeniedError(f"Unauthorized: {error_text}", provider='kimi', error_code='Unauthorized')
-                            else:
-                                raise LLMProviderError(f"Kimi API error ({response.status}): {error_text}", provider='kimi', error_code=f'HTTP{response.status}')
-                        
+            timeout = aiohttp.ClientTimeout(total=self.timeout)
+            session = http_pool.get_session('dashscope')
+            async with session.post(self.api_url, json=payload, headers=headers, timeout=timeout) as response:
+                if response.status == 200:
+                    data = await response.json()
+                    content = data.get('choices', [{}])[0].get('message', {}).get('content', '')
+                    logger.debug(f"Kimi response length: {len(content)} chars")
+                    # Extract usage data
+                    usage = data.get('usage', {})
+                    return {
+                        'content': content,
+                        'usage': usage
+                    }
+                else:
+                    error_text = await response.text()
+                    logger.error(f"Kimi API error {response.status}: {error_text}")
+                    
+                    # Parse error using comprehensive DashScope error parser
+                    try:
+                        error_data = json.loads(error_text)
+                        # This function always raises an exception, never returns
+                        parse_and_raise_dashscope_error(response.status, error_text, error_data, headers=response.headers)
+                    except json.JSONDecodeError:
+                        # Fallback for non-JSON errors
+                        if response.status == 429:
+                            raise LLMRateLimitError(f"Kimi rate limit: {error_text}", retry_after=parse_retry_after(response.headers))
+                        elif response.status == 401:
+                            raise LLMAccessDeniedError(f"Unauthorized: {error_text}", provider='kimi', error_code='Unauthorized')
+                        else:
+                            raise LLMProviderError(f"Kimi API error ({response.status}): {error_text}", provider='kimi', error_code=f'HTTP{response.status}')
+                    
         except asyncio.TimeoutError as e:
             logger.error("Kimi API timeout")
             raise LLMTimeoutError("Kimi API timeout") from e
@@ -558,60 +563,60 @@ class KimiClient:
                 sock_read=self.timeout
             )
             
-            async with aiohttp.ClientSession(timeout=timeout) as session:
-                async with session.post(self.api_url, json=payload, headers=headers) as response:
-                    if response.status != 200:
-                        error_text = await response.text()
-                        logger.error(f"Kimi stream error {response.status}: {error_text}")
-                        
-                        # Parse error using comprehensive DashScope error parser
-                        try:
-                            error_data = json.loads(error_text)
-                            # This function always raises an exception, never returns
-                            parse_and_raise_dashscope_error(response.status, error_text, error_data)
-                        except json.JSONDecodeError:
-                            # Fallback for non-JSON errors
-                            if response.status == 429:
-                                raise LLMRateLimitError(f"Kimi rate limit: {error_text}")
-                            elif response.status == 401:
-                                raise LLMAccessDeniedError(f"Unauthorized: {error_text}", provider='kimi', error_code='Unauthorized')
-                            else:
-                                raise LLMProviderError(f"Kimi stream error ({response.status}): {error_text}", provider='kimi', error_code=f'HTTP{response.status}')
+            session = http_pool.get_session('dashscope')
+            async with session.post(self.api_url, json=payload, headers=headers, timeout=timeout) as response:
+                if response.status != 200:
+                    error_text = await response.text()
+                    logger.error(f"Kimi stream error {response.status}: {error_text}")
                     
-                    last_usage = None
-                    async for line_bytes in response.content:
-                        line = line_bytes.decode('utf-8').strip()
-                        
-                        if not line or not line.startswith('data: '):
-                            continue
-                        
-                        data_content = line[6:]
+                    # Parse error using comprehensive DashScope error parser
+                    try:
+                        error_data = json.loads(error_text)
+                        # This function always raises an exception, never returns
+                        parse_and_raise_dashscope_error(response.status, error_text, error_data, headers=response.headers)
+                    except json.JSONDecodeError:
+                        # Fallback for non-JSON errors
+                        if response.status == 429:
+                            raise LLMRateLimitError(f"Kimi rate limit: {error_text}", retry_after=parse_retry_after(response.headers))
+                        elif response.status == 401:
+                            raise LLMAccessDeniedError(f"Unauthorized: {error_text}", provider='kimi', error_code='Unauthorized')
+                        else:
+                            raise LLMProviderError(f"Kimi stream error ({response.status}): {error_text}", provider='kimi', error_code=f'HTTP{response.status}')
+                
+                last_usage = None
+                async for line_bytes in response.content:
+                    line = line_bytes.decode('utf-8').strip()
+                    
+                    if not line or not line.startswith('data: '):
+                        continue
+                    
+                    data_content = line[6:]
+                    
+                    if data_content.strip() == '[DONE]':
+                        # Yield usage data as final chunk
+                        if last_usage:
+                            yield {'type': 'usage', 'usage': last_usage}
+                        break
+                    
+                    try:
+                        data = json.loads(data_content)
                         
-                        if data_content.strip() == '[DONE]':
-                            # Yield usage data as final chunk
-                            if last_usage:
-                                yield {'type': 'usage', 'usage': last_usage}
-                            break
+                        # Check for usage data (in final chunk)
+                        if 'usage' in data:
+                            last_usage = data.get('usage', {})
                         
-                        try:
-                            data = json.loads(data_content)
-                            
-                            # Check for usage data (in final chunk)
-                            if 'usage' in data:
-                                last_usage = data.get('usage', {})
-                            
-                            delta = data.get('choices', [{}])[0].get('delta', {})
-                            content = delta.get('content', '')
-                            
-                            if content:
-                                yield {'type': 'token', 'content': content}
+                        delta = data.get('choices', [{}])[0].get('delta', {})
+                        content = delta.get('content', '')
                         
-                        except json.JSONDecodeError:
-                            continue
+                        if content:
+                            yield {'type': 'token', 'content': content}
                     
-                    # If we didn't get [DONE] but stream ended, yield usage if we have it
-                    if last_usage:
-                        yield {'type': 'usage', 'usage': last_usage}
+                    except json.JSONDecodeError:
+                        continue
+                
+                # If we didn't get [DONE] but stream ended, yield usage if we have it
+                if last_usage:
+                    yield {'type': 'usage', 'usage': last_usage}
         
         except Exception as e:
             logger.error(f"Kimi streaming error: {e}")
@@ -691,7 +696,7 @@ class HunyuanClient:
         
         except RateLimitError as e:
             logger.error(f"Hunyuan rate limit error: {e}")
-            raise LLMRateLimitError(f"Hunyuan rate limit: {e}")
+            raise LLMRateLimitError(f"Hunyuan rate limit: {e}", retry_after=parse_retry_after(getattr(e.response, 'headers', None)))
         
         except APIStatusError as e:
             error_msg = str(e)
@@ -721,7 +726,11 @@ class HunyuanClient:
             
             # Parse error using comprehensive Hunyuan error parser
             try:
-                parse_and_raise_hunyuan_error(error_code, error_msg, status_code=getattr(e, 'status_code', None))
+                parse_and_raise_hunyuan_error(
+                    error_code, error_msg,
+                    status_code=getattr(e, 'status_code', None),
+                    headers=getattr(e.response, 'headers', None)
+                )
             except (LLMInvalidParameterError, LLMQuotaExhaustedError, LLMModelNotFoundError, 
                     LLMAccessDeniedError, LLMContentFilterError, LLMRateLimitError, LLMTimeoutError):
                 # Re-raise parsed exceptions
@@ -794,7 +803,7 @@ class HunyuanClient:
         
         except RateLimitError as e:
             logger.error(f"Hunyuan streaming rate limit: {e}")
-            raise LLMRateLimitError(f"Hunyuan rate limit: {e}")
+            raise LLMRateLimitError(f"Hunyuan rate limit: {e}", retry_after=parse_retry_after(getattr(e.response, 'headers', None)))
         
         except APIStatusError as e:
             error_msg = str(e)
@@ -823,7 +832,11 @@ class HunyuanClient:
             
             # Parse error using comprehensive Hunyuan error parser
             try:
-                parse_and_raise_hunyuan_error(error_code, error_msg, status_code=getattr(e, 'status_code', None))
+                parse_and_raise_hunyuan_error(
+                    error_code, error_msg,
+                    status_code=getattr(e, 'status_code', None),
+                    headers=getattr(e.response, 'headers', None)
+                )
             except (LLMInvalidParameterError, LLMQuotaExhaustedError, LLMModelNotFoundError, 
                     LLMAccessDeniedError, LLMContentFilterError, LLMRateLimitError, LLMTimeoutError):
                 # Re-raise parsed exceptions
@@ -910,7 +923,7 @@ class DoubaoClient:
         
         except RateLimitError as e:
             logger.error(f"Doubao rate limit error: {e}")
-            raise LLMRateLimitError(f"Doubao rate limit: {e}")
+            raise LLMRateLimitError(f"Doubao rate limit: {e}", retry_after=parse_retry_after(getattr(e.response, 'headers', None)))
         
         except APIStatusError as e:
             error_msg = str(e)
@@ -945,7 +958,11 @@ class DoubaoClient:
             
             # Parse error using comprehensive Doubao error parser
             try:
-                parse_and_raise_doubao_error(error_code, error_msg, status_code=status_code)
+                parse_and_raise_doubao_error(
+                    error_code, error_msg,
+                    status_code=status_code,
+                    headers=getattr(e.response, 'headers', None)
+                )
             except (LLMInvalidParameterError, LLMQuotaExhaustedError, LLMModelNotFoundError, 
                     LLMAccessDeniedError, LLMContentFilterError, LLMRateLimitError, LLMTimeoutError):
                 # Re-raise parsed exceptions
@@ -1018,7 +1035,7 @@ class DoubaoClient:
         
         except RateLimitError as e:
             logger.error(f"Doubao streaming rate limit: {e}")
-            raise LLMRateLimitError(f"Doubao rate limit: {e}")
+            raise LLMRateLimitError(f"Doubao rate limit: {e}", retry_after=parse_retry_after(getattr(e.response, 'headers', None)))
         
         except APIStatusError as e:
             error_msg = str(e)
@@ -1052,7 +1069,11 @@ class DoubaoClient:
             
             # Parse error using comprehensive Doubao error parser
             try:
-                parse_and_raise_doubao_error(error_code, error_msg, status_code=status_code)
+                parse_and_raise_doubao_error(
+                    error_code, error_msg,
+                    status_code=status_code,
+                    headers=getattr(e.response, 'headers', None)
+                )
             except (LLMInvalidParameterError, LLMQuotaExhaustedError, LLMModelNotFoundError, 
                     LLMAccessDeniedError, LLMContentFilterError, LLMRateLimitError, LLMTimeoutError):
                 # Re-raise parsed exceptions
@@ -231,6 +231,424 @@ class Config:
         val = self._get_cached_value('DASHSCOPE_RATE_LIMITING_ENABLED', 'true')
         return val.lower() == 'true'
 
+    @property
+    def HUNYUAN_QPM_LIMIT(self):
+        """Tencent Hunyuan Queries Per Minute limit"""
+        try:
+            return int(self._get_cached_value('HUNYUAN_QPM_LIMIT', '200'))
+        except (ValueError, TypeError):
+            logger.warning("Invalid HUNYUAN_QPM_LIMIT, using 200")
+            return 200
+
+    @property
+    def HUNYUAN_CONCURRENT_LIMIT(self):
+        """Tencent Hunyuan concurrent request limit"""
+        try:
+            return int(self._get_cached_value('HUNYUAN_CONCURRENT_LIMIT', '50'))
+        except (ValueError, TypeError):
+            logger.warning("Invalid HUNYUAN_CONCURRENT_LIMIT, using 50")
+            return 50
+
+    @property
+    def ARK_QPM_LIMIT(self):
+        """Volcengine ARK (Doubao) Queries Per Minute limit"""
+        try:
+            return int(self._get_cached_value('ARK_QPM_LIMIT', '200'))
+        except (ValueError, TypeError):
+            logger.warning("Invalid ARK_QPM_LIMIT, using 200")
+            return 200
+
+    @property
+    def ARK_CONCURRENT_LIMIT(self):
+        """Volcengine ARK (Doubao) concurrent request limit"""
+        try:
+            return int(self._get_cached_value('ARK_CONCURRENT_LIMIT', '50'))
+        except (ValueError, TypeError):
+            logger.warning("Invalid ARK_CONCURRENT_LIMIT, using 50")
+            return 50
+
+    @property
+    def LLM_MODEL_RATE_LIMITS(self):
+        """Per-model limits inside a provider, format 'model=qpm/concurrent,...' (empty = none)"""
+        return self._get_cached_value('LLM_MODEL_RATE_LIMITS', '')
+
+    @property
+    def LLM_RATE_LIMIT_BACKEND(self):
+        """Where limits are enforced: 'sqlite' (shared by all workers on the host) or 'memory' (per worker)"""
+        val = self._get_cached_value('LLM_RATE_LIMIT_BACKEND', 'sqlite').lower()
+        if val not in ('sqlite', 'memory'):
+            logger.warning(f"Invalid LLM_RATE_LIMIT_BACKEND '{val}', using sqlite")
+            return 'sqlite'
+        return val
+
+    @property
+    def LLM_RATE_LIMIT_POLL_MS(self):
+        """How often a worker re-checks for slots freed by other workers (ms)"""
+        try:
+            return max(5, int(self._get_cached_value('LLM_RATE_LIMIT_POLL_MS', '50')))
+        except (ValueError, TypeError):
+            logger.warning("Invalid LLM_RATE_LIMIT_POLL_MS, using 50")
+            return 50
+
+    # ============================================================================
+    # PNG EXPORT BROWSER POOL (Per-worker warm Chromium instances)
+    # ============================================================================
+
+    @property
+    def BROWSER_POOL_SIZE(self):
+        """Maximum number of long-lived Chromium browsers per worker"""
+        try:
+            val = int(self._get_cached_value('BROWSER_POOL_SIZE', '2'))
+            if val < 1 or val > 16:
+                logger.warning(f"BROWSER_POOL_SIZE {val} out of range, using 2")
+                return 2
+            return val
+        except (ValueError, TypeError):
+            logger.warning("Invalid BROWSER_POOL_SIZE, using 2")
+            return 2
+
+    @property
+    def BROWSER_POOL_MAX_RENDERS(self):
+        """Recycle a pooled browser after this many renders"""
+        try:
+            return int(self._get_cached_value('BROWSER_POOL_MAX_RENDERS', '200'))
+        except (ValueError, TypeError):
+            logger.warning("Invalid BROWSER_POOL_MAX_RENDERS, using 200")
+            return 200
+
+    @property
+    def BROWSER_POOL_MAX_MEMORY_MB(self):
+        """Recycle a pooled browser when its process tree RSS exceeds this (MB)"""
+        try:
+            return int(self._get_cached_value('BROWSER_POOL_MAX_MEMORY_MB', '1024'))
+        except (ValueError, TypeError):
+            logger.warning("Invalid BROWSER_POOL_MAX_MEMORY_MB, using 1024")
+            return 1024
+
+    @property
+    def BROWSER_POOL_MAX_QUEUE(self):
+        """Maximum number of export requests waiting for a free browser"""
+        try:
+            return int(self._get_cached_value('BROWSER_POOL_MAX_QUEUE', '20'))
+        except (ValueError, TypeError):
+            logger.warning("Invalid BROWSER_POOL_MAX_QUEUE, using 20")
+            return 20
+
+    @property
+    def BROWSER_POOL_ACQUIRE_TIMEOUT(self):
+        """Seconds an export request may wait for a free browser"""
+        try:
+            return float(self._get_cached_value('BROWSER_POOL_ACQUIRE_TIMEOUT', '30'))
+        except (ValueError, TypeError):
+            logger.warning("Invalid BROWSER_POOL_ACQUIRE_TIMEOUT, using 30")
+            return 30.0
+
+    # ============================================================================
+    # PNG RENDER CACHE (Content-addressed, memory LRU + temp_images/ on disk)
+    # ============================================================================
+
+    @property
+    def PNG_CACHE_ENABLED(self):
+        """Enable/disable reuse of rendered PNGs for identical specs"""
+        val = self._get_cached_value('PNG_CACHE_ENABLED', 'true')
+        return val.lower() == 'true'
+
+    @property
+    def PNG_CACHE_MEMORY_MB(self):
+        """In-memory PNG cache budget per worker (MB)"""
+        try:
+            return int(self._get_cached_value('PNG_CACHE_MEMORY_MB', '64'))
+        except (ValueError, TypeError):
+            logger.warning("Invalid PNG_CACHE_MEMORY_MB, using 64")
+            return 64
+
+    @property
+    def PNG_CACHE_DISK_MB(self):
+        """On-disk PNG cache budget under temp_images/ (MB)"""
+        try:
+            return int(self._get_cached_value('PNG_CACHE_DISK_MB', '512'))
+        except (ValueError, TypeError):
+            logger.warning("Invalid PNG_CACHE_DISK_MB, using 512")
+            return 512
+
+    # ============================================================================
+    # SESSION STORE (node palette, thinking mode, voice, learning sessions)
+    # ============================================================================
+
+    @property
+    def SESSION_STORE_BACKEND(self):
+        """Where session state lives: 'memory' (per worker) or 'sqlite' (shared by all workers on the host)"""
+        val = self._get_cached_value('SESSION_STORE_BACKEND', 'sqlite').lower()
+        if val not in ('sqlite', 'memory'):
+            logger.warning(f"Invalid SESSION_STORE_BACKEND '{val}', using sqlite")
+            return 'sqlite'
+        return val
+
+    @property
+    def SESSION_STORE_TTL_SECONDS(self):
+        """Seconds an idle session is kept"""
+        try:
+            return max(60, int(self._get_cached_value('SESSION_STORE_TTL_SECONDS', '7200')))
+        except (ValueError, TypeError):
+            logger.warning("Invalid SESSION_STORE_TTL_SECONDS, using 7200")
+            return 7200
+
+    @property
+    def SESSION_STORE_MAX_ENTRIES(self):
+        """Maximum sessions per subsystem; least recently used are evicted first"""
+        try:
+            return max(1, int(self._get_cached_value('SESSION_STORE_MAX_ENTRIES', '1000')))
+        except (ValueError, TypeError):
+            logger.warning("Invalid SESSION_STORE_MAX_ENTRIES, using 1000")
+            return 1000
+
+    @property
+    def SESSION_STORE_MAX_MB(self):
+        """Maximum session state per subsystem (MB, pickled size)"""
+        try:
+            return max(1, int(self._get_cached_value('SESSION_STORE_MAX_MB', '64')))
+        except (ValueError, TypeError):
+            logger.warning("Invalid SESSION_STORE_MAX_MB, using 64")
+            return 64
+
+    # ============================================================================
+    # AUTH PRINCIPAL CACHE (users, organizations, API keys per request)
+    # ============================================================================
+
+    @property
+    def AUTH_CACHE_ENABLED(self):
+        """Cache authenticated users, organization status and API keys between requests"""
+        val = self._get_cached_value('AUTH_CACHE_ENABLED', 'true')
+        return val.lower() == 'true'
+
+    @property
+    def AUTH_CACHE_TTL_SECONDS(self):
+        """Seconds a cached principal is trusted (bounds staleness of changes made outside the app)"""
+        try:
+            return max(1, int(self._get_cached_value('AUTH_CACHE_TTL_SECONDS', '30')))
+        except (ValueError, TypeError):
+            logger.warning("Invalid AUTH_CACHE_TTL_SECONDS, using 30")
+            return 30
+
+    @property
+    def AUTH_CACHE_MAX_ENTRIES(self):
+        """Maximum cached principals per worker; least recently used are evicted first"""
+        try:
+            return max(1, int(self._get_cached_value('AUTH_CACHE_MAX_ENTRIES', '10000')))
+        except (ValueError, TypeError):
+            logger.warning("Invalid AUTH_CACHE_MAX_ENTRIES, using 10000")
+            return 10000
+
+    # ============================================================================
+    # LLM HTTP CONNECTION POOL (Dashscope: Qwen, DeepSeek, Kimi)
+    # ============================================================================
+
+    @property
+    def LLM_HTTP_POOL_LIMIT(self):
+        """Maximum open connections per provider session (0 = unlimited)"""
+        try:
+            return int(self._get_cached_value('LLM_HTTP_POOL_LIMIT', '200'))
+        except (ValueError, TypeError):
+            logger.warning("Invalid LLM_HTTP_POOL_LIMIT, using 200")
+            return 200
+
+    @property
+    def LLM_HTTP_POOL_LIMIT_PER_HOST(self):
+        """Maximum open connections to one host (0 = unlimited)"""
+        try:
+            return int(self._get_cached_value('LLM_HTTP_POOL_LIMIT_PER_HOST', '100'))
+        except (ValueError, TypeError):
+            logger.warning("Invalid LLM_HTTP_POOL_LIMIT_PER_HOST, using 100")
+            return 100
+
+    @property
+    def LLM_HTTP_KEEPALIVE_SECONDS(self):
+        """Idle time before a pooled keep-alive connection is closed"""
+        try:
+            return float(self._get_cached_value('LLM_HTTP_KEEPALIVE_SECONDS', '30'))
+        except (ValueError, TypeError):
+            logger.warning("Invalid LLM_HTTP_KEEPALIVE_SECONDS, using 30")
+            return 30.0
+
+    @property
+    def LLM_HTTP_DNS_TTL(self):
+        """Seconds a resolved provider hostname is cached"""
+        try:
+            return int(self._get_cached_value('LLM_HTTP_DNS_TTL', '300'))
+        except (ValueError, TypeError):
+            logger.warning("Invalid LLM_HTTP_DNS_TTL, using 300")
+            return 300
+
+    # ============================================================================
+    # LLM RESPONSE CACHE (LLMService.chat, exact match)
+    # ============================================================================
+
+    @property
+    def LLM_CACHE_ENABLED(self):
+        """Serve identical low-temperature chat requests from cache"""
+        val = self._get_cached_value('LLM_CACHE_ENABLED', 'false')
+        return val.lower() == 'true'
+
+    @property
+    def LLM_CACHE_TTL_SECONDS(self):
+        """Seconds a cached LLM response stays valid"""
+        try:
+            return int(self._get_cached_value('LLM_CACHE_TTL_SECONDS', '3600'))
+        except (ValueError, TypeError):
+            logger.warning("Invalid LLM_CACHE_TTL_SECONDS, using 3600")
+            return 3600
+
+    @property
+    def LLM_CACHE_MAX_ENTRIES(self):
+        """Maximum responses held in each worker's memory LRU"""
+        try:
+            return int(self._get_cached_value('LLM_CACHE_MAX_ENTRIES', '1000'))
+        except (ValueError, TypeError):
+            logger.warning("Invalid LLM_CACHE_MAX_ENTRIES, using 1000")
+            return 1000
+
+    @property
+    def LLM_CACHE_MAX_TEMPERATURE(self):
+        """Requests with a higher temperature bypass the cache"""
+        try:
+            return float(self._get_cached_value('LLM_CACHE_MAX_TEMPERATURE', '0.5'))
+        except (ValueError, TypeError):
+            logger.warning("Invalid LLM_CACHE_MAX_TEMPERATURE, using 0.5")
+            return 0.5
+
+    @property
+    def LLM_CACHE_SHARED(self):
+        """Share cached responses across workers via SQLite (data/llm_response_cache.db)"""
+        val = self._get_cached_value('LLM_CACHE_SHARED', 'true')
+        return val.lower() == 'true'
+
+    @property
+    def LLM_CACHE_SHARED_MAX_ENTRIES(self):
+        """Maximum responses kept in the shared SQLite tier"""
+        try:
+            return int(self._get_cached_value('LLM_CACHE_SHARED_MAX_ENTRIES', '10000'))
+        except (ValueError, TypeError):
+            logger.warning("Invalid LLM_CACHE_SHARED_MAX_ENTRIES, using 10000")
+            return 10000
+
+    @property
+    def LLM_COALESCE_ENABLED(self):
+        """Share one upstream call among concurrent identical chat/chat_stream requests"""
+        val = self._get_cached_value('LLM_COALESCE_ENABLED', 'true')
+        return val.lower() == 'true'
+
+    @property
+    def LLM_RACE_HEDGED(self):
+        """generate_race calls the fastest model first and hedges only past its p90"""
+        val = self._get_cached_value('LLM_RACE_HEDGED', 'true')
+        return val.lower() == 'true'
+
+    @property
+    def LLM_HEDGE_DEFAULT_DELAY(self):
+        """Hedge delay (seconds) for models without enough latency history"""
+        try:
+            return float(self._get_cached_value('LLM_HEDGE_DEFAULT_DELAY', '5.0'))
+        except (ValueError, TypeError):
+            logger.warning("Invalid LLM_HEDGE_DEFAULT_DELAY, using 5.0")
+            return 5.0
+
+    @property
+    def LLM_ROUTES(self):
+        """Named model routes for chat(route=...), e.g. generation=qwen,deepseek,kimi;classification=qwen-turbo,qwen"""
+        return self._get_cached_value('LLM_ROUTES', '')
+
+    @property
+    def LLM_ROUTE_SLOS(self):
+        """Per-route p95 latency SLOs in seconds, e.g. generation=10,classification=3"""
+        return self._get_cached_value('LLM_ROUTE_SLOS', '')
+
+    @property
+    def LLM_ROUTE_DEFAULT_SLO(self):
+        """p95 latency SLO (seconds) for routes without their own"""
+        try:
+            return float(self._get_cached_value('LLM_ROUTE_DEFAULT_SLO', '15.0'))
+        except (ValueError, TypeError):
+            logger.warning("Invalid LLM_ROUTE_DEFAULT_SLO, using 15.0")
+            return 15.0
+
+    @property
+    def LLM_ROUTE_MAX_RETRIES(self):
+        """Attempts per model in a routed call before failing over to the next model"""
+        try:
+            return max(1, int(self._get_cached_value('LLM_ROUTE_MAX_RETRIES', '1')))
+        except (ValueError, TypeError):
+            logger.warning("Invalid LLM_ROUTE_MAX_RETRIES, using 1")
+            return 1
+
+    @property
+    def LEARNING_QUESTION_CONCURRENCY(self):
+        """Learning mode: questions generated concurrently per session"""
+        try:
+            return max(1, int(self._get_cached_value('LEARNING_QUESTION_CONCURRENCY', '4')))
+        except (ValueError, TypeError):
+            logger.warning("Invalid LEARNING_QUESTION_CONCURRENCY, using 4")
+            return 4
+
+    @property
+    def LOCAL_CLASSIFIER_ENABLED(self):
+        """Detect the diagram type locally (keywords + n-grams) before asking the LLM"""
+        return self._get_cached_value('LOCAL_CLASSIFIER_ENABLED', 'true').lower() == 'true'
+
+    @property
+    def LOCAL_CLASSIFIER_MIN_CONFIDENCE(self):
+        """Local diagram type predictions below this confidence fall back to the LLM"""
+        try:
+            return float(self._get_cached_value('LOCAL_CLASSIFIER_MIN_CONFIDENCE', '0.85'))
+        except (ValueError, TypeError):
+            logger.warning("Invalid LOCAL_CLASSIFIER_MIN_CONFIDENCE, using 0.85")
+            return 0.85
+
+    @property
+    def SPECULATIVE_GENERATION_ENABLED(self):
+        """Start topic extraction alongside diagram type detection instead of after it"""
+        return self._get_cached_value('SPECULATIVE_GENERATION_ENABLED', 'true').lower() == 'true'
+
+    @property
+    def FOCUS_QUESTION_PARAGRAPH_SENTENCES(self):
+        """Focus question concept maps: sentences after which introduction text is sent to triple extraction"""
+        try:
+            return max(1, int(self._get_cached_value('FOCUS_QUESTION_PARAGRAPH_SENTENCES', '4')))
+        except (ValueError, TypeError):
+            logger.warning("Invalid FOCUS_QUESTION_PARAGRAPH_SENTENCES, using 4")
+            return 4
+
+    @property
+    def TRIPLE_CHUNKING_ENABLED(self):
+        """Extract triples from long texts in overlapping chunks, concurrently"""
+        return self._get_cached_value('TRIPLE_CHUNKING_ENABLED', 'true').lower() == 'true'
+
+    @property
+    def TRIPLE_CHUNK_CHARS(self):
+        """Texts longer than this are chunked for triple extraction; also the chunk size"""
+        try:
+            return max(200, int(self._get_cached_value('TRIPLE_CHUNK_CHARS', '2000')))
+        except (ValueError, TypeError):
+            logger.warning("Invalid TRIPLE_CHUNK_CHARS, using 2000")
+            return 2000
+
+    @property
+    def TRIPLE_CHUNK_OVERLAP_SENTENCES(self):
+        """Sentences repeated from the previous chunk at the start of the next"""
+        try:
+            return max(0, int(self._get_cached_value('TRIPLE_CHUNK_OVERLAP_SENTENCES', '1')))
+        except (ValueError, TypeError):
+            logger.warning("Invalid TRIPLE_CHUNK_OVERLAP_SENTENCES, using 1")
+            return 1
+
+    @property
+    def TRIPLE_CHUNK_CONCURRENCY(self):
+        """Chunks of one text extracted concurrently"""
+        try:
+            return max(1, int(self._get_cached_value('TRIPLE_CHUNK_CONCURRENCY', '4')))
+        except (ValueError, TypeError):
+            logger.warning("Invalid TRIPLE_CHUNK_CONCURRENCY, using 4")
+            return 4
+
     # ============================================================================
     # SMS RATE LIMITING (For Tencent Cloud SMS API)
     # ============================================================================
@@ -27,6 +27,7 @@ from logging.handlers import TimedRotatingFileHandler, BaseRotatingHandler
 import time
 import signal
 import asyncio
+import threading
 from contextlib import asynccontextmanager
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
@@ -633,12 +634,89 @@ async def lifespan(app: FastAPI):
     try:
         from services.llm_service import llm_service
         llm_service.initialize()
+        # Sync legacy code (concept map threads) submits LLM calls to this loop
+        from services.async_bridge import async_bridge
+        async_bridge.set_main_loop(asyncio.get_running_loop())
         if worker_id == '0' or not worker_id:
             logger.info("LLM Service initialized")
     except Exception as e:
         if worker_id == '0' or not worker_id:
             logger.warning(f"Failed to initialize LLM Service: {e}")
     
+    # Warm the PNG export browser pool (one pool per worker)
+    try:
+        from services.browser import browser_pool
+        browser_pool.configure(
+            size=config.BROWSER_POOL_SIZE,
+            max_renders=config.BROWSER_POOL_MAX_RENDERS,
+            max_memory_mb=config.BROWSER_POOL_MAX_MEMORY_MB,
+            max_queue=config.BROWSER_POOL_MAX_QUEUE,
+            acquire_timeout=config.BROWSER_POOL_ACQUIRE_TIMEOUT
+        )
+        await browser_pool.start(prewarm=1)
+        if worker_id == '0' or not worker_id:
+            logger.info(f"Browser pool started (size={config.BROWSER_POOL_SIZE})")
+    except Exception as e:
+        if worker_id == '0' or not worker_id:
+            logger.warning(f"Failed to warm browser pool (browsers will launch on demand): {e}")
+    
+    # Configure PNG render cache (memory LRU + temp_images/ disk tier)
+    try:
+        from services.png_render_cache import png_render_cache
+        png_render_cache.configure(
+            enabled=config.PNG_CACHE_ENABLED,
+            memory_max_mb=config.PNG_CACHE_MEMORY_MB,
+            disk_max_mb=config.PNG_CACHE_DISK_MB
+        )
+        if worker_id == '0' or not worker_id:
+            logger.info(f"PNG render cache configured (memory={config.PNG_CACHE_MEMORY_MB}MB, disk={config.PNG_CACHE_DISK_MB}MB)")
+    except Exception as e:
+        if worker_id == '0' or not worker_id:
+            logger.warning(f"Failed to configure PNG render cache: {e}")
+    
+    # Configure the session store (node palette, thinking mode, voice, learning)
+    try:
+        from services.session_store import session_stores
+        session_stores.configure(
+            backend=config.SESSION_STORE_BACKEND,
+            ttl_seconds=config.SESSION_STORE_TTL_SECONDS,
+            max_entries=config.SESSION_STORE_MAX_ENTRIES,
+            max_mb=config.SESSION_STORE_MAX_MB
+        )
+        if worker_id == '0' or not worker_id:
+            logger.info(f"Session store configured (backend={config.SESSION_STORE_BACKEND}, ttl={config.SESSION_STORE_TTL_SECONDS}s)")
+    except Exception as e:
+        if worker_id == '0' or not worker_id:
+            logger.warning(f"Failed to configure session store: {e}")
+    
+    # Configure the auth principal cache (users, organization status, API keys)
+    try:
+        from services.principal_cache import principal_cache
+        principal_cache.configure(
+            enabled=config.AUTH_CACHE_ENABLED,
+            ttl_seconds=config.AUTH_CACHE_TTL_SECONDS,
+            max_entries=config.AUTH_CACHE_MAX_ENTRIES
+        )
+        if worker_id == '0' or not worker_id:
+            logger.info(f"Auth principal cache configured (enabled={config.AUTH_CACHE_ENABLED}, ttl={config.AUTH_CACHE_TTL_SECONDS}s)")
+    except Exception as e:
+        if worker_id == '0' or not worker_id:
+            logger.warning(f"Failed to configure auth principal cache: {e}")
+    
+    # Build token usage rollups for databases that predate them (worker 0, off the event loop,
+    # one month per transaction)
+    rollup_backfill_task = None
+    rollup_backfill_stop = threading.Event()
+    if worker_id == '0' or not worker_id:
+        try:
+            from config.database import engine
+            from services.token_rollups import backfill_if_missing
+            rollup_backfill_task = asyncio.create_task(
+                asyncio.to_thread(backfill_if_missing, engine, rollup_backfill_stop)
+            )
+        except Exception as e:
+            logger.warning(f"Failed to start token usage rollup backfill: {e}")
+    
     # Start temp image cleanup task
     cleanup_task = None
     try:
@@ -684,6 +762,17 @@ async def lifespan(app: FastAPI):
         except Exception as e:
             logger.warning(f"Failed to start backup scheduler: {e}")
     
+    # Start token usage maintenance scheduler (daily archival of old raw rows,
+    # hourly rollup pruning and incremental vacuum; worker 0 only)
+    token_maintenance_task = None
+    if worker_id == '0' or not worker_id:
+        try:
+            from services.token_archive import start_token_usage_maintenance_scheduler
+            token_maintenance_task = asyncio.create_task(start_token_usage_maintenance_scheduler())
+            logger.info("Token usage maintenance scheduler started")
+        except Exception as e:
+            logger.warning(f"Failed to start token usage maintenance scheduler: {e}")
+    
     # Yield control to application
     try:
         yield
@@ -713,6 +802,12 @@ async def lifespan(app: FastAPI):
             if worker_id == '0' or not worker_id:
                 logger.info("Captcha cleanup scheduler stopped")
         
+        # The backfill thread can't be cancelled: ask it to stop after the month it is
+        # rebuilding (shutdown waits for that month); it reruns on the next start
+        if rollup_backfill_task and not rollup_backfill_task.done():
+            rollup_backfill_stop.set()
+            logger.info("Token usage rollup backfill stopping; it will rerun on next start")
+        
         # Stop WAL checkpoint scheduler
         if wal_checkpoint_task:
             wal_checkpoint_task.cancel()
@@ -732,16 +827,51 @@ async def lifespan(app: FastAPI):
                 pass
             logger.info("Database backup scheduler stopped")
         
+        # Stop token usage maintenance scheduler (only runs on worker 0)
+        if token_maintenance_task:
+            token_maintenance_task.cancel()
+            try:
+                await token_maintenance_task
+            except asyncio.CancelledError:
+                pass
+            logger.info("Token usage maintenance scheduler stopped")
+        
         # Cleanup LLM Service
         try:
             from services.llm_service import llm_service
+            from services.async_bridge import async_bridge
+            async_bridge.shutdown()
             llm_service.cleanup()
+            # Let pooled provider sessions finish closing their connections
+            from clients.http_pool import http_pool
+            await http_pool.wait_closed()
+            if llm_service.rate_limiter and hasattr(llm_service.rate_limiter, 'close'):
+                # Return this worker's shared rate limiter leases
+                await llm_service.rate_limiter.close()
             if worker_id == '0' or not worker_id:
                 logger.info("LLM Service cleaned up")
         except Exception as e:
             if worker_id == '0' or not worker_id:
                 logger.warning(f"Failed to cleanup LLM Service: {e}")
         
+        # Close pooled browsers and the Playwright driver
+        try:
+            from services.browser import browser_pool
+            await browser_pool.close()
+            if worker_id == '0' or not worker_id:
+                logger.info("Browser pool closed")
+        except Exception as e:
+            if worker_id == '0' or not worker_id:
+                logger.warning(f"Failed to close browser pool: {e}")
+        
+        # Close the session store database connection
+        try:
+            from services.session_store import session_stores
+            session_stores.close()
+        except Exception as e:
+            if worker_id == '0' or not worker_id:
+                logger.warning(f"Failed to close session store: {e}")
+        
         # Flush update notification dismiss buffer
         try:
             from services.update_notifier import update_notifier
@@ -763,6 +893,14 @@ async def lifespan(app: FastAPI):
             if worker_id == '0' or not worker_id:
                 logger.warning(f"Failed to flush TokenTracker: {e}")
         
+        # Write pending API key usage and return leased quota
+        try:
+            from services.api_key_usage import api_key_usage
+            api_key_usage.shutdown()
+        except Exception as e:
+            if worker_id == '0' or not worker_id:
+                logger.warning(f"Failed to flush API key usage: {e}")
+        
         # Shutdown SMS service (close httpx async client)
         try:
             from services.sms_middleware import shutdown_sms_service
@@ -49,6 +49,11 @@ class Messages:
             "en": "PNG export failed: {}",
             "az": "PNG ixracı uğursuz oldu: {}"
         },
+        "export_busy": {
+            "zh": "导出服务繁忙，请稍后重试",
+            "en": "PNG export is busy, please retry shortly",
+            "az": "PNG ixracı məşğuldur, bir az sonra yenidən cəhd edin"
+        },
         "internal_error": {
             "zh": "服务器内部错误",
             "en": "Internal server error",
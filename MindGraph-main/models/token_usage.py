@@ -43,6 +43,7 @@ class TokenUsage(Base):
     diagram_type = Column(String(50))  # 'mind_map', 'concept_map', etc.
     endpoint_path = Column(String(200))  # API endpoint used: '/api/generate_graph', '/thinking_mode/node_palette/start', etc.
     success = Column(Boolean, default=True)
+    cache_hit = Column(Boolean, default=False)  # Served from LLM response cache (zero tokens/cost)
     
     # Timing
     response_time = Column(Float)  # seconds
@@ -62,3 +63,50 @@ class TokenUsage(Base):
     def __repr__(self):
         return f"<TokenUsage(user_id={self.user_id}, model={self.model_alias}, tokens={self.total_tokens})>"
 
+
+
+class TokenUsageRollupMixin:
+    """
+    Pre-aggregated token usage per time bucket, maintained by TokenTracker
+    in the same transaction as the raw rows (see services/token_rollups.py).
+
+    Dimensions are part of the primary key so a batch upserts into it;
+    "none" is stored as 0 / '' because NULLs never conflict. The key leads
+    with bucket: every dashboard read is a time-range aggregate.
+    """
+    bucket = Column(DateTime, primary_key=True)  # Start of the hour/day (UTC)
+    organization_id = Column(Integer, primary_key=True, default=0)  # 0 = no organization
+    user_id = Column(Integer, primary_key=True, default=0)  # 0 = anonymous / API key
+    model_alias = Column(String(50), primary_key=True, default='')
+    request_type = Column(String(50), primary_key=True, default='')
+    success = Column(Boolean, primary_key=True, default=True)
+
+    request_count = Column(Integer, default=0)
+    input_tokens = Column(Integer, default=0)
+    output_tokens = Column(Integer, default=0)
+    total_tokens = Column(Integer, default=0)
+    total_cost = Column(Float, default=0.0)
+
+
+class TokenUsageHourly(TokenUsageRollupMixin, Base):
+    """Hourly token usage rollup"""
+    __tablename__ = 'token_usage_hourly'
+
+    def __repr__(self):
+        return f"<TokenUsageHourly(bucket={self.bucket}, user_id={self.user_id}, tokens={self.total_tokens})>"
+
+
+class TokenUsageDaily(TokenUsageRollupMixin, Base):
+    """Daily token usage rollup"""
+    __tablename__ = 'token_usage_daily'
+
+    def __repr__(self):
+        return f"<TokenUsageDaily(bucket={self.bucket}, user_id={self.user_id}, tokens={self.total_tokens})>"
+
+
+class TokenUsageMonthly(TokenUsageRollupMixin, Base):
+    """Monthly token usage rollup (all-time totals)"""
+    __tablename__ = 'token_usage_monthly'
+
+    def __repr__(self):
+        return f"<TokenUsageMonthly(bucket={self.bucket}, user_id={self.user_id}, tokens={self.total_tokens})>"
@@ -18,7 +18,6 @@ import asyncio
 import uuid
 import re
 from pathlib import Path
-import aiofiles
 import httpx
 from typing import Dict, Any, Optional
 from fastapi import APIRouter, HTTPException, status, Depends, Request
@@ -47,8 +46,13 @@ from models import (
 from clients.dify import AsyncDifyClient
 from clients.llm import qwen_client_generation, qwen_client_classification
 from agents import main_agent as agent
-from services.browser import BrowserContextManager
+from agents.core.diagram_classifier import get_diagram_classifier
+from services.browser import BrowserContextManager, BrowserPoolBusyError, browser_pool
+from services.render_host import render_host_cache
+from services.png_render_cache import png_render_cache, make_render_key, parse_cache_filename
 from services.llm_service import llm_service
+from services.token_tracker import get_token_tracker
+from services.session_store import session_stores
 
 # Import authentication
 from models.auth import User
@@ -253,6 +257,36 @@ async def generate_graph(
 # FOCUS QUESTION CONCEPT MAP GENERATION
 # ============================================================================
 
+async def _resolve_focus_question(
+    req: FocusQuestionGenerateRequest,
+    language: str,
+    llm_model: str,
+    request_id: str
+) -> str:
+    """Focus question for a focus question request (extracted from the text when asked to)."""
+    from services.focus_question_service import focus_question_service
+    
+    if not req.extract_focus_question:
+        # Use text directly as focus question
+        return req.text
+    
+    # Extract focus question from user input using LLM
+    # e.g., "生成加里奥对线狐狸的概念图" -> "加里奥如何对线狐狸"
+    extract_result = await focus_question_service.extract_focus_question(
+        text=req.text,
+        language=language,
+        model=llm_model
+    )
+    if extract_result.get('success') and extract_result.get('focus_question'):
+        focus_question = extract_result['focus_question']
+        logger.info(f"[{request_id}] Extracted focus question: {focus_question}")
+        return focus_question
+    
+    # Fallback: use original text if extraction fails
+    logger.warning(f"[{request_id}] Focus question extraction failed, using original text")
+    return req.text
+
+
 @router.post('/generate_concept_map_from_focus_question', response_model=GenerateResponse)
 async def generate_concept_map_from_focus_question(
     req: FocusQuestionGenerateRequest,
@@ -284,30 +318,11 @@ async def generate_concept_map_from_focus_question(
     try:
         # Import concept map agent
         from agents.concept_maps.concept_map_agent import ConceptMapAgent
-        from services.focus_question_service import focus_question_service
         
         # Pass model parameter to agent (same pattern as other diagram agents)
         agent = ConceptMapAgent(model=llm_model)
         
-        # Determine focus question
-        if req.extract_focus_question:
-            # Extract focus question from user input using LLM
-            # e.g., "生成加里奥对线狐狸的概念图" -> "加里奥如何对线狐狸"
-            extract_result = await focus_question_service.extract_focus_question(
-                text=req.text,
-                language=language,
-                model=llm_model
-            )
-            if extract_result.get('success') and extract_result.get('focus_question'):
-                focus_question = extract_result['focus_question']
-                logger.info(f"[{request_id}] Extracted focus question: {focus_question}")
-            else:
-                # Fallback: use original text if extraction fails
-                focus_question = req.text
-                logger.warning(f"[{request_id}] Focus question extraction failed, using original text")
-        else:
-            # Use text directly as focus question
-            focus_question = req.text
+        focus_question = await _resolve_focus_question(req, language, llm_model, request_id)
         
         # Generate concept map using focus question workflow
         result = await agent.generate_from_focus_question(
@@ -347,6 +362,73 @@ async def generate_concept_map_from_focus_question(
         )
 
 
+@router.post('/generate_concept_map_from_focus_question/stream')
+async def generate_concept_map_from_focus_question_stream(
+    req: FocusQuestionGenerateRequest,
+    x_language: str = None,
+    current_user: Optional[User] = Depends(get_current_user_or_api_key)
+):
+    """
+    Stream concept map generation from a focus question with SSE.
+    
+    Same workflow as /generate_concept_map_from_focus_question, pipelined:
+    triples are extracted from each introduction paragraph while the rest of
+    the introduction is still being written, and the concept map is pushed
+    as it grows.
+    
+    Events (data: JSON):
+    - {"event": "focus_question", "focus_question": ...}
+    - {"event": "introduction", "text": ...} per paragraph
+    - {"event": "partial", "spec": ..., "triple_count": n} after each new batch of triples
+    - {"event": "complete", "success": true, "spec": ..., ...} same fields as the non-streaming response
+    - {"event": "error", "success": false, "error": ...}
+    """
+    language = req.language.value if hasattr(req.language, 'value') else str(req.language)
+    llm_model = req.llm.value if hasattr(req.llm, 'value') else str(req.llm)
+    
+    request_id = str(uuid.uuid4())
+    logger.info(f"[{request_id}] Streaming focus question concept map generation request, LLM model: {llm_model}")
+    
+    async def generate():
+        """Async generator for SSE streaming"""
+        start_time = time.time()
+        try:
+            from agents.concept_maps.concept_map_agent import ConceptMapAgent
+            agent = ConceptMapAgent(model=llm_model)
+            
+            focus_question = await _resolve_focus_question(req, language, llm_model, request_id)
+            yield f"data: {json.dumps({'event': 'focus_question', 'focus_question': focus_question})}\n\n"
+            
+            first_partial = True
+            async for event in agent.generate_from_focus_question_stream(focus_question, language):
+                if event['event'] == 'partial' and first_partial:
+                    first_partial = False
+                    logger.info(f"[{request_id}] First concept map nodes after {time.time() - start_time:.2f}s")
+                elif event['event'] == 'complete':
+                    event.update({
+                        'request_id': request_id,
+                        'method': 'focus_question_workflow',
+                        'focus_question': focus_question,
+                        'extracted_topic': focus_question
+                    })
+                    logger.info(f"[{request_id}] Concept map from focus question completed in {time.time() - start_time:.2f}s")
+                yield f"data: {json.dumps(event)}\n\n"
+                
+        except Exception as e:
+            logger.error(f"[{request_id}] Error streaming concept map from focus question: {e}", exc_info=True)
+            yield f"data: {json.dumps({'event': 'error', 'success': False, 'error': str(e)})}\n\n"
+    
+    return StreamingResponse(
+        generate(),
+        media_type='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no',
+            'Connection': 'keep-alive'
+        }
+    )
+
+
 # ============================================================================
 # CORE CONCEPTS GENERATION
 # ============================================================================
@@ -612,6 +694,19 @@ Linking word:"""
 # PNG EXPORT - BROWSER AUTOMATION
 # ============================================================================
 
+def _png_render_key(req: ExportPNGRequest) -> str:
+    """Content-addressed render cache key for an export request."""
+    diagram_type = req.diagram_type.value if hasattr(req.diagram_type, 'value') else str(req.diagram_type)
+    return make_render_key(
+        diagram_type,
+        req.diagram_data,
+        req.width or 1200,
+        req.height or 800,
+        req.scale or 2,
+        render_host_cache.get_version(diagram_type)
+    )
+
+
 @router.post('/export_png')
 async def export_png(
     req: ExportPNGRequest,
@@ -622,10 +717,10 @@ async def export_png(
     Export diagram as PNG using Playwright browser automation (async).
     
     This is a STANDALONE endpoint - takes diagram data and renders PNG.
-    Creates minimal HTML dynamically in headless browser with D3.js and renderers.
-    No dependency on any existing pages or routes.
+    Loads a prebuilt render host page (D3.js and renderers inlined, cached per
+    diagram type) and injects the spec. No dependency on any existing pages or routes.
     
-    This endpoint is already async-compatible (BrowserContextManager uses async_playwright).
+    Browsers come from the per-worker pool (BrowserContextManager leases one and opens an incognito context).
     """
     
     # Get language for error messages
@@ -671,263 +766,49 @@ async def export_png(
     logger.debug(f"Request width: {req.width}, height: {req.height}, scale: {req.scale}")
     logger.debug("="*80)
     
+    # Identical spec + type + size + scale: reuse the stored PNG, skip the browser
+    render_key = _png_render_key(req)
+    cached_png = await png_render_cache.get(render_key)
+    if cached_png is not None:
+        logger.debug(f"PNG served from render cache ({len(cached_png)} bytes, key={render_key[:12]})")
+        return Response(
+            content=cached_png,
+            media_type="image/png",
+            headers={
+                'Content-Disposition': 'attachment; filename="diagram.png"',
+                'X-Render-Cache': 'HIT'
+            }
+        )
+    
     try:
         # Use async browser manager
         async with BrowserContextManager() as context:
             page = await context.new_page()
             logger.debug("Browser context created successfully")
             
-            # Get server URL
-            port = os.getenv('PORT', '5000')
-            base_url = f"http://localhost:{port}"
-            
-            logger.debug(f"Creating HTML with base_url: {base_url}")
-            logger.debug(f"Container dimensions: {req.width or 1200}x{req.height or 800}")
-            
-            # Create minimal HTML page with rendering infrastructure
-            html_content = f"""
-<!DOCTYPE html>
-<html>
-<head>
-    <meta charset="UTF-8">
-    <script src="{base_url}/static/js/d3.min.js"></script>
-</head>
-<body>
-    <div id="d3-container" style="width: {req.width or 1200}px; height: {req.height or 800}px;"></div>
-    <script>
-        window.renderingComplete = false;
-        window.renderingError = null;
-        
-        // Load theme config, style manager, logger, and renderer
-        const scripts = [
-            '{base_url}/static/js/theme-config.js',
-            '{base_url}/static/js/style-manager.js',
-            '{base_url}/static/js/logger.js',
-            '{base_url}/static/js/renderers/shared-utilities.js',
-            '{base_url}/static/js/renderers/renderer-dispatcher.js'
-        ];
-        
-        // Add diagram-specific renderer
-        const rendererMap = {{
-            // Thinking Maps
-            'bubble_map': 'bubble-map-renderer.js',
-            'double_bubble_map': 'bubble-map-renderer.js',
-            'circle_map': 'bubble-map-renderer.js',
-            'tree_map': 'tree-renderer.js',
-            'flow_map': 'flow-renderer.js',
-            'multi_flow_map': 'flow-renderer.js',
-            'brace_map': 'brace-renderer.js',
-            'bridge_map': 'flow-renderer.js',
-            'flowchart': 'flow-renderer.js',
-            // Mind Maps & Concept Maps
-            'mindmap': 'mind-map-renderer.js',
-            'mind_map': 'mind-map-renderer.js',
-            'concept_map': 'concept-map-renderer.js'
-        }};
-        
-        const diagramType = '{diagram_type}';
-        if (rendererMap[diagramType]) {{
-            scripts.push('{base_url}/static/js/renderers/' + rendererMap[diagramType]);
-        }}
-        
-        // Load scripts sequentially
-        async function loadScripts() {{
-            for (const src of scripts) {{
-                await new Promise((resolve, reject) => {{
-                    const script = document.createElement('script');
-                    script.src = src;
-                    script.onload = () => {{
-                        console.log('Loaded:', src);
-                        resolve();
-                    }};
-                    script.onerror = (err) => {{
-                        console.error('Failed to load:', src);
-                        reject(err);
-                    }};
-                    document.head.appendChild(script);
-                }});
-                // Small delay between scripts to ensure execution
-                await new Promise(resolve => setTimeout(resolve, 100));
-            }}
-        }}
-        
-        // Render diagram after scripts load
-        loadScripts()
-            .then(() => {{
-                console.log('All scripts loaded, starting render...');
-                console.log('renderGraph available:', typeof renderGraph);
-                
-                const diagramData = {json.dumps(diagram_data)};
-                console.log('='.repeat(80));
-                console.log('VERBOSE: Complete Diagram Data in Browser:');
-                console.log('Diagram type:', '{diagram_type}');
-                console.log('Diagram data keys:', Object.keys(diagramData));
-                console.log('Topic:', diagramData.topic);
-                if (diagramData.attributes) {{
-                    console.log('Attributes count:', diagramData.attributes.length);
-                    diagramData.attributes.forEach((attr, i) => {{
-                        console.log(`  Attribute ${{i}}:`, attr);
-                    }});
-                }}
-                if (diagramData.nodes) {{
-                    console.log('Nodes count:', diagramData.nodes.length);
-                    diagramData.nodes.forEach((node, i) => {{
-                        console.log(`  Node ${{i}}:`, node);
-                    }});
-                }}
-                console.log('Layout:', diagramData._layout);
-                console.log('Recommended dimensions:', diagramData._recommended_dimensions);
-                console.log('Metadata:', diagramData._metadata);
-                console.log('='.repeat(80));
-                
-                if (typeof renderGraph !== 'function') {{
-                    throw new Error('renderGraph function not available');
-                }}
-                
-                // Render the diagram (may be async)
-                console.log('Calling renderGraph with:');
-                console.log('  - Type:', '{diagram_type}');
-                console.log('  - Data:', diagramData);
-                console.log('  - Theme:', null);
-                console.log('  - Dimensions:', null);
-                
-                const renderResult = renderGraph('{diagram_type}', diagramData, null, null);
-                console.log('renderGraph returned:', renderResult);
-                console.log('Return value type:', typeof renderResult);
-                console.log('Is promise?', renderResult && typeof renderResult.then === 'function');
-                
-                // Check if result is a promise
-                if (renderResult && typeof renderResult.then === 'function') {{
-                    console.log('renderGraph returned a promise, waiting...');
-                    renderResult.then(() => {{
-                        checkRendering();
-                    }}).catch(err => {{
-                        console.error('renderGraph promise rejected:', err);
-                        window.renderingError = err.toString();
-                        window.renderingComplete = true;
-                    }});
-                }} else {{
-                    // Not a promise, wait a bit and check
-                    console.log('renderGraph did not return a promise, waiting 2s...');
-                    setTimeout(checkRendering, 2000);
-                }}
-                
-                function checkRendering() {{
-                    console.log('='.repeat(80));
-                    console.log('CHECKING RENDERING RESULTS:');
-                    const container = document.getElementById('d3-container');
-                    console.log('Container found:', !!container);
-                    
-                    if (container) {{
-                        console.log('Container dimensions:', container.offsetWidth, 'x', container.offsetHeight);
-                        console.log('Container innerHTML length:', container.innerHTML.length);
-                        console.log('Container children count:', container.children.length);
-                        
-                        const svg = container.querySelector('svg');
-                        console.log('SVG found:', !!svg);
-                        
-                        if (svg) {{
-                            console.log('SVG dimensions:', svg.getAttribute('width'), 'x', svg.getAttribute('height'));
-                            console.log('SVG viewBox:', svg.getAttribute('viewBox'));
-                            console.log('SVG children count:', svg.children.length);
-                            console.log('SVG child tags:', Array.from(svg.children).map(c => c.tagName).join(', '));
-                            
-                            // Check for specific elements
-                            const circles = svg.querySelectorAll('circle');
-                            const rects = svg.querySelectorAll('rect');
-                            const texts = svg.querySelectorAll('text');
-                            const paths = svg.querySelectorAll('path');
-                            console.log('SVG elements - circles:', circles.length, 'rects:', rects.length, 'texts:', texts.length, 'paths:', paths.length);
-                            
-                            // Add watermark to exported PNG
-                            console.log('Adding watermark...');
-                            if (typeof addWatermark === 'function' && typeof d3 !== 'undefined') {{
-                                try {{
-                                    const svgD3 = d3.select(svg);
-                                    addWatermark(svgD3, null);
-                                    console.log('Watermark added successfully');
-                                }} catch (err) {{
-                                    console.error('Error adding watermark:', err);
-                                }}
-                            }} else {{
-                                console.warn('addWatermark or d3 not available - watermark skipped');
-                            }}
-                        }} else {{
-                            console.log('NO SVG FOUND!');
-                            console.log('Container innerHTML (first 500 chars):', container.innerHTML.substring(0, 500));
-                            console.log('Container children:', Array.from(container.children).map(c => c.tagName).join(', '));
-                        }}
-                    }} else {{
-                        console.log('NO CONTAINER FOUND!');
-                    }}
-                    console.log('='.repeat(80));
-                    window.renderingComplete = true;
-                }}
-            }})
-            .catch(err => {{
-                console.error('Rendering error:', err);
-                window.renderingError = err.toString();
-                window.renderingComplete = true;
-            }});
-    </script>
-</body>
-</html>
-            """
-            
-            # Set page content
-            logger.debug("Setting page content...")
-            logger.debug(f"HTML content length: {len(html_content)} characters")
-            await page.set_content(html_content)
-            logger.debug("Page content set successfully")
-            
             # Capture console logs for debugging
             page.on("console", lambda msg: logger.debug(f"[Browser Console] {msg.type}: {msg.text}"))
             
-            # Wait for rendering to complete by polling the flag
-            max_wait = 10  # seconds
-            waited = 0
-            while waited < max_wait:
-                rendering_complete = await page.evaluate("window.renderingComplete")
-                if rendering_complete:
-                    break
-                await asyncio.sleep(0.5)
-                waited += 0.5
-            
-            # Check if there was an error
-            rendering_error = await page.evaluate("window.renderingError")
-            if rendering_error:
-                logger.error(f"Rendering error in browser: {rendering_error}")
-                raise Exception(f"Browser rendering failed: {rendering_error}")
-            
-            # Verify SVG was created
-            svg_exists = await page.evaluate("!!document.querySelector('#d3-container svg')")
-            logger.debug(f"SVG exists check: {svg_exists}")
+            # Load the prebuilt render host page (all scripts inlined, no loopback HTTP)
+            container_width = req.width or 1200
+            container_height = req.height or 800
+            logger.debug(f"Container dimensions: {container_width}x{container_height}")
+            await page.set_content(render_host_cache.get_page(diagram_type))
             
-            if not svg_exists:
-                logger.error("="*80)
-                logger.error("NO SVG ELEMENT FOUND!")
-                
-                # Get detailed info from browser
-                container_info = await page.evaluate("""
-                    (() => {
-                        const container = document.getElementById('d3-container');
-                        return {
-                            found: !!container,
-                            innerHTML: container ? container.innerHTML : null,
-                            childCount: container ? container.children.length : 0,
-                            children: container ? Array.from(container.children).map(c => c.tagName) : []
-                        };
-                    })()
-                """)
-                logger.error(f"Container info: {json.dumps(container_info, indent=2)}")
-                
-                # Get page HTML for debugging
-                page_html = await page.content()
-                logger.error(f"Full page HTML length: {len(page_html)}")
-                logger.error(f"Page HTML (first 1000 chars):\n{page_html[:1000]}")
-                logger.error("="*80)
-                
-                raise Exception("No SVG element created - rendering may have failed")
+            # Inject the spec and wait for the render promise to settle
+            try:
+                await asyncio.wait_for(
+                    page.evaluate(
+                        "([type, data, width, height]) => window.mindgraphRender(type, data, width, height)",
+                        [diagram_type, diagram_data, container_width, container_height]
+                    ),
+                    timeout=10
+                )
+            except asyncio.TimeoutError:
+                raise Exception("Browser rendering timed out after 10s")
+            except Exception as e:
+                logger.error(f"Rendering error in browser: {e}")
+                raise Exception(f"Browser rendering failed: {e}")
             
             logger.debug("Rendering completed successfully, extracting dimensions")
             
@@ -1064,16 +945,25 @@ async def export_png(
             
             logger.debug(f"PNG generated successfully ({len(screenshot_bytes)} bytes, scale={scale_factor}x)")
             
+            await png_render_cache.put(render_key, screenshot_bytes)
+            
             # Return PNG as response
-            from fastapi.responses import Response
             return Response(
                 content=screenshot_bytes,
                 media_type="image/png",
                 headers={
-                    'Content-Disposition': 'attachment; filename="diagram.png"'
+                    'Content-Disposition': 'attachment; filename="diagram.png"',
+                    'X-Render-Cache': 'MISS'
                 }
             )
             
+    except BrowserPoolBusyError as e:
+        logger.warning(f"PNG export rejected: {e}")
+        raise HTTPException(
+            status_code=503,
+            detail=Messages.error("export_busy", lang),
+            headers={'Retry-After': '5'}
+        )
     except Exception as e:
         logger.error(f"PNG export error: {e}", exc_info=True)
         raise HTTPException(
@@ -1200,22 +1090,12 @@ async def generate_dingtalk_png(
         
         png_response = await export_png(export_req, x_language)
         
-        # Step 3: Save PNG to temp directory (ASYNC file I/O)
-        temp_dir = Path("temp_images")
-        temp_dir.mkdir(exist_ok=True)
-        
-        # Generate unique filename
-        unique_id = uuid.uuid4().hex[:8]
-        timestamp = int(time.time())
-        filename = f"dingtalk_{unique_id}_{timestamp}.png"
-        temp_path = temp_dir / filename
-        
-        # Write PNG content to file using aiofiles (100% async, non-blocking)
+        # Step 3: Store PNG in temp_images/ under its content-addressed name
+        # (retries of the same diagram reuse the same file and URL)
         # Note: png_response is a Response object with .body property
-        async with aiofiles.open(temp_path, 'wb') as f:
-            await f.write(png_response.body)
+        filename = await png_render_cache.ensure_file(_png_render_key(export_req), png_response.body)
         
-        logger.debug(f"[generate_dingtalk] Saved to {temp_path}")
+        logger.debug(f"[generate_dingtalk] Stored as temp_images/{filename}")
         
         # Step 4: Build plain text response in ![](url) format (empty alt text)
         # Detect protocol from request (http or https)
@@ -1244,12 +1124,27 @@ async def serve_temp_image(filename: str):
     """
     Serve temporary PNG files for DingTalk integration.
     
-    Images auto-cleanup after 24 hours.
+    Render cache entries (render_<sha256>.png) are immutable and served from
+    the in-memory tier when present. Images auto-cleanup after 24 hours unused.
     """
     # Security: Validate filename to prevent directory traversal
     if '..' in filename or '/' in filename or '\\' in filename:
         raise HTTPException(status_code=400, detail="Invalid filename")
     
+    render_key = parse_cache_filename(filename)
+    if render_key is not None:
+        cached_png = png_render_cache.get_memory(render_key)
+        if cached_png is not None:
+            return Response(
+                content=cached_png,
+                media_type="image/png",
+                headers={
+                    'Cache-Control': 'public, max-age=86400, immutable',
+                    'ETag': f'"{render_key}"',
+                    'X-Content-Type-Options': 'nosniff'
+                }
+            )
+    
     temp_path = Path("temp_images") / filename
     
     if not temp_path.exists():
@@ -1398,6 +1293,13 @@ async def get_llm_metrics(model: Optional[str] = None):
         - Response times (avg, min, max)
         - Circuit breaker state
         - Recent errors
+        - HTTP connection pool reuse (new vs reused connections per provider)
+        - Response cache hits, misses and bypasses
+        - Upstream calls saved by coalescing identical in-flight requests
+        - Hedged race rates (backups launched, backups that won) per primary model
+        - Routed chat usage (model selected, failovers, open circuits skipped) per route
+        - Local diagram type classifier hits (keyword / n-gram) and LLM fallbacks
+        - Speculative generation hit rate and tokens spent on discarded work
         
     Examples:
         GET /api/llm/metrics - Get metrics for all models
@@ -1410,6 +1312,13 @@ async def get_llm_metrics(model: Optional[str] = None):
             content={
                 'status': 'success',
                 'metrics': metrics,
+                'http_pool': llm_service.client_manager.get_http_pool_stats(),
+                'response_cache': llm_service.response_cache.get_stats(),
+                'coalescing': llm_service.singleflight.get_stats(),
+                'hedging': llm_service.performance_tracker.get_hedge_stats(),
+                'routing': llm_service.router.get_stats(),
+                'diagram_classifier': get_diagram_classifier().get_stats(),
+                'speculation': get_token_tracker().get_speculation_stats(),
                 'timestamp': int(time.time())
             }
         )
@@ -1422,6 +1331,65 @@ async def get_llm_metrics(model: Optional[str] = None):
         )
 
 
+@router.get('/browser/metrics')
+async def get_browser_metrics():
+    """
+    Get PNG export browser pool metrics for this worker.
+    
+    Returns:
+        JSON with pool occupancy (idle, in use, waiting), recycle counts
+        and export latency percentiles.
+        
+    Example:
+        GET /api/browser/metrics
+    """
+    try:
+        return JSONResponse(
+            content={
+                'status': 'success',
+                'metrics': browser_pool.get_stats(),
+                'timestamp': int(time.time())
+            }
+        )
+        
+    except Exception as e:
+        logger.error(f"Error getting browser metrics: {e}", exc_info=True)
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to retrieve metrics: {str(e)}"
+        )
+
+
+@router.get('/sessions/metrics')
+async def get_session_metrics():
+    """
+    Get session store metrics (node palette, thinking mode, voice, learning).
+    
+    Returns:
+        JSON with the backend, limits and, per namespace, live sessions,
+        resident bytes, hits/misses and evictions (expired / LRU) counted
+        by the worker that served the request.
+        
+    Example:
+        GET /api/sessions/metrics
+    """
+    try:
+        return JSONResponse(
+            content={
+                'status': 'success',
+                'metrics': session_stores.get_stats(),
+                'timestamp': int(time.time())
+            }
+        )
+        
+    except Exception as e:
+        logger.error(f"Error getting session metrics: {e}", exc_info=True)
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to retrieve metrics: {str(e)}"
+        )
+
+
 @router.post('/generate_multi_parallel')
 async def generate_multi_parallel(
     req: GenerateRequest,
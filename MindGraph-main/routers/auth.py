@@ -21,7 +21,7 @@ import math
 from fastapi import APIRouter, Depends, HTTPException, status, Request, Response, Body, Request, Header
 from fastapi.responses import RedirectResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import func, and_
+from sqlalchemy import func
 from PIL import Image, ImageDraw, ImageFont, ImageFilter
 
 from config.database import get_db
@@ -73,6 +73,8 @@ from utils.auth import (
     validate_bayi_token_body
 )
 from services.captcha_storage import get_captcha_storage
+from services.principal_cache import principal_cache
+from services.api_key_usage import api_key_usage
 from services.sms_middleware import (
     get_sms_middleware,
     SMSServiceError,
@@ -1494,6 +1496,7 @@ async def reset_password_with_sms(
     user.failed_login_attempts = 0  # Unlock account
     user.locked_until = None
     db.commit()
+    principal_cache.invalidate_user(user.id)
     
     logger.info(f"Password reset via SMS for user: {user.phone}")
     
@@ -1741,30 +1744,12 @@ async def list_organizations_admin(
     week_ago = now - timedelta(days=7)
     
     try:
-        from models.token_usage import TokenUsage
-        org_token_stats = db.query(
-            Organization.id,
-            Organization.name,
-            func.coalesce(func.sum(TokenUsage.input_tokens), 0).label('input_tokens'),
-            func.coalesce(func.sum(TokenUsage.output_tokens), 0).label('output_tokens'),
-            func.coalesce(func.sum(TokenUsage.total_tokens), 0).label('total_tokens')
-        ).outerjoin(
-            TokenUsage,
-            and_(
-                Organization.id == TokenUsage.organization_id,
-                TokenUsage.created_at >= week_ago,
-                TokenUsage.success == True
-            )
-        ).group_by(
-            Organization.id,
-            Organization.name
-        ).all()
-        
-        for org_stat in org_token_stats:
-            token_stats_by_org[org_stat.id] = {
-                "input_tokens": int(org_stat.input_tokens or 0),
-                "output_tokens": int(org_stat.output_tokens or 0),
-                "total_tokens": int(org_stat.total_tokens or 0)
+        from services.token_rollups import sum_usage
+        for org_id, usage in sum_usage(db, since=week_ago, by='organization_id').items():
+            token_stats_by_org[org_id] = {
+                "input_tokens": usage["input_tokens"],
+                "output_tokens": usage["output_tokens"],
+                "total_tokens": usage["total_tokens"]
             }
     except (ImportError, Exception) as e:
         logger.debug(f"TokenUsage not available yet: {e}")
@@ -1939,6 +1924,7 @@ async def update_organization_admin(
     
     db.commit()
     db.refresh(org)
+    principal_cache.invalidate_organization(org.id)
     
     logger.info(f"Admin {current_user.phone} updated organization: {org.code}")
     return {
@@ -1980,6 +1966,7 @@ async def delete_organization_admin(
     
     db.delete(org)
     db.commit()
+    principal_cache.invalidate_organization(org_id)
     
     logger.warning(f"Admin {current_user.phone} deleted organization: {org.code}")
     return {"message": Messages.success("organization_deleted", lang, org.code)}
@@ -2046,25 +2033,12 @@ async def list_users_admin(
     token_stats_by_user = {}
     
     try:
-        from models.token_usage import TokenUsage
-        user_token_stats = db.query(
-            TokenUsage.user_id,
-            func.coalesce(func.sum(TokenUsage.input_tokens), 0).label('input_tokens'),
-            func.coalesce(func.sum(TokenUsage.output_tokens), 0).label('output_tokens'),
-            func.coalesce(func.sum(TokenUsage.total_tokens), 0).label('total_tokens')
-        ).filter(
-            TokenUsage.created_at >= week_ago,
-            TokenUsage.success == True,
-            TokenUsage.user_id.isnot(None)
-        ).group_by(
-            TokenUsage.user_id
-        ).all()
-        
-        for stat in user_token_stats:
-            token_stats_by_user[stat.user_id] = {
-                "input_tokens": int(stat.input_tokens or 0),
-                "output_tokens": int(stat.output_tokens or 0),
-                "total_tokens": int(stat.total_tokens or 0)
+        from services.token_rollups import sum_usage
+        for user_id, usage in sum_usage(db, since=week_ago, by='user_id').items():
+            token_stats_by_user[user_id] = {
+                "input_tokens": usage["input_tokens"],
+                "output_tokens": usage["output_tokens"],
+                "total_tokens": usage["total_tokens"]
             }
     except (ImportError, Exception) as e:
         logger.debug(f"TokenUsage not available yet: {e}")
@@ -2173,6 +2147,7 @@ async def update_user_admin(
     
     db.commit()
     db.refresh(user)
+    principal_cache.invalidate_user(user.id)
     
     # Get updated organization info
     org = db.query(Organization).filter(Organization.id == user.organization_id).first()
@@ -2220,6 +2195,7 @@ async def delete_user_admin(
     user_phone = user.phone
     db.delete(user)
     db.commit()
+    principal_cache.invalidate_user(user_id)
     
     logger.warning(f"Admin {current_user.phone} deleted user: {user_phone}")
     return {"message": Messages.success("user_deleted", lang, user_phone)}
@@ -2249,6 +2225,7 @@ async def unlock_user_admin(
     user.failed_login_attempts = 0
     user.locked_until = None
     db.commit()
+    principal_cache.invalidate_user(user.id)
     
     logger.info(f"Admin {current_user.phone} unlocked user: {user.phone}")
     return {"message": Messages.success("user_unlocked", lang, user.phone)}
@@ -2313,6 +2290,7 @@ async def reset_user_password_admin(
     user.failed_login_attempts = 0  # Also unlock if locked
     user.locked_until = None
     db.commit()
+    principal_cache.invalidate_user(user.id)
     
     logger.info(f"Admin {current_user.phone} reset password for user: {user.phone}")
     return {"message": Messages.success("password_reset_for_user", lang, user.phone)}
@@ -2456,55 +2434,29 @@ async def get_stats_admin(
     token_stats_by_org = {}
     
     try:
-        from models.token_usage import TokenUsage
+        from services.token_rollups import sum_usage
         
-        # Global token stats for past week
-        week_token_stats = db.query(
-            func.sum(TokenUsage.input_tokens).label('input_tokens'),
-            func.sum(TokenUsage.output_tokens).label('output_tokens'),
-            func.sum(TokenUsage.total_tokens).label('total_tokens')
-        ).filter(
-            TokenUsage.created_at >= week_ago,
-            TokenUsage.success == True
-        ).first()
-        
-        if week_token_stats:
+        # Global token stats for past week (from the hourly/daily rollups)
+        week_usage = sum_usage(db, since=week_ago).get(None)
+        if week_usage:
             token_stats = {
-                "input_tokens": int(week_token_stats.input_tokens or 0),
-                "output_tokens": int(week_token_stats.output_tokens or 0),
-                "total_tokens": int(week_token_stats.total_tokens or 0)
+                "input_tokens": week_usage["input_tokens"],
+                "output_tokens": week_usage["output_tokens"],
+                "total_tokens": week_usage["total_tokens"]
             }
         
         # Per-organization TOTAL token usage (all time, for active school ranking)
-        # Use LEFT JOIN to include organizations with no token usage
-        org_token_stats = db.query(
-            Organization.id,
-            Organization.name,
-            func.coalesce(func.sum(TokenUsage.input_tokens), 0).label('input_tokens'),
-            func.coalesce(func.sum(TokenUsage.output_tokens), 0).label('output_tokens'),
-            func.coalesce(func.sum(TokenUsage.total_tokens), 0).label('total_tokens'),
-            func.coalesce(func.count(TokenUsage.id), 0).label('request_count')
-        ).outerjoin(
-            TokenUsage, 
-            and_(
-                Organization.id == TokenUsage.organization_id,
-                TokenUsage.success == True
-            )
-        ).group_by(
-            Organization.id,
-            Organization.name
-        ).all()
-        
-        # Build per-organization stats dictionary
         # Only include organizations that actually have token usage
-        for org_stat in org_token_stats:
-            if org_stat.request_count and org_stat.request_count > 0:
-                token_stats_by_org[org_stat.name] = {
-                    "org_id": org_stat.id,
-                    "input_tokens": int(org_stat.input_tokens or 0),
-                    "output_tokens": int(org_stat.output_tokens or 0),
-                    "total_tokens": int(org_stat.total_tokens or 0),
-                    "request_count": int(org_stat.request_count or 0)
+        usage_by_org = sum_usage(db, by='organization_id')
+        for org in orgs:
+            usage = usage_by_org.get(org.id)
+            if usage and usage["request_count"] > 0:
+                token_stats_by_org[org.name] = {
+                    "org_id": org.id,
+                    "input_tokens": usage["input_tokens"],
+                    "output_tokens": usage["output_tokens"],
+                    "total_tokens": usage["total_tokens"],
+                    "request_count": usage["request_count"]
                 }
             
     except (ImportError, Exception) as e:
@@ -2549,111 +2501,63 @@ async def get_token_stats_admin(
     top_users = []
     
     try:
-        from models.token_usage import TokenUsage
-        
-        # Today stats
-        today_token_stats = db.query(
-            func.sum(TokenUsage.input_tokens).label('input_tokens'),
-            func.sum(TokenUsage.output_tokens).label('output_tokens'),
-            func.sum(TokenUsage.total_tokens).label('total_tokens')
-        ).filter(
-            TokenUsage.created_at >= today_start,
-            TokenUsage.success == True
-        ).first()
-        
-        if today_token_stats:
-            today_stats = {
-                "input_tokens": int(today_token_stats.input_tokens or 0),
-                "output_tokens": int(today_token_stats.output_tokens or 0),
-                "total_tokens": int(today_token_stats.total_tokens or 0)
-            }
-        
-        # Past week stats
-        week_token_stats = db.query(
-            func.sum(TokenUsage.input_tokens).label('input_tokens'),
-            func.sum(TokenUsage.output_tokens).label('output_tokens'),
-            func.sum(TokenUsage.total_tokens).label('total_tokens')
-        ).filter(
-            TokenUsage.created_at >= week_ago,
-            TokenUsage.success == True
-        ).first()
-        
-        if week_token_stats:
-            week_stats = {
-                "input_tokens": int(week_token_stats.input_tokens or 0),
-                "output_tokens": int(week_token_stats.output_tokens or 0),
-                "total_tokens": int(week_token_stats.total_tokens or 0)
-            }
-        
-        # Past month stats
-        month_token_stats = db.query(
-            func.sum(TokenUsage.input_tokens).label('input_tokens'),
-            func.sum(TokenUsage.output_tokens).label('output_tokens'),
-            func.sum(TokenUsage.total_tokens).label('total_tokens')
-        ).filter(
-            TokenUsage.created_at >= month_ago,
-            TokenUsage.success == True
-        ).first()
+        from services.token_rollups import sum_usage
         
-        if month_token_stats:
-            month_stats = {
-                "input_tokens": int(month_token_stats.input_tokens or 0),
-                "output_tokens": int(month_token_stats.output_tokens or 0),
-                "total_tokens": int(month_token_stats.total_tokens or 0)
-            }
+        # Today / past week / past month / all time, from the hourly/daily rollups
+        for stats, since in (
+            (today_stats, today_start),
+            (week_stats, week_ago),
+            (month_stats, month_ago),
+            (total_stats, None)
+        ):
+            usage = sum_usage(db, since=since).get(None)
+            if usage:
+                stats.update(
+                    input_tokens=usage["input_tokens"],
+                    output_tokens=usage["output_tokens"],
+                    total_tokens=usage["total_tokens"]
+                )
         
-        # Total stats (all time)
-        total_token_stats = db.query(
-            func.sum(TokenUsage.input_tokens).label('input_tokens'),
-            func.sum(TokenUsage.output_tokens).label('output_tokens'),
-            func.sum(TokenUsage.total_tokens).label('total_tokens')
-        ).filter(
-            TokenUsage.success == True
-        ).first()
+        # Top 10 users by total tokens (all time), including organization name
+        usage_by_user = sum_usage(db, by='user_id')
+        usage_by_user.pop(0, None)  # Usage without a user (API keys)
+        ranked_ids = sorted(usage_by_user, key=lambda uid: usage_by_user[uid]["total_tokens"], reverse=True)
         
-        if total_token_stats:
-            total_stats = {
-                "input_tokens": int(total_token_stats.input_tokens or 0),
-                "output_tokens": int(total_token_stats.output_tokens or 0),
-                "total_tokens": int(total_token_stats.total_tokens or 0)
-            }
+        def user_rows(condition, limit):
+            return db.query(
+                User.id,
+                User.phone,
+                User.name,
+                Organization.name.label('organization_name')
+            ).outerjoin(
+                Organization,
+                User.organization_id == Organization.id
+            ).filter(condition).limit(limit).all()
         
-        # Top 10 users by total tokens (all time), including organization name
-        top_users_query = db.query(
-            User.id,
-            User.phone,
-            User.name,
-            Organization.name.label('organization_name'),
-            func.coalesce(func.sum(TokenUsage.total_tokens), 0).label('total_tokens'),
-            func.coalesce(func.sum(TokenUsage.input_tokens), 0).label('input_tokens'),
-            func.coalesce(func.sum(TokenUsage.output_tokens), 0).label('output_tokens')
-        ).outerjoin(
-            Organization,
-            User.organization_id == Organization.id
-        ).outerjoin(
-            TokenUsage,
-            and_(
-                User.id == TokenUsage.user_id,
-                TokenUsage.success == True
+        top_users_query = []
+        # Walk the ranking in slices: usage of deleted users stays in the rollups
+        for i in range(0, len(ranked_ids), 10):
+            if len(top_users_query) >= 10:
+                break
+            top_users_query += user_rows(User.id.in_(ranked_ids[i:i + 10]), 10)
+        top_users_query.sort(key=lambda user: usage_by_user[user.id]["total_tokens"], reverse=True)
+        top_users_query = top_users_query[:10]
+        if len(top_users_query) < 10:
+            # Fill up with users who have no usage yet
+            top_users_query += user_rows(
+                User.id.notin_([user.id for user in top_users_query]), 10 - len(top_users_query)
             )
-        ).group_by(
-            User.id,
-            User.phone,
-            User.name,
-            Organization.name
-        ).order_by(
-            func.coalesce(func.sum(TokenUsage.total_tokens), 0).desc()
-        ).limit(10).all()
         
+        no_usage = {"input_tokens": 0, "output_tokens": 0, "total_tokens": 0}
         top_users = [
             {
                 "id": user.id,
                 "phone": user.phone,
                 "name": user.name or user.phone,
                 "organization_name": user.organization_name or "",
-                "input_tokens": int(user.input_tokens or 0),
-                "output_tokens": int(user.output_tokens or 0),
-                "total_tokens": int(user.total_tokens or 0)
+                "input_tokens": usage_by_user.get(user.id, no_usage)["input_tokens"],
+                "output_tokens": usage_by_user.get(user.id, no_usage)["output_tokens"],
+                "total_tokens": usage_by_user.get(user.id, no_usage)["total_tokens"]
             }
             for user in top_users_query
         ]
@@ -2803,27 +2707,16 @@ async def get_stats_trends_admin(
     elif metric == 'tokens':
         # Daily token usage (non-cumulative)
         try:
-            from models.token_usage import TokenUsage
-            
-            token_counts = db.query(
-                func.date(TokenUsage.created_at).label('date'),
-                func.sum(TokenUsage.total_tokens).label('total_tokens'),
-                func.sum(TokenUsage.input_tokens).label('input_tokens'),
-                func.sum(TokenUsage.output_tokens).label('output_tokens')
-            ).filter(
-                TokenUsage.created_at >= start_date,
-                TokenUsage.success == True
-            ).group_by(
-                func.date(TokenUsage.created_at)
-            ).all()
+            from services.token_rollups import sum_usage
             
+            # start_date is midnight, so this reads only the daily rollup
             tokens_by_date = {
-                str(row.date): {
-                    "total": int(row.total_tokens or 0),
-                    "input": int(row.input_tokens or 0),
-                    "output": int(row.output_tokens or 0)
+                str(date): {
+                    "total": usage["total_tokens"],
+                    "input": usage["input_tokens"],
+                    "output": usage["output_tokens"]
                 }
-                for row in token_counts
+                for date, usage in sum_usage(db, since=start_date, by='day').items()
             }
             
             for date in date_list:
@@ -2879,6 +2772,8 @@ async def list_api_keys_admin(
     
     from models.auth import APIKey
     
+    # Write this worker's pending usage so the counts are current
+    api_key_usage.flush()
     keys = db.query(APIKey).order_by(APIKey.created_at.desc()).all()
     
     return [{
@@ -2963,6 +2858,8 @@ async def update_api_key_admin(
     
     from models.auth import APIKey
     
+    # Settle this worker's usage and leased quota before the admin change
+    api_key_usage.flush()
     key_record = db.query(APIKey).filter(APIKey.id == key_id).first()
     if not key_record:
         error_msg = Messages.error("api_key_not_found", lang)
@@ -2981,6 +2878,7 @@ async def update_api_key_admin(
         key_record.usage_count = request["usage_count"]
     
     db.commit()
+    principal_cache.invalidate_api_key(key_record.key)
     
     return {
         "message": Messages.success("api_key_updated", lang),
@@ -3012,14 +2910,18 @@ async def delete_api_key_admin(
     
     from models.auth import APIKey
     
+    # Settle this worker's usage and leased quota before the admin change
+    api_key_usage.flush()
     key_record = db.query(APIKey).filter(APIKey.id == key_id).first()
     if not key_record:
         error_msg = Messages.error("api_key_not_found", lang)
         raise HTTPException(status_code=404, detail=error_msg)
     
     key_name = key_record.name
+    key_value = key_record.key
     db.delete(key_record)
     db.commit()
+    principal_cache.invalidate_api_key(key_value)
     
     return {
         "message": f"API key '{key_name}' deleted successfully"
@@ -3044,6 +2946,8 @@ async def toggle_api_key_admin(
     
     from models.auth import APIKey
     
+    # Settle this worker's usage and leased quota before the admin change
+    api_key_usage.flush()
     key_record = db.query(APIKey).filter(APIKey.id == key_id).first()
     if not key_record:
         error_msg = Messages.error("api_key_not_found", lang)
@@ -3051,6 +2955,7 @@ async def toggle_api_key_admin(
     
     key_record.is_active = not key_record.is_active
     db.commit()
+    principal_cache.invalidate_api_key(key_record.key)
     
     if key_record.is_active:
         message = Messages.success("api_key_activated", lang, key_record.name)
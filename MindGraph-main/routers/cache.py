@@ -142,6 +142,8 @@ async def get_modular_cache_status(current_user: User = Depends(get_current_user
     """
     try:
         from static.js.modular_cache_python import get_modular_cache_stats, get_modular_performance_summary
+        from services.render_host import render_host_cache
+        from services.png_render_cache import png_render_cache
         
         stats = get_modular_cache_stats()
         performance_summary = get_modular_performance_summary()
@@ -157,7 +159,9 @@ async def get_modular_cache_status(current_user: User = Depends(get_current_user
                     'total_size_bytes': stats.get('total_memory_usage', 0),
                     'cache_hit_rate_percent': stats.get('cache_hit_rate', 0)
                 },
-                'modular_stats': stats.get('modular', {})
+                'modular_stats': stats.get('modular', {}),
+                'png_render_host': render_host_cache.get_stats(),
+                'png_render_cache': png_render_cache.get_stats()
             },
             'benefits': {
                 'size_reduction': stats.get('modular', {}).get('compressionRatio', '0%'),
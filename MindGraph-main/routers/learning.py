@@ -13,9 +13,9 @@ import logging
 import time
 import random
 import json
-from typing import Dict, Any
+from typing import Dict, Tuple
 from fastapi import APIRouter, HTTPException, Request, Depends
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 
 # Import authentication
 from models.auth import User
@@ -31,14 +31,19 @@ from models import (
 )
 from agents.learning.learning_agent import LearningAgent
 from agents.learning.learning_agent_v3 import LearningAgentV3
+from config.settings import config
+from services.session_store import get_session_store
 
 logger = logging.getLogger(__name__)
 
 # Create FastAPI router
 router = APIRouter(prefix="/learning", tags=["learning"])
 
-# Global session storage (in production, use Redis or database)
-learning_sessions: Dict[str, Dict[str, Any]] = {}
+# Learning session state (bounded, shared across workers with the sqlite backend)
+learning_sessions = get_session_store('learning')
+
+# Agents hold LLM clients, not session state: one pair per language per worker
+_learning_agents: Dict[str, Tuple[LearningAgent, LearningAgentV3]] = {}
 
 
 # ============================================================================
@@ -87,6 +92,34 @@ def _extract_node_text(node_id: str, spec: Dict, diagram_type: str) -> str:
         return ""
 
 
+def _get_agents(language: str) -> Tuple[LearningAgent, LearningAgentV3]:
+    """Learning agents for a language (V2 for questions, V3 for prerequisite testing)."""
+    if language not in _learning_agents:
+        _learning_agents[language] = (LearningAgent(language=language), LearningAgentV3(language=language))
+    return _learning_agents[language]
+
+
+async def _create_session(diagram_type, spec: Dict, knocked_out_nodes, language: str):
+    """Register a new session (questions filled in by the caller, who saves it again)."""
+    # Generate session ID
+    session_id = f"learning_{int(time.time())}_{random.randint(1000, 9999)}"
+    
+    # Store session
+    session = {
+        'session_id': session_id,
+        'diagram_type': diagram_type,
+        'spec': spec,
+        'knocked_out_nodes': knocked_out_nodes,
+        'questions': [],
+        'language': language,
+        'answers': {},
+        'prerequisite_tests': {},
+        'created_at': time.time()
+    }
+    await learning_sessions.aset(session_id, session)
+    return session_id, session
+
+
 # ============================================================================
 # API Endpoints
 # ============================================================================
@@ -113,38 +146,24 @@ async def start_session(
         knocked_out_nodes = req.knocked_out_nodes
         language = req.language.value
         
-        # Create learning agents (V2 for questions, V3 for prerequisite testing)
-        agent_v2 = LearningAgent(language=language)
-        agent_v3 = LearningAgentV3(language=language)
-        
-        # Generate session ID
-        session_id = f"learning_{int(time.time())}_{random.randint(1000, 9999)}"
-        
-        # Generate intelligent questions for each knocked-out node
-        questions = []
-        for node_id in knocked_out_nodes:
-            question_data = agent_v2.generate_question(
-                node_id=node_id,
-                diagram_type=diagram_type,
-                spec=spec,
-                language=language
-            )
-            questions.append(question_data)
-        
-        # Store session
-        learning_sessions[session_id] = {
-            'session_id': session_id,
-            'diagram_type': diagram_type,
-            'spec': spec,
-            'knocked_out_nodes': knocked_out_nodes,
-            'questions': questions,
-            'language': language,
-            'agent_v2': agent_v2,
-            'agent_v3': agent_v3,
-            'answers': {},
-            'prerequisite_tests': {},
-            'created_at': time.time()
-        }
+        session_id, session = await _create_session(diagram_type, spec, knocked_out_nodes, language)
+        agent_v2, _ = _get_agents(language)
+        
+        # Generate intelligent questions for all knocked-out nodes concurrently
+        by_node = {}
+        async for question_data in agent_v2.generate_questions(
+            node_ids=knocked_out_nodes,
+            diagram_type=diagram_type,
+            spec=spec,
+            language=language,
+            max_concurrency=config.LEARNING_QUESTION_CONCURRENCY
+        ):
+            by_node[question_data['node_id']] = question_data
+        
+        # Keep the knocked-out order in the response
+        questions = [by_node[node_id] for node_id in knocked_out_nodes if node_id in by_node]
+        session['questions'] = questions
+        await learning_sessions.aset(session_id, session)
         
         logger.info(f"[LRNG] Created session: {session_id} | {len(questions)} questions | Lang: {language}")
         
@@ -163,6 +182,75 @@ async def start_session(
         )
 
 
+@router.post("/start_session_stream")
+async def start_session_stream(
+    request: Request,
+    req: LearningStartSessionRequest,
+    current_user: User = Depends(get_current_user)
+) -> StreamingResponse:
+    """
+    Initialize a learning session and stream each question as soon as it is ready (SSE).
+    
+    POST /api/learning/start_session_stream
+    
+    Events:
+        {"event": "session", "session_id": ..., "total_questions": N}
+        {"event": "question", "question": {...}, "index": i}   (completion order)
+        {"event": "complete", "session_id": ..., "total_questions": N}
+        {"event": "error", "error": ...}
+    """
+    language_code = get_request_language(
+        language_header=request.headers.get("X-Language"),
+        accept_language=request.headers.get("Accept-Language")
+    )
+    
+    try:
+        diagram_type = req.diagram_type
+        spec = req.spec
+        knocked_out_nodes = req.knocked_out_nodes
+        language = req.language.value
+        
+        session_id, session = await _create_session(diagram_type, spec, knocked_out_nodes, language)
+    except Exception as e:
+        logger.error(f"[LRNG] Error starting session: {str(e)}", exc_info=True)
+        raise HTTPException(
+            status_code=500,
+            detail=Messages.error('learning_session_start_failed', language_code)
+        )
+    
+    async def generate():
+        yield f"data: {json.dumps({'event': 'session', 'session_id': session_id, 'total_questions': len(knocked_out_nodes)})}\n\n"
+        try:
+            agent_v2, _ = _get_agents(language)
+            async for question_data in agent_v2.generate_questions(
+                node_ids=knocked_out_nodes,
+                diagram_type=diagram_type,
+                spec=spec,
+                language=language,
+                max_concurrency=config.LEARNING_QUESTION_CONCURRENCY
+            ):
+                session['questions'].append(question_data)
+                await learning_sessions.aset(session_id, session)
+                event = {'event': 'question', 'question': question_data, 'index': len(session['questions']) - 1}
+                yield f"data: {json.dumps(event, ensure_ascii=False)}\n\n"
+            
+            logger.info(f"[LRNG] Created session (stream): {session_id} | {len(session['questions'])} questions | Lang: {language}")
+            yield f"data: {json.dumps({'event': 'complete', 'session_id': session_id, 'total_questions': len(session['questions'])})}\n\n"
+        except Exception as e:
+            logger.error(f"[LRNG] Error streaming session questions: {str(e)}", exc_info=True)
+            yield f"data: {json.dumps({'event': 'error', 'error': Messages.error('learning_session_start_failed', language_code)}, ensure_ascii=False)}\n\n"
+    
+    return StreamingResponse(
+        generate(),
+        media_type='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no',
+            'Connection': 'keep-alive'
+        }
+    )
+
+
 @router.post("/validate_answer")
 async def validate_answer(
     request: Request,
@@ -188,7 +276,7 @@ async def validate_answer(
         language = req.language.value
         
         # Get session
-        session = learning_sessions.get(session_id)
+        session = await learning_sessions.aget(session_id)
         if not session:
             raise HTTPException(
                 status_code=404,
@@ -205,11 +293,10 @@ async def validate_answer(
             )
         
         # Get agents
-        agent_v2 = session['agent_v2']
-        agent_v3 = session['agent_v3']
+        agent_v2, agent_v3 = _get_agents(session['language'])
         
         # Validate answer with V2 agent
-        validation_result = agent_v2.validate_answer(
+        validation_result = await agent_v2.validate_answer(
             user_answer=user_answer,
             correct_answer=correct_answer,
             question=question or "",
@@ -231,7 +318,7 @@ async def validate_answer(
             
             try:
                 # Run V3 agent to analyze misconception
-                agent_workflow = agent_v3.process_wrong_answer(
+                agent_workflow = await agent_v3.process_wrong_answer(
                     user_answer=user_answer,
                     correct_answer=correct_answer,
                     question=question or "",
@@ -261,6 +348,7 @@ async def validate_answer(
                 logger.error(f"[LRNG] V3 agent error: {v3_err}", exc_info=True)
                 validation_result['prerequisite_testing_enabled'] = False
         
+        await learning_sessions.aset(session_id, session)
         logger.info(f"[LRNG] Validated answer: {session_id} | Node: {node_id} | Correct: {validation_result['correct']}")
         
         return JSONResponse(content=validation_result)
@@ -300,7 +388,7 @@ async def get_hint(
         language = req.language.value
         
         # Get session
-        session = learning_sessions.get(session_id)
+        session = await learning_sessions.aget(session_id)
         if not session:
             raise HTTPException(
                 status_code=404,
@@ -317,11 +405,10 @@ async def get_hint(
             )
         
         # Get agent
-        agent_v2 = session['agent_v2']
+        agent_v2, _ = _get_agents(session['language'])
         
         # Generate hint
-        hint_result = agent_v2.generate_hint(
-            node_id=node_id,
+        hint_result = await agent_v2.generate_hint(
             correct_answer=correct_answer,
             question=question,
             context=context,
@@ -366,7 +453,7 @@ async def verify_understanding(
         language = req.language.value
         
         # Get session
-        session = learning_sessions.get(session_id)
+        session = await learning_sessions.aget(session_id)
         if not session:
             raise HTTPException(
                 status_code=404,
@@ -383,14 +470,17 @@ async def verify_understanding(
             )
         
         # Get agent
-        agent_v2 = session['agent_v2']
+        agent_v2, _ = _get_agents(session['language'])
         
-        # Verify understanding
-        verification_result = agent_v2.verify_understanding(
-            user_explanation=user_explanation,
+        # Verify understanding against the question asked for this node
+        node_question = next(
+            (q.get('question', '') for q in session['questions'] if q.get('node_id') == node_id),
+            ""
+        )
+        verification_result = await agent_v2.verify_understanding(
+            user_answer=user_explanation,
             correct_answer=correct_answer,
-            node_id=node_id,
-            diagram_spec=session['spec'],
+            verification_question=node_question,
             language=language
         )
         
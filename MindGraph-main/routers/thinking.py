@@ -9,6 +9,7 @@ Provides SSE streaming for Socratic guided thinking workflow.
 @made_by MindSpring Team
 """
 
+import asyncio
 import logging
 from fastapi import APIRouter, HTTPException, Depends
 from fastapi.responses import StreamingResponse
@@ -234,7 +235,7 @@ async def get_node_learning_material(
         # Get agent from factory using diagram type
         # In production, diagram_type should be stored in session metadata
         agent = ThinkingAgentFactory.get_agent(diagram_type)
-        session = agent.get_session(session_id)
+        session = await asyncio.to_thread(agent.get_session, session_id)
         
         if not session:
             raise HTTPException(status_code=404, detail="Session not found")
@@ -853,7 +854,7 @@ async def node_palette_cleanup(
     else:
         generator = get_circle_map_palette_generator()
     
-    generator.end_session(session_id, reason="canvas_exit")
+    await asyncio.to_thread(generator.end_session, session_id, reason="canvas_exit")
     
     return {"status": "session_cleaned"}
 
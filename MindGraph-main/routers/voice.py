@@ -17,6 +17,7 @@ import asyncio
 import base64
 import re
 import json
+import time
 from typing import Dict, Any, Optional, List
 from datetime import datetime
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Depends
@@ -28,6 +29,7 @@ from services.voice_agent import voice_agent_manager
 from services.token_tracker import get_token_tracker
 from services.llm_service import llm_service
 from services.websocket_llm_middleware import omni_middleware
+from services.session_store import get_session_store
 from config.database import get_db
 from utils.auth import decode_access_token, get_current_user
 from models.auth import User
@@ -37,8 +39,14 @@ logger = logging.getLogger('VOICE')
 
 router = APIRouter()
 
-# In-memory session storage
-voice_sessions: Dict[str, Dict[str, Any]] = {}
+# Voice session state (bounded, shared across workers with the sqlite backend)
+voice_sessions = get_session_store('voice')
+
+# How often an open connection restarts its session's idle clock
+VOICE_SESSION_TOUCH_SECONDS = 30
+
+# Per-session OmniClient instances live with the worker that holds the WebSocket
+omni_clients: Dict[str, Any] = {}
 
 # Track active WebSocket connections by diagram_session_id
 # CRITICAL: This ensures we can close WebSocket connections when diagram sessions end
@@ -136,7 +144,8 @@ async def process_paragraph_with_qwen_plus(
     websocket: WebSocket,
     voice_session_id: str,
     paragraph_text: str,
-    session_context: Dict[str, Any]
+    session_context: Dict[str, Any],
+    session_state: Dict[str, Any]
 ) -> bool:
     """
     Process a paragraph using Qwen Plus to understand teacher intent and extract diagram content.
@@ -151,12 +160,13 @@ async def process_paragraph_with_qwen_plus(
         voice_session_id: Voice session ID
         paragraph_text: The paragraph text to process
         session_context: Current session context
+        session_state: Voice session read by the caller
     
     Returns:
         True if diagram was updated, False otherwise
     """
     try:
-        current_diagram_type = voice_sessions[voice_session_id].get('diagram_type', 'circle_map')
+        current_diagram_type = session_state.get('diagram_type', 'circle_map')
         diagram_data = session_context.get('diagram_data', {})
         
         # Get current diagram state
@@ -382,7 +392,7 @@ Return JSON with intent, recommended_diagram_type, topic, nodes, summary, and re
                     'left': left_topic,
                     'right': right_topic,
                     'target': f"{left_topic} vs {right_topic}"
-                }, session_context)
+                }, session_context, session_state)
                 # CRITICAL: Batch add nodes instead of one-by-one for efficiency
                 # Collect all nodes first, then send batch update
                 nodes_to_add = []
@@ -415,16 +425,16 @@ Return JSON with intent, recommended_diagram_type, topic, nodes, summary, and re
                         session_context['diagram_data'] = {}
                     
                     # Update agent state
-                    agent_session_id = get_agent_session_id(voice_session_id)
+                    agent_session_id = get_agent_session_id(voice_session_id, session_state)
                     agent = voice_agent_manager.get_or_create(agent_session_id)
                     diagram_data = session_context.get('diagram_data', {})
-                    diagram_data['diagram_type'] = voice_sessions[voice_session_id].get('diagram_type')
+                    diagram_data['diagram_type'] = session_state.get('diagram_type')
                     agent.update_diagram_state(diagram_data)
                     
                     updated_context = {
-                        'diagram_type': voice_sessions[voice_session_id].get('diagram_type'),
-                        'active_panel': voice_sessions[voice_session_id].get('active_panel', 'none'),
-                        'conversation_history': voice_sessions[voice_session_id].get('conversation_history', []),
+                        'diagram_type': session_state.get('diagram_type'),
+                        'active_panel': session_state.get('active_panel', 'none'),
+                        'conversation_history': session_state.get('conversation_history', []),
                         'selected_nodes': session_context.get('selected_nodes', []),
                         'diagram_data': diagram_data
                     }
@@ -441,7 +451,7 @@ Return JSON with intent, recommended_diagram_type, topic, nodes, summary, and re
                     'action': 'update_center',
                     'title': title,
                     'target': title
-                }, session_context)
+                }, session_context, session_state)
             nodes = extracted_data.get('nodes', [])
             # CRITICAL: Batch add nodes instead of one-by-one
             nodes_to_add = [{'text': str(node_text).strip()} for node_text in nodes[:10] if node_text and str(node_text).strip()]
@@ -459,16 +469,16 @@ Return JSON with intent, recommended_diagram_type, topic, nodes, summary, and re
                     session_context['diagram_data']['children'] = []
                 session_context['diagram_data']['children'].extend([{'text': n['text']} for n in nodes_to_add])
                 
-                agent_session_id = get_agent_session_id(voice_session_id)
+                agent_session_id = get_agent_session_id(voice_session_id, session_state)
                 agent = voice_agent_manager.get_or_create(agent_session_id)
                 diagram_data = session_context.get('diagram_data', {})
-                diagram_data['diagram_type'] = voice_sessions[voice_session_id].get('diagram_type')
+                diagram_data['diagram_type'] = session_state.get('diagram_type')
                 agent.update_diagram_state(diagram_data)
                 
                 updated_context = {
-                    'diagram_type': voice_sessions[voice_session_id].get('diagram_type'),
-                    'active_panel': voice_sessions[voice_session_id].get('active_panel', 'none'),
-                    'conversation_history': voice_sessions[voice_session_id].get('conversation_history', []),
+                    'diagram_type': session_state.get('diagram_type'),
+                    'active_panel': session_state.get('active_panel', 'none'),
+                    'conversation_history': session_state.get('conversation_history', []),
                     'selected_nodes': session_context.get('selected_nodes', []),
                     'diagram_data': diagram_data
                 }
@@ -485,7 +495,7 @@ Return JSON with intent, recommended_diagram_type, topic, nodes, summary, and re
                     'action': 'update_center',
                     'event': event,
                     'target': event
-                }, session_context)
+                }, session_context, session_state)
             causes = extracted_data.get('causes', [])
             effects = extracted_data.get('effects', [])
             # CRITICAL: Batch add nodes
@@ -508,16 +518,16 @@ Return JSON with intent, recommended_diagram_type, topic, nodes, summary, and re
                 if 'diagram_data' not in session_context:
                     session_context['diagram_data'] = {}
                 
-                agent_session_id = get_agent_session_id(voice_session_id)
+                agent_session_id = get_agent_session_id(voice_session_id, session_state)
                 agent = voice_agent_manager.get_or_create(agent_session_id)
                 diagram_data = session_context.get('diagram_data', {})
-                diagram_data['diagram_type'] = voice_sessions[voice_session_id].get('diagram_type')
+                diagram_data['diagram_type'] = session_state.get('diagram_type')
                 agent.update_diagram_state(diagram_data)
                 
                 updated_context = {
-                    'diagram_type': voice_sessions[voice_session_id].get('diagram_type'),
-                    'active_panel': voice_sessions[voice_session_id].get('active_panel', 'none'),
-                    'conversation_history': voice_sessions[voice_session_id].get('conversation_history', []),
+                    'diagram_type': session_state.get('diagram_type'),
+                    'active_panel': session_state.get('active_panel', 'none'),
+                    'conversation_history': session_state.get('conversation_history', []),
                     'selected_nodes': session_context.get('selected_nodes', []),
                     'diagram_data': diagram_data
                 }
@@ -534,7 +544,7 @@ Return JSON with intent, recommended_diagram_type, topic, nodes, summary, and re
                     'action': 'update_center',
                     'whole': whole,
                     'target': whole
-                }, session_context)
+                }, session_context, session_state)
             parts = extracted_data.get('parts', []) or extracted_data.get('nodes', [])
             # CRITICAL: Batch add nodes
             nodes_to_add = [{'text': str(node_text).strip()} for node_text in parts[:10] if node_text and str(node_text).strip()]
@@ -552,16 +562,16 @@ Return JSON with intent, recommended_diagram_type, topic, nodes, summary, and re
                     session_context['diagram_data']['children'] = []
                 session_context['diagram_data']['children'].extend([{'text': n['text']} for n in nodes_to_add])
                 
-                agent_session_id = get_agent_session_id(voice_session_id)
+                agent_session_id = get_agent_session_id(voice_session_id, session_state)
                 agent = voice_agent_manager.get_or_create(agent_session_id)
                 diagram_data = session_context.get('diagram_data', {})
-                diagram_data['diagram_type'] = voice_sessions[voice_session_id].get('diagram_type')
+                diagram_data['diagram_type'] = session_state.get('diagram_type')
                 agent.update_diagram_state(diagram_data)
                 
                 updated_context = {
-                    'diagram_type': voice_sessions[voice_session_id].get('diagram_type'),
-                    'active_panel': voice_sessions[voice_session_id].get('active_panel', 'none'),
-                    'conversation_history': voice_sessions[voice_session_id].get('conversation_history', []),
+                    'diagram_type': session_state.get('diagram_type'),
+                    'active_panel': session_state.get('active_panel', 'none'),
+                    'conversation_history': session_state.get('conversation_history', []),
                     'selected_nodes': session_context.get('selected_nodes', []),
                     'diagram_data': diagram_data
                 }
@@ -578,7 +588,7 @@ Return JSON with intent, recommended_diagram_type, topic, nodes, summary, and re
                     'action': 'update_center',
                     'dimension': dimension,
                     'target': dimension
-                }, session_context)
+                }, session_context, session_state)
             analogies = extracted_data.get('analogies', [])
             # CRITICAL: Batch add nodes
             nodes_to_add = []
@@ -604,16 +614,16 @@ Return JSON with intent, recommended_diagram_type, topic, nodes, summary, and re
                 if 'diagram_data' not in session_context:
                     session_context['diagram_data'] = {}
                 
-                agent_session_id = get_agent_session_id(voice_session_id)
+                agent_session_id = get_agent_session_id(voice_session_id, session_state)
                 agent = voice_agent_manager.get_or_create(agent_session_id)
                 diagram_data = session_context.get('diagram_data', {})
-                diagram_data['diagram_type'] = voice_sessions[voice_session_id].get('diagram_type')
+                diagram_data['diagram_type'] = session_state.get('diagram_type')
                 agent.update_diagram_state(diagram_data)
                 
                 updated_context = {
-                    'diagram_type': voice_sessions[voice_session_id].get('diagram_type'),
-                    'active_panel': voice_sessions[voice_session_id].get('active_panel', 'none'),
-                    'conversation_history': voice_sessions[voice_session_id].get('conversation_history', []),
+                    'diagram_type': session_state.get('diagram_type'),
+                    'active_panel': session_state.get('active_panel', 'none'),
+                    'conversation_history': session_state.get('conversation_history', []),
                     'selected_nodes': session_context.get('selected_nodes', []),
                     'diagram_data': diagram_data
                 }
@@ -630,7 +640,7 @@ Return JSON with intent, recommended_diagram_type, topic, nodes, summary, and re
                 await execute_diagram_update(websocket, voice_session_id, 'update_center', {
                     'action': 'update_center',
                     'target': topic
-                }, session_context)
+                }, session_context, session_state)
             nodes = extracted_data.get('nodes', [])
             # CRITICAL: Batch add nodes instead of one-by-one
             nodes_to_add = [{'text': str(node_text).strip()} for node_text in nodes[:10] if node_text and str(node_text).strip()]
@@ -648,16 +658,16 @@ Return JSON with intent, recommended_diagram_type, topic, nodes, summary, and re
                     session_context['diagram_data']['children'] = []
                 session_context['diagram_data']['children'].extend([{'text': n['text']} for n in nodes_to_add])
                 
-                agent_session_id = get_agent_session_id(voice_session_id)
+                agent_session_id = get_agent_session_id(voice_session_id, session_state)
                 agent = voice_agent_manager.get_or_create(agent_session_id)
                 diagram_data = session_context.get('diagram_data', {})
-                diagram_data['diagram_type'] = voice_sessions[voice_session_id].get('diagram_type')
+                diagram_data['diagram_type'] = session_state.get('diagram_type')
                 agent.update_diagram_state(diagram_data)
                 
                 updated_context = {
-                    'diagram_type': voice_sessions[voice_session_id].get('diagram_type'),
-                    'active_panel': voice_sessions[voice_session_id].get('active_panel', 'none'),
-                    'conversation_history': voice_sessions[voice_session_id].get('conversation_history', []),
+                    'diagram_type': session_state.get('diagram_type'),
+                    'active_panel': session_state.get('active_panel', 'none'),
+                    'conversation_history': session_state.get('conversation_history', []),
                     'selected_nodes': session_context.get('selected_nodes', []),
                     'diagram_data': diagram_data
                 }
@@ -701,7 +711,7 @@ Return JSON with intent, recommended_diagram_type, topic, nodes, summary, and re
         return False
 
 
-def get_agent_session_id(voice_session_id: str) -> str:
+def get_agent_session_id(voice_session_id: str, session: Optional[Dict[str, Any]] = None) -> str:
     """
     Get the agent session ID scoped to diagram_session_id.
     
@@ -713,12 +723,15 @@ def get_agent_session_id(voice_session_id: str) -> str:
     
     Args:
         voice_session_id: The voice session ID (WebSocket connection identifier)
+        session: Voice session already read by the caller (read from the store if omitted)
     
     Returns:
         Agent session ID (scoped to diagram_session_id)
     """
-    if voice_session_id in voice_sessions:
-        diagram_session_id = voice_sessions[voice_session_id].get('diagram_session_id')
+    if session is None:
+        session = voice_sessions.get(voice_session_id)
+    if session is not None:
+        diagram_session_id = session.get('diagram_session_id')
         if diagram_session_id:
             return f"diagram_{diagram_session_id}"
     
@@ -727,11 +740,12 @@ def get_agent_session_id(voice_session_id: str) -> str:
     return voice_session_id
 
 
-def create_voice_session(
+async def create_voice_session(
     user_id: str,
     diagram_session_id: Optional[str] = None,
     diagram_type: Optional[str] = None,
-    active_panel: Optional[str] = None
+    active_panel: Optional[str] = None,
+    context: Optional[Dict[str, Any]] = None
 ) -> str:
     """
     Create new voice session (session-bound to diagram session).
@@ -756,8 +770,9 @@ def create_voice_session(
     # Without this, multiple users would share the same OmniClient singleton,
     # causing cross-contamination (User A's messages going to User B's conversation)
     omni_client = OmniClient()
+    omni_clients[session_id] = omni_client
     
-    voice_sessions[session_id] = {
+    await voice_sessions.aset(session_id, {
         'session_id': session_id,
         'user_id': user_id,
         'diagram_session_id': diagram_session_id,
@@ -766,8 +781,8 @@ def create_voice_session(
         'created_at': datetime.now(),
         'last_activity': datetime.now(),
         'conversation_history': [],
-        'omni_client': omni_client  # Per-session OmniClient instance
-    }
+        'context': context or {}
+    })
     
     logger.debug(f"Session created: {session_id} (linked to diagram={diagram_session_id}, has own OmniClient)")
     return session_id
@@ -791,12 +806,8 @@ def get_session_omni_client(voice_session_id: str):
     Returns:
         OmniClient instance for this session, or None if session not found
     """
-    session = get_voice_session(voice_session_id)
-    if not session:
-        logger.warning(f"Voice session {voice_session_id} not found")
-        return None
-    
-    omni_client = session.get('omni_client')
+    # Clients are held by the worker serving the session's WebSocket
+    omni_client = omni_clients.get(voice_session_id)
     if not omni_client:
         logger.warning(f"OmniClient not found for session {voice_session_id}")
         return None
@@ -806,12 +817,22 @@ def get_session_omni_client(voice_session_id: str):
 
 def update_panel_context(session_id: str, active_panel: str) -> None:
     """Update active panel context"""
-    if session_id in voice_sessions:
-        old_panel = voice_sessions[session_id].get('active_panel', 'unknown')
-        voice_sessions[session_id]['active_panel'] = active_panel
+    session = voice_sessions.get(session_id)
+    if session is not None:
+        old_panel = session.get('active_panel', 'unknown')
+        session['active_panel'] = active_panel
+        voice_sessions.set(session_id, session)
         logger.debug(f"Panel context updated: {session_id} ({old_panel} -> {active_panel})")
 
 
+async def append_conversation_turn(session_id: str, role: str, content: str) -> None:
+    """Append a message to the session's conversation history"""
+    session = await voice_sessions.aget(session_id)
+    if session is not None:
+        session['conversation_history'].append({'role': role, 'content': content})
+        await voice_sessions.aset(session_id, session)
+
+
 def end_voice_session(session_id: str, reason: str = 'completed') -> None:
     """
     End and cleanup session including persistent agent and OmniClient.
@@ -822,16 +843,18 @@ def end_voice_session(session_id: str, reason: str = 'completed') -> None:
     - User switches to a different diagram
     - WebSocket connection closes
     """
-    if session_id in voice_sessions:
+    # The OmniClient belongs to this worker even if the session state already expired
+    omni_client = omni_clients.pop(session_id, None)
+    session = voice_sessions.get(session_id)
+    if session is not None or omni_client is not None:
         logger.debug(f"VOIC | Session ended: {session_id} (reason={reason})")
-        session = voice_sessions[session_id]
+        session = session or {}
         
         # Get diagram_session_id before deleting the session
         diagram_session_id = session.get('diagram_session_id')
         
         # CRITICAL: Close OmniClient WebSocket connection before deleting session
         # Each voice session has its own OmniClient instance that must be closed
-        omni_client = session.get('omni_client')
         if omni_client:
             try:
                 # Native WebSocket client uses async close()
@@ -864,7 +887,7 @@ def end_voice_session(session_id: str, reason: str = 'completed') -> None:
             except Exception as e:
                 logger.debug(f"VOIC | Error closing Omni client for session {session_id} (may already be closed): {e}")
         
-        # Delete session from memory
+        # Delete session state
         del voice_sessions[session_id]
         
         # Cleanup the persistent LangGraph agent using diagram_session_id
@@ -925,7 +948,7 @@ async def cleanup_voice_by_diagram_session(diagram_session_id: str) -> bool:
     # CRITICAL: Cleanup ALL voice sessions for this diagram_session_id (not just the first one)
     # This handles cases where cleanup failed before and multiple sessions exist
     voice_session_ids_to_cleanup = []
-    for sid, session in list(voice_sessions.items()):  # Use list() to avoid modification during iteration
+    for sid, session in await voice_sessions.aitems():
         if session.get('diagram_session_id') == diagram_session_id:
             voice_session_ids_to_cleanup.append(sid)
     
@@ -1158,11 +1181,14 @@ async def execute_diagram_update(
     voice_session_id: str,
     action: str,
     command: Dict[str, Any],
-    session_context: Dict[str, Any]
+    session_context: Dict[str, Any],
+    session_state: Dict[str, Any]
 ) -> bool:
     """
     Execute a diagram update action (update_center, update_node, add_node, delete_node).
     Returns True if update was executed, False otherwise.
+    
+    session_state is the voice session read by the caller; it is not re-read here.
     """
     target = command.get('target')
     node_index = command.get('node_index')
@@ -1170,11 +1196,9 @@ async def execute_diagram_update(
     
     try:
         if action == 'update_center':
-            # CRITICAL: Get diagram_type directly from voice_sessions (source of truth)
+            # CRITICAL: Get diagram_type from the voice session (source of truth)
             # This ensures we have the correct diagram type even if session wasn't updated yet
-            diagram_type = None
-            if voice_session_id in voice_sessions:
-                diagram_type = voice_sessions[voice_session_id].get('diagram_type')
+            diagram_type = session_state.get('diagram_type')
             if not diagram_type:
                 # Fallback: try to get from context
                 diagram_type = session_context.get('diagram_type')
@@ -1293,16 +1317,16 @@ async def execute_diagram_update(
             
             # Update agent state and instructions
             # CRITICAL: Agent is scoped to diagram_session_id, not voice_session_id
-            agent_session_id = get_agent_session_id(voice_session_id)
+            agent_session_id = get_agent_session_id(voice_session_id, session_state)
             agent = voice_agent_manager.get_or_create(agent_session_id)
             diagram_data = session_context.get('diagram_data', {})
-            diagram_data['diagram_type'] = voice_sessions[voice_session_id].get('diagram_type')
+            diagram_data['diagram_type'] = session_state.get('diagram_type')
             agent.update_diagram_state(diagram_data)
             
             updated_context = {
-                'diagram_type': voice_sessions[voice_session_id].get('diagram_type'),
-                'active_panel': voice_sessions[voice_session_id].get('active_panel', 'none'),
-                'conversation_history': voice_sessions[voice_session_id].get('conversation_history', []),
+                'diagram_type': session_state.get('diagram_type'),
+                'active_panel': session_state.get('active_panel', 'none'),
+                'conversation_history': session_state.get('conversation_history', []),
                 'selected_nodes': session_context.get('selected_nodes', []),
                 'diagram_data': diagram_data
             }
@@ -1362,7 +1386,7 @@ async def execute_diagram_update(
                 logger.info(f"Updating node {resolved_node_index} ({resolved_node_id}) to: {target}")
                 
                 # Build update payload with diagram-specific fields
-                diagram_type = voice_sessions[voice_session_id].get('diagram_type')
+                diagram_type = session_state.get('diagram_type')
                 update_payload = {
                     'node_id': resolved_node_id,
                     'new_text': target
@@ -1398,16 +1422,16 @@ async def execute_diagram_update(
                 
                 # Update agent state and instructions
                 # CRITICAL: Agent is scoped to diagram_session_id, not voice_session_id
-                agent_session_id = get_agent_session_id(voice_session_id)
+                agent_session_id = get_agent_session_id(voice_session_id, session_state)
                 agent = voice_agent_manager.get_or_create(agent_session_id)
                 diagram_data = session_context.get('diagram_data', {})
-                diagram_data['diagram_type'] = voice_sessions[voice_session_id].get('diagram_type')
+                diagram_data['diagram_type'] = session_state.get('diagram_type')
                 agent.update_diagram_state(diagram_data)
                 
                 updated_context = {
-                    'diagram_type': voice_sessions[voice_session_id].get('diagram_type'),
-                    'active_panel': voice_sessions[voice_session_id].get('active_panel', 'none'),
-                    'conversation_history': voice_sessions[voice_session_id].get('conversation_history', []),
+                    'diagram_type': session_state.get('diagram_type'),
+                    'active_panel': session_state.get('active_panel', 'none'),
+                    'conversation_history': session_state.get('conversation_history', []),
                     'selected_nodes': session_context.get('selected_nodes', []),
                     'diagram_data': diagram_data
                 }
@@ -1436,7 +1460,7 @@ async def execute_diagram_update(
                 step_index = command.get('step_index')  # For flow_map substeps
                 substep_index = command.get('substep_index')  # For flow_map substeps
                 
-                diagram_type = voice_sessions[voice_session_id].get('diagram_type', 'circle_map')
+                diagram_type = session_state.get('diagram_type', 'circle_map')
                 
                 # Extract hierarchical indices for different diagram types
                 category_index = command.get('category_index')  # For tree_map items
@@ -1480,15 +1504,15 @@ async def execute_diagram_update(
                                 category['children'].insert(item_index, {'text': target, 'children': []})
                     
                     # Update agent state
-                    agent_session_id = get_agent_session_id(voice_session_id)
+                    agent_session_id = get_agent_session_id(voice_session_id, session_state)
                     agent = voice_agent_manager.get_or_create(agent_session_id)
                     diagram_data['diagram_type'] = diagram_type
                     agent.update_diagram_state(diagram_data)
                     
                     updated_context = {
                         'diagram_type': diagram_type,
-                        'active_panel': voice_sessions[voice_session_id].get('active_panel', 'none'),
-                        'conversation_history': voice_sessions[voice_session_id].get('conversation_history', []),
+                        'active_panel': session_state.get('active_panel', 'none'),
+                        'conversation_history': session_state.get('conversation_history', []),
                         'selected_nodes': session_context.get('selected_nodes', []),
                         'diagram_data': diagram_data
                     }
@@ -1540,15 +1564,15 @@ async def execute_diagram_update(
                                 part['subparts'].insert(subpart_index, {'name': target})
                     
                     # Update agent state
-                    agent_session_id = get_agent_session_id(voice_session_id)
+                    agent_session_id = get_agent_session_id(voice_session_id, session_state)
                     agent = voice_agent_manager.get_or_create(agent_session_id)
                     diagram_data['diagram_type'] = diagram_type
                     agent.update_diagram_state(diagram_data)
                     
                     updated_context = {
                         'diagram_type': diagram_type,
-                        'active_panel': voice_sessions[voice_session_id].get('active_panel', 'none'),
-                        'conversation_history': voice_sessions[voice_session_id].get('conversation_history', []),
+                        'active_panel': session_state.get('active_panel', 'none'),
+                        'conversation_history': session_state.get('conversation_history', []),
                         'selected_nodes': session_context.get('selected_nodes', []),
                         'diagram_data': diagram_data
                     }
@@ -1601,15 +1625,15 @@ async def execute_diagram_update(
                                 branch['children'].append(new_child)
                     
                     # Update agent state
-                    agent_session_id = get_agent_session_id(voice_session_id)
+                    agent_session_id = get_agent_session_id(voice_session_id, session_state)
                     agent = voice_agent_manager.get_or_create(agent_session_id)
                     diagram_data['diagram_type'] = diagram_type
                     agent.update_diagram_state(diagram_data)
                     
                     updated_context = {
                         'diagram_type': diagram_type,
-                        'active_panel': voice_sessions[voice_session_id].get('active_panel', 'none'),
-                        'conversation_history': voice_sessions[voice_session_id].get('conversation_history', []),
+                        'active_panel': session_state.get('active_panel', 'none'),
+                        'conversation_history': session_state.get('conversation_history', []),
                         'selected_nodes': session_context.get('selected_nodes', []),
                         'diagram_data': diagram_data
                     }
@@ -1654,15 +1678,15 @@ async def execute_diagram_update(
                     diagram_data['relationships'] = relationships
                     
                     # Update agent state
-                    agent_session_id = get_agent_session_id(voice_session_id)
+                    agent_session_id = get_agent_session_id(voice_session_id, session_state)
                     agent = voice_agent_manager.get_or_create(agent_session_id)
                     diagram_data['diagram_type'] = diagram_type
                     agent.update_diagram_state(diagram_data)
                     
                     updated_context = {
                         'diagram_type': diagram_type,
-                        'active_panel': voice_sessions[voice_session_id].get('active_panel', 'none'),
-                        'conversation_history': voice_sessions[voice_session_id].get('conversation_history', []),
+                        'active_panel': session_state.get('active_panel', 'none'),
+                        'conversation_history': session_state.get('conversation_history', []),
                         'selected_nodes': session_context.get('selected_nodes', []),
                         'diagram_data': diagram_data
                     }
@@ -1737,15 +1761,15 @@ async def execute_diagram_update(
                             substeps_entry['substeps'].append(target)
                     
                     # Update agent state
-                    agent_session_id = get_agent_session_id(voice_session_id)
+                    agent_session_id = get_agent_session_id(voice_session_id, session_state)
                     agent = voice_agent_manager.get_or_create(agent_session_id)
                     diagram_data['diagram_type'] = diagram_type
                     agent.update_diagram_state(diagram_data)
                     
                     updated_context = {
                         'diagram_type': diagram_type,
-                        'active_panel': voice_sessions[voice_session_id].get('active_panel', 'none'),
-                        'conversation_history': voice_sessions[voice_session_id].get('conversation_history', []),
+                        'active_panel': session_state.get('active_panel', 'none'),
+                        'conversation_history': session_state.get('conversation_history', []),
                         'selected_nodes': session_context.get('selected_nodes', []),
                         'diagram_data': diagram_data
                     }
@@ -1859,16 +1883,16 @@ async def execute_diagram_update(
                 
                 # Update agent state and instructions
                 # CRITICAL: Agent is scoped to diagram_session_id, not voice_session_id
-                agent_session_id = get_agent_session_id(voice_session_id)
+                agent_session_id = get_agent_session_id(voice_session_id, session_state)
                 agent = voice_agent_manager.get_or_create(agent_session_id)
                 diagram_data = session_context.get('diagram_data', {})
-                diagram_data['diagram_type'] = voice_sessions[voice_session_id].get('diagram_type')
+                diagram_data['diagram_type'] = session_state.get('diagram_type')
                 agent.update_diagram_state(diagram_data)
                 
                 updated_context = {
-                    'diagram_type': voice_sessions[voice_session_id].get('diagram_type'),
-                    'active_panel': voice_sessions[voice_session_id].get('active_panel', 'none'),
-                    'conversation_history': voice_sessions[voice_session_id].get('conversation_history', []),
+                    'diagram_type': session_state.get('diagram_type'),
+                    'active_panel': session_state.get('active_panel', 'none'),
+                    'conversation_history': session_state.get('conversation_history', []),
                     'selected_nodes': session_context.get('selected_nodes', []),
                     'diagram_data': diagram_data
                 }
@@ -1890,7 +1914,7 @@ async def execute_diagram_update(
                 return True
         
         elif action == 'delete_node':
-            diagram_type = voice_sessions[voice_session_id].get('diagram_type')
+            diagram_type = session_state.get('diagram_type')
             step_index = command.get('step_index')  # For flow_map substeps
             substep_index = command.get('substep_index')  # For flow_map substeps
             category_index = command.get('category_index')  # For tree_map items
@@ -1927,15 +1951,15 @@ async def execute_diagram_update(
                             category['children'].pop(item_index)
                 
                 # Update agent state
-                agent_session_id = get_agent_session_id(voice_session_id)
+                agent_session_id = get_agent_session_id(voice_session_id, session_state)
                 agent = voice_agent_manager.get_or_create(agent_session_id)
                 diagram_data['diagram_type'] = diagram_type
                 agent.update_diagram_state(diagram_data)
                 
                 updated_context = {
                     'diagram_type': diagram_type,
-                    'active_panel': voice_sessions[voice_session_id].get('active_panel', 'none'),
-                    'conversation_history': voice_sessions[voice_session_id].get('conversation_history', []),
+                    'active_panel': session_state.get('active_panel', 'none'),
+                    'conversation_history': session_state.get('conversation_history', []),
                     'selected_nodes': session_context.get('selected_nodes', []),
                     'diagram_data': diagram_data
                 }
@@ -1979,15 +2003,15 @@ async def execute_diagram_update(
                             part['subparts'].pop(subpart_index)
                 
                 # Update agent state
-                agent_session_id = get_agent_session_id(voice_session_id)
+                agent_session_id = get_agent_session_id(voice_session_id, session_state)
                 agent = voice_agent_manager.get_or_create(agent_session_id)
                 diagram_data['diagram_type'] = diagram_type
                 agent.update_diagram_state(diagram_data)
                 
                 updated_context = {
                     'diagram_type': diagram_type,
-                    'active_panel': voice_sessions[voice_session_id].get('active_panel', 'none'),
-                    'conversation_history': voice_sessions[voice_session_id].get('conversation_history', []),
+                    'active_panel': session_state.get('active_panel', 'none'),
+                    'conversation_history': session_state.get('conversation_history', []),
                     'selected_nodes': session_context.get('selected_nodes', []),
                     'diagram_data': diagram_data
                 }
@@ -2031,15 +2055,15 @@ async def execute_diagram_update(
                             branch['children'].pop(child_index)
                 
                 # Update agent state
-                agent_session_id = get_agent_session_id(voice_session_id)
+                agent_session_id = get_agent_session_id(voice_session_id, session_state)
                 agent = voice_agent_manager.get_or_create(agent_session_id)
                 diagram_data['diagram_type'] = diagram_type
                 agent.update_diagram_state(diagram_data)
                 
                 updated_context = {
                     'diagram_type': diagram_type,
-                    'active_panel': voice_sessions[voice_session_id].get('active_panel', 'none'),
-                    'conversation_history': voice_sessions[voice_session_id].get('conversation_history', []),
+                    'active_panel': session_state.get('active_panel', 'none'),
+                    'conversation_history': session_state.get('conversation_history', []),
                     'selected_nodes': session_context.get('selected_nodes', []),
                     'diagram_data': diagram_data
                 }
@@ -2079,15 +2103,15 @@ async def execute_diagram_update(
                     relationships.pop(relationship_index)
                 
                 # Update agent state
-                agent_session_id = get_agent_session_id(voice_session_id)
+                agent_session_id = get_agent_session_id(voice_session_id, session_state)
                 agent = voice_agent_manager.get_or_create(agent_session_id)
                 diagram_data['diagram_type'] = diagram_type
                 agent.update_diagram_state(diagram_data)
                 
                 updated_context = {
                     'diagram_type': diagram_type,
-                    'active_panel': voice_sessions[voice_session_id].get('active_panel', 'none'),
-                    'conversation_history': voice_sessions[voice_session_id].get('conversation_history', []),
+                    'active_panel': session_state.get('active_panel', 'none'),
+                    'conversation_history': session_state.get('conversation_history', []),
                     'selected_nodes': session_context.get('selected_nodes', []),
                     'diagram_data': diagram_data
                 }
@@ -2137,15 +2161,15 @@ async def execute_diagram_update(
                                 break
                 
                 # Update agent state
-                agent_session_id = get_agent_session_id(voice_session_id)
+                agent_session_id = get_agent_session_id(voice_session_id, session_state)
                 agent = voice_agent_manager.get_or_create(agent_session_id)
                 diagram_data['diagram_type'] = diagram_type
                 agent.update_diagram_state(diagram_data)
                 
                 updated_context = {
                     'diagram_type': diagram_type,
-                    'active_panel': voice_sessions[voice_session_id].get('active_panel', 'none'),
-                    'conversation_history': voice_sessions[voice_session_id].get('conversation_history', []),
+                    'active_panel': session_state.get('active_panel', 'none'),
+                    'conversation_history': session_state.get('conversation_history', []),
                     'selected_nodes': session_context.get('selected_nodes', []),
                     'diagram_data': diagram_data
                 }
@@ -2170,7 +2194,7 @@ async def execute_diagram_update(
             nodes = session_context.get('diagram_data', {}).get('children', [])
             
             if not resolved_node_id and resolved_node_index is not None:
-                diagram_type = voice_sessions[voice_session_id].get('diagram_type', 'circle_map')
+                diagram_type = session_state.get('diagram_type', 'circle_map')
                 prefix_map = get_diagram_prefix_map()
                 prefix = prefix_map.get(diagram_type, 'node')
                 resolved_node_id = f"{prefix}_{resolved_node_index}"
@@ -2180,7 +2204,7 @@ async def execute_diagram_update(
                 for idx, node in enumerate(nodes):
                     node_text = node.get('text') if isinstance(node, dict) else str(node)
                     if target in node_text or node_text in target:
-                        diagram_type = voice_sessions[voice_session_id].get('diagram_type', 'circle_map')
+                        diagram_type = session_state.get('diagram_type', 'circle_map')
                         prefix_map = get_diagram_prefix_map()
                         prefix = prefix_map.get(diagram_type, 'node')
                         resolved_node_id = f"{prefix}_{idx}"
@@ -2188,7 +2212,7 @@ async def execute_diagram_update(
                         break
             
             if resolved_node_id:
-                diagram_type = voice_sessions[voice_session_id].get('diagram_type')
+                diagram_type = session_state.get('diagram_type')
                 
                 # Build delete payload with diagram-specific fields
                 delete_payload = resolved_node_id
@@ -2217,16 +2241,16 @@ async def execute_diagram_update(
                 
                 # Update agent state and instructions
                 # CRITICAL: Agent is scoped to diagram_session_id, not voice_session_id
-                agent_session_id = get_agent_session_id(voice_session_id)
+                agent_session_id = get_agent_session_id(voice_session_id, session_state)
                 agent = voice_agent_manager.get_or_create(agent_session_id)
                 diagram_data = session_context.get('diagram_data', {})
-                diagram_data['diagram_type'] = voice_sessions[voice_session_id].get('diagram_type')
+                diagram_data['diagram_type'] = session_state.get('diagram_type')
                 agent.update_diagram_state(diagram_data)
                 
                 updated_context = {
-                    'diagram_type': voice_sessions[voice_session_id].get('diagram_type'),
-                    'active_panel': voice_sessions[voice_session_id].get('active_panel', 'none'),
-                    'conversation_history': voice_sessions[voice_session_id].get('conversation_history', []),
+                    'diagram_type': session_state.get('diagram_type'),
+                    'active_panel': session_state.get('active_panel', 'none'),
+                    'conversation_history': session_state.get('conversation_history', []),
                     'selected_nodes': session_context.get('selected_nodes', []),
                     'diagram_data': diagram_data
                 }
@@ -2253,6 +2277,7 @@ async def process_voice_command(
     voice_session_id: str,
     command_text: str,
     session_context: Dict[str, Any],
+    session_state: Dict[str, Any],
     is_text_message: bool = False
 ) -> bool:
     """
@@ -2269,6 +2294,7 @@ async def process_voice_command(
         voice_session_id: Voice session ID
         command_text: Command text from user
         session_context: Current session context
+        session_state: Voice session read by the caller
         is_text_message: True if this is from text input (lower confidence threshold)
     
     Note:
@@ -2282,45 +2308,39 @@ async def process_voice_command(
         if is_paragraph_text(command_text):
             logger.info(f"Detected paragraph input (length: {len(command_text)}), processing with Qwen Plus")
             return await process_paragraph_with_qwen_plus(
-                websocket, voice_session_id, command_text, session_context
+                websocket, voice_session_id, command_text, session_context, session_state
             )
         
         # Otherwise, process as a command
         # Get the persistent agent for this session
         # CRITICAL: Agent is scoped to diagram_session_id, not voice_session_id
         # This ensures the agent is scoped to the diagram session, not the WebSocket connection
-        agent_session_id = get_agent_session_id(voice_session_id)
+        agent_session_id = get_agent_session_id(voice_session_id, session_state)
         agent = voice_agent_manager.get_or_create(agent_session_id)
         
         # Get user info from session for token tracking
-        session = get_voice_session(voice_session_id)
         user_id = None
         organization_id = None
-        if session:
-            user_id_str = session.get('user_id')
-            # Convert user_id to int if it's a string (voice_sessions stores as string)
-            if user_id_str:
+        user_id_str = session_state.get('user_id')
+        # Convert user_id to int if it's a string (voice_sessions stores as string)
+        if user_id_str:
+            try:
+                user_id = int(user_id_str) if isinstance(user_id_str, str) else user_id_str
+                # Get organization_id from user if available
                 try:
-                    user_id = int(user_id_str) if isinstance(user_id_str, str) else user_id_str
-                    # Get organization_id from user if available
-                    try:
-                        db = next(get_db())
-                        user = db.query(User).filter(User.id == user_id).first()
-                        if user:
-                            organization_id = user.organization_id
-                    except Exception as e:
-                        logger.debug(f"Error getting organization_id for token tracking: {e}")
-                except (ValueError, TypeError) as e:
-                    logger.debug(f"Error converting user_id for token tracking: {e}")
+                    db = next(get_db())
+                    user = db.query(User).filter(User.id == user_id).first()
+                    if user:
+                        organization_id = user.organization_id
+                except Exception as e:
+                    logger.debug(f"Error getting organization_id for token tracking: {e}")
+            except (ValueError, TypeError) as e:
+                logger.debug(f"Error converting user_id for token tracking: {e}")
         
-        # CRITICAL: Get diagram_type directly from voice_sessions (source of truth)
+        # CRITICAL: Get diagram_type from the session state (source of truth)
         # session_context may be stale when diagram type changes
-        # Always check voice_sessions first, then fallback to session_context
-        diagram_type = None
-        if voice_session_id in voice_sessions:
-            diagram_type = voice_sessions[voice_session_id].get('diagram_type')
-        if not diagram_type and session:
-            diagram_type = session.get('diagram_type')
+        # Always check the session first, then fallback to session_context
+        diagram_type = session_state.get('diagram_type')
         if not diagram_type:
             diagram_type = session_context.get('diagram_type')
         
@@ -2366,7 +2386,9 @@ async def process_voice_command(
         if action in diagram_update_actions:
             # For diagram updates, execute if confidence meets threshold
             if confidence >= confidence_threshold:
-                return await execute_diagram_update(websocket, voice_session_id, action, command, session_context)
+                return await execute_diagram_update(
+                    websocket, voice_session_id, action, command, session_context, session_state
+                )
             else:
                 logger.debug(f"Low confidence ({confidence}) for diagram update '{action}', threshold={confidence_threshold}")
                 return False
@@ -2482,7 +2504,7 @@ async def process_voice_command(
             
             # Resolve node_id from index if needed
             if node_index is not None and not resolved_node_id:
-                diagram_type = voice_sessions[voice_session_id].get('diagram_type', 'circle_map')
+                diagram_type = session_state.get('diagram_type', 'circle_map')
                 prefix_map = get_diagram_prefix_map()
                 prefix = prefix_map.get(diagram_type, 'node')
                 resolved_node_id = f"{prefix}_{node_index}"
@@ -2543,6 +2565,40 @@ async def process_voice_command(
         return False  # Send to Omni on error
 
 
+async def run_session_command(
+    websocket: WebSocket,
+    voice_session_id: str,
+    command_text: str,
+    is_text_message: bool = False
+) -> bool:
+    """
+    Process a command against the session's stored context and save its edits.
+    
+    The session store hands out copies, so the diagram edits a command makes
+    to its context in place are written back here. They are dropped if a
+    context_update replaced the context meanwhile: the client's diagram is newer.
+    
+    Returns:
+        Result of process_voice_command(), False if the session has expired
+    """
+    session = await voice_sessions.aget(voice_session_id)
+    if session is None:
+        logger.warning(f"VOIC | Session {voice_session_id} expired, skipping command")
+        return False
+    session_context = session.setdefault('context', {})
+    context_version = session.get('context_version', 0)
+    try:
+        return await process_voice_command(
+            websocket, voice_session_id, command_text, session_context, session,
+            is_text_message=is_text_message
+        )
+    finally:
+        session = await voice_sessions.aget(voice_session_id)
+        if session is not None and session.get('context_version', 0) == context_version:
+            session['context'] = session_context
+            await voice_sessions.aset(voice_session_id, session)
+
+
 @router.websocket("/ws/voice/{diagram_session_id}")
 async def voice_conversation(
     websocket: WebSocket,
@@ -2667,19 +2723,17 @@ async def voice_conversation(
         logger.debug(f"Registered WebSocket for diagram {diagram_session_id} (total: {len(active_websockets[diagram_session_id])})")
         
         # Create new voice session (with fresh conversation_history: [])
-        voice_session_id = create_voice_session(
+        voice_session_id = await create_voice_session(
             user_id=user_id,
             diagram_session_id=diagram_session_id,
             diagram_type=start_msg.get('diagram_type'),
-            active_panel=start_msg.get('active_panel', 'thinkguide')
+            active_panel=start_msg.get('active_panel', 'thinkguide'),
+            context=start_msg.get('context', {})  # Initial context
         )
         
         logger.debug(f"Session created: {voice_session_id}, diagram_type={start_msg.get('diagram_type')}, panel={start_msg.get('active_panel')}")
         logger.debug(f"Agent session ID: {agent_session_id} (scoped to diagram_session_id)")
         
-        # Store initial context
-        voice_sessions[voice_session_id]['context'] = start_msg.get('context', {})
-        
         # Initialize persistent LangGraph agent with diagram state
         # CRITICAL: Agent is scoped to diagram_session_id, not voice_session_id
         # This ensures the agent is scoped to the diagram session, not the WebSocket connection
@@ -2718,13 +2772,7 @@ async def voice_conversation(
         
         # CRITICAL: Use session-specific OmniClient (not singleton)
         # Each voice session has its own OmniClient instance to support concurrent users
-        session = get_voice_session(voice_session_id)
-        if not session:
-            logger.error(f"Voice session {voice_session_id} not found")
-            await websocket.close(code=1008, reason="Session not found")
-            return
-        
-        omni_client = session.get('omni_client')
+        omni_client = get_session_omni_client(voice_session_id)
         if not omni_client:
             logger.error(f"OmniClient not found for session {voice_session_id}")
             await websocket.close(code=1008, reason="OmniClient not initialized")
@@ -2742,9 +2790,6 @@ async def voice_conversation(
             endpoint_path='/ws/voice'
         )
         
-        # Store generator in session for cleanup
-        voice_sessions[voice_session_id]['omni_generator'] = omni_generator
-        
         # Send connected confirmation
         await safe_websocket_send(websocket, {
             'type': 'connected',
@@ -2757,14 +2802,33 @@ async def voice_conversation(
         # The first event will confirm conversation is ready
         logger.debug(f"Waiting for Omni session to initialize...")
         
+        async def close_expired_session():
+            """Close the connection when the store has evicted its session"""
+            logger.warning(f"VOIC | Session {voice_session_id} expired while connected, closing")
+            await safe_websocket_send(websocket, {'type': 'error', 'error': 'Voice session expired'})
+            end_voice_session(voice_session_id, reason='expired')
+            try:
+                await websocket.close(code=1001, reason="Voice session expired")
+            except Exception as e:
+                logger.debug(f"Error closing WebSocket (may already be closed): {e}")
+        
         # Handle messages concurrently
         async def handle_client_messages():
             """Handle messages from client"""
+            last_touch = time.monotonic()
             try:
                 while True:
                     message = await websocket.receive_json()
                     msg_type = message.get('type')
                     
+                    # Keep the session alive while the connection is in use
+                    # (throttled: audio arrives many times a second)
+                    if time.monotonic() - last_touch >= VOICE_SESSION_TOUCH_SECONDS:
+                        last_touch = time.monotonic()
+                        if not await voice_sessions.atouch(voice_session_id):
+                            await close_expired_session()
+                            break
+                    
                     if msg_type == 'audio':
                         # Forward audio to Omni
                         audio_data = message.get('data')
@@ -2786,21 +2850,16 @@ async def voice_conversation(
                             logger.debug(f"Received text message: {text}")
                             
                             # Store in conversation history
-                            voice_sessions[voice_session_id]['conversation_history'].append({
-                                'role': 'user',
-                                'content': text
-                            })
+                            await append_conversation_turn(voice_session_id, 'user', text)
                             
                             # CRITICAL: Process text message through unified command processing
                             # Uses Qwen Turbo (classification model) for intention checking via agent.process_command()
                             # Pass is_text_message=True for lower confidence threshold (0.5 vs 0.7)
                             # This allows conversational requests like "can you change..." to be executed
-                            session_context = voice_sessions[voice_session_id].get('context', {})
-                            
                             # Process command through unified function (handles UI actions AND diagram updates)
                             # LLM (Qwen Turbo) parses the command and returns structured action JSON
-                            command_executed = await process_voice_command(
-                                websocket, voice_session_id, text, session_context, is_text_message=True
+                            command_executed = await run_session_command(
+                                websocket, voice_session_id, text, is_text_message=True
                             )
                             
                             # If command was executed (UI actions or diagram updates), we're done
@@ -2834,38 +2893,45 @@ async def voice_conversation(
                         # CRITICAL: Update diagram_type from context if provided
                         # This ensures the session knows the current diagram type when switching diagrams
                         new_diagram_type = new_context.get('diagram_type')
+                        session = await voice_sessions.aget(voice_session_id)
+                        if session is None:
+                            await close_expired_session()
+                            break
                         if new_diagram_type:
-                            old_diagram_type = voice_sessions[voice_session_id].get('diagram_type')
-                            voice_sessions[voice_session_id]['diagram_type'] = new_diagram_type
+                            old_diagram_type = session.get('diagram_type')
+                            session['diagram_type'] = new_diagram_type
                             if old_diagram_type != new_diagram_type:
                                 logger.info(f"VOIC | Diagram type updated: {old_diagram_type} -> {new_diagram_type} for session {voice_session_id}")
                                 # CRITICAL: When diagram type changes, clear old diagram data to prevent cross-contamination
-                                if 'diagram_data' in voice_sessions[voice_session_id].get('context', {}):
-                                    voice_sessions[voice_session_id]['context']['diagram_data'] = {}
+                                if 'diagram_data' in session.get('context', {}):
+                                    session['context']['diagram_data'] = {}
                         
-                        update_panel_context(voice_session_id, active_panel)
-                        voice_sessions[voice_session_id]['context'].update(new_context)
+                        session['context'].update(new_context)
                         
                         # CRITICAL: Ensure diagram_type is also in context dict for consistency
                         # This prevents issues when session_context is passed to other functions
                         if new_diagram_type:
-                            voice_sessions[voice_session_id]['context']['diagram_type'] = new_diagram_type
+                            session['context']['diagram_type'] = new_diagram_type
+                        # Commands still running on the previous context must not write it back
+                        session['context_version'] = session.get('context_version', 0) + 1
+                        session['active_panel'] = active_panel
+                        await voice_sessions.aset(voice_session_id, session)
                         
                         # Update persistent agent's diagram state (keeps agent in sync)
                         # CRITICAL: Agent is scoped to diagram_session_id, not voice_session_id
-                        agent_session_id = get_agent_session_id(voice_session_id)
+                        agent_session_id = get_agent_session_id(voice_session_id, session)
                         agent = voice_agent_manager.get_or_create(agent_session_id)
                         diagram_data = new_context.get('diagram_data', {})
                         # Use updated diagram_type from session (or fallback to context)
-                        diagram_data['diagram_type'] = voice_sessions[voice_session_id].get('diagram_type') or new_diagram_type
+                        diagram_data['diagram_type'] = session.get('diagram_type') or new_diagram_type
                         agent.update_diagram_state(diagram_data)
                         agent.update_panel_state(active_panel, new_context.get('panels', {}))
                         
                         # Rebuild and update Omni instructions with FULL context
                         updated_context = {
-                            'diagram_type': voice_sessions[voice_session_id].get('diagram_type'),
+                            'diagram_type': session.get('diagram_type'),
                             'active_panel': active_panel,
-                            'conversation_history': voice_sessions[voice_session_id].get('conversation_history', []),
+                            'conversation_history': session.get('conversation_history', []),
                             'selected_nodes': new_context.get('selected_nodes', []),
                             'diagram_data': diagram_data
                         }
@@ -2960,7 +3026,11 @@ async def voice_conversation(
                     # Send short greeting when session is ready
                     if not greeting_sent and event_type == 'session_ready':
                         # Build short, personalized greeting (avoid long intro that triggers Omni's self-intro)
-                        diagram_type = voice_sessions[voice_session_id].get('diagram_type', 'unknown')
+                        session = await voice_sessions.aget(voice_session_id)
+                        if session is None:
+                            await close_expired_session()
+                            break
+                        diagram_type = session.get('diagram_type', 'unknown')
                         greeting = build_greeting_message(diagram_type, language='zh')
                         
                         omni_client = get_session_omni_client(voice_session_id)
@@ -2973,7 +3043,6 @@ async def voice_conversation(
                     
                     if event_type == 'transcription':
                         transcription_text = event.get('text', '')
-                        session_context = voice_sessions[voice_session_id].get('context', {})
                         
                         logger.debug(f"Omni transcription: '{transcription_text}'")
                         
@@ -2984,19 +3053,14 @@ async def voice_conversation(
                         })
                         
                         # Store in conversation history
-                        voice_sessions[voice_session_id]['conversation_history'].append({
-                            'role': 'user',
-                            'content': transcription_text
-                        })
+                        await append_conversation_turn(voice_session_id, 'user', transcription_text)
                         
                         # Parse voice command using unified command processing
                         # Voice transcriptions use higher confidence threshold (0.7)
                         try:
-                            session_context = voice_sessions[voice_session_id].get('context', {})
-                            
                             # Process command through unified function (handles UI actions AND diagram updates)
-                            command_executed = await process_voice_command(
-                                websocket, voice_session_id, transcription_text, session_context, is_text_message=False
+                            command_executed = await run_session_command(
+                                websocket, voice_session_id, transcription_text, is_text_message=False
                             )
                             
                             # If command was executed (UI actions or diagram updates), we're done
@@ -3174,26 +3238,6 @@ async def voice_conversation(
             except ValueError:
                 # WebSocket not in list (already removed)
                 pass
-        
-        # CRITICAL: Close session-specific Omni client
-        # Each voice session has its own OmniClient instance that must be closed
-        if voice_session_id:
-            session = get_voice_session(voice_session_id)
-            if session and 'omni_client' in session:
-                omni_client = session['omni_client']
-                try:
-                    # Native WebSocket client uses async close()
-                    if hasattr(omni_client, '_native_client') and omni_client._native_client:
-                        await omni_client._native_client.close()
-                        logger.debug(f"Closed Omni client for session {voice_session_id}")
-                    elif hasattr(omni_client, 'close'):
-                        # Handle both sync and async close methods
-                        close_result = omni_client.close()
-                        if asyncio.iscoroutine(close_result):
-                            await close_result
-                        logger.debug(f"Closed Omni client for session {voice_session_id}")
-                except Exception as e:
-                    logger.debug(f"Error closing Omni client for session {voice_session_id} (may already be closed): {e}")
 
 
 @router.post("/api/voice/cleanup/{diagram_session_id}")
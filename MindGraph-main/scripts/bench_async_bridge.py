@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Benchmark for sync-to-async LLM call overhead.
+
+Measures the per-call cost of running a coroutine from synchronous code:
+
+- legacy thread:  the previous _LegacyLLMStub._call (new OS thread and new
+                  event loop per call, reproduced below)
+- bridge (bg):    AsyncBridge with no main loop - shared background loop
+- bridge (main):  AsyncBridge from worker threads while an app loop runs,
+                  the production path for concept map ThreadPoolExecutors
+
+The coroutine is a stand-in for an LLM call that sleeps --work seconds
+(default 0: pure overhead). Calls are made sequentially and from a
+ThreadPoolExecutor (--workers, as in generate_concept_map_two_stage).
+
+Usage:
+    python scripts/bench_async_bridge.py
+    python scripts/bench_async_bridge.py --calls 500 --workers 6 --work 0.01
+"""
+
+import argparse
+import asyncio
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from services.async_bridge import AsyncBridge
+
+
+def legacy_thread_call(coro_factory):
+    """The previous _LegacyLLMStub._call: one thread and one event loop per call."""
+    result_container = {'result': None, 'exception': None}
+
+    def run_in_thread():
+        new_loop = asyncio.new_event_loop()
+        try:
+            asyncio.set_event_loop(new_loop)
+            result_container['result'] = new_loop.run_until_complete(coro_factory())
+        except Exception as e:
+            result_container['exception'] = e
+        finally:
+            new_loop.close()
+
+    thread = threading.Thread(target=run_in_thread)
+    thread.start()
+    thread.join(timeout=35.0)
+    if result_container['exception']:
+        raise result_container['exception']
+    return result_container['result']
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def measure(call, calls: int, workers: int):
+    """Per-call latency (sequential) and total wall time (from a thread pool)."""
+    latencies = []
+    for _ in range(calls):
+        started = time.perf_counter()
+        call()
+        latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(lambda _: call(), range(calls)))
+    pooled = time.perf_counter() - started
+    return latencies, pooled
+
+
+def report(name: str, latencies, pooled: float, work: float):
+    overhead = [(latency - work) * 1e6 for latency in latencies]
+    print(
+        f"{name:<16}"
+        f"overhead p50={percentile(overhead, 50):8.1f}us  "
+        f"p99={percentile(overhead, 99):8.1f}us  "
+        f"pooled total={pooled * 1000:8.1f}ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sync-to-async call overhead benchmark")
+    parser.add_argument('--calls', type=int, default=300, help="Calls per variant")
+    parser.add_argument('--workers', type=int, default=6, help="Thread pool size for the pooled run")
+    parser.add_argument('--work', type=float, default=0.0, help="Seconds each simulated LLM call sleeps")
+    args = parser.parse_args()
+
+    async def fake_llm_call():
+        await asyncio.sleep(args.work)
+        return "ok"
+
+    print(f"{args.calls} calls per variant, {args.workers} pooled workers, simulated call={args.work}s")
+
+    latencies, pooled = measure(lambda: legacy_thread_call(fake_llm_call), args.calls, args.workers)
+    report("legacy thread", latencies, pooled, args.work)
+
+    bridge = AsyncBridge()
+    latencies, pooled = measure(lambda: bridge.run(fake_llm_call(), timeout=35.0), args.calls, args.workers)
+    report("bridge (bg)", latencies, pooled, args.work)
+    bridge.shutdown()
+
+    # Production shape: app loop running in its own thread, sync callers in other threads
+    app_loop = asyncio.new_event_loop()
+    app_thread = threading.Thread(target=app_loop.run_forever, daemon=True)
+    app_thread.start()
+    bridge = AsyncBridge()
+    bridge.set_main_loop(app_loop)
+    latencies, pooled = measure(lambda: bridge.run(fake_llm_call(), timeout=35.0), args.calls, args.workers)
+    report("bridge (main)", latencies, pooled, args.work)
+    bridge.shutdown()
+    app_loop.call_soon_threadsafe(app_loop.stop)
+    app_thread.join()
+    app_loop.close()
+
+
+if __name__ == '__main__':
+    main()
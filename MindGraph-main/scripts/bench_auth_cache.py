@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark for per-request authentication overhead.
+
+Builds a throwaway SQLite database (file-backed, like data/mindgraph.db) with
+a few hundred organizations, users and API keys, then times the auth
+dependencies as a route would call them:
+
+- get_current_user (JWT: user + organization status)
+- get_current_user_or_api_key with a JWT
+- get_current_user_or_api_key with an X-API-Key (usage counter still written)
+
+once with the principal cache disabled (the previous behaviour: every call
+opens a session and queries) and once enabled, and reports microseconds and
+SQL statements per request.
+
+Usage:
+    python scripts/bench_auth_cache.py
+    python scripts/bench_auth_cache.py --requests 5000 --users 1000
+"""
+
+import argparse
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from fastapi.security import HTTPAuthorizationCredentials
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+import config.database
+import utils.auth as auth
+from models.auth import Base, User, Organization, APIKey
+from services.principal_cache import PrincipalCache
+
+
+def build_database(path: Path, users: int):
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine)
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    session = session_factory()
+    orgs = [Organization(code=f"ORG-{i:04d}", name=f"School {i}", is_active=True) for i in range(max(1, users // 20))]
+    session.add_all(orgs)
+    session.commit()
+    session.add_all(
+        User(phone=f"138{i:08d}", password_hash="x", name=f"Teacher {i}", organization_id=orgs[i % len(orgs)].id)
+        for i in range(users)
+    )
+    session.add_all(APIKey(key=f"mg_bench_{i}", name=f"Key {i}", usage_count=0, is_active=True) for i in range(20))
+    session.commit()
+    tokens = [
+        HTTPAuthorizationCredentials(scheme="Bearer", credentials=auth.create_access_token(user))
+        for user in session.query(User).all()
+    ]
+    session.close()
+    return engine, session_factory, tokens
+
+
+def run(label, call, requests, statements):
+    statements.clear()
+    started = time.perf_counter()
+    for i in range(requests):
+        call(i)
+    elapsed_us = (time.perf_counter() - started) / requests * 1e6
+    print(f"  {label:<32} {elapsed_us:8.1f}us/request  {len(statements) / requests:5.2f} SQL/request")
+    return elapsed_us
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Auth dependency overhead benchmark")
+    parser.add_argument('--requests', type=int, default=3000, help="Requests timed per scenario")
+    parser.add_argument('--users', type=int, default=200, help="Distinct users (all fit in the cache)")
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine, session_factory, tokens = build_database(Path(tmp) / "bench.db", args.users)
+        config.database.SessionLocal = session_factory
+        auth.AUTH_MODE = "standard"
+        statements = []
+        event.listen(engine, "before_cursor_execute", lambda *a: statements.append(a[2]))
+
+        rng = random.Random(args.seed)
+        picks = [rng.randrange(len(tokens)) for _ in range(args.requests)]
+        request = SimpleNamespace(cookies={}, url=SimpleNamespace(path="/api/generate_graph"))
+
+        scenarios = {
+            'get_current_user (JWT)': lambda i: auth.get_current_user(request, tokens[picks[i]]),
+            'user_or_api_key (JWT)': lambda i: auth.get_current_user_or_api_key(request, tokens[picks[i]], None),
+            'user_or_api_key (API key)': lambda i: auth.get_current_user_or_api_key(
+                request, None, f"mg_bench_{picks[i] % 20}"
+            ),
+        }
+
+        results = {}
+        for enabled in (False, True):
+            auth.principal_cache = PrincipalCache(enabled=enabled, epoch_path=Path(tmp) / "auth_cache.epoch")
+            print(f"principal cache {'enabled' if enabled else 'disabled'}:")
+            for label, call in scenarios.items():
+                if enabled:
+                    # Warm every principal, as after the first minute in production
+                    for i in range(args.requests):
+                        call(i)
+                results[(label, enabled)] = run(label, call, args.requests, statements)
+
+        print("speedup:")
+        for label in scenarios:
+            print(f"  {label:<32} {results[(label, False)] / results[(label, True)]:6.1f}x")
+        engine.dispose()
+
+
+if __name__ == '__main__':
+    main()
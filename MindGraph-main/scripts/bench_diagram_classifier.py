@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Offline benchmark for the local diagram type classifier.
+
+Runs the classifier over a labelled zh/en prompt set (none of these prompts
+are in its training data) and reports, per confidence threshold:
+
+- coverage: share of prompts answered locally (the rest go to the LLM)
+- accuracy: share of locally answered prompts that match the label
+
+plus per-call latency. The LLM classifier it replaces costs one chat round
+trip (typically 0.5-2s) on every generation request.
+
+Usage:
+    python scripts/bench_diagram_classifier.py
+    python scripts/bench_diagram_classifier.py --thresholds 0.7,0.8,0.9 --show-errors
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from agents.core.diagram_classifier import DiagramTypeClassifier
+
+# (prompt, expected diagram_type). Topic-only prompts are labelled mind_map,
+# the LLM classifier's documented default for prompts without intent.
+LABELLED_PROMPTS = [
+    # Explicit names (en)
+    ("create a circle map about the water cycle", 'circle_map'),
+    ("make a bubble map describing elephants", 'bubble_map'),
+    ("double bubble map comparing cats and dogs", 'double_bubble_map'),
+    ("draw a brace map of a bicycle", 'brace_map'),
+    ("bridge map: hand is to glove as foot is to sock", 'bridge_map'),
+    ("tree map of vertebrate animals", 'tree_map'),
+    ("flow map of how a bill becomes a law", 'flow_map'),
+    ("multi-flow map for the fall of the roman empire", 'multi_flow_map'),
+    ("mind map for planning a school trip", 'mind_map'),
+    ("generate a bubble map about tree maps", 'bubble_map'),
+    ("a mind map explaining flow maps", 'mind_map'),
+    ("Create a Flowchart for Brewing Tea", 'flow_map'),
+    ("give me a multi flow map on deforestation", 'multi_flow_map'),
+    ("treemap of the solar system planets", 'tree_map'),
+    # Explicit names (zh)
+    ("生成一个关于光合作用的圆圈图", 'circle_map'),
+    ("用气泡图描述熊猫", 'bubble_map'),
+    ("双气泡图对比唐朝和宋朝", 'double_bubble_map'),
+    ("画一个汽车的括号图", 'brace_map'),
+    ("桥形图：老师和学生，医生和病人", 'bridge_map'),
+    ("植物分类树形图", 'tree_map'),
+    ("生成泡茶的流程图", 'flow_map'),
+    ("分析全球变暖的复流程图", 'multi_flow_map'),
+    ("春节思维导图", 'mind_map'),
+    ("生成一个关于括号图的思维导图", 'mind_map'),
+    ("介绍流程图的气泡图", 'bubble_map'),
+    ("多重流程图分析工业革命", 'multi_flow_map'),
+    # Intent only (en)
+    ("compare the sun and the moon", 'double_bubble_map'),
+    ("similarities and differences between frogs and toads", 'double_bubble_map'),
+    ("steps to plant a tree", 'flow_map'),
+    ("the process of making bread", 'flow_map'),
+    ("causes and effects of the great depression", 'multi_flow_map'),
+    ("why did the titanic sink", 'multi_flow_map'),
+    ("parts of a flower", 'brace_map'),
+    ("components of a computer", 'brace_map'),
+    ("classify animals by what they eat", 'tree_map'),
+    ("types of rocks", 'tree_map'),
+    ("describe the characteristics of a good friend", 'bubble_map'),
+    ("features of autumn", 'bubble_map'),
+    ("define democracy", 'circle_map'),
+    ("analogies for the cell: the nucleus is like a brain", 'bridge_map'),
+    ("brainstorm ideas for a science fair", 'mind_map'),
+    # Intent only (zh)
+    ("比较猫和狗", 'double_bubble_map'),
+    ("苹果和橙子的异同", 'double_bubble_map'),
+    ("制作咖啡的步骤", 'flow_map'),
+    ("水的循环过程", 'flow_map'),
+    ("第一次世界大战的原因和结果", 'multi_flow_map'),
+    ("森林火灾的因果", 'multi_flow_map'),
+    ("电脑的组成部分", 'brace_map'),
+    ("人体的结构", 'brace_map'),
+    ("动物的分类", 'tree_map'),
+    ("岩石的种类", 'tree_map'),
+    ("描述秋天的特点", 'bubble_map'),
+    ("大熊猫的特征", 'bubble_map'),
+    ("定义民主", 'circle_map'),
+    ("用类比理解电路", 'bridge_map'),
+    ("暑假计划头脑风暴", 'mind_map'),
+    # Topic only: no intent either way
+    ("photosynthesis", 'mind_map'),
+    ("solar system", 'mind_map'),
+    ("the french revolution", 'mind_map'),
+    ("光合作用", 'mind_map'),
+    ("中国古代四大发明", 'mind_map'),
+    ("人工智能", 'mind_map'),
+]
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local diagram classifier accuracy/latency benchmark")
+    parser.add_argument('--thresholds', default='0.6,0.7,0.8,0.85,0.9,0.95',
+                        help="Comma-separated confidence thresholds to report")
+    parser.add_argument('--repeat', type=int, default=200, help="Passes over the prompt set for latency")
+    parser.add_argument('--show-errors', action='store_true', help="Print wrong predictions")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    classifier = DiagramTypeClassifier()
+    print(f"Training: {(time.perf_counter() - started) * 1000:.1f}ms")
+
+    results = [(prompt, label, classifier.classify(prompt)) for prompt, label in LABELLED_PROMPTS]
+    print(f"{len(results)} labelled prompts")
+
+    for threshold in (float(t) for t in args.thresholds.split(',')):
+        answered = [
+            (label, result) for _, label, result in results
+            if result['diagram_type'] and result['confidence'] >= threshold
+        ]
+        correct = sum(1 for label, result in answered if result['diagram_type'] == label)
+        coverage = len(answered) / len(results)
+        accuracy = correct / len(answered) if answered else 0.0
+        print(f"threshold={threshold:.2f}  coverage={coverage:6.1%}  accuracy={accuracy:6.1%}  "
+              f"({correct}/{len(answered)} local, {len(results) - len(answered)} to LLM)")
+
+    latencies = []
+    for _ in range(args.repeat):
+        for prompt, _ in LABELLED_PROMPTS:
+            call_started = time.perf_counter()
+            classifier.classify(prompt)
+            latencies.append((time.perf_counter() - call_started) * 1e6)
+    print(f"latency p50={percentile(latencies, 50):.1f}us  p99={percentile(latencies, 99):.1f}us  "
+          f"({len(latencies)} calls)")
+
+    if args.show_errors:
+        for prompt, label, result in results:
+            if result['diagram_type'] != label:
+                print(f"  {prompt!r}: expected {label}, got {result['diagram_type']} "
+                      f"({result['source']}, {result['confidence']:.2f})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark for node palette deduplication.
+
+Fills a session with N unique node texts (synthetic zh/en phrases of 2-4
+words from a topic-sized vocabulary), then times lookups of new texts - half near-duplicates of seen
+ones, half fresh - against:
+
+- linear: the previous scan, SequenceMatcher(...).ratio() against every seen text
+- indexed: NodeDedupIndex (length band + char/bigram prefix filter + quick_ratio)
+
+and checks both give the same duplicate/unique decision for every probe.
+
+Usage:
+    python scripts/bench_node_dedup.py
+    python scripts/bench_node_dedup.py --sizes 1000,5000,10000 --probes 200
+"""
+
+import argparse
+import random
+import sys
+import time
+from difflib import SequenceMatcher
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from agents.thinking_modes.node_palette.dedup_index import NodeDedupIndex
+
+# Vocabulary sizes in the range of one topic's palette: a few hundred
+# two-character zh words and en words, drawn from a fixed seed
+_VOCABULARY_RNG = random.Random(0)
+ZH_WORDS = [
+    ''.join(chr(0x4E00 + _VOCABULARY_RNG.randrange(3500)) for _ in range(2)) for _ in range(400)
+]
+EN_WORDS = [
+    ''.join(_VOCABULARY_RNG.choice('abcdefghijklmnopqrstuvwxyz') for _ in range(_VOCABULARY_RNG.randint(3, 9)))
+    for _ in range(400)
+]
+
+
+def random_node(rng: random.Random) -> str:
+    if rng.random() < 0.6:
+        return ''.join(rng.choice(ZH_WORDS) for _ in range(rng.randint(2, 4)))
+    return ' '.join(rng.choice(EN_WORDS) for _ in range(rng.randint(2, 4)))
+
+
+def near_duplicate(text: str, rng: random.Random) -> str:
+    chars = list(text)
+    position = rng.randrange(len(chars))
+    if rng.random() < 0.5:
+        chars.insert(position, rng.choice('的与和s'))
+    else:
+        chars.pop(position)
+    return ''.join(chars)
+
+
+def linear_find(text, seen):
+    for seen_text in seen:
+        if SequenceMatcher(None, text, seen_text).ratio() > 0.85:
+            return True
+    return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Node palette dedup lookup benchmark")
+    parser.add_argument('--sizes', default='1000,2500,5000,10000', help="Comma-separated seen-node counts")
+    parser.add_argument('--probes', type=int, default=200, help="Lookups timed per size")
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    for size in (int(s) for s in args.sizes.split(',')):
+        rng = random.Random(args.seed)
+        index = NodeDedupIndex(threshold=0.85)
+        seen = []
+        while len(seen) < size:
+            text = random_node(rng)
+            if text not in index and index.find_similar(text) is None:
+                index.add(text)
+                seen.append(text)
+
+        probes = [
+            near_duplicate(rng.choice(seen), rng) if i % 2 else random_node(rng)
+            for i in range(args.probes)
+        ]
+
+        started = time.perf_counter()
+        linear = [p in index or linear_find(p, seen) for p in probes]
+        linear_us = (time.perf_counter() - started) / len(probes) * 1e6
+
+        started = time.perf_counter()
+        indexed = [p in index or index.find_similar(p) is not None for p in probes]
+        indexed_us = (time.perf_counter() - started) / len(probes) * 1e6
+
+        mismatches = sum(1 for a, b in zip(linear, indexed) if a != b)
+        print(
+            f"seen={size:>6}  linear={linear_us:10.1f}us/lookup  indexed={indexed_us:8.1f}us/lookup  "
+            f"speedup={linear_us / indexed_us:7.1f}x  duplicates={sum(indexed)}/{len(probes)}  "
+            f"mismatches={mismatches}"
+        )
+
+
+if __name__ == '__main__':
+    main()
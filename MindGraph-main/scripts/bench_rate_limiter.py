@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the LLM rate limiter.
+
+Offers load at a multiple of the QPM limit (default 4x) and reports
+acquisition latency percentiles for the event-driven limiter next to the
+previous sleep-polling implementation (reproduced below for comparison).
+
+"Lateness" is how long after the earliest FIFO-feasible moment a request was
+admitted: for request i, ideal_i = max(arrival_i, ideal_{i-qpm} + window).
+Latency above the ideal is pure scheduler overhead.
+
+The QPM window is shortened (default 3s instead of 60s) so a run takes
+seconds; the legacy poll intervals are scaled by the same factor so its
+relative quantization matches production.
+
+Usage:
+    python scripts/bench_rate_limiter.py
+    python scripts/bench_rate_limiter.py --qpm 60 --window 3 --load 4
+"""
+
+import argparse
+import asyncio
+import logging
+import sys
+import time
+from collections import deque
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from services.rate_limiter import LLMRateLimiter
+
+# Per-request wait warnings would drown the report
+logging.getLogger('services.rate_limiter').setLevel(logging.ERROR)
+
+
+class LegacySleepPollLimiter:
+    """The previous DashscopeRateLimiter.acquire/release, with a configurable window."""
+
+    def __init__(self, qpm_limit: int, concurrent_limit: int, window_seconds: float):
+        self.qpm_limit = qpm_limit
+        self.concurrent_limit = concurrent_limit
+        self.window_seconds = window_seconds
+        scale = window_seconds / 60.0
+        self.concurrency_poll = 0.1 * scale
+        self.qpm_poll = 1.0 * scale
+        self._request_timestamps = deque()
+        self._active_requests = 0
+        self._lock = asyncio.Lock()
+
+    def _prune(self, now: float) -> None:
+        while self._request_timestamps and self._request_timestamps[0] < now - self.window_seconds:
+            self._request_timestamps.popleft()
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while self._active_requests >= self.concurrent_limit:
+                await asyncio.sleep(self.concurrency_poll)
+            now = time.monotonic()
+            self._prune(now)
+            while len(self._request_timestamps) >= self.qpm_limit:
+                await asyncio.sleep(self.qpm_poll)
+                now = time.monotonic()
+                self._prune(now)
+            self._request_timestamps.append(now)
+            self._active_requests += 1
+
+    async def release(self) -> None:
+        async with self._lock:
+            self._active_requests -= 1
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+async def run(limiter, qpm: int, window: float, load: float, hold: float):
+    """Offer load*qpm requests spread evenly over one window."""
+    total = int(qpm * load)
+    interval = window / total
+    arrivals = [0.0] * total
+    grants = [0.0] * total
+    start = time.monotonic()
+
+    async def request(i: int):
+        await asyncio.sleep(i * interval)
+        arrivals[i] = time.monotonic() - start
+        await limiter.acquire()
+        grants[i] = time.monotonic() - start
+        try:
+            await asyncio.sleep(hold)
+        finally:
+            await limiter.release()
+
+    await asyncio.gather(*[request(i) for i in range(total)])
+
+    # Earliest FIFO-feasible grant for each request given the QPM window
+    ideal = []
+    for i, arrival in enumerate(arrivals):
+        earliest = arrival
+        if i >= qpm:
+            earliest = max(earliest, ideal[i - qpm] + window)
+        ideal.append(earliest)
+
+    latency = [g - a for g, a in zip(grants, arrivals)]
+    lateness = [max(0.0, g - e) for g, e in zip(grants, ideal)]
+    return latency, lateness
+
+
+def report(name: str, latency, lateness):
+    print(
+        f"{name:<16}"
+        f"p50={percentile(latency, 50):7.3f}s  "
+        f"p95={percentile(latency, 95):7.3f}s  "
+        f"p99={percentile(latency, 99):7.3f}s  "
+        f"p99 lateness={percentile(lateness, 99) * 1000:8.1f}ms"
+    )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Rate limiter acquisition latency benchmark")
+    parser.add_argument('--qpm', type=int, default=60, help="Requests allowed per window")
+    parser.add_argument('--window', type=float, default=3.0, help="QPM window in seconds (production: 60)")
+    parser.add_argument('--load', type=float, default=4.0, help="Offered load as a multiple of the QPM limit")
+    parser.add_argument('--hold', type=float, default=0.05, help="Seconds each request holds its slot")
+    parser.add_argument('--concurrent', type=int, default=500, help="Concurrent limit")
+    args = parser.parse_args()
+
+    print(
+        f"QPM={args.qpm} per {args.window}s window, offered load {args.load}x "
+        f"({int(args.qpm * args.load)} requests), hold={args.hold}s"
+    )
+
+    limiter = LLMRateLimiter(
+        qpm_limit=args.qpm,
+        concurrent_limit=args.concurrent,
+        window_seconds=args.window
+    )
+    latency, lateness = await run(limiter, args.qpm, args.window, args.load, args.hold)
+    report("event-driven", latency, lateness)
+    stats = limiter.get_stats()
+    print(f"{'':<16}max queue depth={stats['max_queue_depth']}, waits={stats['total_waits']}")
+
+    legacy = LegacySleepPollLimiter(args.qpm, args.concurrent, args.window)
+    latency, lateness = await run(legacy, args.qpm, args.window, args.load, args.hold)
+    report("legacy poll", latency, lateness)
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the admin dashboard token queries: raw token_usage scans
+(the previous queries of /admin/stats, /admin/token-stats,
+/admin/stats/trends, /admin/organizations and /admin/users) against reads
+from the hourly/daily/monthly rollups.
+
+Fills a file-backed SQLite database (same schema and indexes as
+data/mindgraph.db) with synthetic token_usage rows spread over --days,
+builds the rollups with rebuild_rollups() (the startup backfill), then
+times each dashboard's token queries both ways and checks they return the
+same numbers. "now" is pinned to an hour boundary so the hour-resolved
+rollup windows match the raw windows exactly.
+
+Usage:
+    python scripts/bench_token_rollups.py                      # 10M rows
+    python scripts/bench_token_rollups.py --rows 1000000 --days 90
+    python scripts/bench_token_rollups.py --db /tmp/usage.db   # reuse between runs
+"""
+
+import argparse
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from sqlalchemy import and_, create_engine, func
+from sqlalchemy.orm import sessionmaker
+
+from models.auth import Base, Organization, User
+from models.token_usage import TokenUsage
+from services.token_rollups import rebuild_rollups, sum_usage
+
+MODELS = ['qwen', 'deepseek', 'kimi', 'hunyuan']
+REQUEST_TYPES = ['diagram_generation', 'node_palette', 'thinkguide', 'autocomplete', 'mindmate']
+COLUMNS = (
+    'user_id', 'organization_id', 'session_id', 'model_provider', 'model_name', 'model_alias',
+    'input_tokens', 'output_tokens', 'total_tokens', 'input_cost', 'output_cost', 'total_cost',
+    'request_type', 'success', 'cache_hit', 'created_at'
+)
+
+
+def build_database(engine, rows: int, days: int, users: int, orgs: int, now: datetime, seed: int):
+    """
+    Synthetic usage shaped like the real table: rows come in sessions (a
+    node palette batch or a ThinkGuide conversation is a dozen LLM calls),
+    each teacher sticks to a couple of models and features, and a few
+    teachers account for most of the sessions.
+    """
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    session.add_all(Organization(code=f"ORG-{i:04d}", name=f"School {i}") for i in range(orgs))
+    session.add_all(
+        User(phone=f"139{i:08d}", password_hash="x", name=f"Teacher {i}", organization_id=i % orgs + 1)
+        for i in range(users)
+    )
+    session.commit()
+    session.close()
+
+    rng = random.Random(seed)
+    habits = [(rng.sample(MODELS, 2), rng.sample(REQUEST_TYPES, 3)) for _ in range(users)]
+    weights = [rng.paretovariate(1.2) for _ in range(users)]
+    span = days * 86400
+
+    def generate():
+        produced = 0
+        while produced < rows:
+            user_index = rng.choices(range(users), weights=weights)[0]
+            models, request_types = habits[user_index]
+            request_type = rng.choice(request_types)
+            started = now - timedelta(seconds=rng.uniform(60, span))
+            calls = min(rng.randint(4, 20), rows - produced)
+            for call in range(calls):
+                input_tokens = rng.randint(200, 3000)
+                output_tokens = rng.randint(100, 2000)
+                created_at = min(started + timedelta(seconds=call * rng.uniform(2, 20)), now - timedelta(seconds=1))
+                yield (
+                    user_index + 1, user_index % orgs + 1, f"s{produced}", 'dashscope', 'qwen-plus-latest',
+                    rng.choice(models), input_tokens, output_tokens, input_tokens + output_tokens,
+                    input_tokens * 4e-7, output_tokens * 1.2e-6, input_tokens * 4e-7 + output_tokens * 1.2e-6,
+                    request_type, rng.random() > 0.02, False,
+                    created_at.strftime('%Y-%m-%d %H:%M:%S.%f')
+                )
+            produced += calls
+
+    connection = engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        cursor.executemany(
+            f"INSERT INTO token_usage ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})",
+            generate()
+        )
+        connection.commit()
+    finally:
+        connection.close()
+
+
+# ----------------------------------------------------------------------
+# The previous raw queries, as the routes ran them
+# ----------------------------------------------------------------------
+
+def _sums(query):
+    row = query.first()
+    return (int(row.input_tokens or 0), int(row.output_tokens or 0), int(row.total_tokens or 0))
+
+
+def _raw_window(db, since):
+    query = db.query(
+        func.sum(TokenUsage.input_tokens).label('input_tokens'),
+        func.sum(TokenUsage.output_tokens).label('output_tokens'),
+        func.sum(TokenUsage.total_tokens).label('total_tokens')
+    ).filter(TokenUsage.success == True)
+    if since:
+        query = query.filter(TokenUsage.created_at >= since)
+    return _sums(query)
+
+
+def raw_stats(db, now):
+    week = _raw_window(db, now - timedelta(days=7))
+    orgs = db.query(
+        Organization.id,
+        func.coalesce(func.sum(TokenUsage.total_tokens), 0).label('total_tokens'),
+        func.coalesce(func.count(TokenUsage.id), 0).label('request_count')
+    ).outerjoin(
+        TokenUsage, and_(Organization.id == TokenUsage.organization_id, TokenUsage.success == True)
+    ).group_by(Organization.id, Organization.name).all()
+    return week, {row.id: (int(row.total_tokens), row.request_count) for row in orgs if row.request_count}
+
+
+def raw_token_stats(db, now):
+    today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    windows = [_raw_window(db, since) for since in (today, now - timedelta(days=7), now - timedelta(days=30), None)]
+    top = db.query(
+        User.id,
+        func.coalesce(func.sum(TokenUsage.total_tokens), 0).label('total_tokens')
+    ).outerjoin(
+        TokenUsage, and_(User.id == TokenUsage.user_id, TokenUsage.success == True)
+    ).group_by(User.id).order_by(func.coalesce(func.sum(TokenUsage.total_tokens), 0).desc()).limit(10).all()
+    return windows, [(row.id, int(row.total_tokens)) for row in top]
+
+
+def raw_trends(db, now):
+    start = (now - timedelta(days=30)).replace(hour=0, minute=0, second=0, microsecond=0)
+    rows = db.query(
+        func.date(TokenUsage.created_at).label('date'),
+        func.sum(TokenUsage.total_tokens).label('total_tokens')
+    ).filter(
+        TokenUsage.created_at >= start, TokenUsage.success == True
+    ).group_by(func.date(TokenUsage.created_at)).all()
+    return {str(row.date): int(row.total_tokens) for row in rows}
+
+
+def raw_organizations(db, now):
+    rows = db.query(
+        Organization.id,
+        func.coalesce(func.sum(TokenUsage.total_tokens), 0).label('total_tokens')
+    ).outerjoin(
+        TokenUsage,
+        and_(
+            Organization.id == TokenUsage.organization_id,
+            TokenUsage.created_at >= now - timedelta(days=7),
+            TokenUsage.success == True
+        )
+    ).group_by(Organization.id, Organization.name).all()
+    return {row.id: int(row.total_tokens) for row in rows if row.total_tokens}
+
+
+def raw_users(db, now):
+    rows = db.query(
+        TokenUsage.user_id,
+        func.coalesce(func.sum(TokenUsage.total_tokens), 0).label('total_tokens')
+    ).filter(
+        TokenUsage.created_at >= now - timedelta(days=7),
+        TokenUsage.success == True,
+        TokenUsage.user_id.isnot(None)
+    ).group_by(TokenUsage.user_id).all()
+    return {row.user_id: int(row.total_tokens) for row in rows}
+
+
+# ----------------------------------------------------------------------
+# The same numbers from the rollups, as the routes now read them
+# ----------------------------------------------------------------------
+
+def _rollup_window(db, since):
+    usage = sum_usage(db, since=since).get(None)
+    return (usage['input_tokens'], usage['output_tokens'], usage['total_tokens']) if usage else (0, 0, 0)
+
+
+def rollup_stats(db, now):
+    week = _rollup_window(db, now - timedelta(days=7))
+    orgs = sum_usage(db, by='organization_id')
+    return week, {org_id: (usage['total_tokens'], usage['request_count']) for org_id, usage in orgs.items()}
+
+
+def rollup_token_stats(db, now):
+    today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    windows = [_rollup_window(db, since) for since in (today, now - timedelta(days=7), now - timedelta(days=30), None)]
+    by_user = sum_usage(db, by='user_id')
+    top = sorted(by_user.items(), key=lambda item: item[1]['total_tokens'], reverse=True)[:10]
+    return windows, [(user_id, usage['total_tokens']) for user_id, usage in top]
+
+
+def rollup_trends(db, now):
+    start = (now - timedelta(days=30)).replace(hour=0, minute=0, second=0, microsecond=0)
+    return {str(date): usage['total_tokens'] for date, usage in sum_usage(db, since=start, by='day').items()}
+
+
+def rollup_organizations(db, now):
+    usage = sum_usage(db, since=now - timedelta(days=7), by='organization_id')
+    return {org_id: totals['total_tokens'] for org_id, totals in usage.items() if totals['total_tokens']}
+
+
+def rollup_users(db, now):
+    usage = sum_usage(db, since=now - timedelta(days=7), by='user_id')
+    return {user_id: totals['total_tokens'] for user_id, totals in usage.items()}
+
+
+SCENARIOS = {
+    '/admin/stats': (raw_stats, rollup_stats),
+    '/admin/token-stats': (raw_token_stats, rollup_token_stats),
+    '/admin/stats/trends (tokens, 30d)': (raw_trends, rollup_trends),
+    '/admin/organizations (sums)': (raw_organizations, rollup_organizations),
+    '/admin/users (sums)': (raw_users, rollup_users),
+}
+
+
+def timed(call, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = call()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Raw token_usage scans vs rollup reads")
+    parser.add_argument('--rows', type=int, default=10_000_000, help="Synthetic token_usage rows")
+    parser.add_argument('--days', type=int, default=365, help="Days the rows are spread over")
+    parser.add_argument('--users', type=int, default=3000)
+    parser.add_argument('--orgs', type=int, default=60)
+    parser.add_argument('--repeat', type=int, default=3, help="Timed runs per query (median)")
+    parser.add_argument('--db', type=Path, default=None, help="Database file to create or reuse")
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    # Pinned to an hour boundary (see module docstring); close to the real clock
+    # so the hourly rollups are within their retention window
+    now = datetime.utcnow().replace(minute=0, second=0, microsecond=0)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.db or Path(tmp) / "bench.db"
+        reuse = path.exists()
+        engine = create_engine(f"sqlite:///{path}")
+        if reuse:
+            now = datetime.fromisoformat(engine.connect().exec_driver_sql(
+                "SELECT max(created_at) FROM token_usage"
+            ).scalar()).replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
+            Base.metadata.create_all(engine)  # Rollup tables added since the file was built
+            print(f"reusing {path}")
+        else:
+            started = time.perf_counter()
+            build_database(engine, args.rows, args.days, args.users, args.orgs, now, args.seed)
+            print(f"generated {args.rows:,} rows over {args.days} days in {time.perf_counter() - started:.1f}s")
+
+        started = time.perf_counter()
+        counts = rebuild_rollups(engine)
+        print(
+            f"rebuild_rollups: {counts['raw_rows']:,} rows -> {counts['hourly_rows']:,} hourly, "
+            f"{counts['daily_rows']:,} daily, {counts['monthly_rows']:,} monthly in {time.perf_counter() - started:.1f}s"
+        )
+
+        db = sessionmaker(bind=engine)()
+        print(f"{'dashboard':<36} {'raw':>10} {'rollups':>10} {'speedup':>9}")
+        for label, (raw_call, rollup_call) in SCENARIOS.items():
+            raw_seconds, raw_result = timed(lambda: raw_call(db, now), args.repeat)
+            rollup_seconds, rollup_result = timed(lambda: rollup_call(db, now), args.repeat)
+            match = "" if raw_result == rollup_result else "  MISMATCH"
+            print(
+                f"{label:<36} {raw_seconds * 1000:8.1f}ms {rollup_seconds * 1000:8.1f}ms "
+                f"{raw_seconds / rollup_seconds:8.1f}x{match}"
+            )
+        db.close()
+        engine.dispose()
+
+
+if __name__ == '__main__':
+    main()
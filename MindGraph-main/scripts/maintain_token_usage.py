@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+Run token usage maintenance once: archive raw token_usage rows past
+TOKEN_USAGE_RETENTION_DAYS into per-month files, prune old hourly rollups
+and vacuum the database (what the server's daily scheduler does).
+
+Safe while the server is running: rows are copied before they are deleted,
+and deletes run in short batches.
+
+Usage:
+    python scripts/maintain_token_usage.py
+"""
+
+import logging
+import sys
+import time
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from config.database import engine, init_db
+from services.token_archive import TOKEN_USAGE_RETENTION_DAYS, run_maintenance
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    init_db()
+
+    started = time.perf_counter()
+    result = run_maintenance(engine)
+    vacuum = result['vacuum']
+    print(
+        f"Archived {result['archived_rows']} token_usage rows older than {TOKEN_USAGE_RETENTION_DAYS} days, "
+        f"pruned {result['pruned_hourly_rows']} hourly rollups"
+        + (f", vacuum {vacuum['mode']}: database {vacuum['size_mb']} MB" if vacuum else "")
+        + f" ({time.perf_counter() - started:.1f}s)"
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Rebuild the token usage rollup tables (token_usage_hourly / _daily / _monthly)
+from the raw token_usage table and its per-month archive files.
+
+The rollups are maintained incrementally by TokenTracker and backfilled once
+on startup; run this after editing token_usage by hand, or to repair the
+rollups for a range of days. Safe while the server is running: each month
+is rebuilt in its own transaction, so token writes wait for one month at most.
+
+Usage:
+    python scripts/rebuild_token_rollups.py                    # everything
+    python scripts/rebuild_token_rollups.py --since 2025-12-01 # from that day on
+"""
+
+import argparse
+import logging
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from config.database import engine, init_db
+from services.token_rollups import rebuild_rollups
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild token usage rollups from token_usage")
+    parser.add_argument('--since', type=datetime.fromisoformat, default=None,
+                        help="Only rebuild from this day (YYYY-MM-DD, UTC) on")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    init_db()  # Creates the rollup tables on databases that predate them
+
+    started = time.perf_counter()
+    counts = rebuild_rollups(engine, since=args.since)
+    print(
+        f"Rebuilt rollups from {counts['raw_rows']} token_usage rows: "
+        f"{counts['hourly_rows']} hourly, {counts['daily_rows']} daily, {counts['monthly_rows']} monthly "
+        f"({time.perf_counter() - started:.1f}s)"
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -6,7 +6,7 @@ This package contains internal services:
 - LLM Service: Centralized LLM client management and orchestration
 """
 
-from .browser import BrowserContextManager
+from .browser import BrowserContextManager, browser_pool
 
 # LLM Service imports (Phases 1-4 complete)
 from .llm_service import llm_service
@@ -17,6 +17,7 @@ from .performance_tracker import performance_tracker
 
 __all__ = [
     'BrowserContextManager',
+    'browser_pool',
     'llm_service',
     'client_manager',
     'error_handler',
@@ -0,0 +1,231 @@
+"""
+API Key Usage Accounting
+========================
+
+Write-behind usage counters for API keys, so a burst of API-key requests
+(DingTalk, Dify, integrators) does not take the SQLite write lock once per
+request.
+
+Reserve-then-settle:
+- reserve(): a request takes one unit of quota before it runs. Keys with a
+  quota lease units from the database in blocks with one conditional
+  UPDATE (usage_count + n <= quota_limit), so every worker together can
+  never admit more requests than the quota; the block shrinks to a single
+  unit as the remaining quota runs low
+- settle(): the unit is counted as used (last_used_at updated in memory);
+  unlimited keys just count
+- flush(): a background thread writes the pending deltas every
+  FLUSH_INTERVAL seconds in one transaction, returning unused leased units.
+  usage_count and last_used_at are at most one interval behind; leased
+  units show up in usage_count until they are used or returned
+
+@author lycosa9527
+@made_by MindSpring Team
+"""
+
+import logging
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from sqlalchemy import func, or_, update
+
+from models.auth import APIKey
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _KeyUsage:
+    """In-memory state of one key in this worker."""
+    lock: threading.Lock = field(default_factory=threading.Lock)
+    used: int = 0  # Settled units not yet written (unlimited keys)
+    leased: int = 0  # Units reserved in the database and not yet handed out
+    last_used_at: Optional[datetime] = None
+
+
+class APIKeyUsageTracker:
+    """
+    Per-worker usage counters with batched writes.
+
+    reserve()/settle() are called from the sync auth dependency (threadpool
+    threads), so state is guarded by threading locks and the flusher is a
+    daemon thread rather than an event loop task.
+    """
+
+    FLUSH_INTERVAL = 5.0  # Seconds between batched writes
+    MAX_LEASE = 50  # Largest block of quota leased at once
+    LEASE_DIVISOR = 20  # Lease at most 1/N of the remaining quota
+
+    def __init__(self):
+        self._keys: Dict[int, _KeyUsage] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+        self.leases = 0
+        self.rejections = 0
+        self.flushes = 0
+        self.flush_errors = 0
+
+    def _state(self, key_id: int) -> _KeyUsage:
+        with self._lock:
+            state = self._keys.get(key_id)
+            if state is None:
+                state = self._keys[key_id] = _KeyUsage()
+            return state
+
+    def _ensure_flusher(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name="api-key-usage", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.FLUSH_INTERVAL):
+            self.flush()
+
+    # ------------------------------------------------------------------
+    # Request path
+    # ------------------------------------------------------------------
+
+    def _lease_size(self, key_record: Dict[str, Any]) -> int:
+        remaining = key_record['quota_limit'] - (key_record['usage_count'] or 0)
+        return max(1, min(self.MAX_LEASE, remaining // self.LEASE_DIVISOR))
+
+    def _lease(self, key_id: int, units: int) -> bool:
+        """Atomically add units to usage_count unless that would pass the quota."""
+        from config.database import SessionLocal
+        db = SessionLocal()
+        try:
+            result = db.execute(
+                update(APIKey)
+                .where(
+                    APIKey.id == key_id,
+                    APIKey.is_active == True,
+                    or_(
+                        APIKey.quota_limit.is_(None),
+                        func.coalesce(APIKey.usage_count, 0) + units <= APIKey.quota_limit
+                    )
+                )
+                .values(usage_count=func.coalesce(APIKey.usage_count, 0) + units)
+            )
+            db.commit()
+            return result.rowcount == 1
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def reserve(self, key_record: Dict[str, Any]) -> bool:
+        """
+        Take one unit of quota for a request.
+
+        Args:
+            key_record: APIKey column snapshot (id, quota_limit, usage_count)
+
+        Returns:
+            False if the quota is used up
+        """
+        self._ensure_flusher()
+        if not key_record['quota_limit']:
+            return True
+        state = self._state(key_record['id'])
+        with state.lock:
+            if state.leased:
+                state.leased -= 1
+                return True
+            # usage_count in the snapshot may be stale: it only sizes the block
+            units = self._lease_size(key_record)
+            if not self._lease(key_record['id'], units):
+                units = 1 if units > 1 and self._lease(key_record['id'], 1) else 0
+            if not units:
+                self.rejections += 1
+                return False
+            self.leases += 1
+            state.leased += units - 1
+            return True
+
+    def settle(self, key_record: Dict[str, Any]) -> None:
+        """Count a reserved unit as used."""
+        state = self._state(key_record['id'])
+        with state.lock:
+            if not key_record['quota_limit']:
+                # Leased units are already in usage_count; only unlimited keys add here
+                state.used += 1
+            state.last_used_at = datetime.utcnow()
+
+    # ------------------------------------------------------------------
+    # Write-behind
+    # ------------------------------------------------------------------
+
+    def flush(self) -> int:
+        """Write pending usage and return unused leases; returns keys written."""
+        with self._lock:
+            states = list(self._keys.items())
+        batch = []
+        for key_id, state in states:
+            with state.lock:
+                if not (state.used or state.leased or state.last_used_at):
+                    continue
+                batch.append((key_id, state.used, state.leased, state.last_used_at, state))
+                state.used, state.leased, state.last_used_at = 0, 0, None
+        if not batch:
+            return 0
+
+        from config.database import SessionLocal
+        db = SessionLocal()
+        try:
+            for key_id, used, leased, last_used_at, _ in batch:
+                # Clamped: an admin may have reset usage_count while units were leased
+                values = {'usage_count': func.max(func.coalesce(APIKey.usage_count, 0) + used - leased, 0)}
+                if last_used_at:
+                    values['last_used_at'] = last_used_at
+                db.execute(update(APIKey).where(APIKey.id == key_id).values(**values))
+            db.commit()
+            self.flushes += 1
+            logger.debug(f"[APIKeyUsage] Flushed usage for {len(batch)} keys")
+            return len(batch)
+        except Exception as e:
+            db.rollback()
+            self.flush_errors += 1
+            logger.warning(f"[APIKeyUsage] Flush failed, retrying next interval: {e}")
+            # Put everything back: unreturned leases are still valid units
+            for key_id, used, leased, last_used_at, state in batch:
+                with state.lock:
+                    state.used += used
+                    state.leased += leased
+                    if last_used_at and (state.last_used_at is None or state.last_used_at < last_used_at):
+                        state.last_used_at = last_used_at
+            return 0
+        finally:
+            db.close()
+
+    def shutdown(self) -> None:
+        """Stop the flusher and write everything pending (called at shutdown)."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.FLUSH_INTERVAL)
+        self.flush()
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            states = list(self._keys.values())
+        return {
+            'keys': len(states),
+            'pending_units': sum(state.used for state in states),
+            'leased_units': sum(state.leased for state in states),
+            'leases': self.leases,
+            'rejections': self.rejections,
+            'flushes': self.flushes,
+            'flush_errors': self.flush_errors,
+        }
+
+
+# Singleton instance
+api_key_usage = APIKeyUsageTracker()
@@ -0,0 +1,129 @@
+"""
+Sync-to-Async Bridge
+====================
+
+Runs LLM Service coroutines from synchronous code (legacy concept map
+generation, LangChain sync paths) without creating a thread and an event
+loop per call.
+
+- From a worker thread (e.g. a ThreadPoolExecutor) while the app is
+  running: the coroutine is submitted to the main event loop, so it uses
+  the same pooled HTTP sessions and rate limiter as every other request
+- From the event loop thread itself (sync code called inside an async
+  endpoint), or when no main loop is registered: the coroutine runs on one
+  long-lived background loop thread. The caller still blocks until the
+  result is ready; only the per-call setup cost is gone
+
+@author lycosa9527
+@made_by MindSpring Team
+"""
+
+import asyncio
+import concurrent.futures
+import logging
+import threading
+from typing import Any, Awaitable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncBridge:
+    """
+    Thread-safe submit API: run(coro) from any thread, get the result back.
+    """
+
+    def __init__(self):
+        self._main_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+        self.main_loop_calls = 0
+        self.background_calls = 0
+        self.timeouts = 0
+
+    def set_main_loop(self, loop: Optional[asyncio.AbstractEventLoop]) -> None:
+        """Register the application event loop (called at startup; None at shutdown)."""
+        self._main_loop = loop
+
+    def _background_loop(self) -> asyncio.AbstractEventLoop:
+        """Start the background loop thread on first use."""
+        with self._lock:
+            if self._loop is None or self._loop.is_closed() or not self._thread.is_alive():
+                loop = asyncio.new_event_loop()
+                ready = threading.Event()
+
+                def _run():
+                    asyncio.set_event_loop(loop)
+                    loop.call_soon(ready.set)
+                    loop.run_forever()
+
+                thread = threading.Thread(target=_run, name="async-bridge", daemon=True)
+                thread.start()
+                ready.wait()
+                self._loop, self._thread = loop, thread
+                logger.debug("[AsyncBridge] Background event loop started")
+            return self._loop
+
+    def _target_loop(self) -> asyncio.AbstractEventLoop:
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        main = self._main_loop
+        if main is not None and main.is_running() and running is not main:
+            self.main_loop_calls += 1
+            return main
+        # Blocking the main loop on itself would deadlock: use the background loop
+        self.background_calls += 1
+        return self._background_loop()
+
+    def run(self, coro: Awaitable[Any], timeout: Optional[float] = None) -> Any:
+        """
+        Run a coroutine and block until it finishes.
+
+        Args:
+            coro: Coroutine to run
+            timeout: Seconds to wait (None waits indefinitely)
+
+        Returns:
+            The coroutine's result
+
+        Raises:
+            TimeoutError: If the coroutine does not finish in time (it is cancelled)
+            Exception: Whatever the coroutine raised
+        """
+        future = asyncio.run_coroutine_threadsafe(coro, self._target_loop())
+        try:
+            return future.result(timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            self.timeouts += 1
+            raise TimeoutError(f"Async call timed out after {timeout} seconds")
+
+    def shutdown(self) -> None:
+        """Stop the background loop thread (called at app shutdown)."""
+        self._main_loop = None
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            self._loop = self._thread = None
+        if loop is None:
+            return
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout=5.0)
+        if not thread.is_alive():
+            loop.close()
+        logger.debug("[AsyncBridge] Background event loop stopped")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get bridge statistics."""
+        return {
+            'main_loop_calls': self.main_loop_calls,
+            'background_calls': self.background_calls,
+            'timeouts': self.timeouts,
+            'background_loop_running': self._loop is not None and self._loop.is_running(),
+        }
+
+
+# Singleton instance
+async_bridge = AsyncBridge()
@@ -1,24 +1,33 @@
 """
 Browser Manager for MindGraph
 
-Simple browser manager that creates a fresh browser instance for each request.
-This approach ensures reliability and isolation between requests.
+Per-worker pool of long-lived Chromium browsers for PNG generation.
+Each request gets its own incognito context, which keeps requests isolated
+without paying for a driver start and browser launch on every export.
 
 Features:
-- Fresh browser instance per request
-- Automatic cleanup of browser resources
+- Warm browser pool with configurable size and bounded wait queue
+- Health checks on checkout, recycling after N renders or a memory ceiling
+- Fresh incognito context per request with automatic cleanup
+- Chromium executable resolved once at startup, versions cached on disk
 - Optimized browser configuration for PNG generation
-- Thread-safe operations
 - Support for offline Chromium installation (browsers/chromium/)
 """
 
+import asyncio
+import json
 import logging
 import os
 import platform
 import subprocess
 import re
+import threading
+import time
+from collections import deque
 from pathlib import Path
-from typing import Optional, Tuple
+from typing import Any, Dict, List, Optional, Tuple
+
+import psutil
 from playwright.async_api import async_playwright, Browser, BrowserContext
 
 logger = logging.getLogger(__name__)
@@ -218,13 +227,94 @@ def _get_local_chromium_executable():
     return str(exe_path) if exe_path.exists() else None
 
 
-def _get_best_chromium_executable() -> Optional[str]:
+# ============================================================================
+# CHROMIUM RESOLUTION CACHE
+# ============================================================================
+# Version probes launch a full browser through sync_playwright, so the choice
+# is made once per process (at startup, off the event loop) and the probed
+# versions are persisted on disk keyed by binary path + mtime. Later workers
+# and restarts reuse the cached versions without launching anything.
+
+_CHROMIUM_CACHE_FILE = Path(__file__).parent.parent / "data" / "chromium_cache.json"
+_resolution_lock = threading.Lock()
+_resolved = False
+_resolved_executable: Optional[str] = None
+_resolution_stats: Dict[str, Any] = {
+    'executable': None,
+    'version': None,
+    'source': None,
+    'resolve_ms': 0.0,
+    'version_probes': 0,
+    'version_cache_hits': 0,
+    'lookups_after_startup': 0
+}
+
+
+def _binary_cache_key(executable_path: str) -> Optional[str]:
+    """Cache key for a Chromium binary: path plus mtime and size."""
+    try:
+        st = os.stat(executable_path)
+        return f"{executable_path}|{st.st_mtime_ns}|{st.st_size}"
+    except OSError:
+        return None
+
+
+def _load_chromium_cache() -> Dict[str, Any]:
+    """Load the persisted Chromium version cache (empty dict if missing/corrupt)."""
+    try:
+        with open(_CHROMIUM_CACHE_FILE, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        return data if isinstance(data, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_chromium_cache(cache: Dict[str, Any]) -> None:
+    """Persist the Chromium version cache atomically."""
+    try:
+        _CHROMIUM_CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = _CHROMIUM_CACHE_FILE.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(cache, f, indent=2)
+        os.replace(tmp_path, _CHROMIUM_CACHE_FILE)
+    except OSError as e:
+        logger.debug(f"Could not persist Chromium cache: {e}")
+
+
+def _get_chromium_version_cached(executable_path: str, cache: Dict[str, Any]) -> Optional[str]:
     """
-    Get the best available Chromium executable, preferring newer version.
+    Get Chromium version, probing the binary only if it changed since the last probe.
+    
+    Args:
+        executable_path: Path to Chromium executable
+        cache: Loaded cache dict (updated in place)
+        
+    Returns:
+        Version string or None if it could not be determined
+    """
+    key = _binary_cache_key(executable_path)
+    versions = cache.setdefault('versions', {})
+    if key and key in versions:
+        _resolution_stats['version_cache_hits'] += 1
+        return versions[key] or None
+    
+    _resolution_stats['version_probes'] += 1
+    version = _get_chromium_version(executable_path)
+    if key:
+        versions[key] = version or ''
+    return version
+
+
+def _select_best_chromium(cache: Dict[str, Any]) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Pick the best available Chromium executable, preferring newer version.
     Compares local packed browser vs Playwright's managed browser.
     
+    Args:
+        cache: Loaded version cache (updated in place)
+    
     Returns:
-        str or None: Path to best Chromium executable, or None if not found
+        (executable path, version) - both None if no browser was found
     """
     local_chromium = _get_local_chromium_executable()
     playwright_chromium = _get_playwright_chromium_executable()
@@ -232,32 +322,32 @@ def _get_best_chromium_executable() -> Optional[str]:
     # If only one is available, use it
     if local_chromium and not playwright_chromium:
         logger.debug(f"Using local Chromium (Playwright browser not found): {local_chromium}")
-        return local_chromium
+        return local_chromium, None
     
     if playwright_chromium and not local_chromium:
         logger.debug(f"Using Playwright Chromium (local browser not found): {playwright_chromium}")
-        return playwright_chromium
+        return playwright_chromium, None
     
     # If neither is available, return None
     if not local_chromium and not playwright_chromium:
-        return None
+        return None, None
     
     # Both are available - compare versions
-    local_version = _get_chromium_version(local_chromium)
-    playwright_version = _get_chromium_version(playwright_chromium)
+    local_version = _get_chromium_version_cached(local_chromium, cache)
+    playwright_version = _get_chromium_version_cached(playwright_chromium, cache)
     
     if not local_version and not playwright_version:
         # Can't determine versions, prefer local (faster, no download needed)
         logger.debug(f"Using local Chromium (version check failed): {local_chromium}")
-        return local_chromium
+        return local_chromium, None
     
     if not local_version:
         logger.debug(f"Using Playwright Chromium (local version check failed): {playwright_chromium}")
-        return playwright_chromium
+        return playwright_chromium, playwright_version
     
     if not playwright_version:
         logger.debug(f"Using local Chromium (Playwright version check failed): {local_chromium}")
-        return local_chromium
+        return local_chromium, local_version
     
     # Check if one is a revision number (single number) and the other is a full version
     local_is_revision = '.' not in local_version
@@ -265,98 +355,449 @@ def _get_best_chromium_executable() -> Optional[str]:
     
     # If one is a revision and the other is a full version, prefer the full version
     # (revision numbers cannot be reliably compared to version numbers)
-    # (we can't reliably compare revision numbers to version numbers)
     if local_is_revision and not playwright_is_revision:
         logger.info(f"Using Playwright Chromium (v{playwright_version}) - has full version vs local revision {local_version}")
-        return playwright_chromium
+        return playwright_chromium, playwright_version
     
     if playwright_is_revision and not local_is_revision:
         logger.info(f"Using local Chromium (v{local_version}) - has full version vs Playwright revision {playwright_version}")
-        return local_chromium
+        return local_chromium, local_version
     
     # Both are either revisions or full versions - compare them
     comparison = _compare_versions(local_version, playwright_version)
     if comparison < 0:
         # Playwright version is newer
         logger.info(f"Using Playwright Chromium (v{playwright_version}) - newer than local (v{local_version})")
-        return playwright_chromium
+        return playwright_chromium, playwright_version
     elif comparison > 0:
         # Local version is newer (unlikely but possible)
         logger.info(f"Using local Chromium (v{local_version}) - newer than Playwright (v{playwright_version})")
-        return local_chromium
+        return local_chromium, local_version
     else:
         # Versions are equal, prefer local (faster, no download needed)
         logger.debug(f"Using local Chromium (v{local_version}) - same version as Playwright")
-        return local_chromium
+        return local_chromium, local_version
 
 
-class BrowserContextManager:
-    """Context manager that creates a fresh browser for each request"""
+def resolve_chromium_executable(force: bool = False) -> Optional[str]:
+    """
+    Resolve the Chromium executable once per process.
     
-    def __init__(self):
-        self.context = None
-        self.browser = None
-        self.playwright = None
+    Blocking (may start sync_playwright), so call it via asyncio.to_thread at
+    startup. Version probes are served from the on-disk cache when the binary
+    is unchanged.
     
-    async def __aenter__(self):
-        """Create fresh browser instance for this request"""
-        logger.debug("Creating fresh browser instance for PNG generation")
+    Args:
+        force: Re-resolve even if already resolved
         
-        self.playwright = await async_playwright().start()
+    Returns:
+        str or None: Path to Chromium executable (None lets Playwright pick its default)
+    """
+    global _resolved, _resolved_executable
+    with _resolution_lock:
+        if _resolved and not force:
+            return _resolved_executable
         
-        # Get best available Chromium (compares versions, prefers newer)
-        chromium_executable = _get_best_chromium_executable()
-        launch_options = {
-            'headless': True,
-            'args': [
-                '--no-sandbox',
-                '--disable-dev-shm-usage',
-                '--disable-gpu',
-                '--disable-web-security',
-                '--disable-features=VizDisplayCompositor',
-                '--memory-pressure-off',
-                '--max_old_space_size=4096',
-                '--disable-background-networking',
-                '--disable-background-timer-throttling',
-                '--disable-renderer-backgrounding',
-                '--disable-backgrounding-occluded-windows',
-                '--disable-ipc-flooding-protection'
-            ]
-        }
+        start = time.perf_counter()
+        probes_before = _resolution_stats['version_probes']
+        cache = _load_chromium_cache()
+        executable, version = _select_best_chromium(cache)
+        if _resolution_stats['version_probes'] != probes_before:
+            _save_chromium_cache(cache)
+        
+        _resolved_executable = executable
+        _resolved = True
+        _resolution_stats.update({
+            'executable': executable,
+            'version': version,
+            'source': 'probe' if _resolution_stats['version_probes'] != probes_before else 'disk_cache',
+            'resolve_ms': round((time.perf_counter() - start) * 1000, 1)
+        })
+        logger.info(
+            f"[Browser] Chromium resolved in {_resolution_stats['resolve_ms']}ms "
+            f"(source={_resolution_stats['source']}, "
+            f"probes={_resolution_stats['version_probes'] - probes_before}): {executable or 'playwright default'}"
+        )
+        return executable
+
+
+def _get_best_chromium_executable() -> Optional[str]:
+    """
+    Get the resolved Chromium executable (resolves on first call).
+    
+    Returns:
+        str or None: Path to best Chromium executable, or None if not found
+    """
+    if _resolved:
+        _resolution_stats['lookups_after_startup'] += 1
+        return _resolved_executable
+    return resolve_chromium_executable()
+
+
+def get_chromium_resolution_stats() -> Dict[str, Any]:
+    """Startup resolution timing and probe counters (probes stay flat after startup)."""
+    return dict(_resolution_stats, resolved=_resolved)
+
+
+# Chromium flags shared by every pooled browser
+_LAUNCH_ARGS = [
+    '--no-sandbox',
+    '--disable-dev-shm-usage',
+    '--disable-gpu',
+    '--disable-web-security',
+    '--disable-features=VizDisplayCompositor',
+    '--memory-pressure-off',
+    '--max_old_space_size=4096',
+    '--disable-background-networking',
+    '--disable-background-timer-throttling',
+    '--disable-renderer-backgrounding',
+    '--disable-backgrounding-occluded-windows',
+    '--disable-ipc-flooding-protection'
+]
+
+
+class BrowserPoolBusyError(Exception):
+    """Raised when the export wait queue is full or a browser could not be leased in time."""
+    pass
+
+
+class _PooledBrowser:
+    """A long-lived Chromium instance owned by the pool."""
+    
+    def __init__(self, browser: Browser, root_pids: List[int]):
+        self.browser = browser
+        self.root_pids = root_pids
+        self.render_count = 0
+        self.created_at = time.time()
+    
+    def is_healthy(self) -> bool:
+        """Check that the browser process is still connected."""
+        try:
+            return self.browser.is_connected()
+        except Exception:
+            return False
+    
+    def memory_mb(self) -> float:
+        """Resident memory of this browser's process tree in MB (0 if unknown)."""
+        total = 0
+        for pid in self.root_pids:
+            try:
+                proc = psutil.Process(pid)
+                total += proc.memory_info().rss
+                for child in proc.children(recursive=True):
+                    try:
+                        total += child.memory_info().rss
+                    except (psutil.NoSuchProcess, psutil.AccessDenied):
+                        pass
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                pass
+        return total / (1024 * 1024)
+
+
+class BrowserPool:
+    """
+    Per-worker pool of long-lived Chromium browsers.
+    
+    Each export leases one browser and gets its own incognito BrowserContext,
+    so requests stay isolated while skipping the driver start and Chromium
+    launch. Browsers are health-checked on checkout and recycled after
+    max_renders renders or when their process tree exceeds max_memory_mb.
+    Waiters beyond max_queue are rejected with BrowserPoolBusyError.
+    """
+    
+    def __init__(
+        self,
+        size: int = 2,
+        max_renders: int = 200,
+        max_memory_mb: int = 1024,
+        max_queue: int = 20,
+        acquire_timeout: float = 30.0
+    ):
+        self.size = size
+        self.max_renders = max_renders
+        self.max_memory_mb = max_memory_mb
+        self.max_queue = max_queue
+        self.acquire_timeout = acquire_timeout
         
-        if chromium_executable:
-            logger.debug(f"Using Chromium executable: {chromium_executable}")
-            launch_options['executable_path'] = chromium_executable
+        self._playwright = None
+        self._idle: deque = deque()
+        self._in_use = 0
+        self._waiting = 0
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._launch_lock: Optional[asyncio.Lock] = None
+        self._closed = False
         
-        self.browser = await self.playwright.chromium.launch(**launch_options)
+        # Statistics
+        self._total_leases = 0
+        self._total_launches = 0
+        self._total_rejected = 0
+        self._recycles = {'max_renders': 0, 'memory': 0, 'unhealthy': 0, 'error': 0}
+        self._wait_times = deque(maxlen=200)
+        self._lease_times = deque(maxlen=200)
+    
+    def configure(
+        self,
+        size: int,
+        max_renders: int,
+        max_memory_mb: int,
+        max_queue: int,
+        acquire_timeout: float
+    ) -> None:
+        """Apply settings before the pool is started."""
+        if self._slots is not None:
+            logger.warning("[BrowserPool] Already started, configuration ignored")
+            return
+        self.size = size
+        self.max_renders = max_renders
+        self.max_memory_mb = max_memory_mb
+        self.max_queue = max_queue
+        self.acquire_timeout = acquire_timeout
+    
+    def _ensure_primitives(self) -> None:
+        """Create asyncio primitives lazily (must run inside the event loop)."""
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.size)
+            self._launch_lock = asyncio.Lock()
+    
+    async def start(self, prewarm: int = 1) -> None:
+        """
+        Start the Playwright driver and launch prewarm browsers.
         
-        # Create fresh context with high resolution for crisp PNG output
-        self.context = await self.browser.new_context(
-            viewport={'width': 1200, 'height': 800},
-            device_scale_factor=3,  # 3x for high-DPI displays (Retina quality)
-            user_agent='MindGraph/2.0 (PNG Generator)'
+        Args:
+            prewarm: Number of browsers to launch up front (capped at pool size)
+        """
+        self._ensure_primitives()
+        self._closed = False
+        # Resolve the executable off the event loop (version probes are blocking)
+        await asyncio.to_thread(resolve_chromium_executable)
+        for _ in range(min(prewarm, self.size) - len(self._idle)):
+            self._idle.append(await self._launch())
+        logger.info(f"[BrowserPool] Started: size={self.size}, warm={len(self._idle)}")
+    
+    async def _launch(self) -> _PooledBrowser:
+        """Launch one Chromium process and record its PIDs for memory accounting."""
+        async with self._launch_lock:
+            if self._playwright is None:
+                self._playwright = await async_playwright().start()
+            
+            launch_options = {'headless': True, 'args': list(_LAUNCH_ARGS)}
+            if _resolved:
+                chromium_executable = _get_best_chromium_executable()
+            else:
+                chromium_executable = await asyncio.to_thread(resolve_chromium_executable)
+            if chromium_executable:
+                logger.debug(f"Using Chromium executable: {chromium_executable}")
+                launch_options['executable_path'] = chromium_executable
+            
+            me = psutil.Process()
+            before = {p.pid for p in me.children(recursive=True)}
+            browser = await self._playwright.chromium.launch(**launch_options)
+            new_procs = [p for p in me.children(recursive=True) if p.pid not in before]
+            new_pids = {p.pid for p in new_procs}
+            root_pids = []
+            for proc in new_procs:
+                try:
+                    if proc.ppid() not in new_pids:
+                        root_pids.append(proc.pid)
+                except psutil.NoSuchProcess:
+                    pass
+            
+            self._total_launches += 1
+            logger.debug(f"[BrowserPool] Launched browser (pids={root_pids})")
+            return _PooledBrowser(browser, root_pids)
+    
+    async def _discard(self, pooled: _PooledBrowser, reason: str) -> None:
+        """Close a browser and count the recycle reason."""
+        self._recycles[reason] = self._recycles.get(reason, 0) + 1
+        logger.debug(
+            f"[BrowserPool] Recycling browser ({reason}) after {pooled.render_count} renders"
         )
+        try:
+            await pooled.browser.close()
+        except Exception as e:
+            logger.debug(f"[BrowserPool] Error closing browser: {e}")
+    
+    async def acquire(self) -> _PooledBrowser:
+        """
+        Lease a healthy browser, waiting in FIFO order for a free slot.
+        
+        Raises:
+            BrowserPoolBusyError: If the wait queue is full or the wait times out
+        """
+        self._ensure_primitives()
+        if self._closed:
+            raise BrowserPoolBusyError("Browser pool is shut down")
+        
+        if self._slots.locked() and self._waiting >= self.max_queue:
+            self._total_rejected += 1
+            raise BrowserPoolBusyError(
+                f"PNG export queue full ({self._waiting} waiting, {self._in_use} rendering)"
+            )
+        
+        wait_start = time.perf_counter()
+        self._waiting += 1
+        try:
+            await asyncio.wait_for(self._slots.acquire(), timeout=self.acquire_timeout)
+        except asyncio.TimeoutError:
+            self._total_rejected += 1
+            raise BrowserPoolBusyError(
+                f"No browser available within {self.acquire_timeout:.0f}s"
+            )
+        finally:
+            self._waiting -= 1
+        self._wait_times.append(time.perf_counter() - wait_start)
+        
+        try:
+            pooled = None
+            while self._idle:
+                candidate = self._idle.popleft()
+                if candidate.is_healthy():
+                    pooled = candidate
+                    break
+                await self._discard(candidate, 'unhealthy')
+            if pooled is None:
+                pooled = await self._launch()
+        except BaseException:
+            self._slots.release()
+            raise
+        
+        self._in_use += 1
+        self._total_leases += 1
+        return pooled
+    
+    async def release(self, pooled: _PooledBrowser, lease_seconds: float, failed: bool = False) -> None:
+        """
+        Return a leased browser, recycling it if it is worn out or broken.
+        
+        Args:
+            pooled: Browser returned by acquire()
+            lease_seconds: Time the caller held the browser (export latency)
+            failed: True if the render raised, so the browser is health-checked
+        """
+        pooled.render_count += 1
+        self._lease_times.append(lease_seconds)
+        try:
+            if self._closed:
+                await self._discard(pooled, 'error')
+            elif not pooled.is_healthy():
+                await self._discard(pooled, 'unhealthy' if not failed else 'error')
+            elif pooled.render_count >= self.max_renders:
+                await self._discard(pooled, 'max_renders')
+            elif self.max_memory_mb > 0 and pooled.memory_mb() > self.max_memory_mb:
+                await self._discard(pooled, 'memory')
+            else:
+                self._idle.append(pooled)
+        finally:
+            self._in_use -= 1
+            self._slots.release()
+    
+    async def close(self) -> None:
+        """Close all idle browsers and stop the Playwright driver (app shutdown)."""
+        self._closed = True
+        while self._idle:
+            pooled = self._idle.popleft()
+            try:
+                await pooled.browser.close()
+            except Exception:
+                pass
+        if self._playwright:
+            try:
+                await self._playwright.stop()
+            except Exception:
+                pass
+            self._playwright = None
+        logger.info("[BrowserPool] Closed")
+    
+    @staticmethod
+    def _percentile(values: List[float], pct: float) -> float:
+        if not values:
+            return 0.0
+        ordered = sorted(values)
+        index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+        return ordered[index]
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get pool occupancy and export latency statistics."""
+        lease_times = list(self._lease_times)
+        wait_times = list(self._wait_times)
+        return {
+            'size': self.size,
+            'idle': len(self._idle),
+            'in_use': self._in_use,
+            'waiting': self._waiting,
+            'max_queue': self.max_queue,
+            'occupancy_percent': round(self._in_use / self.size * 100, 1) if self.size else 0.0,
+            'total_leases': self._total_leases,
+            'total_launches': self._total_launches,
+            'total_rejected': self._total_rejected,
+            'recycles': dict(self._recycles),
+            'chromium': get_chromium_resolution_stats(),
+            'idle_memory_mb': round(sum(p.memory_mb() for p in self._idle), 1),
+            'export_latency': {
+                'samples': len(lease_times),
+                'avg': round(sum(lease_times) / len(lease_times), 3) if lease_times else 0.0,
+                'p50': round(self._percentile(lease_times, 50), 3),
+                'p95': round(self._percentile(lease_times, 95), 3),
+                'max': round(max(lease_times), 3) if lease_times else 0.0
+            },
+            'queue_wait': {
+                'avg': round(sum(wait_times) / len(wait_times), 3) if wait_times else 0.0,
+                'p95': round(self._percentile(wait_times, 95), 3)
+            }
+        }
+
+
+# Per-worker pool (configured and warmed in the app lifespan)
+browser_pool = BrowserPool()
+
+
+class BrowserContextManager:
+    """Context manager that leases a pooled browser and opens a fresh incognito context"""
+    
+    def __init__(self):
+        self.context = None
+        self._pooled = None
+        self._lease_start = 0.0
+    
+    async def __aenter__(self):
+        """Lease a warm browser and create an isolated context for this request"""
+        self._pooled = await browser_pool.acquire()
+        self._lease_start = time.perf_counter()
         
-        logger.debug(f"Fresh browser context created - type: {type(self.context)}, id: {id(self.context)}")
+        try:
+            # Create fresh context with high resolution for crisp PNG output
+            self.context = await self._pooled.browser.new_context(
+                viewport={'width': 1200, 'height': 800},
+                device_scale_factor=3,  # 3x for high-DPI displays (Retina quality)
+                user_agent='MindGraph/2.0 (PNG Generator)'
+            )
+        except BaseException:
+            await browser_pool.release(self._pooled, time.perf_counter() - self._lease_start, failed=True)
+            self._pooled = None
+            raise
+        
+        logger.debug(f"Browser context created - id: {id(self.context)}")
         return self.context
     
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        """Clean up browser resources"""
+        """Close the request's context and return the browser to the pool"""
         if self.context:
-            await self.context.close()
+            try:
+                await self.context.close()
+            except Exception as e:
+                logger.debug(f"Error closing browser context: {e}")
             self.context = None
         
-        if self.browser:
-            await self.browser.close()
-            self.browser = None
-            
-        if self.playwright:
-            await self.playwright.stop()
-            self.playwright = None
+        if self._pooled:
+            await browser_pool.release(
+                self._pooled,
+                time.perf_counter() - self._lease_start,
+                failed=exc_type is not None
+            )
+            self._pooled = None
         
-        logger.debug("Fresh browser instance cleaned up")
+        logger.debug("Browser context closed, browser returned to pool")
 
 # Only log from main worker to avoid duplicate messages
-import os
 if os.getenv('UVICORN_WORKER_ID') is None or os.getenv('UVICORN_WORKER_ID') == '0':
     logger.debug("Browser manager module loaded")
@@ -17,10 +17,12 @@ Session management remains in agents (CircleMapThinkingAgent, etc.)
 @made_by MindSpring Team
 """
 
+import asyncio
 import logging
 from typing import Dict, Optional, Any
 from threading import Lock
 
+from clients.http_pool import http_pool
 from clients.llm import (
     QwenClient,
     DeepSeekClient,
@@ -62,6 +64,20 @@ class ClientManager:
             logger.debug("[ClientManager] Initializing LLM clients...")
             
             try:
+                # Shared keep-alive connection pool for Dashscope clients
+                http_pool.configure(
+                    limit=config.LLM_HTTP_POOL_LIMIT,
+                    limit_per_host=config.LLM_HTTP_POOL_LIMIT_PER_HOST,
+                    keepalive_timeout=config.LLM_HTTP_KEEPALIVE_SECONDS,
+                    dns_cache_ttl=config.LLM_HTTP_DNS_TTL
+                )
+                try:
+                    asyncio.get_running_loop()
+                    http_pool.get_session('dashscope')
+                except RuntimeError:
+                    # No loop yet (sync startup); created on first request
+                    pass
+                
                 # Initialize Qwen clients (two instances for different purposes)
                 self._clients['qwen'] = QwenClient('generation')
                 self._clients['qwen-turbo'] = QwenClient('classification')
@@ -133,6 +149,10 @@ class ClientManager:
         """Get list of available model names."""
         return list(self._clients.keys())
     
+    def get_http_pool_stats(self) -> Dict[str, Any]:
+        """Get pooled HTTP connection reuse statistics."""
+        return http_pool.get_stats()
+    
     def cleanup(self) -> None:
         """
         Cleanup all clients (called during shutdown).
@@ -141,6 +161,8 @@ class ClientManager:
         with self._lock:
             self._clients.clear()
             self._initialized = False
+        # Closes are scheduled on each session's loop; await http_pool.wait_closed() to drain
+        http_pool.close_all()
         logger.debug("[ClientManager] Cleanup complete")
     
     @property
@@ -11,7 +11,7 @@ Maps error codes and messages to proper exception types with user-friendly messa
 
 import re
 import logging
-from typing import Dict, Optional, Tuple
+from typing import Dict, Mapping, Optional, Tuple
 from services.error_handler import (
     LLMServiceError,
     LLMTimeoutError,
@@ -22,7 +22,8 @@ from services.error_handler import (
     LLMInvalidParameterError,
     LLMQuotaExhaustedError,
     LLMModelNotFoundError,
-    LLMAccessDeniedError
+    LLMAccessDeniedError,
+    parse_retry_after
 )
 
 logger = logging.getLogger(__name__)
@@ -457,7 +458,12 @@ def parse_dashscope_error(
     ), user_msg
 
 
-def parse_and_raise_dashscope_error(status_code: int, error_text: str, error_data: Optional[Dict] = None):
+def parse_and_raise_dashscope_error(
+    status_code: int,
+    error_text: str,
+    error_data: Optional[Dict] = None,
+    headers: Optional[Mapping[str, str]] = None
+):
     """
     Parse DashScope error and raise appropriate exception.
     
@@ -465,6 +471,7 @@ def parse_and_raise_dashscope_error(status_code: int, error_text: str, error_dat
         status_code: HTTP status code
         error_text: Raw error text
         error_data: Parsed error JSON (optional)
+        headers: Response headers, for the Retry-After hint (optional)
         
     Raises:
         Appropriate exception based on error type
@@ -485,5 +492,9 @@ def parse_and_raise_dashscope_error(status_code: int, error_text: str, error_dat
     # Attach user-friendly message to exception
     exception.user_message = user_message
     
+    # Provider backoff hint, honored by ErrorHandler.with_retry
+    if isinstance(exception, LLMRateLimitError):
+        exception.retry_after = parse_retry_after(headers)
+    
     raise exception
 
@@ -13,7 +13,7 @@ Reference: https://www.volcengine.com/docs/82379/1299023?lang=zh
 
 import re
 import logging
-from typing import Dict, Optional, Tuple
+from typing import Dict, Mapping, Optional, Tuple
 from services.error_handler import (
     LLMServiceError,
     LLMTimeoutError,
@@ -23,7 +23,8 @@ from services.error_handler import (
     LLMInvalidParameterError,
     LLMQuotaExhaustedError,
     LLMModelNotFoundError,
-    LLMAccessDeniedError
+    LLMAccessDeniedError,
+    parse_retry_after
 )
 
 logger = logging.getLogger(__name__)
@@ -336,7 +337,12 @@ def parse_doubao_error(
     ), user_msg
 
 
-def parse_and_raise_doubao_error(error_code: str, error_message: str, status_code: Optional[int] = None):
+def parse_and_raise_doubao_error(
+    error_code: str,
+    error_message: str,
+    status_code: Optional[int] = None,
+    headers: Optional[Mapping[str, str]] = None
+):
     """
     Parse Doubao error and raise appropriate exception.
     
@@ -344,6 +350,7 @@ def parse_and_raise_doubao_error(error_code: str, error_message: str, status_cod
         error_code: Error code from API response
         error_message: Error message from API response
         status_code: HTTP status code (optional)
+        headers: Response headers, for the Retry-After hint (optional)
         
     Raises:
         Appropriate exception based on error type
@@ -364,5 +371,9 @@ def parse_and_raise_doubao_error(error_code: str, error_message: str, status_cod
     # Attach user-friendly message to exception
     exception.user_message = user_message
     
+    # Provider backoff hint, honored by ErrorHandler.with_retry
+    if isinstance(exception, LLMRateLimitError):
+        exception.retry_after = parse_retry_after(headers)
+    
     raise exception
 
@@ -10,7 +10,9 @@ Provides retry logic, exponential backoff, and error handling for LLM calls.
 
 import asyncio
 import logging
-from typing import Callable, Any, Optional, TypeVar
+import time
+from email.utils import parsedate_to_datetime
+from typing import Callable, Any, Mapping, Optional, TypeVar
 from functools import wraps
 
 logger = logging.getLogger(__name__)
@@ -35,7 +37,9 @@ class LLMValidationError(LLMServiceError):
 
 class LLMRateLimitError(LLMServiceError):
     """Raised when API rate limit is exceeded."""
-    pass
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after  # Provider backoff hint in seconds (Retry-After)
 
 
 class LLMContentFilterError(LLMServiceError):
@@ -74,6 +78,32 @@ class LLMAccessDeniedError(LLMProviderError):
     pass
 
 
+def parse_retry_after(headers: Optional[Mapping[str, str]]) -> Optional[float]:
+    """
+    Read a provider backoff hint from response headers.
+    
+    Supports Retry-After (delta-seconds or HTTP date) and retry-after-ms.
+    
+    Returns:
+        Seconds to wait, or None if no usable hint
+    """
+    if not headers:
+        return None
+    try:
+        value = headers.get('retry-after-ms') or headers.get('Retry-After-Ms')
+        if value:
+            return max(0.0, float(value) / 1000)
+        value = headers.get('Retry-After') or headers.get('retry-after')
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError, AttributeError):
+        return None
+
+
 class ErrorHandler:
     """
     Handles errors and retries for LLM API calls.
@@ -82,6 +112,7 @@ class ErrorHandler:
     DEFAULT_MAX_RETRIES = 3
     DEFAULT_BASE_DELAY = 1.0  # seconds
     DEFAULT_MAX_DELAY = 10.0  # seconds
+    MAX_RATE_LIMIT_DELAY = 60.0  # seconds, cap for provider Retry-After hints
     
     @staticmethod
     async def with_retry(
@@ -90,6 +121,7 @@ class ErrorHandler:
         max_retries: int = DEFAULT_MAX_RETRIES,
         base_delay: float = DEFAULT_BASE_DELAY,
         max_delay: float = DEFAULT_MAX_DELAY,
+        timeout: Optional[float] = None,
         **kwargs
     ) -> Any:
         """
@@ -101,20 +133,36 @@ class ErrorHandler:
             max_retries: Maximum number of retry attempts
             base_delay: Initial delay between retries (seconds)
             max_delay: Maximum delay between retries (seconds)
+            timeout: Time budget (seconds) shared by all attempts and backoff
+                sleeps; each attempt gets what is left of it
             **kwargs: Keyword arguments for func
             
         Returns:
             Result from successful function call
             
         Raises:
-            LLMServiceError: If all retries fail
+            LLMServiceError: If all retries fail or the time budget runs out
         """
         last_exception = None
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout if timeout is not None else None
+        
+        def _budget_allows(delay: float) -> bool:
+            """Whether sleeping delay seconds still leaves time for another attempt."""
+            if deadline is None or loop.time() + delay < deadline:
+                return True
+            logger.warning(f"[ErrorHandler] Not retrying: {delay:.1f}s backoff exceeds the {timeout}s budget")
+            return False
         
+        attempts = 0
         for attempt in range(max_retries):
+            attempts += 1
             try:
                 logger.debug(f"[ErrorHandler] Attempt {attempt + 1}/{max_retries}")
-                result = await func(*args, **kwargs)
+                if deadline is None:
+                    result = await func(*args, **kwargs)
+                else:
+                    result = await asyncio.wait_for(func(*args, **kwargs), timeout=deadline - loop.time())
                 
                 if attempt > 0:
                     logger.info(f"[ErrorHandler] Succeeded on attempt {attempt + 1}")
@@ -140,8 +188,14 @@ class ErrorHandler:
                 last_exception = e
                 logger.warning(f"[ErrorHandler] Rate limited on attempt {attempt + 1}: {e}")
                 if attempt < max_retries - 1:
-                    # Longer delays for rate limits: 5s, 10s, 20s
-                    delay = min(5.0 * (2 ** attempt), 30.0)
+                    if e.retry_after is not None:
+                        # Provider told us when to come back
+                        delay = min(e.retry_after, ErrorHandler.MAX_RATE_LIMIT_DELAY)
+                    else:
+                        # Longer delays for rate limits: 5s, 10s, 20s
+                        delay = min(5.0 * (2 ** attempt), 30.0)
+                    if not _budget_allows(delay):
+                        break
                     logger.debug(f"[ErrorHandler] Rate limit retry in {delay:.1f}s...")
                     await asyncio.sleep(delay)
                 continue  # Skip normal delay calculation
@@ -154,11 +208,13 @@ class ErrorHandler:
             if attempt < max_retries - 1:
                 # Exponential backoff: 1s, 2s, 4s, 8s, ...
                 delay = min(base_delay * (2 ** attempt), max_delay)
+                if not _budget_allows(delay):
+                    break
                 logger.debug(f"[ErrorHandler] Retrying in {delay:.1f}s...")
                 await asyncio.sleep(delay)
         
         # All retries failed
-        error_msg = f"All {max_retries} attempts failed. Last error: {last_exception}"
+        error_msg = f"All {attempts} attempts failed. Last error: {last_exception}"
         logger.error(f"[ErrorHandler] {error_msg}")
         raise LLMServiceError(error_msg) from last_exception
     
@@ -12,7 +12,7 @@ Reference: https://cloud.tencent.cn/document/product/1729/101847
 """
 
 import logging
-from typing import Dict, Optional, Tuple
+from typing import Dict, Mapping, Optional, Tuple
 from services.error_handler import (
     LLMServiceError,
     LLMTimeoutError,
@@ -22,7 +22,8 @@ from services.error_handler import (
     LLMInvalidParameterError,
     LLMQuotaExhaustedError,
     LLMModelNotFoundError,
-    LLMAccessDeniedError
+    LLMAccessDeniedError,
+    parse_retry_after
 )
 
 logger = logging.getLogger(__name__)
@@ -346,7 +347,12 @@ def parse_hunyuan_error(
     ), user_msg
 
 
-def parse_and_raise_hunyuan_error(error_code: str, error_message: str, status_code: Optional[int] = None):
+def parse_and_raise_hunyuan_error(
+    error_code: str,
+    error_message: str,
+    status_code: Optional[int] = None,
+    headers: Optional[Mapping[str, str]] = None
+):
     """
     Parse Hunyuan error and raise appropriate exception.
     
@@ -354,6 +360,7 @@ def parse_and_raise_hunyuan_error(error_code: str, error_message: str, status_co
         error_code: Error code from API response
         error_message: Error message from API response
         status_code: HTTP status code (optional)
+        headers: Response headers, for the Retry-After hint (optional)
         
     Raises:
         Appropriate exception based on error type
@@ -374,5 +381,9 @@ def parse_and_raise_hunyuan_error(error_code: str, error_message: str, status_co
     # Attach user-friendly message to exception
     exception.user_message = user_message
     
+    # Provider backoff hint, honored by ErrorHandler.with_retry
+    if isinstance(exception, LLMRateLimitError):
+        exception.retry_after = parse_retry_after(headers)
+    
     raise exception
 
@@ -9,12 +9,16 @@ Based on concept-map-new-master/llm/introduction-service.js
 """
 
 import logging
+import re
 from typing import Dict, Optional, AsyncGenerator
 
 from services.llm_service import llm_service
 
 logger = logging.getLogger(__name__)
 
+# Line break, or the end of a zh/en sentence (an English period only once the next character is in)
+_SENTENCE_BOUNDARY = re.compile(r'\n|[。！？!?]|\.(?=\s)')
+
 
 class IntroductionService:
     """
@@ -156,6 +160,51 @@ class IntroductionService:
             logger.error(f"[IntroductionService] Stream generation failed: {e}")
             yield ""
     
+    async def generate_introduction_paragraphs(
+        self,
+        keyword: str,
+        language: str = 'zh',
+        model: str = 'qwen',
+        max_sentences: int = 4
+    ) -> AsyncGenerator[str, None]:
+        """
+        Stream introduction text as completed paragraphs.
+        
+        The stream is read sentence by sentence. A paragraph ends at a line
+        break, or after max_sentences sentences so that a model writing one
+        long paragraph still hands text over early.
+        
+        Args:
+            keyword: Focus question keyword
+            language: Language ('zh' or 'en')
+            model: LLM model to use (default: 'qwen')
+            max_sentences: Sentences after which an unfinished paragraph is yielded
+            
+        Yields:
+            Paragraph text, stripped
+        """
+        separator = '' if language == 'zh' else ' '
+        pending = ""
+        sentences = []
+        
+        async for chunk in self.generate_introduction_stream(keyword, language=language, model=model):
+            pending += chunk
+            while True:
+                match = _SENTENCE_BOUNDARY.search(pending)
+                if not match:
+                    break
+                sentence, pending = pending[:match.end()].strip(), pending[match.end():]
+                if sentence:
+                    sentences.append(sentence)
+                if sentences and (match.group(0) == '\n' or len(sentences) >= max_sentences):
+                    yield separator.join(sentences)
+                    sentences = []
+        
+        if pending.strip():
+            sentences.append(pending.strip())
+        if sentences:
+            yield separator.join(sentences)
+    
     def _build_system_prompt(self, keyword: str, language: str) -> str:
         """Build system prompt for introduction generation."""
         if language == 'zh':
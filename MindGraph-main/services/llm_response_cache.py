@@ -0,0 +1,342 @@
+"""
+LLM Response Cache
+==================
+
+Exact-match cache for LLMService.chat responses. Identical requests (same
+model, system message, prompt, temperature, max_tokens and extra params)
+within the TTL are answered without a provider round-trip.
+
+- Memory tier: per-worker LRU bounded by entry count
+- Shared tier (optional): SQLite database (data/llm_response_cache.db, WAL
+  mode) so a response generated by one uvicorn worker serves all of them
+- Requests above the temperature threshold, or with no explicit
+  temperature, bypass the cache: they ask for varied output
+
+Disabled by default (LLM_CACHE_ENABLED).
+
+@author lycosa9527
+@made_by MindSpring Team
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DB_PATH = Path("data") / "llm_response_cache.db"
+
+
+def make_cache_key(
+    model: str,
+    prompt: str,
+    system_message: Optional[str],
+    temperature: Optional[float],
+    max_tokens: int,
+    extra: Optional[Dict[str, Any]] = None
+) -> str:
+    """Stable hash of everything that determines the response."""
+    canonical = json.dumps(
+        {
+            'model': model,
+            'system': system_message or '',
+            'prompt': prompt,
+            'temperature': temperature,
+            'max_tokens': max_tokens,
+            'extra': extra or {},
+        },
+        sort_keys=True,
+        ensure_ascii=False,
+        separators=(',', ':'),
+        default=str
+    )
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+class SQLiteResponseCacheStore:
+    """
+    Cross-process response cache table in SQLite.
+
+    All methods are blocking; callers run them via asyncio.to_thread.
+    """
+
+    # Prune expired rows and enforce max_entries every N writes
+    PRUNE_EVERY = 100
+
+    def __init__(self, db_path: Path = DEFAULT_DB_PATH, max_entries: int = 10000):
+        self.db_path = Path(db_path)
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._conn = self._connect()
+
+    def _connect(self) -> sqlite3.Connection:
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(
+            str(self.db_path),
+            timeout=5.0,
+            isolation_level=None,
+            check_same_thread=False
+        )
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA busy_timeout=5000")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache ("
+            " key TEXT PRIMARY KEY,"
+            " content TEXT NOT NULL,"
+            " usage TEXT,"
+            " expires_at REAL NOT NULL,"
+            " last_access REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_last_access ON llm_cache(last_access)")
+        return conn
+
+    def get(self, key: str, now: float) -> Optional[Tuple[str, Dict[str, Any], float]]:
+        """Return (content, usage, expires_at) for a live entry."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT content, usage, expires_at FROM llm_cache WHERE key = ? AND expires_at > ?",
+                (key, now)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE llm_cache SET last_access = ? WHERE key = ?", (now, key))
+        content, usage, expires_at = row
+        return content, json.loads(usage) if usage else {}, expires_at
+
+    def put(self, key: str, content: str, usage: Dict[str, Any], expires_at: float, now: float) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, content, usage, expires_at, last_access)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (key, content, json.dumps(usage or {}), expires_at, now)
+            )
+            self._writes += 1
+            if self._writes % self.PRUNE_EVERY == 0:
+                self._prune(now)
+
+    def _prune(self, now: float) -> None:
+        """Drop expired rows, then least recently used rows above max_entries."""
+        self._conn.execute("DELETE FROM llm_cache WHERE expires_at <= ?", (now,))
+        self._conn.execute(
+            "DELETE FROM llm_cache WHERE key IN ("
+            " SELECT key FROM llm_cache ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,)
+        )
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_cache")
+
+    def close(self) -> None:
+        with self._lock:
+            try:
+                self._conn.close()
+            except Exception:
+                pass
+
+
+class LLMResponseCache:
+    """
+    Two-tier exact-match cache for chat responses.
+
+    Shared-tier errors are logged and counted, never raised: a cache
+    failure falls through to a normal LLM call.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = False,
+        ttl_seconds: float = 3600.0,
+        max_entries: int = 1000,
+        max_temperature: float = 0.5,
+        store: Optional[SQLiteResponseCacheStore] = None
+    ):
+        self.enabled = enabled
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_temperature = max_temperature
+        self._store = store
+        self._memory: "OrderedDict[str, Tuple[float, str, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.memory_hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self.stores = 0
+        self.evictions = 0
+        self.tokens_saved = 0
+        self.store_errors = 0
+
+    def configure(
+        self,
+        enabled: bool,
+        ttl_seconds: float,
+        max_entries: int,
+        max_temperature: float,
+        shared: bool = False,
+        db_path: Path = DEFAULT_DB_PATH,
+        shared_max_entries: int = 10000
+    ) -> None:
+        """Apply settings (called at startup)."""
+        self.enabled = enabled
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_temperature = max_temperature
+        if self._store:
+            self._store.close()
+            self._store = None
+        if enabled and shared:
+            try:
+                self._store = SQLiteResponseCacheStore(db_path=db_path, max_entries=shared_max_entries)
+            except Exception as e:
+                logger.warning(f"[LLMResponseCache] Shared tier unavailable, using memory only: {e}")
+        logger.debug(
+            f"[LLMResponseCache] enabled={enabled}, ttl={ttl_seconds}s, max_entries={max_entries}, "
+            f"max_temperature={max_temperature}, shared={self._store is not None}"
+        )
+
+    def is_cacheable(self, temperature: Optional[float]) -> bool:
+        """
+        Whether a request at this temperature may be served from cache.
+
+        Counts a bypass when the cache is on but the request is too creative.
+        """
+        if not self.enabled:
+            return False
+        if not self.is_repeatable(temperature):
+            self.bypassed += 1
+            return False
+        return True
+
+    def is_repeatable(self, temperature: Optional[float]) -> bool:
+        """Whether one response may stand in for another request at this temperature."""
+        return temperature is not None and temperature <= self.max_temperature
+
+    def _memory_get(self, key: str, now: float) -> Optional[Tuple[float, str, Dict[str, Any]]]:
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= now:
+                del self._memory[key]
+                return None
+            self._memory.move_to_end(key)
+            return entry
+
+    def _memory_put(self, key: str, expires_at: float, content: str, usage: Dict[str, Any]) -> None:
+        with self._lock:
+            self._memory[key] = (expires_at, content, usage)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+                self.evictions += 1
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up a response.
+
+        Returns:
+            {'content': str, 'usage': dict} or None on miss
+        """
+        now = time.time()
+        entry = self._memory_get(key, now)
+        if entry is not None:
+            self.memory_hits += 1
+            self.tokens_saved += entry[2].get('total_tokens') or 0
+            return {'content': entry[1], 'usage': entry[2]}
+
+        if self._store:
+            try:
+                row = await asyncio.to_thread(self._store.get, key, now)
+            except Exception as e:
+                self.store_errors += 1
+                logger.warning(f"[LLMResponseCache] Shared tier read failed: {e}")
+                row = None
+            if row is not None:
+                content, usage, expires_at = row
+                self._memory_put(key, expires_at, content, usage)
+                self.shared_hits += 1
+                self.tokens_saved += usage.get('total_tokens') or 0
+                return {'content': content, 'usage': usage}
+
+        self.misses += 1
+        return None
+
+    async def put(self, key: str, content: str, usage: Optional[Dict[str, Any]] = None) -> None:
+        """Store a successful response in both tiers."""
+        if not content:
+            return
+        now = time.time()
+        expires_at = now + self.ttl_seconds
+        usage = dict(usage or {})
+        self._memory_put(key, expires_at, content, usage)
+        self.stores += 1
+
+        if self._store:
+            try:
+                await asyncio.to_thread(self._store.put, key, content, usage, expires_at, now)
+            except Exception as e:
+                self.store_errors += 1
+                logger.warning(f"[LLMResponseCache] Shared tier write failed: {e}")
+
+    def clear(self) -> None:
+        """Drop all cached responses (both tiers)."""
+        with self._lock:
+            self._memory.clear()
+        if self._store:
+            try:
+                self._store.clear()
+            except Exception as e:
+                logger.warning(f"[LLMResponseCache] Shared tier clear failed: {e}")
+
+    def close(self) -> None:
+        if self._store:
+            self._store.close()
+            self._store = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache statistics."""
+        hits = self.memory_hits + self.shared_hits
+        lookups = hits + self.misses
+        stats = {
+            'enabled': self.enabled,
+            'ttl_seconds': self.ttl_seconds,
+            'max_temperature': self.max_temperature,
+            'hits': hits,
+            'memory_hits': self.memory_hits,
+            'shared_hits': self.shared_hits,
+            'misses': self.misses,
+            'bypassed': self.bypassed,
+            'hit_rate_percent': round(hits / lookups * 100, 2) if lookups else 0.0,
+            'stores': self.stores,
+            'evictions': self.evictions,
+            'tokens_saved': self.tokens_saved,
+            'memory_entries': len(self._memory),
+            'max_entries': self.max_entries,
+            'shared': self._store is not None,
+        }
+        if self._store:
+            stats['store_errors'] = self.store_errors
+            try:
+                stats['shared_entries'] = self._store.count()
+            except Exception:
+                stats['shared_entries'] = None
+        return stats
+
+
+# Singleton instance (configured by LLMService.initialize)
+llm_response_cache = LLMResponseCache()
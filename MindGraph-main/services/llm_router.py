@@ -0,0 +1,197 @@
+"""
+Latency-Aware Model Router
+==========================
+
+Orders a list of equivalent models for one request:
+
+1. Models with an open circuit breaker are skipped
+2. Models whose recent p95 meets the route's latency SLO go first, fastest
+   p50 first
+3. Models without enough history follow, in the order given
+4. Models that currently violate the SLO go last, by p95
+
+LLMService.chat / chat_stream walk that order and fail over to the next
+model on a retryable error (see is_failover_error).
+
+Routes are configured as LLM_ROUTES=name=model,model;name=model,... and
+per-route p95 SLOs as LLM_ROUTE_SLOS=name=seconds,...
+
+@author lycosa9527
+@made_by MindSpring Team
+"""
+
+import logging
+from threading import Lock
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from services.error_handler import LLMContentFilterError, LLMInvalidParameterError
+
+logger = logging.getLogger(__name__)
+
+# Errors caused by the request itself: another model would reject it too
+NON_FAILOVER_ERRORS = (LLMContentFilterError, LLMInvalidParameterError)
+
+
+def parse_routes(spec: str) -> Dict[str, List[str]]:
+    """
+    Parse 'generation=qwen,deepseek,kimi;classification=qwen-turbo,qwen'.
+
+    Malformed entries are skipped with a warning.
+    """
+    routes: Dict[str, List[str]] = {}
+    for entry in (spec or '').split(';'):
+        entry = entry.strip()
+        if not entry:
+            continue
+        name, sep, models = entry.partition('=')
+        model_list = [m.strip() for m in models.split(',') if m.strip()]
+        if not sep or not name.strip() or not model_list:
+            logger.warning(f"[ModelRouter] Ignoring malformed route '{entry}'")
+            continue
+        routes[name.strip()] = model_list
+    return routes
+
+
+def parse_route_slos(spec: str) -> Dict[str, float]:
+    """Parse 'generation=8,classification=2.5' (p95 seconds per route)."""
+    slos: Dict[str, float] = {}
+    for entry in (spec or '').split(','):
+        entry = entry.strip()
+        if not entry:
+            continue
+        name, _, value = entry.partition('=')
+        try:
+            slos[name.strip()] = float(value)
+        except ValueError:
+            logger.warning(f"[ModelRouter] Ignoring malformed route SLO '{entry}'")
+    return slos
+
+
+def is_failover_error(error: BaseException) -> bool:
+    """
+    Whether a failed attempt should move on to the next model.
+
+    Walks the exception chain, since LLMService wraps provider errors.
+    """
+    seen = set()
+    current: Optional[BaseException] = error
+    while current is not None and id(current) not in seen:
+        if isinstance(current, NON_FAILOVER_ERRORS):
+            return False
+        seen.add(id(current))
+        current = current.__cause__ or current.__context__
+    return True
+
+
+class ModelRouter:
+    """
+    Picks the model order for a route from PerformanceTracker history.
+    """
+
+    def __init__(
+        self,
+        performance_tracker: Any,
+        routes: Optional[Dict[str, List[str]]] = None,
+        slos: Optional[Dict[str, float]] = None,
+        default_slo: float = 15.0,
+        min_samples: int = 5
+    ):
+        self.performance_tracker = performance_tracker
+        self.routes = routes or {}
+        self.slos = slos or {}
+        self.default_slo = default_slo
+        self.min_samples = min_samples
+        self._stats: Dict[str, Dict[str, Any]] = {}
+        self._lock = Lock()
+
+    def configure(
+        self,
+        routes: Dict[str, List[str]],
+        slos: Dict[str, float],
+        default_slo: float
+    ) -> None:
+        """Apply settings (called at startup)."""
+        self.routes = routes
+        self.slos = slos
+        self.default_slo = default_slo
+        if routes:
+            logger.debug(f"[ModelRouter] Routes: {routes}, SLOs: {slos}, default SLO={default_slo}s")
+
+    def resolve(self, route: Union[str, List[str]]) -> Tuple[str, List[str]]:
+        """
+        Turn a route name or explicit model list into (route name, models).
+
+        Raises:
+            ValueError: If a named route is not configured
+        """
+        if isinstance(route, str):
+            if route not in self.routes:
+                raise ValueError(
+                    f"Unknown route: {route}. Configured routes: {', '.join(self.routes) or 'none'}"
+                )
+            return route, list(self.routes[route])
+        models = list(route)
+        return ','.join(models), models
+
+    def order(self, route_name: str, models: List[str]) -> List[str]:
+        """
+        Order models for one request (open circuits removed).
+        """
+        slo = self.slos.get(route_name, self.default_slo)
+        tracker = self.performance_tracker
+        ranked = []
+        skipped = []
+        for index, model in enumerate(models):
+            if not tracker.can_call_model(model):
+                skipped.append(model)
+                continue
+            p50 = tracker.get_latency_percentile(model, 50, self.min_samples)
+            p95 = tracker.get_latency_percentile(model, 95, self.min_samples)
+            if p95 is None:
+                ranked.append(((1, index), model))
+            elif p95 <= slo:
+                ranked.append(((0, p50, index), model))
+            else:
+                ranked.append(((2, p95, index), model))
+        ranked.sort(key=lambda item: item[0])
+        ordered = [model for _, model in ranked]
+
+        with self._lock:
+            stats = self._route_stats(route_name, slo)
+            stats['requests'] += 1
+            stats['skipped_open_circuit'] += len(skipped)
+            if ordered:
+                stats['selected'][ordered[0]] = stats['selected'].get(ordered[0], 0) + 1
+
+        if skipped:
+            logger.debug(f"[ModelRouter] {route_name}: skipping open circuit(s) {skipped}")
+        return ordered
+
+    def record_failover(self, route_name: str, from_model: str, error: BaseException) -> None:
+        with self._lock:
+            stats = self._route_stats(route_name, self.slos.get(route_name, self.default_slo))
+            stats['failovers'] += 1
+        logger.warning(f"[ModelRouter] {route_name}: {from_model} failed, failing over ({error})")
+
+    def _route_stats(self, route_name: str, slo: float) -> Dict[str, Any]:
+        if route_name not in self._stats:
+            self._stats[route_name] = {
+                'slo_p95_seconds': slo,
+                'requests': 0,
+                'failovers': 0,
+                'skipped_open_circuit': 0,
+                'selected': {},
+            }
+        return self._stats[route_name]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get routing statistics per route."""
+        with self._lock:
+            return {
+                'routes': dict(self.routes),
+                'default_slo_seconds': self.default_slo,
+                'usage': {
+                    name: {**stats, 'selected': dict(stats['selected'])}
+                    for name, stats in self._stats.items()
+                },
+            }
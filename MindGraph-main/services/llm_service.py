@@ -12,14 +12,17 @@ Provides unified API, error handling, and performance tracking.
 import asyncio
 import logging
 import time
-from typing import Dict, List, Optional, Any, AsyncGenerator
+from typing import Dict, List, Optional, Any, AsyncGenerator, Callable, Tuple, Union
 
 from services.client_manager import client_manager
 from services.error_handler import error_handler, LLMServiceError
-from services.rate_limiter import initialize_rate_limiter, get_rate_limiter
+from services.rate_limiter import initialize_rate_limiter, get_rate_limiter, parse_model_limits
 from services.prompt_manager import prompt_manager
 from services.performance_tracker import performance_tracker
 from services.token_tracker import get_token_tracker
+from services.llm_response_cache import llm_response_cache, make_cache_key
+from services.llm_singleflight import SingleFlight
+from services.llm_router import ModelRouter, is_failover_error, parse_routes, parse_route_slos
 from config.settings import config
 
 logger = logging.getLogger(__name__)
@@ -41,6 +44,9 @@ class LLMService:
         self.prompt_manager = prompt_manager
         self.performance_tracker = performance_tracker
         self.rate_limiter = None
+        self.response_cache = llm_response_cache
+        self.singleflight = SingleFlight()
+        self.router = ModelRouter(performance_tracker)
         logger.info("[LLMService] Initialized")
     
     def initialize(self) -> None:
@@ -64,18 +70,46 @@ class LLMService:
             self.rate_limiter = initialize_rate_limiter(
                 qpm_limit=config.DASHSCOPE_QPM_LIMIT,
                 concurrent_limit=config.DASHSCOPE_CONCURRENT_LIMIT,
-                enabled=config.DASHSCOPE_RATE_LIMITING_ENABLED
+                enabled=config.DASHSCOPE_RATE_LIMITING_ENABLED,
+                provider_limits={
+                    'hunyuan': (config.HUNYUAN_QPM_LIMIT, config.HUNYUAN_CONCURRENT_LIMIT),
+                    'volcengine': (config.ARK_QPM_LIMIT, config.ARK_CONCURRENT_LIMIT)
+                },
+                model_limits=parse_model_limits(config.LLM_MODEL_RATE_LIMITS),
+                backend=config.LLM_RATE_LIMIT_BACKEND,
+                poll_interval=config.LLM_RATE_LIMIT_POLL_MS / 1000
             )
         else:
             logger.debug("[LLMService] Rate limiting disabled")
             self.rate_limiter = None
         
+        # Exact-match response cache for low-temperature chat() calls (opt-in)
+        self.response_cache.configure(
+            enabled=config.LLM_CACHE_ENABLED,
+            ttl_seconds=config.LLM_CACHE_TTL_SECONDS,
+            max_entries=config.LLM_CACHE_MAX_ENTRIES,
+            max_temperature=config.LLM_CACHE_MAX_TEMPERATURE,
+            shared=config.LLM_CACHE_SHARED,
+            shared_max_entries=config.LLM_CACHE_SHARED_MAX_ENTRIES
+        )
+        
+        # Share one upstream call among concurrent identical requests
+        self.singleflight.enabled = config.LLM_COALESCE_ENABLED
+        
+        # Named routes of equivalent models for chat(route=...) / chat_stream(route=...)
+        self.router.configure(
+            routes=parse_routes(config.LLM_ROUTES),
+            slos=parse_route_slos(config.LLM_ROUTE_SLOS),
+            default_slo=config.LLM_ROUTE_DEFAULT_SLO
+        )
+        
         logger.debug("[LLMService] Ready")
     
     def cleanup(self) -> None:
         """Cleanup LLM Service (called at app shutdown)."""
         logger.info("[LLMService] Cleaning up...")
         self.client_manager.cleanup()
+        self.response_cache.close()
         logger.info("[LLMService] Cleanup complete")
     
     # ============================================================================
@@ -98,6 +132,9 @@ class LLMService:
         endpoint_path: Optional[str] = None,
         session_id: Optional[str] = None,
         conversation_id: Optional[str] = None,
+        use_cache: bool = True,
+        route: Optional[Union[str, List[str]]] = None,
+        max_retries: Optional[int] = None,
         **kwargs
     ) -> str:
         """
@@ -110,6 +147,13 @@ class LLMService:
             max_tokens: Maximum tokens in response
             system_message: Optional system message
             timeout: Request timeout in seconds (None uses default)
+            use_cache: Allow a cached response when the response cache is enabled
+                and temperature is at or below LLM_CACHE_MAX_TEMPERATURE
+            route: Route name from LLM_ROUTES, or an ordered list of equivalent
+                models. Replaces model: open circuits are skipped, the fastest
+                model within the route's SLO goes first, and retryable errors
+                fail over to the next model
+            max_retries: Provider attempts (None uses the ErrorHandler default)
             **kwargs: Additional model-specific parameters
             
         Returns:
@@ -122,7 +166,36 @@ class LLMService:
                 temperature=0.7
             )
         """
+        if route is not None:
+            route_name, ordered = self._route_order(route)
+            attempts = max_retries or config.LLM_ROUTE_MAX_RETRIES
+            for index, routed_model in enumerate(ordered):
+                try:
+                    return await self.chat(
+                        prompt=prompt,
+                        model=routed_model,
+                        temperature=temperature,
+                        max_tokens=max_tokens,
+                        system_message=system_message,
+                        timeout=timeout,
+                        user_id=user_id,
+                        organization_id=organization_id,
+                        request_type=request_type,
+                        diagram_type=diagram_type,
+                        endpoint_path=endpoint_path,
+                        session_id=session_id,
+                        conversation_id=conversation_id,
+                        use_cache=use_cache,
+                        max_retries=attempts,
+                        **kwargs
+                    )
+                except LLMServiceError as e:
+                    if index == len(ordered) - 1 or not is_failover_error(e):
+                        raise
+                    self.router.record_failover(route_name, routed_model, e)
+        
         start_time = time.time()
+        coalesced = False
         
         try:
             logger.debug(f"[LLMService] chat() - model={model}, prompt_len={len(prompt)}")
@@ -130,6 +203,27 @@ class LLMService:
             # Get client
             client = self.client_manager.get_client(model)
             
+            # Serve identical low-temperature requests from the response cache
+            cache_key = None
+            if use_cache and self.response_cache.is_cacheable(temperature):
+                cache_key = make_cache_key(model, prompt, system_message, temperature, max_tokens, kwargs)
+                cached = await self.response_cache.get(cache_key)
+                if cached is not None:
+                    duration = time.time() - start_time
+                    logger.debug(f"[LLMService] {model} served from response cache")
+                    await self._track_cache_hit(
+                        model=model,
+                        request_type=request_type,
+                        diagram_type=diagram_type,
+                        user_id=user_id,
+                        organization_id=organization_id,
+                        session_id=session_id,
+                        conversation_id=conversation_id,
+                        endpoint_path=endpoint_path,
+                        response_time=duration
+                    )
+                    return cached['content']
+            
             # Build messages
             messages = []
             if system_message:
@@ -140,116 +234,46 @@ class LLMService:
             if timeout is None:
                 timeout = self._get_default_timeout(model)
             
-            # Use rate limiter if available
-            if self.rate_limiter:
-                async with self.rate_limiter:
-                    # Execute with retry and timeout
-                    async def _call():
-                        # DeepSeek and Kimi use async_chat_completion
-                        if hasattr(client, 'async_chat_completion'):
-                            return await client.async_chat_completion(
-                                messages=messages,
-                                temperature=temperature,
-                                max_tokens=max_tokens,
-                                **kwargs
-                            )
-                        else:
-                            # Qwen and Hunyuan use chat_completion
-                            return await client.chat_completion(
-                                messages=messages,
-                                temperature=temperature,
-                                max_tokens=max_tokens,
-                                **kwargs
-                            )
-                    
-                    # Properly await with_retry inside timeout
-                    response = await asyncio.wait_for(
-                        error_handler.with_retry(_call),
-                        timeout=timeout
-                    )
-            else:
-                # No rate limiting
-                async def _call():
-                    if hasattr(client, 'async_chat_completion'):
-                        return await client.async_chat_completion(
-                            messages=messages,
-                            temperature=temperature,
-                            max_tokens=max_tokens,
-                            **kwargs
-                        )
-                    else:
-                        return await client.chat_completion(
-                            messages=messages,
-                            temperature=temperature,
-                            max_tokens=max_tokens,
-                            **kwargs
-                        )
-                
-                # Properly await with_retry inside timeout
-                response = await asyncio.wait_for(
-                    error_handler.with_retry(_call),
-                    timeout=timeout
-                )
-            
-            # Validate response
-            response = error_handler.validate_response(response)
-            
-            duration = time.time() - start_time
+            # Concurrent identical requests share one upstream call. It tracks
+            # usage, metrics and the cache itself, so they are recorded even if
+            # the caller that started it has gone
+            tracking = dict(
+                request_type=request_type,
+                diagram_type=diagram_type,
+                user_id=user_id,
+                organization_id=organization_id,
+                session_id=session_id,
+                conversation_id=conversation_id,
+                endpoint_path=endpoint_path
+            )
             
-            # Extract content and usage from response (new format: dict with 'content' and 'usage')
-            content = response
-            usage_data = {}
+            def _upstream():
+                return self._chat_upstream(
+                    client, model, messages, temperature, max_tokens, timeout, kwargs, max_retries,
+                    start_time, tracking, cache_key
+                )
             
-            if isinstance(response, dict):
-                content = response.get('content', '')
-                usage_data = response.get('usage', {})
+            # High-temperature requests ("regenerate") each get their own answer
+            if self.singleflight.enabled and self.response_cache.is_repeatable(temperature):
+                flight_key = cache_key or make_cache_key(model, prompt, system_message, temperature, max_tokens, kwargs)
+                coalesced = self.singleflight.in_flight(flight_key)
+                content = await self.singleflight.do(flight_key, _upstream)
             else:
-                # Backward compatibility: plain string response
-                content = str(response)
-                usage_data = {}
+                content = await _upstream()
             
-            logger.info(f"[LLMService] {model} responded in {duration:.2f}s")
-            
-            # Track token usage (async, non-blocking)
-            if usage_data:
-                try:
-                    # Normalize token field names (API uses prompt_tokens/completion_tokens, we use input_tokens/output_tokens)
-                    input_tokens = usage_data.get('prompt_tokens') or usage_data.get('input_tokens') or 0
-                    output_tokens = usage_data.get('completion_tokens') or usage_data.get('output_tokens') or 0
-                    # Use API's total_tokens (authoritative billing value) - may include overhead tokens
-                    total_tokens = usage_data.get('total_tokens') or None
-                    
-                    token_tracker = get_token_tracker()
-                    await token_tracker.track_usage(
-                        model_alias=model,
-                        input_tokens=input_tokens,
-                        output_tokens=output_tokens,
-                        total_tokens=total_tokens,
-                        request_type=request_type,
-                        diagram_type=diagram_type,
-                        user_id=user_id,
-                        organization_id=organization_id,
-                        session_id=session_id,
-                        conversation_id=conversation_id,
-                        endpoint_path=endpoint_path,
-                        response_time=duration,
-                        success=True
-                    )
-                except Exception as e:
-                    logger.debug(f"[LLMService] Token tracking failed (non-critical): {e}")
-            
-            # Record performance metrics
-            self.performance_tracker.record_request(
-                model=model,
-                duration=duration,
-                success=True
-            )
+            if coalesced:
+                duration = time.time() - start_time
+                logger.debug(f"[LLMService] {model} shared an in-flight response ({duration:.2f}s)")
+                await self._track_cache_hit(model=model, response_time=duration, **tracking)
             
             return content
             
         except ValueError as e:
             # Let ValueError pass through (e.g., invalid model)
             raise
+        except LLMServiceError:
+            # Upstream failure, already recorded once by _chat_upstream
+            raise
         except Exception as e:
             duration = time.time() - start_time
             logger.error(f"[LLMService] {model} failed after {duration:.2f}s: {e}")
@@ -280,6 +304,7 @@ class LLMService:
         endpoint_path: Optional[str] = None,
         session_id: Optional[str] = None,
         conversation_id: Optional[str] = None,
+        route: Optional[Union[str, List[str]]] = None,
         **kwargs
     ):
         """
@@ -292,11 +317,46 @@ class LLMService:
             max_tokens: Maximum tokens to generate
             timeout: Request timeout in seconds
             system_message: Optional system message
+            route: Route name from LLM_ROUTES, or an ordered list of equivalent
+                models (see chat). Fails over only before the first chunk
             **kwargs: Additional model-specific parameters
             
         Yields:
             Response chunks as they arrive
         """
+        if route is not None:
+            route_name, ordered = self._route_order(route)
+            for index, routed_model in enumerate(ordered):
+                stream = self.chat_stream(
+                    prompt=prompt,
+                    model=routed_model,
+                    temperature=temperature,
+                    max_tokens=max_tokens,
+                    timeout=timeout,
+                    system_message=system_message,
+                    user_id=user_id,
+                    organization_id=organization_id,
+                    request_type=request_type,
+                    diagram_type=diagram_type,
+                    endpoint_path=endpoint_path,
+                    session_id=session_id,
+                    conversation_id=conversation_id,
+                    **kwargs
+                )
+                started = False
+                try:
+                    async for chunk in stream:
+                        started = True
+                        yield chunk
+                    return
+                except LLMServiceError as e:
+                    # Chunks already sent to the caller cannot be taken back
+                    if started or index == len(ordered) - 1 or not is_failover_error(e):
+                        raise
+                    self.router.record_failover(route_name, routed_model, e)
+                finally:
+                    await stream.aclose()
+        
         start_time = time.time()
         
         try:
@@ -334,28 +394,258 @@ class LLMService:
                 yield response
                 return
             
+            # Concurrent identical streams share one upstream stream;
+            # late joiners get the tokens emitted so far replayed first
+            tracking = dict(
+                request_type=request_type,
+                diagram_type=diagram_type,
+                user_id=user_id,
+                organization_id=organization_id,
+                session_id=session_id,
+                conversation_id=conversation_id,
+                endpoint_path=endpoint_path
+            )
+            
+            def _upstream():
+                return self._stream_upstream(
+                    stream_method, model, messages, temperature, max_tokens, start_time, tracking, kwargs
+                )
+            
+            joined = False
+            if self.singleflight.enabled and self.response_cache.is_repeatable(temperature):
+                flight_key = make_cache_key(model, prompt, system_message, temperature, max_tokens, kwargs)
+                joined = self.singleflight.stream_in_flight(flight_key)
+                source = self.singleflight.stream(flight_key, _upstream)
+            else:
+                source = _upstream()
+            
+            try:
+                async for chunk in source:
+                    yield chunk
+            finally:
+                # Release the upstream (or our subscription) as soon as the caller stops reading
+                await source.aclose()
+            
+            if joined:
+                await self._track_cache_hit(model=model, response_time=time.time() - start_time, **tracking)
+            
+        except ValueError as e:
+            # Let ValueError pass through (e.g., invalid model)
+            raise
+        except LLMServiceError:
+            # Upstream stream failure, already recorded once by _stream_upstream
+            raise
+        except Exception as e:
+            duration = time.time() - start_time
+            logger.error(f"[LLMService] {model} stream failed after {duration:.2f}s: {e}")
+            
+            # Record failure metrics
+            self.performance_tracker.record_request(
+                model=model,
+                duration=duration,
+                success=False,
+                error=str(e)
+            )
+            
+            raise LLMServiceError(f"Chat stream failed for model {model}: {e}") from e
+    
+    # ============================================================================
+    # UTILITY METHODS
+    # ============================================================================
+    
+    def _get_default_timeout(self, model: str) -> float:
+        """Get default timeout for model (in seconds)."""
+        # Generous timeouts for complex diagrams (mind maps, tree maps with deep hierarchies)
+        timeouts = {
+            'qwen': 70.0,
+            'qwen-turbo': 70.0,
+            'qwen-plus': 70.0,
+            'deepseek': 70.0,
+            'hunyuan': 70.0,
+            'kimi': 70.0,
+            'doubao': 70.0,
+            'chatglm': 70.0
+        }
+        return timeouts.get(model, 70.0)
+    
+    async def _call_upstream(
+        self,
+        client: Any,
+        model: str,
+        messages: List[Dict],
+        temperature: Optional[float],
+        max_tokens: int,
+        timeout: float,
+        kwargs: Dict[str, Any],
+        max_retries: Optional[int] = None
+    ) -> Any:
+        """
+        One provider call with retry and timeout (raw client response).
+        
+        Each attempt takes and returns its own rate limiter slot, so a request
+        sleeping in retry backoff does not hold a concurrency slot. The timeout
+        is one budget for all attempts and backoff sleeps together.
+        """
+        async def _call():
+            # DeepSeek and Kimi use async_chat_completion
+            if hasattr(client, 'async_chat_completion'):
+                return await client.async_chat_completion(
+                    messages=messages,
+                    temperature=temperature,
+                    max_tokens=max_tokens,
+                    **kwargs
+                )
+            else:
+                # Qwen and Hunyuan use chat_completion
+                return await client.chat_completion(
+                    messages=messages,
+                    temperature=temperature,
+                    max_tokens=max_tokens,
+                    **kwargs
+                )
+        
+        async def _attempt():
+            # Use rate limiter if available
+            if self.rate_limiter:
+                async with self.rate_limiter.limit(model):
+                    return await _call()
+            return await _call()
+        
+        retry_kwargs = {'max_retries': max_retries} if max_retries else {}
+        return await error_handler.with_retry(_attempt, timeout=timeout, **retry_kwargs)
+    
+    async def _chat_upstream(
+        self,
+        client: Any,
+        model: str,
+        messages: List[Dict],
+        temperature: Optional[float],
+        max_tokens: int,
+        timeout: float,
+        kwargs: Dict[str, Any],
+        max_retries: Optional[int],
+        start_time: float,
+        tracking: Dict[str, Any],
+        cache_key: Optional[str]
+    ) -> str:
+        """
+        One validated provider call, returning its content.
+        
+        Tracks token usage, performance and the response cache once for the
+        upstream call, however many callers are waiting on it.
+        """
+        try:
+            response = await self._call_upstream(
+                client, model, messages, temperature, max_tokens, timeout, kwargs, max_retries
+            )
+            response = error_handler.validate_response(response)
+        except ValueError:
+            raise
+        except Exception as e:
+            duration = time.time() - start_time
+            logger.error(f"[LLMService] {model} failed after {duration:.2f}s: {e}")
+            self.performance_tracker.record_request(
+                model=model,
+                duration=duration,
+                success=False,
+                error=str(e)
+            )
+            raise LLMServiceError(f"Chat failed for model {model}: {e}") from e
+        
+        duration = time.time() - start_time
+        
+        # Extract content and usage from response (new format: dict with 'content' and 'usage')
+        if isinstance(response, dict):
+            content = response.get('content', '')
+            usage_data = response.get('usage', {})
+        else:
+            # Backward compatibility: plain string response
+            content = str(response)
+            usage_data = {}
+        
+        logger.info(f"[LLMService] {model} responded in {duration:.2f}s")
+        
+        # Track token usage (async, non-blocking)
+        if usage_data:
+            try:
+                # Normalize token field names (API uses prompt_tokens/completion_tokens, we use input_tokens/output_tokens)
+                input_tokens = usage_data.get('prompt_tokens') or usage_data.get('input_tokens') or 0
+                output_tokens = usage_data.get('completion_tokens') or usage_data.get('output_tokens') or 0
+                # Use API's total_tokens (authoritative billing value) - may include overhead tokens
+                total_tokens = usage_data.get('total_tokens') or None
+                
+                token_tracker = get_token_tracker()
+                await token_tracker.track_usage(
+                    model_alias=model,
+                    input_tokens=input_tokens,
+                    output_tokens=output_tokens,
+                    total_tokens=total_tokens,
+                    response_time=duration,
+                    success=True,
+                    **tracking
+                )
+            except Exception as e:
+                logger.debug(f"[LLMService] Token tracking failed (non-critical): {e}")
+        
+        # Record performance metrics
+        self.performance_tracker.record_request(
+            model=model,
+            duration=duration,
+            success=True
+        )
+        
+        if cache_key:
+            await self.response_cache.put(cache_key, content, usage_data)
+        
+        return content
+    
+    async def _stream_upstream(
+        self,
+        stream_method: Callable,
+        model: str,
+        messages: List[Dict],
+        temperature: Optional[float],
+        max_tokens: int,
+        start_time: float,
+        tracking: Dict[str, Any],
+        kwargs: Dict[str, Any]
+    ) -> AsyncGenerator[str, None]:
+        """
+        One rate-limited provider stream, yielding content tokens.
+        
+        Tracks token usage and performance once for the upstream call, however
+        many callers are subscribed to it.
+        """
+        try:
             # Stream the response and capture usage
+            # (rate limiter slot is held for the whole stream)
             usage_data = None
-            async for chunk in stream_method(
-                messages=messages,
-                temperature=temperature,
-                max_tokens=max_tokens,
-                **kwargs
-            ):
-                # Handle new format: chunk can be dict with 'type' and content/usage
-                if isinstance(chunk, dict):
-                    chunk_type = chunk.get('type', 'token')
-                    if chunk_type == 'usage':
-                        # Capture usage data from final chunk
-                        usage_data = chunk.get('usage', {})
-                    elif chunk_type == 'token':
-                        # Yield content token
-                        content = chunk.get('content', '')
-                        if content:
-                            yield content
-                else:
-                    # Backward compatibility: plain string chunk
-                    yield chunk
+            if self.rate_limiter:
+                await self.rate_limiter.acquire(model)
+            try:
+                async for chunk in stream_method(
+                    messages=messages,
+                    temperature=temperature,
+                    max_tokens=max_tokens,
+                    **kwargs
+                ):
+                    # Handle new format: chunk can be dict with 'type' and content/usage
+                    if isinstance(chunk, dict):
+                        chunk_type = chunk.get('type', 'token')
+                        if chunk_type == 'usage':
+                            # Capture usage data from final chunk
+                            usage_data = chunk.get('usage', {})
+                        elif chunk_type == 'token':
+                            # Yield content token
+                            content = chunk.get('content', '')
+                            if content:
+                                yield content
+                    else:
+                        # Backward compatibility: plain string chunk
+                        yield chunk
+            finally:
+                if self.rate_limiter:
+                    await self.rate_limiter.release(model)
             
             duration = time.time() - start_time
             logger.debug(f"[LLMService] {model} stream completed in {duration:.2f}s")
@@ -375,15 +665,9 @@ class LLMService:
                         input_tokens=input_tokens,
                         output_tokens=output_tokens,
                         total_tokens=total_tokens,
-                        request_type=request_type,
-                        diagram_type=diagram_type,
-                        user_id=user_id,
-                        organization_id=organization_id,
-                        session_id=session_id,
-                        conversation_id=conversation_id,
-                        endpoint_path=endpoint_path,
                         response_time=duration,
-                        success=True
+                        success=True,
+                        **tracking
                     )
                 except Exception as e:
                     logger.debug(f"[LLMService] Token tracking failed (non-critical): {e}")
@@ -395,41 +679,43 @@ class LLMService:
                 success=True
             )
             
-        except ValueError as e:
-            # Let ValueError pass through (e.g., invalid model)
-            raise
         except Exception as e:
             duration = time.time() - start_time
             logger.error(f"[LLMService] {model} stream failed after {duration:.2f}s: {e}")
-            
-            # Record failure metrics
             self.performance_tracker.record_request(
                 model=model,
                 duration=duration,
                 success=False,
                 error=str(e)
             )
-            
             raise LLMServiceError(f"Chat stream failed for model {model}: {e}") from e
     
-    # ============================================================================
-    # UTILITY METHODS
-    # ============================================================================
+    def _route_order(self, route: Union[str, List[str]]) -> Tuple[str, List[str]]:
+        """Resolve a route and order its models; raises if every circuit is open."""
+        route_name, models = self.router.resolve(route)
+        ordered = self.router.order(route_name, models)
+        if not ordered:
+            raise LLMServiceError(
+                f"No model available for route {route_name}: circuit open for {', '.join(models)}"
+            )
+        logger.debug(f"[LLMService] Route {route_name}: {ordered}")
+        return route_name, ordered
     
-    def _get_default_timeout(self, model: str) -> float:
-        """Get default timeout for model (in seconds)."""
-        # Generous timeouts for complex diagrams (mind maps, tree maps with deep hierarchies)
-        timeouts = {
-            'qwen': 70.0,
-            'qwen-turbo': 70.0,
-            'qwen-plus': 70.0,
-            'deepseek': 70.0,
-            'hunyuan': 70.0,
-            'kimi': 70.0,
-            'doubao': 70.0,
-            'chatglm': 70.0
-        }
-        return timeouts.get(model, 70.0)
+    async def _track_cache_hit(self, model: str, response_time: float, **tracking) -> None:
+        """Record a cached or coalesced response as a zero-token, zero-cost usage row."""
+        try:
+            token_tracker = get_token_tracker()
+            await token_tracker.track_usage(
+                model_alias=model,
+                input_tokens=0,
+                output_tokens=0,
+                response_time=response_time,
+                success=True,
+                cache_hit=True,
+                **tracking
+            )
+        except Exception as e:
+            logger.debug(f"[LLMService] Token tracking failed (non-critical): {e}")
     
     def get_available_models(self) -> List[str]:
         """Get list of all available models."""
@@ -879,6 +1165,7 @@ class LLMService:
         max_tokens: int = 2000,
         timeout: Optional[float] = None,
         system_message: Optional[str] = None,
+        hedged: Optional[bool] = None,
         **kwargs
     ) -> Dict[str, Any]:
         """
@@ -886,6 +1173,11 @@ class LLMService:
         
         Useful when you want the fastest response and don't care which model.
         
+        In hedged mode (default, LLM_RACE_HEDGED) only the historically fastest
+        model is called first; a backup is launched when that call passes the
+        model's observed p90 latency (or fails), so the extra token cost is
+        paid only for slow tail requests.
+        
         Args:
             prompt: Prompt to send to all LLMs
             models: List of model names (default: ['qwen-turbo', 'qwen', 'deepseek'])
@@ -893,6 +1185,7 @@ class LLMService:
             max_tokens: Maximum tokens
             timeout: Per-LLM timeout
             system_message: Optional system message
+            hedged: Hedge instead of calling every model at once (None uses config)
             **kwargs: Additional parameters
             
         Returns:
@@ -901,7 +1194,8 @@ class LLMService:
                 'llm': 'qwen-turbo',
                 'response': 'Generated text...',
                 'duration': 1.8,
-                'success': True
+                'success': True,
+                'hedged': False  # hedged mode only: a backup was launched
             }
             
         Example:
@@ -915,6 +1209,19 @@ class LLMService:
         if models is None:
             models = ['qwen-turbo', 'qwen', 'deepseek']
         
+        if hedged is None:
+            hedged = config.LLM_RACE_HEDGED
+        if hedged:
+            return await self._generate_hedged(
+                prompt=prompt,
+                models=models,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                timeout=timeout,
+                system_message=system_message,
+                **kwargs
+            )
+        
         logger.debug(f"[LLMService] generate_race() - first of {len(models)} models")
         
         # Create tasks with model info
@@ -975,6 +1282,114 @@ class LLMService:
         logger.error("[LLMService] All models failed in race")
         raise LLMServiceError("All models failed to generate response")
     
+    def _hedge_cutoff(self, model: str) -> float:
+        """Seconds to wait on a model before launching a backup (observed p90)."""
+        p90 = self.performance_tracker.get_latency_percentile(model, 90)
+        return p90 if p90 is not None else config.LLM_HEDGE_DEFAULT_DELAY
+    
+    async def _generate_hedged(
+        self,
+        prompt: str,
+        models: List[str],
+        temperature: Optional[float] = None,
+        max_tokens: int = 2000,
+        timeout: Optional[float] = None,
+        system_message: Optional[str] = None,
+        **kwargs
+    ) -> Dict[str, Any]:
+        """
+        Hedged race: fastest model first, backups only past its p90 or on failure.
+        """
+        candidates = [m for m in models if self.performance_tracker.can_call_model(m)]
+        if not candidates:
+            raise LLMServiceError("All models failed to generate response (circuits open)")
+        
+        # Fastest by recent history first; models without history keep list order
+        fastest = self.performance_tracker.get_fastest_model(candidates)
+        if fastest:
+            candidates.remove(fastest)
+            candidates.insert(0, fastest)
+        primary = candidates[0]
+        backups = candidates[1:]
+        
+        logger.debug(f"[LLMService] generate_race() hedged - primary={primary}, backups={backups}")
+        
+        def launch(model: str) -> asyncio.Task:
+            return asyncio.create_task(
+                self._call_single_model_with_timing(
+                    model=model,
+                    prompt=prompt,
+                    temperature=temperature,
+                    max_tokens=max_tokens,
+                    timeout=timeout,
+                    system_message=system_message,
+                    **kwargs
+                )
+            )
+        
+        start_time = time.time()
+        pending: Dict[asyncio.Task, str] = {launch(primary): primary}
+        cutoff = self._hedge_cutoff(primary)
+        hedged = False
+        
+        try:
+            while pending:
+                done, _ = await asyncio.wait(
+                    pending.keys(),
+                    timeout=cutoff if backups else None,
+                    return_when=asyncio.FIRST_COMPLETED
+                )
+                
+                if not done:
+                    # Last launched model passed its p90: hedge with the next one
+                    backup = backups.pop(0)
+                    hedged = True
+                    logger.debug(f"[LLMService] Hedging {primary} with {backup} after {time.time() - start_time:.2f}s")
+                    pending[launch(backup)] = backup
+                    cutoff = self._hedge_cutoff(backup)
+                    continue
+                
+                for task in done:
+                    model = pending.pop(task)
+                    try:
+                        result = task.result()
+                    except Exception as e:
+                        result = {'success': False, 'error': str(e)}
+                    
+                    if result.get('success'):
+                        self.performance_tracker.record_hedge(
+                            primary, hedged=hedged, backup_won=(model != primary)
+                        )
+                        logger.debug(
+                            f"[LLMService] {model} won the hedged race in {result['duration']:.2f}s"
+                            f"{' (backup)' if model != primary else ''}"
+                        )
+                        return {
+                            'llm': model,
+                            'response': result['response'],
+                            'duration': result['duration'],
+                            'success': True,
+                            'error': None,
+                            'hedged': hedged
+                        }
+                    
+                    logger.debug(f"[LLMService] {model} failed in hedged race: {result.get('error')}")
+                
+                # A call failed and nothing is running: fail over right away
+                if not pending and backups:
+                    backup = backups.pop(0)
+                    hedged = True
+                    pending[launch(backup)] = backup
+                    cutoff = self._hedge_cutoff(backup)
+        finally:
+            # Cancel whichever calls lost
+            for task in pending:
+                task.cancel()
+        
+        self.performance_tracker.record_hedge(primary, hedged=hedged)
+        logger.error("[LLMService] All models failed in hedged race")
+        raise LLMServiceError("All models failed to generate response")
+    
     async def compare_responses(
         self,
         prompt: str,
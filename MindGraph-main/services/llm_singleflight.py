@@ -0,0 +1,213 @@
+"""
+LLM Request Coalescing (Singleflight)
+=====================================
+
+Concurrent identical LLM requests share one upstream call. A classroom
+submitting the same prompt within seconds costs one provider request, not
+forty.
+
+- do(): callers with the same key await one shared result (or exception)
+- stream(): callers with the same key subscribe to one upstream token
+  stream; late joiners first get a replay of the chunks already emitted
+
+Only in-flight requests are shared: once the upstream call finishes the key
+is released, and the next request goes upstream again (see the response
+cache for reuse across time).
+
+The upstream call runs in its own task, so a caller that disconnects does
+not cancel it for the others. It is cancelled only when every caller has
+left.
+
+@author lycosa9527
+@made_by MindSpring Team
+"""
+
+import asyncio
+import logging
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class _Call:
+    """One in-flight non-streaming upstream call."""
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class _StreamFlight:
+    """One in-flight upstream stream and the chunks it has produced so far."""
+
+    def __init__(self):
+        self.chunks: List[Any] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.subscribers = 0
+        self.task: Optional[asyncio.Task] = None
+        self._changed = asyncio.Event()
+
+    def notify(self) -> None:
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+
+class SingleFlight:
+    """
+    In-flight deduplication for async calls and async streams.
+
+    Keys are scoped to the running event loop.
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._calls: Dict[Tuple[int, str], _Call] = {}
+        self._streams: Dict[Tuple[int, str], _StreamFlight] = {}
+
+        self.upstream_calls = 0
+        self.coalesced_calls = 0
+        self.upstream_streams = 0
+        self.coalesced_streams = 0
+        self.replayed_chunks = 0
+        self.max_waiters = 0
+
+    @staticmethod
+    def _scoped(key: str) -> Tuple[int, str]:
+        return (id(asyncio.get_running_loop()), key)
+
+    def in_flight(self, key: str) -> bool:
+        """Whether do(key, ...) would join an existing call right now."""
+        return self._scoped(key) in self._calls
+
+    def stream_in_flight(self, key: str) -> bool:
+        """Whether stream(key, ...) would join an existing stream right now."""
+        return self._scoped(key) in self._streams
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run fn once for all concurrent callers with the same key.
+
+        Every caller receives the same result, or the same exception.
+        """
+        scoped = self._scoped(key)
+        call = self._calls.get(scoped)
+        if call is None:
+            call = _Call(asyncio.ensure_future(fn()))
+            self._calls[scoped] = call
+            call.task.add_done_callback(lambda _: self._forget_call(scoped, call))
+            self.upstream_calls += 1
+        else:
+            self.coalesced_calls += 1
+
+        call.waiters += 1
+        self.max_waiters = max(self.max_waiters, call.waiters)
+        try:
+            return await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                # Every caller gave up; stop the upstream request
+                call.task.cancel()
+                self._forget_call(scoped, call)
+
+    def _forget_call(self, scoped: Tuple[int, str], call: _Call) -> None:
+        if self._calls.get(scoped) is call:
+            del self._calls[scoped]
+
+    async def stream(
+        self,
+        key: str,
+        factory: Callable[[], AsyncIterator[Any]]
+    ) -> AsyncIterator[Any]:
+        """
+        Subscribe to one shared upstream stream per key.
+
+        factory() is called only by the first subscriber. Later subscribers
+        replay the buffered chunks, then follow the live stream. Upstream
+        errors are raised in every subscriber.
+        """
+        scoped = self._scoped(key)
+        flight = self._streams.get(scoped)
+        if flight is None:
+            flight = _StreamFlight()
+            self._streams[scoped] = flight
+            flight.task = asyncio.ensure_future(self._pump(scoped, flight, factory))
+            self.upstream_streams += 1
+        else:
+            self.coalesced_streams += 1
+            self.replayed_chunks += len(flight.chunks)
+
+        flight.subscribers += 1
+        self.max_waiters = max(self.max_waiters, flight.subscribers)
+        position = 0
+        try:
+            while True:
+                if position < len(flight.chunks):
+                    chunk = flight.chunks[position]
+                    position += 1
+                    yield chunk
+                    continue
+                if flight.done:
+                    if flight.error is not None:
+                        raise flight.error
+                    return
+                changed = flight._changed
+                await changed.wait()
+        finally:
+            flight.subscribers -= 1
+            if flight.subscribers == 0 and not flight.done:
+                # Last subscriber left; stop the upstream stream
+                flight.task.cancel()
+                self._forget_stream(scoped, flight)
+
+    async def _pump(
+        self,
+        scoped: Tuple[int, str],
+        flight: _StreamFlight,
+        factory: Callable[[], AsyncIterator[Any]]
+    ) -> None:
+        """Copy the upstream stream into the flight buffer."""
+        source = factory()
+        try:
+            async for chunk in source:
+                flight.chunks.append(chunk)
+                flight.notify()
+        except asyncio.CancelledError:
+            flight.error = asyncio.CancelledError()
+            raise
+        except Exception as e:
+            flight.error = e
+        finally:
+            # Run the source's cleanup (e.g. rate limiter release) even when cancelled
+            aclose = getattr(source, 'aclose', None)
+            if aclose is not None:
+                try:
+                    await aclose()
+                except Exception as e:
+                    logger.debug(f"[SingleFlight] Error closing upstream stream: {e}")
+            flight.done = True
+            self._forget_stream(scoped, flight)
+            flight.notify()
+
+    def _forget_stream(self, scoped: Tuple[int, str], flight: _StreamFlight) -> None:
+        if self._streams.get(scoped) is flight:
+            del self._streams[scoped]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get coalescing statistics."""
+        saved = self.coalesced_calls + self.coalesced_streams
+        total = saved + self.upstream_calls + self.upstream_streams
+        return {
+            'enabled': self.enabled,
+            'upstream_calls': self.upstream_calls,
+            'coalesced_calls': self.coalesced_calls,
+            'upstream_streams': self.upstream_streams,
+            'coalesced_streams': self.coalesced_streams,
+            'upstream_calls_saved': saved,
+            'saved_percent': round(saved / total * 100, 2) if total else 0.0,
+            'replayed_chunks': self.replayed_chunks,
+            'max_waiters': self.max_waiters,
+            'in_flight_calls': len(self._calls),
+            'in_flight_streams': len(self._streams),
+        }
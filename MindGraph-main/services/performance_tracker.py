@@ -9,6 +9,7 @@ Tracks LLM performance metrics and implements circuit breaker pattern.
 """
 
 import logging
+import math
 import time
 from typing import Dict, List, Optional, Any
 from collections import deque
@@ -64,6 +65,9 @@ class PerformanceTracker:
         self._recent_failures: Dict[str, deque] = {}
         self._recent_successes: Dict[str, deque] = {}
         
+        # Hedged race outcomes per primary model
+        self._hedge_stats: Dict[str, Dict[str, int]] = {}
+        
         self._lock = Lock()
         
         logger.info("[PerformanceTracker] Initialized")
@@ -306,6 +310,71 @@ class PerformanceTracker:
             valid_models.sort(key=lambda x: x[1])
             return valid_models[0][0]
     
+    def get_latency_percentile(
+        self,
+        model: str,
+        percentile: float,
+        min_samples: int = 5
+    ) -> Optional[float]:
+        """
+        Get a response-time percentile over the recent window (last 100 requests).
+        
+        Args:
+            model: Model name
+            percentile: Percentile in (0, 100], e.g. 90 for p90
+            min_samples: Minimum recorded requests before a value is returned
+            
+        Returns:
+            Latency in seconds, or None if there is not enough history
+        """
+        with self._lock:
+            if model not in self._metrics:
+                return None
+            times = sorted(self._metrics[model]['response_times'])
+        
+        if len(times) < max(1, min_samples):
+            return None
+        index = max(0, math.ceil(percentile / 100 * len(times)) - 1)
+        return times[min(index, len(times) - 1)]
+    
+    def record_hedge(self, model: str, hedged: bool, backup_won: bool = False):
+        """
+        Record the outcome of a hedged race.
+        
+        Args:
+            model: Primary model the request was sent to first
+            hedged: Whether a backup model was launched
+            backup_won: Whether the backup answered first
+        """
+        with self._lock:
+            stats = self._hedge_stats.setdefault(
+                model, {'requests': 0, 'hedged': 0, 'backup_wins': 0}
+            )
+            stats['requests'] += 1
+            if hedged:
+                stats['hedged'] += 1
+            if backup_won:
+                stats['backup_wins'] += 1
+    
+    def get_hedge_stats(self) -> Dict[str, Any]:
+        """
+        Get hedged race statistics per primary model.
+        
+        hedge_rate_percent is how often the primary passed its cutoff;
+        hedge_hit_rate_percent is how often a launched backup then won.
+        """
+        with self._lock:
+            result = {}
+            for model, stats in self._hedge_stats.items():
+                requests = stats['requests']
+                hedged = stats['hedged']
+                result[model] = {
+                    **stats,
+                    'hedge_rate_percent': round(hedged / requests * 100, 2) if requests else 0.0,
+                    'hedge_hit_rate_percent': round(stats['backup_wins'] / hedged * 100, 2) if hedged else 0.0
+                }
+            return result
+    
     def reset_metrics(self, model: Optional[str] = None):
         """
         Reset metrics.
@@ -322,6 +391,7 @@ class PerformanceTracker:
                     del self._recent_successes[model]
                     if model in self._circuit_open_times:
                         del self._circuit_open_times[model]
+                    self._hedge_stats.pop(model, None)
                     logger.info(f"[PerformanceTracker] Reset metrics for {model}")
             else:
                 self._metrics.clear()
@@ -329,6 +399,7 @@ class PerformanceTracker:
                 self._circuit_open_times.clear()
                 self._recent_failures.clear()
                 self._recent_successes.clear()
+                self._hedge_stats.clear()
                 logger.info("[PerformanceTracker] Reset all metrics")
 
 
@@ -0,0 +1,348 @@
+"""
+PNG Render Cache
+================
+
+Content-addressed cache for rendered diagram PNGs.
+
+The key is a SHA-256 over the canonical JSON of the diagram spec plus the
+render parameters (diagram type, width, height, scale) and the render host
+page version, so identical exports - editor re-exports, DingTalk retries,
+repeated generate_png calls - skip the browser entirely.
+
+Two tiers:
+- Memory: per-worker LRU bounded by total bytes
+- Disk: render_<key>.png files in temp_images/, bounded by total bytes and
+  evicted least-recently-used (mtime is refreshed on every hit). Files are
+  shared by all workers and served directly by /api/temp_images/.
+
+@author lycosa9527
+@made_by MindSpring Team
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import aiofiles
+import aiofiles.os
+
+logger = logging.getLogger(__name__)
+
+TEMP_IMAGES_DIR = Path("temp_images")
+CACHE_FILE_PREFIX = "render_"
+_CACHE_FILE_RE = re.compile(r'^render_([0-9a-f]{64})\.png$')
+
+
+def make_render_key(
+    diagram_type: str,
+    diagram_data: Dict[str, Any],
+    width: int,
+    height: int,
+    scale: int,
+    render_version: str = ""
+) -> str:
+    """
+    Build the content-addressed cache key for a render.
+
+    Dict key order and whitespace do not affect the key; any change to the
+    spec, the render parameters or the render host page does.
+    """
+    canonical = json.dumps(
+        {
+            'type': diagram_type,
+            'data': diagram_data,
+            'width': width,
+            'height': height,
+            'scale': scale,
+            'version': render_version
+        },
+        sort_keys=True,
+        separators=(',', ':'),
+        ensure_ascii=False,
+        default=str
+    )
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def cache_filename(key: str) -> str:
+    """Filename of the on-disk entry for a key (served under /api/temp_images/)."""
+    return f"{CACHE_FILE_PREFIX}{key}.png"
+
+
+def parse_cache_filename(filename: str) -> Optional[str]:
+    """Return the key for a render cache filename, or None for other files."""
+    match = _CACHE_FILE_RE.match(filename)
+    return match.group(1) if match else None
+
+
+class PNGRenderCache:
+    """
+    Two-tier (memory LRU + disk) cache of rendered PNG bytes.
+
+    Memory operations are guarded by a threading lock so stats can be read
+    from any thread; disk I/O uses aiofiles and never blocks the event loop.
+    """
+
+    def __init__(
+        self,
+        directory: Path = TEMP_IMAGES_DIR,
+        memory_max_bytes: int = 64 * 1024 * 1024,
+        disk_max_bytes: int = 512 * 1024 * 1024,
+        enabled: bool = True
+    ):
+        self.directory = Path(directory)
+        self.memory_max_bytes = memory_max_bytes
+        self.disk_max_bytes = disk_max_bytes
+        self.enabled = enabled
+
+        self._memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+
+        # key -> (size, last_access); loaded lazily from the directory
+        self._disk_index: Dict[str, tuple] = {}
+        self._disk_bytes = 0
+        self._disk_loaded = False
+        self._disk_lock: Optional[asyncio.Lock] = None
+
+        self._memory_hits = 0
+        self._disk_hits = 0
+        self._misses = 0
+        self._stores = 0
+        self._bytes_saved = 0
+        self._memory_evictions = 0
+        self._disk_evictions = 0
+
+    def configure(self, enabled: bool, memory_max_mb: int, disk_max_mb: int) -> None:
+        """Apply settings from config (called once at startup)."""
+        self.enabled = enabled
+        self.memory_max_bytes = max(0, memory_max_mb) * 1024 * 1024
+        self.disk_max_bytes = max(0, disk_max_mb) * 1024 * 1024
+
+    # ------------------------------------------------------------------
+    # Memory tier
+    # ------------------------------------------------------------------
+
+    def _memory_get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+            return data
+
+    def _memory_put(self, key: str, data: bytes) -> None:
+        if len(data) > self.memory_max_bytes:
+            return
+        with self._lock:
+            old = self._memory.pop(key, None)
+            if old is not None:
+                self._memory_bytes -= len(old)
+            self._memory[key] = data
+            self._memory_bytes += len(data)
+            while self._memory_bytes > self.memory_max_bytes and self._memory:
+                _, evicted = self._memory.popitem(last=False)
+                self._memory_bytes -= len(evicted)
+                self._memory_evictions += 1
+
+    def get_memory(self, key: str) -> Optional[bytes]:
+        """Memory-tier lookup only (no disk I/O, no stats)."""
+        return self._memory_get(key)
+
+    # ------------------------------------------------------------------
+    # Disk tier
+    # ------------------------------------------------------------------
+
+    def _get_disk_lock(self) -> asyncio.Lock:
+        if self._disk_lock is None:
+            self._disk_lock = asyncio.Lock()
+        return self._disk_lock
+
+    def _scan_directory(self) -> Dict[str, tuple]:
+        """Index existing cache files (runs in a worker thread)."""
+        index = {}
+        if not self.directory.exists():
+            return index
+        for path in self.directory.glob(f"{CACHE_FILE_PREFIX}*.png"):
+            key = parse_cache_filename(path.name)
+            if key is None:
+                continue
+            try:
+                st = path.stat()
+                index[key] = (st.st_size, st.st_mtime)
+            except OSError:
+                continue
+        return index
+
+    async def _ensure_disk_index(self) -> None:
+        if self._disk_loaded:
+            return
+        async with self._get_disk_lock():
+            if self._disk_loaded:
+                return
+            self._disk_index = await asyncio.to_thread(self._scan_directory)
+            self._disk_bytes = sum(size for size, _ in self._disk_index.values())
+            self._disk_loaded = True
+            if self._disk_index:
+                logger.debug(
+                    f"[PNGRenderCache] Indexed {len(self._disk_index)} cached PNGs "
+                    f"({self._disk_bytes // 1024}KB)"
+                )
+
+    def _forget_disk(self, key: str) -> None:
+        entry = self._disk_index.pop(key, None)
+        if entry is not None:
+            self._disk_bytes -= entry[0]
+
+    async def _disk_get(self, key: str) -> Optional[bytes]:
+        path = self.directory / cache_filename(key)
+        try:
+            async with aiofiles.open(path, 'rb') as f:
+                data = await f.read()
+        except FileNotFoundError:
+            # Evicted by another worker or removed by temp image cleanup
+            self._forget_disk(key)
+            return None
+        except OSError as e:
+            logger.warning(f"[PNGRenderCache] Failed to read {path.name}: {e}")
+            return None
+
+        now = time.time()
+        try:
+            # Refresh mtime so LRU eviction and age-based cleanup see the hit
+            await asyncio.to_thread(os.utime, path, (now, now))
+        except OSError:
+            pass
+        self._forget_disk(key)
+        self._disk_index[key] = (len(data), now)
+        self._disk_bytes += len(data)
+        return data
+
+    async def _disk_put(self, key: str, data: bytes) -> None:
+        if len(data) > self.disk_max_bytes:
+            return
+        path = self.directory / cache_filename(key)
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        try:
+            await aiofiles.os.makedirs(self.directory, exist_ok=True)
+            async with aiofiles.open(tmp_path, 'wb') as f:
+                await f.write(data)
+            # Atomic so concurrent readers never see a partial PNG
+            await aiofiles.os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"[PNGRenderCache] Failed to write {path.name}: {e}")
+            return
+
+        self._forget_disk(key)
+        self._disk_index[key] = (len(data), time.time())
+        self._disk_bytes += len(data)
+        await self._evict_disk()
+
+    async def _evict_disk(self) -> None:
+        if self._disk_bytes <= self.disk_max_bytes:
+            return
+        async with self._get_disk_lock():
+            by_age = sorted(self._disk_index.items(), key=lambda item: item[1][1])
+            for key, _ in by_age:
+                if self._disk_bytes <= self.disk_max_bytes:
+                    break
+                self._forget_disk(key)
+                try:
+                    await aiofiles.os.remove(self.directory / cache_filename(key))
+                    self._disk_evictions += 1
+                except FileNotFoundError:
+                    pass
+                except OSError as e:
+                    logger.warning(f"[PNGRenderCache] Failed to evict {key[:12]}: {e}")
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    async def get(self, key: str) -> Optional[bytes]:
+        """
+        Look up a rendered PNG, memory first, then disk.
+
+        Disk hits are promoted into the memory tier.
+        """
+        if not self.enabled:
+            return None
+
+        data = self._memory_get(key)
+        if data is not None:
+            self._memory_hits += 1
+            self._bytes_saved += len(data)
+            return data
+
+        await self._ensure_disk_index()
+        if key in self._disk_index or await aiofiles.os.path.exists(self.directory / cache_filename(key)):
+            data = await self._disk_get(key)
+            if data is not None:
+                self._disk_hits += 1
+                self._bytes_saved += len(data)
+                self._memory_put(key, data)
+                return data
+
+        self._misses += 1
+        return None
+
+    async def put(self, key: str, data: bytes) -> None:
+        """Store a freshly rendered PNG in both tiers."""
+        if not self.enabled or not data:
+            return
+        self._memory_put(key, data)
+        await self._ensure_disk_index()
+        await self._disk_put(key, data)
+        self._stores += 1
+
+    async def ensure_file(self, key: str, data: bytes) -> str:
+        """
+        Make sure the PNG for key exists in temp_images/ and return its filename.
+
+        Used by DingTalk, which hands out a URL instead of the bytes. Works
+        even when caching is disabled so the URL always resolves.
+        """
+        await self._ensure_disk_index()
+        path = self.directory / cache_filename(key)
+        if key not in self._disk_index or not await aiofiles.os.path.exists(path):
+            await self._disk_put(key, data)
+        return cache_filename(key)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache statistics."""
+        hits = self._memory_hits + self._disk_hits
+        lookups = hits + self._misses
+        return {
+            'enabled': self.enabled,
+            'lookups': lookups,
+            'hits': hits,
+            'memory_hits': self._memory_hits,
+            'disk_hits': self._disk_hits,
+            'misses': self._misses,
+            'hit_rate_percent': round(hits / lookups * 100, 1) if lookups else 0.0,
+            'bytes_saved': self._bytes_saved,
+            'stores': self._stores,
+            'memory': {
+                'entries': len(self._memory),
+                'bytes': self._memory_bytes,
+                'max_bytes': self.memory_max_bytes,
+                'evictions': self._memory_evictions
+            },
+            'disk': {
+                'entries': len(self._disk_index),
+                'bytes': self._disk_bytes,
+                'max_bytes': self.disk_max_bytes,
+                'evictions': self._disk_evictions
+            }
+        }
+
+
+# Singleton instance
+png_render_cache = PNGRenderCache()
@@ -0,0 +1,262 @@
+"""
+Principal Cache
+===============
+
+Short-TTL, size-bounded cache of what authentication resolves on every
+request: users by id, organization status by id and API keys by SHA-256
+of the key. Steady-state authenticated requests never open a database
+session.
+
+Entries are column snapshots, not ORM instances: each hit builds a fresh
+detached User (the same shape get_current_user returned after expunge), so
+a route mutating current_user cannot leak into other requests.
+
+Invalidation:
+- invalidate_user / invalidate_organization / invalidate_api_key evict the
+  entry in this worker right away, and are called wherever auth state
+  changes (admin edits, lockouts, password resets)
+- the same calls bump a shared epoch file (data/auth_cache.epoch); every
+  worker stats it on lookup and clears its own cache when it changes, so
+  other workers drop stale principals immediately as well
+- the TTL bounds staleness for changes made outside the app (direct SQL)
+
+@author lycosa9527
+@made_by MindSpring Team
+"""
+
+import hashlib
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+from sqlalchemy import inspect as sa_inspect
+from sqlalchemy.orm import make_transient_to_detached
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_EPOCH_PATH = Path("data") / "auth_cache.epoch"
+
+_MISSING = object()
+
+
+def hash_api_key(api_key: str) -> str:
+    """Cache key for an API key (the raw key is never kept in memory longer than the request)."""
+    return hashlib.sha256(api_key.encode('utf-8')).hexdigest()
+
+
+def snapshot(instance: Any) -> Dict[str, Any]:
+    """Column values of an ORM instance."""
+    return {attr.key: getattr(instance, attr.key) for attr in sa_inspect(type(instance)).column_attrs}
+
+
+def organization_status(org) -> Optional[Dict[str, Any]]:
+    """The organization fields authentication checks (None for a missing organization)."""
+    if org is None:
+        return None
+    return {
+        'is_active': org.is_active if hasattr(org, 'is_active') else True,
+        'expires_at': getattr(org, 'expires_at', None),
+    }
+
+
+class PrincipalCache:
+    """
+    LRU of (expires_at, value) keyed by ('user', id), ('org', id),
+    ('api_key', sha256) and ('enterprise',).
+
+    Guarded by a threading lock: sync dependencies run in the threadpool.
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: float = 30.0,
+        max_entries: int = 10000,
+        enabled: bool = True,
+        epoch_path: Path = DEFAULT_EPOCH_PATH
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.enabled = enabled
+        self.epoch_path = Path(epoch_path)
+
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._epoch = self._read_epoch()
+
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._invalidations = 0
+        self._epoch_clears = 0
+
+    def configure(self, enabled: bool, ttl_seconds: float, max_entries: int) -> None:
+        """Apply settings from config (called once at startup)."""
+        self.enabled = enabled
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max(1, max_entries)
+        self.clear()
+
+    # ------------------------------------------------------------------
+    # Cross-worker epoch
+    # ------------------------------------------------------------------
+
+    def _read_epoch(self) -> Optional[Tuple[int, int, int]]:
+        try:
+            st = os.stat(self.epoch_path)
+        except OSError:
+            return None
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    def _bump_epoch(self) -> None:
+        """Replace the epoch file (new inode) so every worker sees a change."""
+        try:
+            self.epoch_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.epoch_path.with_name(f"{self.epoch_path.name}.{uuid.uuid4().hex}.tmp")
+            tmp_path.write_text(uuid.uuid4().hex)
+            os.replace(tmp_path, self.epoch_path)
+        except OSError as e:
+            logger.warning(f"[PrincipalCache] Failed to publish invalidation to other workers: {e}")
+            return
+        # This worker already evicted what changed; don't clear everything
+        self._epoch = self._read_epoch()
+
+    def _check_epoch(self) -> None:
+        epoch = self._read_epoch()
+        if epoch != self._epoch:
+            with self._lock:
+                self._entries.clear()
+                self._epoch = epoch
+                self._epoch_clears += 1
+
+    # ------------------------------------------------------------------
+    # Entries
+    # ------------------------------------------------------------------
+
+    def _get(self, key: Hashable) -> Any:
+        if not self.enabled:
+            return _MISSING
+        self._check_epoch()
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    del self._entries[key]
+                self._misses += 1
+                return _MISSING
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return entry[1]
+
+    def _put(self, key: Hashable, value: Any) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def _evict(self, *keys: Hashable, broadcast: bool) -> None:
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+            self._invalidations += 1
+        if broadcast:
+            self._bump_epoch()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    # ------------------------------------------------------------------
+    # Users and organizations
+    # ------------------------------------------------------------------
+
+    def get_user(self, user_id: int):
+        """Fresh detached User for a cached id, or None."""
+        values = self._get(('user', user_id))
+        if values is _MISSING:
+            return None
+        from models.auth import User
+        user = User(**values)
+        make_transient_to_detached(user)
+        return user
+
+    def put_user(self, user) -> None:
+        self._put(('user', user.id), snapshot(user))
+
+    def get_organization(self, org_id: int) -> Tuple[bool, Optional[Dict[str, Any]]]:
+        """(cached, status); status is None for a missing organization."""
+        value = self._get(('org', org_id))
+        if value is _MISSING:
+            return False, None
+        return True, value
+
+    def put_organization(self, org_id: int, status: Optional[Dict[str, Any]]) -> None:
+        self._put(('org', org_id), status)
+
+    def get_enterprise_user_id(self) -> Optional[int]:
+        value = self._get(('enterprise',))
+        return None if value is _MISSING else value
+
+    def put_enterprise_user_id(self, user_id: int) -> None:
+        self._put(('enterprise',), user_id)
+
+    # ------------------------------------------------------------------
+    # API keys
+    # ------------------------------------------------------------------
+
+    def get_api_key(self, api_key: str) -> Optional[Dict[str, Any]]:
+        """Snapshot of an active APIKey row, or None."""
+        value = self._get(('api_key', hash_api_key(api_key)))
+        return None if value is _MISSING else value
+
+    def put_api_key(self, api_key: str, record) -> None:
+        self._put(('api_key', hash_api_key(api_key)), snapshot(record))
+
+    # ------------------------------------------------------------------
+    # Invalidation hooks
+    # ------------------------------------------------------------------
+
+    def invalidate_user(self, user_id: int, broadcast: bool = True) -> None:
+        """
+        Evict a user after changing it.
+
+        broadcast=False only evicts in this worker: for bookkeeping fields
+        (failed attempts, last login) that no authorization decision reads,
+        so every login doesn't flush the other workers' caches.
+        """
+        self._evict(('user', user_id), ('enterprise',), broadcast=broadcast)
+
+    def invalidate_organization(self, org_id: int) -> None:
+        self._evict(('org', org_id), ('enterprise',), broadcast=True)
+
+    def invalidate_api_key(self, api_key: str) -> None:
+        self._evict(('api_key', hash_api_key(api_key)), broadcast=True)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'enabled': self.enabled,
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl_seconds,
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_rate': round(self._hits / lookups, 3) if lookups else 0.0,
+                'evictions': self._evictions,
+                'invalidations': self._invalidations,
+                'epoch_clears': self._epoch_clears,
+            }
+
+
+# Singleton instance (configured at startup from AUTH_CACHE_* settings)
+principal_cache = PrincipalCache()
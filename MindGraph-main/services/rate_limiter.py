@@ -1,178 +1,438 @@
 """
-Dashscope Rate Limiter
-======================
+LLM Rate Limiter
+================
 
-Rate limiting for Dashscope platform to prevent exceeding QPM and concurrent limits.
+Rate limiting for LLM providers to prevent exceeding QPM and concurrent limits.
+
+Each request is admitted against a chain of buckets: an optional per-model
+bucket (e.g. qwen-plus) and the provider bucket it belongs to (Dashscope,
+Hunyuan, Volcengine). A bucket enforces a rolling QPM window plus a
+concurrency cap.
+
+Waiters are queued and woken in FIFO order (per bucket) the moment capacity
+frees up: release() dispatches immediately, and when a waiter is blocked on
+QPM a single loop timer fires exactly when the oldest request in the window
+expires. No coroutine sleeps while holding a lock.
 
 @author lycosa9527
 @made_by MindSpring Team
 """
 
 import asyncio
+import bisect
 import logging
-from datetime import datetime, timedelta
 from collections import deque
-from typing import Optional
+from contextlib import asynccontextmanager
+from typing import Optional, Dict, List, Tuple, Any
 
 logger = logging.getLogger(__name__)
 
 
-class DashscopeRateLimiter:
+DEFAULT_PROVIDER = 'dashscope'
+
+# Which provider account each model alias is billed/limited against
+MODEL_PROVIDERS = {
+    'qwen': 'dashscope',
+    'qwen-turbo': 'dashscope',
+    'qwen-plus': 'dashscope',
+    'deepseek': 'dashscope',
+    'kimi': 'dashscope',
+    'omni': 'dashscope',
+    'qwen-omni': 'dashscope',
+    'hunyuan': 'hunyuan',
+    'doubao': 'volcengine',
+}
+
+# Histogram bucket upper bounds
+_WAIT_BOUNDS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+_DEPTH_BOUNDS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+
+class _Histogram:
+    """Fixed-bucket histogram (non-cumulative counts per upper bound)."""
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+
+    def snapshot(self) -> Dict[str, int]:
+        labels = [f"le_{b:g}" for b in self.bounds] + ['gt_' + f"{self.bounds[-1]:g}"]
+        return dict(zip(labels, self.counts))
+
+
+class _Bucket:
+    """Rolling-window QPM + concurrency budget for one provider or model."""
+
+    def __init__(self, name: str, qpm_limit: int, concurrent_limit: int, window_seconds: float):
+        self.name = name
+        self.qpm_limit = qpm_limit
+        self.concurrent_limit = concurrent_limit
+        self.window_seconds = window_seconds
+        self.window = deque()
+        self.active = 0
+
+        # Statistics
+        self.total_requests = 0
+        self.total_waits = 0
+        self.total_wait_time = 0.0
+
+    def prune(self, now: float) -> None:
+        cutoff = now - self.window_seconds
+        while self.window and self.window[0] <= cutoff:
+            self.window.popleft()
+
+    def has_capacity(self, now: float) -> bool:
+        self.prune(now)
+        return self.active < self.concurrent_limit and len(self.window) < self.qpm_limit
+
+    def qpm_free_at(self) -> Optional[float]:
+        """Loop time at which the QPM window admits another request (None if it already does)."""
+        if len(self.window) < self.qpm_limit:
+            return None
+        return self.window[0] + self.window_seconds
+
+    def take(self, now: float) -> None:
+        self.window.append(now)
+        self.active += 1
+        self.total_requests += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'qpm_limit': self.qpm_limit,
+            'concurrent_limit': self.concurrent_limit,
+            'current_qpm': len(self.window),
+            'active_requests': self.active,
+            'total_requests': self.total_requests,
+            'total_waits': self.total_waits,
+            'total_wait_time': round(self.total_wait_time, 2)
+        }
+
+
+class _Waiter:
+    __slots__ = ('future', 'buckets', 'enqueued_at')
+
+    def __init__(self, future: asyncio.Future, buckets: List[_Bucket], enqueued_at: float):
+        self.future = future
+        self.buckets = buckets
+        self.enqueued_at = enqueued_at
+
+
+class LLMRateLimiter:
     """
-    Rate limiter for Dashscope platform.
-    
+    FIFO rate limiter with per-provider and per-model buckets.
+
     Prevents exceeding:
     - QPM (Queries Per Minute) limit
     - Concurrent request limit
-    
+
     Usage:
-        limiter = DashscopeRateLimiter(qpm_limit=60, concurrent_limit=10)
-        
-        await limiter.acquire()  # Blocks if limits exceeded
+        limiter = LLMRateLimiter(qpm_limit=60, concurrent_limit=10)
+
+        async with limiter.limit('qwen-plus'):  # Blocks if limits exceeded
+            result = await make_api_call()
+
+        # or explicitly
+        await limiter.acquire('qwen-plus')
         try:
             result = await make_api_call()
         finally:
-            await limiter.release()
+            await limiter.release('qwen-plus')
     """
-    
+
     def __init__(
         self,
         qpm_limit: int = 200,
         concurrent_limit: int = 50,
-        enabled: bool = True
+        enabled: bool = True,
+        provider_limits: Optional[Dict[str, Tuple[int, int]]] = None,
+        model_limits: Optional[Dict[str, Tuple[int, int]]] = None,
+        window_seconds: float = 60.0
     ):
         """
         Initialize rate limiter.
-        
+
         Args:
-            qpm_limit: Maximum queries per minute (default: 200)
-            concurrent_limit: Maximum concurrent requests (default: 50)
+            qpm_limit: Maximum queries per minute for the default (Dashscope) provider
+            concurrent_limit: Maximum concurrent requests for the default provider
             enabled: Whether rate limiting is enabled
+            provider_limits: Extra provider buckets, {provider: (qpm, concurrent)}
+            model_limits: Per-model buckets checked before the provider, {model: (qpm, concurrent)}
+            window_seconds: Length of the QPM window (60 in production)
         """
         self.qpm_limit = qpm_limit
         self.concurrent_limit = concurrent_limit
         self.enabled = enabled
-        
-        # Track recent requests (last minute)
-        self._request_timestamps = deque()
-        self._active_requests = 0
-        self._lock = asyncio.Lock()
-        
+        self.window_seconds = window_seconds
+
+        self._providers: Dict[str, _Bucket] = {
+            DEFAULT_PROVIDER: _Bucket(DEFAULT_PROVIDER, qpm_limit, concurrent_limit, window_seconds)
+        }
+        for name, (qpm, concurrent) in (provider_limits or {}).items():
+            self._providers[name] = _Bucket(name, qpm, concurrent, window_seconds)
+        self._models: Dict[str, _Bucket] = {
+            name: _Bucket(f"model:{name}", qpm, concurrent, window_seconds)
+            for name, (qpm, concurrent) in (model_limits or {}).items()
+        }
+
+        self._waiters: deque = deque()
+        self._timer: Optional[asyncio.TimerHandle] = None
+
         # Statistics
         self._total_requests = 0
         self._total_waits = 0
         self._total_wait_time = 0.0
-        
+        self._max_queue_depth = 0
+        self._wait_histogram = _Histogram(_WAIT_BOUNDS)
+        self._depth_histogram = _Histogram(_DEPTH_BOUNDS)
+        self._recent_waits = deque(maxlen=1000)
+
         logger.info(
             f"[RateLimiter] Initialized: "
-            f"QPM={qpm_limit}, Concurrent={concurrent_limit}, Enabled={enabled}"
+            f"QPM={qpm_limit}, Concurrent={concurrent_limit}, Enabled={enabled}, "
+            f"providers={sorted(self._providers)}, model_buckets={sorted(self._models)}"
         )
-    
-    async def acquire(self) -> None:
+
+    # ------------------------------------------------------------------
+    # Bucket resolution
+    # ------------------------------------------------------------------
+
+    def _buckets_for(self, model: Optional[str]) -> List[_Bucket]:
+        """Buckets a request for model must fit in (model bucket first, then provider)."""
+        provider = MODEL_PROVIDERS.get(model, DEFAULT_PROVIDER) if model else DEFAULT_PROVIDER
+        chain = []
+        if model in self._models:
+            chain.append(self._models[model])
+        chain.append(self._providers.get(provider) or self._providers[DEFAULT_PROVIDER])
+        return chain
+
+    # ------------------------------------------------------------------
+    # Dispatch
+    # ------------------------------------------------------------------
+
+    def _grant(self, buckets: List[_Bucket], enqueued_at: float, now: float) -> None:
+        for bucket in buckets:
+            bucket.take(now)
+        self._record_grant(buckets, now - enqueued_at)
+
+    def _record_grant(self, buckets: List[_Bucket], wait: float, held_back: Optional[bool] = None) -> None:
+        """Update wait statistics for a granted request."""
+        self._total_requests += 1
+        self._wait_histogram.observe(wait)
+        self._recent_waits.append(wait)
+        if held_back if held_back is not None else wait > 0:
+            self._total_waits += 1
+            self._total_wait_time += wait
+            for bucket in buckets:
+                bucket.total_waits += 1
+                bucket.total_wait_time += wait
+
+    def _dispatch(self) -> None:
+        """
+        Grant every waiter that fits, in FIFO order per bucket.
+
+        A waiter that cannot be granted holds back later waiters only on the
+        buckets that stopped it, so a saturated provider (or a model at its own
+        limit) never stalls traffic that does not need that bucket.
+        """
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._waiters:
+            return
+
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        blocked = set()
+        wake_at = None
+        remaining = deque()
+
+        for waiter in self._waiters:
+            if waiter.future.done():
+                continue  # Cancelled while queued
+            stoppers = [
+                b for b in waiter.buckets
+                if id(b) in blocked or not b.has_capacity(now)
+            ]
+            if not stoppers:
+                self._grant(waiter.buckets, waiter.enqueued_at, now)
+                waiter.future.set_result(None)
+                continue
+
+            blocked.update(id(b) for b in stoppers)
+            remaining.append(waiter)
+            for bucket in waiter.buckets:
+                free_at = bucket.qpm_free_at()
+                if free_at is not None and (wake_at is None or free_at < wake_at):
+                    wake_at = free_at
+
+        self._waiters = remaining
+
+        # Concurrency frees up via release(); QPM frees up at a known time
+        if wake_at is not None:
+            self._timer = loop.call_at(wake_at, self._dispatch)
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def _try_fast_path(self, buckets: List[_Bucket], now: float) -> bool:
+        """Grant immediately when nothing is queued and every bucket has capacity."""
+        if not self._waiters and all(b.has_capacity(now) for b in buckets):
+            self._grant(buckets, now, now)
+            return True
+        return False
+
+    async def acquire(self, model: Optional[str] = None) -> None:
         """
         Acquire permission to make a request.
-        Blocks if rate limits would be exceeded.
+        Blocks (FIFO) if rate limits would be exceeded.
+
+        Args:
+            model: Model alias; selects the model and provider buckets
+                   (None uses the default Dashscope bucket)
         """
         if not self.enabled:
             return
-        
-        wait_start = None
-        async with self._lock:
-            # 1. Wait if concurrent limit reached
-            while self._active_requests >= self.concurrent_limit:
-                if wait_start is None:
-                    wait_start = datetime.now()
-                    self._total_waits += 1
-                    logger.debug(
-                        f"[RateLimiter] Concurrent limit reached "
-                        f"({self._active_requests}/{self.concurrent_limit}), waiting..."
-                    )
-                await asyncio.sleep(0.1)
-            
-            # 2. Clean old timestamps (older than 1 minute)
-            now = datetime.now()
-            one_minute_ago = now - timedelta(minutes=1)
-            while self._request_timestamps and self._request_timestamps[0] < one_minute_ago:
-                self._request_timestamps.popleft()
-            
-            # 3. Wait if QPM limit reached
-            while len(self._request_timestamps) >= self.qpm_limit:
-                if wait_start is None:
-                    wait_start = datetime.now()
-                    self._total_waits += 1
-                    logger.warning(
-                        f"[RateLimiter] QPM limit reached "
-                        f"({len(self._request_timestamps)}/{self.qpm_limit}), waiting..."
-                    )
-                await asyncio.sleep(1.0)
-                
-                # Clean old timestamps again
-                now = datetime.now()
-                one_minute_ago = now - timedelta(minutes=1)
-                while self._request_timestamps and self._request_timestamps[0] < one_minute_ago:
-                    self._request_timestamps.popleft()
-            
-            # 4. Grant permission
-            self._request_timestamps.append(now)
-            self._active_requests += 1
-            self._total_requests += 1
-            
-            # Track wait time
-            if wait_start:
-                wait_duration = (datetime.now() - wait_start).total_seconds()
-                self._total_wait_time += wait_duration
-                logger.debug(f"[RateLimiter] Waited {wait_duration:.2f}s before acquiring")
-            
+
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        buckets = self._buckets_for(model)
+
+        depth = len(self._waiters)
+        self._depth_histogram.observe(depth)
+
+        if self._try_fast_path(buckets, now):
+            return
+
+        waiter = _Waiter(loop.create_future(), buckets, now)
+        self._waiters.append(waiter)
+        self._max_queue_depth = max(self._max_queue_depth, len(self._waiters))
+        self._dispatch()
+
+        if not waiter.future.done():
             logger.debug(
-                f"[RateLimiter] Acquired: "
-                f"{self._active_requests}/{self.concurrent_limit} concurrent, "
-                f"{len(self._request_timestamps)}/{self.qpm_limit} QPM"
+                f"[RateLimiter] {'/'.join(b.name for b in buckets)} at capacity, "
+                f"queued behind {depth} waiter(s)"
             )
-    
-    async def release(self) -> None:
-        """Release after request completes."""
+
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # Granted in the same tick we were cancelled: hand the slot back
+                self._release_buckets(buckets)
+            else:
+                waiter.future.cancel()
+            self._dispatch()
+            raise
+
+        wait = loop.time() - now
+        if wait >= 1.0:
+            logger.warning(f"[RateLimiter] Waited {wait:.2f}s for {model or DEFAULT_PROVIDER}")
+        else:
+            logger.debug(f"[RateLimiter] Waited {wait:.3f}s before acquiring")
+
+    def _release_buckets(self, buckets: List[_Bucket]) -> None:
+        for bucket in buckets:
+            bucket.active = max(0, bucket.active - 1)
+
+    async def release(self, model: Optional[str] = None) -> None:
+        """Release after request completes (pass the same model given to acquire)."""
         if not self.enabled:
             return
-        
-        async with self._lock:
-            self._active_requests -= 1
-            logger.debug(
-                f"[RateLimiter] Released: "
-                f"{self._active_requests}/{self.concurrent_limit} concurrent"
-            )
-    
+
+        self._release_buckets(self._buckets_for(model))
+        self._dispatch()
+
+    @asynccontextmanager
+    async def limit(self, model: Optional[str] = None):
+        """Context manager holding a slot for model for the duration of the block."""
+        await self.acquire(model)
+        try:
+            yield self
+        finally:
+            await self.release(model)
+
+    def _percentile(self, values: List[float], pct: float) -> float:
+        if not values:
+            return 0.0
+        index = min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))
+        return values[index]
+
     def get_stats(self) -> dict:
         """Get rate limiter statistics."""
+        default = self._providers[DEFAULT_PROVIDER]
+        try:
+            default.prune(asyncio.get_running_loop().time())
+        except RuntimeError:
+            pass  # Called outside the event loop; window shown as last pruned
+        recent = sorted(self._recent_waits)
         return {
             'enabled': self.enabled,
             'qpm_limit': self.qpm_limit,
             'concurrent_limit': self.concurrent_limit,
-            'current_qpm': len(self._request_timestamps),
-            'active_requests': self._active_requests,
+            'current_qpm': len(default.window),
+            'active_requests': default.active,
             'total_requests': self._total_requests,
             'total_waits': self._total_waits,
             'total_wait_time': round(self._total_wait_time, 2),
             'avg_wait_time': round(
                 self._total_wait_time / self._total_waits if self._total_waits > 0 else 0,
                 2
-            )
+            ),
+            'queue_depth': len(self._waiters),
+            'max_queue_depth': self._max_queue_depth,
+            'wait_p50': round(self._percentile(recent, 50), 4),
+            'wait_p95': round(self._percentile(recent, 95), 4),
+            'wait_p99': round(self._percentile(recent, 99), 4),
+            'wait_histogram': self._wait_histogram.snapshot(),
+            'queue_depth_histogram': self._depth_histogram.snapshot(),
+            'providers': {name: b.get_stats() for name, b in self._providers.items()},
+            'models': {name: b.get_stats() for name, b in self._models.items()}
         }
-    
+
     async def __aenter__(self):
-        """Context manager support."""
+        """Context manager support (default provider bucket)."""
         await self.acquire()
         return self
-    
+
     async def __aexit__(self, exc_type, exc_val, exc_tb):
         """Context manager support."""
         await self.release()
 
 
+# Backward-compatible name (the limiter used to cover Dashscope only)
+DashscopeRateLimiter = LLMRateLimiter
+
+
+def parse_model_limits(spec: str) -> Dict[str, Tuple[int, int]]:
+    """
+    Parse per-model limits from 'model=qpm/concurrent,...'.
+
+    Example: 'qwen-plus=300/50,kimi=60/10'. Invalid entries are skipped with a warning.
+    """
+    limits = {}
+    for item in (spec or '').split(','):
+        item = item.strip()
+        if not item:
+            continue
+        try:
+            name, values = item.split('=', 1)
+            qpm, concurrent = values.split('/', 1)
+            limits[name.strip()] = (int(qpm), int(concurrent))
+        except ValueError:
+            logger.warning(f"[RateLimiter] Ignoring invalid model limit '{item}' (expected model=qpm/concurrent)")
+    return limits
+
+
 # Singleton instance (will be initialized by LLMService)
-_rate_limiter: Optional[DashscopeRateLimiter] = None
+_rate_limiter: Optional[LLMRateLimiter] = None
 
 
-def get_rate_limiter() -> Optional[DashscopeRateLimiter]:
+def get_rate_limiter() -> Optional[LLMRateLimiter]:
     """Get the global rate limiter instance."""
     return _rate_limiter
 
@@ -180,25 +440,43 @@ def get_rate_limiter() -> Optional[DashscopeRateLimiter]:
 def initialize_rate_limiter(
     qpm_limit: int = 200,
     concurrent_limit: int = 50,
-    enabled: bool = True
-) -> DashscopeRateLimiter:
+    enabled: bool = True,
+    provider_limits: Optional[Dict[str, Tuple[int, int]]] = None,
+    model_limits: Optional[Dict[str, Tuple[int, int]]] = None,
+    backend: str = 'memory',
+    poll_interval: float = 0.05
+) -> LLMRateLimiter:
     """
     Initialize the global rate limiter.
-    
+
     Args:
-        qpm_limit: Maximum queries per minute (default: 200)
-        concurrent_limit: Maximum concurrent requests (default: 50)
+        qpm_limit: Maximum queries per minute for Dashscope (default: 200)
+        concurrent_limit: Maximum concurrent requests for Dashscope (default: 50)
         enabled: Whether to enable rate limiting
-        
+        provider_limits: Other provider buckets, {provider: (qpm, concurrent)}
+        model_limits: Per-model buckets, {model: (qpm, concurrent)}
+        backend: 'memory' (per process) or 'sqlite' (shared by all workers on the host)
+        poll_interval: Seconds between checks for releases in other workers (sqlite only)
+
     Returns:
         Initialized rate limiter instance
     """
     global _rate_limiter
-    _rate_limiter = DashscopeRateLimiter(
+    kwargs = dict(
         qpm_limit=qpm_limit,
         concurrent_limit=concurrent_limit,
-        enabled=enabled
+        enabled=enabled,
+        provider_limits=provider_limits,
+        model_limits=model_limits
     )
+    if backend == 'sqlite' and enabled:
+        try:
+            from services.shared_rate_limiter import SharedRateLimiter
+            _rate_limiter = SharedRateLimiter(poll_interval=poll_interval, **kwargs)
+            return _rate_limiter
+        except Exception as e:
+            logger.error(f"[RateLimiter] Shared backend unavailable, using per-worker limits: {e}")
+    elif backend not in ('memory', 'sqlite'):
+        logger.warning(f"[RateLimiter] Unknown backend '{backend}', using per-worker limits")
+    _rate_limiter = LLMRateLimiter(**kwargs)
     return _rate_limiter
-
-
@@ -0,0 +1,178 @@
+"""
+PNG Render Host Pages
+=====================
+
+Self-contained HTML pages used by the headless browser for PNG export.
+
+Each page inlines every script a diagram type needs (d3, theme, style manager,
+logger, shared utilities, the renderer and the dispatcher) taken from the
+modular JavaScript cache, so rendering never fetches anything over loopback
+HTTP. Pages are built once per diagram type and kept in memory; an export only
+injects the spec and awaits window.mindgraphRender().
+
+@author lycosa9527
+@made_by MindSpring Team
+"""
+
+import hashlib
+import logging
+import threading
+from typing import Dict, Any
+
+from static.js.modular_cache_python import modular_js_manager
+
+logger = logging.getLogger(__name__)
+
+
+# Runs after all bundled scripts: marks inlined modules as loaded so the
+# dynamic renderer loader never tries to fetch them, then exposes a single
+# promise-returning entry point for the exporter.
+_HOST_BOOTSTRAP = """
+(function () {
+    const loader = window.dynamicRendererLoader;
+    if (loader) {
+        loader.cache.set('shared-utilities', { renderer: true });
+        loader.cache.set('sugiyama-layout', { renderer: true });
+        Object.values(loader.config).forEach(cfg => {
+            if (window[cfg.renderer]) {
+                loader.cache.set(cfg.module, { renderer: window[cfg.renderer] });
+            }
+        });
+    }
+
+    window.mindgraphRender = async function (diagramType, diagramData, width, height) {
+        const container = document.getElementById('d3-container');
+        container.style.width = width + 'px';
+        container.style.height = height + 'px';
+
+        if (typeof renderGraph !== 'function') {
+            throw new Error('renderGraph function not available');
+        }
+        await renderGraph(diagramType, diagramData, null, null);
+
+        const svg = container.querySelector('svg');
+        if (!svg) {
+            throw new Error('No SVG element created - rendering may have failed');
+        }
+
+        // Add watermark to exported PNG
+        if (typeof addWatermark === 'function' && typeof d3 !== 'undefined') {
+            try {
+                addWatermark(d3.select(svg), null);
+            } catch (err) {
+                console.error('Error adding watermark:', err);
+            }
+        }
+        return true;
+    };
+})();
+"""
+
+
+class RenderHostCache:
+    """
+    Builds and caches one render host page per diagram type.
+
+    Thread-safe; pages are immutable once built, so concurrent exports of the
+    same diagram type share the same string.
+    """
+
+    def __init__(self):
+        self._pages: Dict[str, str] = {}
+        self._versions: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._builds = 0
+
+    @staticmethod
+    def _escape_script(content: str) -> str:
+        """Prevent inlined JS from closing its <script> element early."""
+        return content.replace('</script', '<\\/script')
+
+    def _build(self, diagram_type: str) -> str:
+        """Assemble the host page for a diagram type."""
+        scripts = []
+        for module_name, content in modular_js_manager.get_render_bundle(diagram_type):
+            scripts.append(
+                f'<script data-module="{module_name}">\n{self._escape_script(content)}\n</script>'
+            )
+        scripts.append(f'<script>{_HOST_BOOTSTRAP}</script>')
+
+        return (
+            '<!DOCTYPE html>\n'
+            '<html>\n'
+            '<head>\n'
+            '    <meta charset="UTF-8">\n'
+            '</head>\n'
+            '<body>\n'
+            '    <div id="d3-container" style="width: 1200px; height: 800px;"></div>\n'
+            + '\n'.join(scripts) +
+            '\n</body>\n'
+            '</html>\n'
+        )
+
+    def get_page(self, diagram_type: str) -> str:
+        """
+        Get the render host page for a diagram type, building it on first use.
+
+        Args:
+            diagram_type: Diagram type as sent by the client (e.g. 'bubble_map')
+
+        Returns:
+            Complete HTML document with all scripts inlined
+        """
+        return self._get_page(diagram_type, count_hit=True)
+
+    def _get_page(self, diagram_type: str, count_hit: bool) -> str:
+        key = modular_js_manager.normalize_graph_type(diagram_type)
+        page = self._pages.get(key)
+        if page is not None:
+            if count_hit:
+                self._hits += 1
+            return page
+
+        with self._lock:
+            page = self._pages.get(key)
+            if page is None:
+                page = self._build(diagram_type)
+                self._pages[key] = page
+                self._versions[key] = hashlib.sha256(page.encode('utf-8')).hexdigest()[:16]
+                self._builds += 1
+                logger.debug(f"[RenderHost] Built host page for {key} ({len(page) // 1024}KB)")
+            elif count_hit:
+                self._hits += 1
+        return page
+
+    def get_version(self, diagram_type: str) -> str:
+        """
+        Short content hash of the host page for a diagram type.
+
+        Changes whenever any inlined script changes, so it can be used to key
+        anything derived from a render (e.g. cached PNGs). Not counted as a
+        page cache hit.
+        """
+        key = modular_js_manager.normalize_graph_type(diagram_type)
+        version = self._versions.get(key)
+        if version is None:
+            self._get_page(diagram_type, count_hit=False)
+            version = self._versions[key]
+        return version
+
+    def clear(self) -> None:
+        """Drop all cached pages (e.g. after static JS changes)."""
+        with self._lock:
+            self._pages.clear()
+            self._versions.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get host page cache statistics."""
+        return {
+            'cached_types': sorted(self._pages.keys()),
+            'builds': self._builds,
+            'hits': self._hits,
+            'total_bytes': sum(len(p) for p in self._pages.values())
+        }
+
+
+# Singleton instance
+render_host_cache = RenderHostCache()
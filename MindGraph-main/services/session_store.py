@@ -0,0 +1,490 @@
+"""
+Session Store
+=============
+
+Bounded storage for per-session state: node palette, thinking mode, voice
+and learning sessions.
+
+- One namespace per subsystem (get_session_store('voice'))
+- Idle TTL: a session expires SESSION_STORE_TTL_SECONDS after its last access
+- LRU caps per namespace: SESSION_STORE_MAX_ENTRIES sessions and
+  SESSION_STORE_MAX_MB of state (measured as pickled size); the least
+  recently used sessions are evicted first
+- Backends: 'memory' keeps live objects in each worker; 'sqlite'
+  (data/session_store.db, WAL mode) keeps pickled state shared by all
+  workers, so a follow-up request can land on any of them
+
+get() returns a copy with the sqlite backend: callers that change a session
+write it back with set(). Process-bound resources (WebSockets, API clients,
+agents) stay out of the store.
+
+The dict-style methods are blocking. Async code uses aget/aset/apop/atouch/
+aitems instead, which run the sqlite backend (statements, pickling and the
+periodic prune) in a worker thread; memory backend calls stay inline.
+
+@author lycosa9527
+@made_by MindSpring Team
+"""
+
+import asyncio
+import logging
+import pickle
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DB_PATH = Path("data") / "session_store.db"
+
+_MISSING = object()
+
+
+def measure_size(value: Any) -> int:
+    """Bytes a session value accounts for (its pickled size)."""
+    try:
+        return len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        return sys.getsizeof(value)
+
+
+class MemorySessionBackend:
+    """
+    Per-worker backend: one OrderedDict per namespace in access order.
+
+    With an idle TTL, least recently used also means first to expire, so
+    pruning only ever pops from the front.
+    """
+
+    shared = False
+
+    def __init__(self):
+        # namespace -> key -> (last_access, size, value)
+        self._entries: Dict[str, "OrderedDict[str, Tuple[float, int, Any]]"] = defaultdict(OrderedDict)
+        self._bytes: Dict[str, int] = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def get(self, namespace: str, key: str, now: float, ttl: float) -> Any:
+        with self._lock:
+            entries = self._entries[namespace]
+            entry = entries.get(key)
+            if entry is None or entry[0] <= now - ttl:
+                return _MISSING
+            entries[key] = (now, entry[1], entry[2])
+            entries.move_to_end(key)
+            return entry[2]
+
+    def contains(self, namespace: str, key: str, now: float, ttl: float) -> bool:
+        with self._lock:
+            entry = self._entries[namespace].get(key)
+            return entry is not None and entry[0] > now - ttl
+
+    def touch(self, namespace: str, key: str, now: float, ttl: float) -> bool:
+        with self._lock:
+            entries = self._entries[namespace]
+            entry = entries.get(key)
+            if entry is None or entry[0] <= now - ttl:
+                return False
+            entries[key] = (now, entry[1], entry[2])
+            entries.move_to_end(key)
+            return True
+
+    def set(self, namespace: str, key: str, value: Any, now: float) -> None:
+        size = measure_size(value)
+        with self._lock:
+            entries = self._entries[namespace]
+            previous = entries.pop(key, None)
+            if previous is not None:
+                self._bytes[namespace] -= previous[1]
+            entries[key] = (now, size, value)
+            self._bytes[namespace] += size
+
+    def delete(self, namespace: str, key: str) -> bool:
+        with self._lock:
+            entry = self._entries[namespace].pop(key, None)
+            if entry is None:
+                return False
+            self._bytes[namespace] -= entry[1]
+            return True
+
+    def keys(self, namespace: str, now: float, ttl: float) -> List[str]:
+        with self._lock:
+            return [key for key, entry in self._entries[namespace].items() if entry[0] > now - ttl]
+
+    def prune(self, namespace: str, now: float, ttl: float, max_entries: int, max_bytes: int) -> Dict[str, int]:
+        """Drop expired sessions, then least recently used ones above the caps."""
+        evicted = {'expired': 0, 'lru': 0}
+        with self._lock:
+            entries = self._entries[namespace]
+            while entries:
+                key, (last_access, size, _) = next(iter(entries.items()))
+                if last_access <= now - ttl:
+                    reason = 'expired'
+                elif len(entries) > max_entries or self._bytes[namespace] > max_bytes:
+                    reason = 'lru'
+                else:
+                    break
+                del entries[key]
+                self._bytes[namespace] -= size
+                evicted[reason] += 1
+        return evicted
+
+    def usage(self, namespace: str) -> Tuple[int, int]:
+        with self._lock:
+            return len(self._entries[namespace]), self._bytes[namespace]
+
+    def close(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes.clear()
+
+
+class SQLiteSessionBackend:
+    """Cross-worker backend: pickled sessions in one SQLite table."""
+
+    shared = True
+
+    # Enforce TTL and caps every N writes (per worker)
+    PRUNE_EVERY = 10
+
+    def __init__(self, db_path: Path = DEFAULT_DB_PATH):
+        self.db_path = Path(db_path)
+        self._lock = threading.Lock()
+        self._writes: Dict[str, int] = defaultdict(int)
+        self._conn = self._connect()
+
+    def _connect(self) -> sqlite3.Connection:
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(
+            str(self.db_path),
+            timeout=5.0,
+            isolation_level=None,
+            check_same_thread=False
+        )
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA busy_timeout=5000")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            " namespace TEXT NOT NULL,"
+            " key TEXT NOT NULL,"
+            " value BLOB NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " last_access REAL NOT NULL,"
+            " PRIMARY KEY (namespace, key))"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_last_access ON sessions(namespace, last_access)")
+        return conn
+
+    def get(self, namespace: str, key: str, now: float, ttl: float) -> Any:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM sessions WHERE namespace = ? AND key = ? AND last_access > ?",
+                (namespace, key, now - ttl)
+            ).fetchone()
+            if row is None:
+                return _MISSING
+            self._conn.execute(
+                "UPDATE sessions SET last_access = ? WHERE namespace = ? AND key = ?",
+                (now, namespace, key)
+            )
+        return pickle.loads(row[0])
+
+    def contains(self, namespace: str, key: str, now: float, ttl: float) -> bool:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM sessions WHERE namespace = ? AND key = ? AND last_access > ?",
+                (namespace, key, now - ttl)
+            ).fetchone()
+        return row is not None
+
+    def touch(self, namespace: str, key: str, now: float, ttl: float) -> bool:
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE sessions SET last_access = ? WHERE namespace = ? AND key = ? AND last_access > ?",
+                (now, namespace, key, now - ttl)
+            )
+        return cursor.rowcount > 0
+
+    def set(self, namespace: str, key: str, value: Any, now: float) -> None:
+        data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sessions (namespace, key, value, size, last_access) VALUES (?, ?, ?, ?, ?)",
+                (namespace, key, data, len(data), now)
+            )
+            self._writes[namespace] += 1
+
+    def delete(self, namespace: str, key: str) -> bool:
+        with self._lock:
+            cursor = self._conn.execute("DELETE FROM sessions WHERE namespace = ? AND key = ?", (namespace, key))
+        return cursor.rowcount > 0
+
+    def keys(self, namespace: str, now: float, ttl: float) -> List[str]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT key FROM sessions WHERE namespace = ? AND last_access > ? ORDER BY last_access",
+                (namespace, now - ttl)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def prune(self, namespace: str, now: float, ttl: float, max_entries: int, max_bytes: int) -> Dict[str, int]:
+        """Drop expired sessions, then least recently used ones above the caps."""
+        evicted = {'expired': 0, 'lru': 0}
+        with self._lock:
+            if self._writes[namespace] % self.PRUNE_EVERY:
+                return evicted
+            evicted['expired'] = self._conn.execute(
+                "DELETE FROM sessions WHERE namespace = ? AND last_access <= ?",
+                (namespace, now - ttl)
+            ).rowcount
+            # Keep the most recently used sessions while both caps hold
+            evicted['lru'] = self._conn.execute(
+                "DELETE FROM sessions WHERE namespace = ? AND key IN ("
+                " SELECT key FROM ("
+                "  SELECT key,"
+                "   ROW_NUMBER() OVER (ORDER BY last_access DESC) AS position,"
+                "   SUM(size) OVER (ORDER BY last_access DESC ROWS UNBOUNDED PRECEDING) AS running_bytes"
+                "  FROM sessions WHERE namespace = ?)"
+                " WHERE position > ? OR running_bytes > ?)",
+                (namespace, namespace, max_entries, max_bytes)
+            ).rowcount
+        return evicted
+
+    def usage(self, namespace: str) -> Tuple[int, int]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM sessions WHERE namespace = ?",
+                (namespace,)
+            ).fetchone()
+        return row[0], row[1]
+
+    def close(self) -> None:
+        with self._lock:
+            try:
+                self._conn.close()
+            except Exception:
+                pass
+
+
+class SessionStore:
+    """
+    Dict-like view of one namespace.
+
+    Backend errors are logged and counted: a failed read behaves as a
+    missing session and a failed write is dropped.
+    """
+
+    def __init__(self, namespace: str, manager: "SessionStoreManager"):
+        self.namespace = namespace
+        self._manager = manager
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = {'expired': 0, 'lru': 0}
+        self.errors = 0
+
+    def get(self, key: str, default: Any = None) -> Any:
+        manager = self._manager
+        try:
+            value = manager.backend.get(self.namespace, key, time.time(), manager.ttl_seconds)
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"[SessionStore] {self.namespace} read failed: {e}")
+            value = _MISSING
+        if value is _MISSING:
+            self.misses += 1
+            return default
+        self.hits += 1
+        return value
+
+    def __getitem__(self, key: str) -> Any:
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key: str) -> bool:
+        manager = self._manager
+        try:
+            return manager.backend.contains(self.namespace, key, time.time(), manager.ttl_seconds)
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"[SessionStore] {self.namespace} read failed: {e}")
+            return False
+
+    def touch(self, key: str) -> bool:
+        """Restart a session's idle clock without reading it; False if it is gone."""
+        manager = self._manager
+        try:
+            return manager.backend.touch(self.namespace, key, time.time(), manager.ttl_seconds)
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"[SessionStore] {self.namespace} write failed: {e}")
+            return False
+
+    def set(self, key: str, value: Any) -> None:
+        manager = self._manager
+        now = time.time()
+        try:
+            manager.backend.set(self.namespace, key, value, now)
+            self.writes += 1
+            evicted = manager.backend.prune(
+                self.namespace, now, manager.ttl_seconds, manager.max_entries, manager.max_bytes
+            )
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"[SessionStore] {self.namespace} write failed: {e}")
+            return
+        for reason, count in evicted.items():
+            self.evictions[reason] += count
+        if sum(evicted.values()):
+            logger.debug(f"[SessionStore] {self.namespace} evicted {evicted}")
+
+    __setitem__ = set
+
+    def pop(self, key: str, default: Any = None) -> Any:
+        value = self.get(key, _MISSING)
+        self.__delitem__(key)
+        return default if value is _MISSING else value
+
+    def __delitem__(self, key: str) -> None:
+        try:
+            self._manager.backend.delete(self.namespace, key)
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"[SessionStore] {self.namespace} delete failed: {e}")
+
+    def keys(self) -> List[str]:
+        manager = self._manager
+        try:
+            return manager.backend.keys(self.namespace, time.time(), manager.ttl_seconds)
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"[SessionStore] {self.namespace} read failed: {e}")
+            return []
+
+    def items(self) -> List[Tuple[str, Any]]:
+        """Snapshot of live sessions."""
+        items = []
+        for key in self.keys():
+            value = self.get(key, _MISSING)
+            if value is not _MISSING:
+                items.append((key, value))
+        return items
+
+    def __len__(self) -> int:
+        return len(self.keys())
+
+    # ===== ASYNC ACCESS =====
+
+    async def _offload(self, method, *args) -> Any:
+        """Run a blocking method off the event loop when the backend does I/O."""
+        if not self._manager.backend.shared:
+            return method(*args)
+        return await asyncio.to_thread(method, *args)
+
+    async def aget(self, key: str, default: Any = None) -> Any:
+        return await self._offload(self.get, key, default)
+
+    async def aset(self, key: str, value: Any) -> None:
+        await self._offload(self.set, key, value)
+
+    async def apop(self, key: str, default: Any = None) -> Any:
+        return await self._offload(self.pop, key, default)
+
+    async def atouch(self, key: str) -> bool:
+        return await self._offload(self.touch, key)
+
+    async def aitems(self) -> List[Tuple[str, Any]]:
+        return await self._offload(self.items)
+
+    def get_stats(self) -> Dict[str, Any]:
+        try:
+            entries, resident_bytes = self._manager.backend.usage(self.namespace)
+        except Exception:
+            entries, resident_bytes = None, None
+        return {
+            'entries': entries,
+            'resident_bytes': resident_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'writes': self.writes,
+            'evictions': dict(self.evictions),
+            'errors': self.errors,
+        }
+
+
+class SessionStoreManager:
+    """Backend and limits shared by every namespace."""
+
+    def __init__(self):
+        self.backend = MemorySessionBackend()
+        self.ttl_seconds = 3600.0
+        self.max_entries = 1000
+        self.max_bytes = 64 * 1024 * 1024
+        self._stores: Dict[str, SessionStore] = {}
+        self._lock = threading.Lock()
+
+    def configure(
+        self,
+        backend: str = 'memory',
+        ttl_seconds: float = 3600.0,
+        max_entries: int = 1000,
+        max_mb: int = 64,
+        db_path: Path = DEFAULT_DB_PATH
+    ) -> None:
+        """Apply settings (called at startup, before sessions exist)."""
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_bytes = max_mb * 1024 * 1024
+        self.backend.close()
+        self.backend = MemorySessionBackend()
+        if backend == 'sqlite':
+            try:
+                self.backend = SQLiteSessionBackend(db_path=db_path)
+            except Exception as e:
+                logger.error(f"[SessionStore] Shared backend unavailable, using per-worker memory: {e}")
+        elif backend != 'memory':
+            logger.warning(f"[SessionStore] Unknown backend '{backend}', using per-worker memory")
+        logger.debug(
+            f"[SessionStore] backend={'sqlite' if self.backend.shared else 'memory'}, ttl={ttl_seconds}s, "
+            f"max_entries={max_entries}, max_mb={max_mb}"
+        )
+
+    def store(self, namespace: str) -> SessionStore:
+        with self._lock:
+            if namespace not in self._stores:
+                self._stores[namespace] = SessionStore(namespace, self)
+            return self._stores[namespace]
+
+    def close(self) -> None:
+        self.backend.close()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Per-namespace entries, resident bytes, hits and evictions (evictions counted by this worker)."""
+        with self._lock:
+            stores = dict(self._stores)
+        namespaces = {namespace: store.get_stats() for namespace, store in sorted(stores.items())}
+        return {
+            'backend': 'sqlite' if self.backend.shared else 'memory',
+            'ttl_seconds': self.ttl_seconds,
+            'max_entries': self.max_entries,
+            'max_bytes': self.max_bytes,
+            'resident_bytes': sum(stats['resident_bytes'] or 0 for stats in namespaces.values()),
+            'evictions': sum(sum(stats['evictions'].values()) for stats in namespaces.values()),
+            'namespaces': namespaces,
+        }
+
+
+# Singleton instance (configured at startup from SESSION_STORE_* settings)
+session_stores = SessionStoreManager()
+
+
+def get_session_store(namespace: str) -> SessionStore:
+    """Get the store for one subsystem's sessions."""
+    return session_stores.store(namespace)
@@ -0,0 +1,390 @@
+"""
+Shared (Cross-Worker) LLM Rate Limiter
+======================================
+
+Every uvicorn worker builds its own LLMService, so an in-process limiter
+lets N workers send N x DASHSCOPE_QPM_LIMIT. This backend keeps the QPM
+window and the concurrency counters in a small SQLite database
+(data/llm_rate_limiter.db, WAL mode) shared by all workers on the host.
+
+- QPM window: one row per granted request, pruned on every admission pass
+- Concurrency: one lease row per in-flight request; leases of dead worker
+  processes (pid + process start time) and leases older than the TTL are
+  reclaimed automatically
+- Admission is a single BEGIN IMMEDIATE transaction per dispatch pass, so
+  check-and-take is atomic across processes
+
+Within a worker, waiters keep the FIFO-per-bucket order of LLMRateLimiter.
+Local releases and QPM expiry wake the dispatcher immediately; releases in
+other workers are picked up by a short poll (LLM_RATE_LIMIT_POLL_MS).
+
+@author lycosa9527
+@made_by MindSpring Team
+"""
+
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import defaultdict, deque
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import psutil
+
+from services.rate_limiter import LLMRateLimiter, _Bucket
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DB_PATH = Path("data") / "llm_rate_limiter.db"
+
+# (bucket name, qpm limit, concurrent limit)
+BucketSpec = Tuple[str, int, int]
+
+
+def _process_started_at(pid: int) -> Optional[float]:
+    """Creation time of a process, or None if it no longer exists."""
+    try:
+        return psutil.Process(pid).create_time()
+    except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+        return None
+
+
+class SQLiteRateLimitStore:
+    """
+    Cross-process QPM windows and concurrency leases in SQLite.
+
+    All methods are blocking; callers run them via asyncio.to_thread.
+    """
+
+    def __init__(
+        self,
+        db_path: Path = DEFAULT_DB_PATH,
+        window_seconds: float = 60.0,
+        lease_ttl_seconds: float = 900.0,
+        reclaim_interval: float = 5.0
+    ):
+        self.db_path = Path(db_path)
+        self.window_seconds = window_seconds
+        self.lease_ttl_seconds = lease_ttl_seconds
+        self.reclaim_interval = reclaim_interval
+
+        self._pid = os.getpid()
+        self._pid_started = _process_started_at(self._pid) or 0.0
+        self._lock = threading.Lock()
+        self._last_reclaim = 0.0
+        self._conn = self._connect()
+
+    def _connect(self) -> sqlite3.Connection:
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(
+            str(self.db_path),
+            timeout=5.0,
+            isolation_level=None,  # Explicit BEGIN IMMEDIATE below
+            check_same_thread=False
+        )
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA busy_timeout=5000")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS rl_window ("
+            " bucket TEXT NOT NULL,"
+            " ts REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_rl_window_bucket_ts ON rl_window(bucket, ts)")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS rl_lease ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " bucket TEXT NOT NULL,"
+            " pid INTEGER NOT NULL,"
+            " pid_started REAL NOT NULL,"
+            " acquired_at REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_rl_lease_bucket ON rl_lease(bucket)")
+        return conn
+
+    def _reclaim(self, now: float) -> None:
+        """Drop leases held by dead processes or older than the TTL (inside a transaction)."""
+        if now - self._last_reclaim < self.reclaim_interval:
+            return
+        self._last_reclaim = now
+
+        expired = self._conn.execute(
+            "DELETE FROM rl_lease WHERE acquired_at < ?", (now - self.lease_ttl_seconds,)
+        ).rowcount
+        dead = 0
+        for pid, pid_started in self._conn.execute(
+            "SELECT DISTINCT pid, pid_started FROM rl_lease"
+        ).fetchall():
+            started = _process_started_at(pid)
+            if started is None or abs(started - pid_started) > 1.0:
+                dead += self._conn.execute(
+                    "DELETE FROM rl_lease WHERE pid = ? AND pid_started = ?", (pid, pid_started)
+                ).rowcount
+        if expired or dead:
+            logger.warning(f"[SharedRateLimiter] Reclaimed {dead} dead-worker and {expired} expired lease(s)")
+
+    def try_acquire(
+        self,
+        chains: List[List[BucketSpec]],
+        now: float
+    ) -> Tuple[Dict[int, Dict[str, int]], Optional[float]]:
+        """
+        Admit as many queued requests as fit, in order.
+
+        A request that does not fit holds back later requests only on the
+        buckets that stopped it (same rule as the in-process limiter).
+
+        Args:
+            chains: Bucket chain per queued request, in FIFO order
+            now: Wall-clock time (shared across processes)
+
+        Returns:
+            ({index: {bucket: lease_id}} for granted requests,
+             earliest wall time a QPM window frees up, or None)
+        """
+        names = {name for chain in chains for name, _, _ in chain}
+        granted: Dict[int, Dict[str, int]] = {}
+        retry_at = None
+
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._reclaim(now)
+                cutoff = now - self.window_seconds
+                used: Dict[str, int] = {}
+                oldest: Dict[str, Optional[float]] = {}
+                active: Dict[str, int] = {}
+                for name in names:
+                    self._conn.execute("DELETE FROM rl_window WHERE bucket = ? AND ts <= ?", (name, cutoff))
+                    used[name], oldest[name] = self._conn.execute(
+                        "SELECT COUNT(*), MIN(ts) FROM rl_window WHERE bucket = ?", (name,)
+                    ).fetchone()
+                    active[name] = self._conn.execute(
+                        "SELECT COUNT(*) FROM rl_lease WHERE bucket = ?", (name,)
+                    ).fetchone()[0]
+
+                blocked = set()
+                for index, chain in enumerate(chains):
+                    stoppers = [
+                        name for name, qpm, concurrent in chain
+                        if name in blocked or active[name] >= concurrent or used[name] >= qpm
+                    ]
+                    if stoppers:
+                        blocked.update(stoppers)
+                        for name, qpm, _ in chain:
+                            if used[name] >= qpm:
+                                free_at = oldest[name] + self.window_seconds
+                                retry_at = free_at if retry_at is None else min(retry_at, free_at)
+                        continue
+
+                    leases = {}
+                    for name, _, _ in chain:
+                        self._conn.execute("INSERT INTO rl_window (bucket, ts) VALUES (?, ?)", (name, now))
+                        leases[name] = self._conn.execute(
+                            "INSERT INTO rl_lease (bucket, pid, pid_started, acquired_at) VALUES (?, ?, ?, ?)",
+                            (name, self._pid, self._pid_started, now)
+                        ).lastrowid
+                        used[name] += 1
+                        if oldest[name] is None:
+                            oldest[name] = now
+                        active[name] += 1
+                    granted[index] = leases
+
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+        return granted, retry_at
+
+    def release(self, lease_ids: List[int]) -> None:
+        """Return concurrency leases."""
+        if not lease_ids:
+            return
+        with self._lock:
+            self._conn.executemany("DELETE FROM rl_lease WHERE id = ?", [(i,) for i in lease_ids])
+
+    def release_own(self) -> int:
+        """Drop every lease held by this process (shutdown)."""
+        with self._lock:
+            return self._conn.execute(
+                "DELETE FROM rl_lease WHERE pid = ? AND pid_started = ?", (self._pid, self._pid_started)
+            ).rowcount
+
+    def snapshot(self, names: List[str], now: float) -> Dict[str, Dict[str, int]]:
+        """Host-wide current QPM and in-flight count per bucket."""
+        cutoff = now - self.window_seconds
+        with self._lock:
+            return {
+                name: {
+                    'current_qpm': self._conn.execute(
+                        "SELECT COUNT(*) FROM rl_window WHERE bucket = ? AND ts > ?", (name, cutoff)
+                    ).fetchone()[0],
+                    'active_requests': self._conn.execute(
+                        "SELECT COUNT(*) FROM rl_lease WHERE bucket = ?", (name,)
+                    ).fetchone()[0]
+                }
+                for name in names
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class SharedRateLimiter(LLMRateLimiter):
+    """
+    LLMRateLimiter whose buckets live in a SQLiteRateLimitStore.
+
+    Same interface (acquire/release/limit/get_stats), so LLMService and the
+    WebSocket middleware use it unchanged.
+    """
+
+    def __init__(
+        self,
+        *args,
+        store: Optional[SQLiteRateLimitStore] = None,
+        poll_interval: float = 0.05,
+        **kwargs
+    ):
+        super().__init__(*args, **kwargs)
+        self._store = store or SQLiteRateLimitStore(window_seconds=self.window_seconds)
+        self.poll_interval = poll_interval
+
+        self._leases: Dict[str, List[int]] = defaultdict(list)
+        self._held_back = set()  # ids of waiters refused at least once
+        self._wakeup: Optional[asyncio.Event] = None
+        self._pump_task: Optional[asyncio.Task] = None
+        self._release_tasks = set()
+        self._store_errors = 0
+        self._last_error_log = 0.0
+
+    @staticmethod
+    def _spec(buckets: List[_Bucket]) -> List[BucketSpec]:
+        return [(b.name, b.qpm_limit, b.concurrent_limit) for b in buckets]
+
+    def _try_fast_path(self, buckets: List[_Bucket], now: float) -> bool:
+        # Capacity is only known to the shared store
+        return False
+
+    def _dispatch(self) -> None:
+        """Wake the dispatcher task (starting it if needed)."""
+        if self._wakeup is None:
+            self._wakeup = asyncio.Event()
+        self._wakeup.set()
+        if self._waiters and (self._pump_task is None or self._pump_task.done()):
+            self._pump_task = asyncio.get_running_loop().create_task(self._pump())
+
+    async def _pump(self) -> None:
+        """Admission loop: one store transaction per pass while waiters remain."""
+        loop = asyncio.get_running_loop()
+        while True:
+            live = [w for w in self._waiters if not w.future.done()]
+            self._waiters = deque(live)
+            if not live:
+                return
+
+            self._wakeup.clear()
+            try:
+                granted, retry_at = await asyncio.to_thread(
+                    self._store.try_acquire, [self._spec(w.buckets) for w in live], time.time()
+                )
+            except Exception as e:
+                # Fail open: a broken limiter database must not stop LLM traffic
+                self._store_errors += 1
+                if time.time() - self._last_error_log > 60:
+                    self._last_error_log = time.time()
+                    logger.error(f"[SharedRateLimiter] Store unavailable, admitting without limits: {e}")
+                granted = {i: {} for i in range(len(live))}
+                retry_at = None
+
+            now = loop.time()
+            for index, leases in granted.items():
+                waiter = live[index]
+                if waiter.future.done():
+                    # Cancelled while the transaction ran: give the slot back
+                    self._spawn_release(list(leases.values()))
+                    continue
+                for bucket in waiter.buckets:
+                    if bucket.name in leases:
+                        self._leases[bucket.name].append(leases[bucket.name])
+                    bucket.active += 1
+                    bucket.total_requests += 1
+                held_back = id(waiter) in self._held_back
+                self._held_back.discard(id(waiter))
+                self._record_grant(waiter.buckets, now - waiter.enqueued_at, held_back)
+                waiter.future.set_result(None)
+
+            self._waiters = deque(w for w in self._waiters if not w.future.done())
+            self._held_back = {id(w) for w in self._waiters}
+            if not self._waiters:
+                return
+
+            timeout = self.poll_interval
+            if retry_at is not None:
+                timeout = min(timeout, max(0.0, retry_at - time.time()))
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    def _spawn_release(self, lease_ids: List[int]) -> None:
+        if not lease_ids:
+            return
+
+        async def _release():
+            try:
+                await asyncio.to_thread(self._store.release, lease_ids)
+            except Exception as e:
+                logger.warning(f"[SharedRateLimiter] Failed to return leases (reclaimed later): {e}")
+            if self._waiters:
+                self._dispatch()
+
+        task = asyncio.get_running_loop().create_task(_release())
+        self._release_tasks.add(task)
+        task.add_done_callback(self._release_tasks.discard)
+
+    def _release_buckets(self, buckets: List[_Bucket]) -> None:
+        lease_ids = []
+        for bucket in buckets:
+            bucket.active = max(0, bucket.active - 1)
+            if self._leases[bucket.name]:
+                lease_ids.append(self._leases[bucket.name].pop())
+        self._spawn_release(lease_ids)
+
+    async def close(self) -> None:
+        """Return all leases held by this worker (called at shutdown)."""
+        if self._pump_task is not None:
+            self._pump_task.cancel()
+        if self._release_tasks:
+            await asyncio.gather(*self._release_tasks, return_exceptions=True)
+        try:
+            await asyncio.to_thread(self._store.release_own)
+        except Exception as e:
+            logger.debug(f"[SharedRateLimiter] Lease cleanup failed: {e}")
+
+    def get_stats(self) -> dict:
+        """Get rate limiter statistics (current QPM/in-flight are host-wide)."""
+        stats = super().get_stats()
+        stats['backend'] = 'sqlite'
+        stats['store_errors'] = self._store_errors
+
+        buckets = {**{f"provider:{n}": b for n, b in self._providers.items()},
+                   **{f"model:{n}": b for n, b in self._models.items()}}
+        try:
+            shared = self._store.snapshot([b.name for b in buckets.values()], time.time())
+        except Exception as e:
+            logger.debug(f"[SharedRateLimiter] Snapshot failed: {e}")
+            return stats
+
+        for key, bucket in buckets.items():
+            kind, name = key.split(':', 1)
+            section = stats['providers' if kind == 'provider' else 'models'][name]
+            section.update(shared[bucket.name])
+        default = stats['providers']['dashscope']
+        stats['current_qpm'] = default['current_qpm']
+        stats['active_requests'] = default['active_requests']
+        return stats
@@ -3,7 +3,8 @@ Temporary Image Cleanup Service
 ================================
 
 Background task to clean up old PNG files from temp_images/ directory.
-Automatically removes files older than 24 hours.
+Automatically removes files older than 24 hours (DingTalk images and render
+cache entries; cache hits refresh the mtime, so only unused entries expire).
 
 100% async implementation - all file operations use asyncio.
 Compatible with Windows and Ubuntu when running under Uvicorn.
@@ -44,7 +45,9 @@ async def cleanup_temp_images(max_age_seconds: int = 86400):
     
     try:
         # Use asyncio to run blocking glob operation in thread pool
-        files = await asyncio.to_thread(list, temp_dir.glob("dingtalk_*.png"))
+        files = await asyncio.to_thread(
+            lambda: list(temp_dir.glob("dingtalk_*.png")) + list(temp_dir.glob("render_*.png"))
+        )
         
         for file_path in files:
             # Get file stats asynchronously
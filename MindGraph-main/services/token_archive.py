@@ -0,0 +1,405 @@
+"""
+Token Usage Retention and Archival
+==================================
+
+Keeps the raw token_usage table (and with it the main database, its
+backups, integrity checks and WAL checkpoints) small.
+
+- Raw rows older than TOKEN_USAGE_RETENTION_DAYS are moved, a whole month
+  at a time, into per-month SQLite files
+  (data/token_usage_archive/token_usage_YYYY-MM.db). A month's file is
+  written completely before any of its rows are deleted from the main
+  database, so an interrupted move is finished by the next run
+- The dashboards read the rollups (services/token_rollups.py), which are
+  not archived; rebuild_rollups() reads the archive files as well, so a
+  rebuild still covers archived months
+- Hourly rollups older than HOURLY_RETENTION_DAYS are pruned
+- SQLite space freed by the deletes is returned to the file system with
+  incremental vacuum (the database is switched to auto_vacuum=INCREMENTAL
+  by one full VACUUM the first time it has enough free pages)
+
+Runs daily from start_token_usage_maintenance_scheduler() on worker 0, or
+once from scripts/maintain_token_usage.py.
+
+Archive files are immutable once their month is closed; they are not part
+of the database backup (services/backup_scheduler.py), back the archive
+directory up alongside it if raw history must survive a disk loss.
+
+Configuration (environment):
+- TOKEN_USAGE_ARCHIVE_ENABLED=true (default: true)
+- TOKEN_USAGE_RETENTION_DAYS=90 (default: 90, minimum: 1)
+- TOKEN_USAGE_ARCHIVE_DIR=data/token_usage_archive
+- TOKEN_USAGE_MAINTENANCE_HOUR=4 (default: 4 = 4:00 AM, after the backup)
+
+@author lycosa9527
+@made_by MindSpring Team
+"""
+
+import asyncio
+import logging
+import os
+import re
+import sqlite3
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import and_, delete, func, select, tuple_
+from sqlalchemy.dialects import sqlite as sqlite_dialect
+from sqlalchemy.engine import Engine
+
+from models.token_usage import TokenUsage, TokenUsageHourly
+from services.token_rollups import DIMENSIONS, MEASURES, ROLLUPS, hourly_cutoff, next_month, truncate_month
+
+logger = logging.getLogger(__name__)
+
+TOKEN_USAGE_ARCHIVE_ENABLED = os.getenv("TOKEN_USAGE_ARCHIVE_ENABLED", "true").lower() == "true"
+TOKEN_USAGE_RETENTION_DAYS = max(1, int(os.getenv("TOKEN_USAGE_RETENTION_DAYS", "90")))
+ARCHIVE_DIR = Path(os.getenv("TOKEN_USAGE_ARCHIVE_DIR", "data/token_usage_archive"))
+_maintenance_hour_raw = int(os.getenv("TOKEN_USAGE_MAINTENANCE_HOUR", "4"))
+TOKEN_USAGE_MAINTENANCE_HOUR = max(0, min(23, _maintenance_hour_raw))
+
+BATCH_SIZE = 5000  # Rows per copy / delete transaction (keeps write locks short)
+VACUUM_STEP_PAGES = 2000  # Pages per incremental_vacuum step
+VACUUM_CONVERT_FREE_RATIO = 0.2  # Free-page share worth a one-time full VACUUM
+
+_DATETIME_FORMAT = '%Y-%m-%d %H:%M:%S.%f'  # How SQLAlchemy stores DateTime on SQLite
+_ARCHIVE_NAME = re.compile(r'^token_usage_(\d{4})-(\d{2})\.db$')
+_COLUMNS = [column.name for column in TokenUsage.__table__.columns]
+
+# Rollup bucket SQL inside an archive file, per rollup unit
+_ARCHIVE_BUCKETS = {
+    'hour': "strftime('%Y-%m-%d %H:00:00.000000', created_at)",
+    'day': "strftime('%Y-%m-%d 00:00:00.000000', created_at)",
+    'month': "strftime('%Y-%m-01 00:00:00.000000', created_at)",
+}
+
+
+# ----------------------------------------------------------------------
+# Archive files
+# ----------------------------------------------------------------------
+
+def archive_path(month: datetime) -> Path:
+    return ARCHIVE_DIR / f"token_usage_{month:%Y-%m}.db"
+
+
+def archived_months() -> List[datetime]:
+    """Months that have an archive file, oldest first."""
+    if not ARCHIVE_DIR.exists():
+        return []
+    months = []
+    for path in ARCHIVE_DIR.iterdir():
+        match = _ARCHIVE_NAME.match(path.name)
+        if match:
+            months.append(datetime(int(match.group(1)), int(match.group(2)), 1))
+    return sorted(months)
+
+
+def _create_archive_table(conn: sqlite3.Connection) -> None:
+    """token_usage without its foreign keys (the archive holds no users / organizations)."""
+    columns = []
+    for column in TokenUsage.__table__.columns:
+        if column.primary_key:
+            columns.append(f"{column.name} INTEGER PRIMARY KEY")
+        else:
+            columns.append(f"{column.name} {column.type.compile(dialect=sqlite_dialect.dialect())}")
+    conn.execute(f"CREATE TABLE IF NOT EXISTS token_usage ({', '.join(columns)})")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_token_usage_date ON token_usage (created_at)")
+
+
+def _archive_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.strftime(_DATETIME_FORMAT)
+    return value
+
+
+def _month_filter(month: datetime):
+    created_at = TokenUsage.__table__.c.created_at
+    return and_(created_at >= month, created_at < next_month(month))
+
+
+def _month_batches(engine: Engine, month: datetime):
+    """
+    A month of raw rows in created_at order, BATCH_SIZE rows per list.
+
+    Pages on the created_at index by (created_at, id) rather than by id
+    ranges, so rows written out of order (spill-journal replays, imported
+    history) cost nothing extra.
+    """
+    usage = TokenUsage.__table__
+    after = None
+    while True:
+        query = select(usage).where(_month_filter(month))
+        if after is not None:
+            query = query.where(tuple_(usage.c.created_at, usage.c.id) > after)
+        query = query.order_by(usage.c.created_at, usage.c.id).limit(BATCH_SIZE)
+        with engine.connect() as conn:
+            rows = conn.execute(query).all()
+        if not rows:
+            return
+        yield rows
+        after = (rows[-1].created_at, rows[-1].id)
+
+
+def _copy_month(engine: Engine, month: datetime) -> int:
+    """
+    Copy a month of raw rows into its archive file; returns rows copied.
+
+    A new file is written under a temporary name and renamed once complete,
+    so an archive file that exists always holds the whole month. Rows that
+    arrive for an already archived month (a late spill-journal replay) are
+    added to the existing file in one transaction.
+    """
+    ARCHIVE_DIR.mkdir(parents=True, exist_ok=True)
+    final_path = archive_path(month)
+    exists = final_path.exists()
+    path = final_path if exists else final_path.with_name(f"{final_path.name}.{os.getpid()}.tmp")
+    if not exists and path.exists():
+        path.unlink()
+
+    insert_sql = (
+        f"INSERT OR IGNORE INTO token_usage ({', '.join(_COLUMNS)}) "
+        f"VALUES ({', '.join('?' for _ in _COLUMNS)})"
+    )
+    copied = 0
+    archive = sqlite3.connect(path)
+    try:
+        _create_archive_table(archive)
+        for rows in _month_batches(engine, month):
+            archive.executemany(insert_sql, [tuple(_archive_value(value) for value in row) for row in rows])
+            copied += len(rows)
+        archive.commit()
+    except BaseException:
+        archive.close()
+        if not exists:
+            path.unlink(missing_ok=True)
+        raise
+    archive.close()
+
+    if not exists:
+        os.replace(path, final_path)
+    return copied
+
+
+def _delete_month(engine: Engine, month: datetime) -> int:
+    """
+    Delete a month's archived rows from token_usage in short transactions; returns rows deleted.
+
+    Only ids read back from the archive file are deleted, so rows that
+    arrive while the month is being moved stay in token_usage until the
+    next run archives them.
+    """
+    usage = TokenUsage.__table__
+    deleted = 0
+    after = -1
+    archive = sqlite3.connect(f"file:{archive_path(month)}?mode=ro", uri=True)
+    try:
+        while True:
+            ids = [row[0] for row in archive.execute(
+                "SELECT id FROM token_usage WHERE id > ? ORDER BY id LIMIT ?", (after, BATCH_SIZE)
+            )]
+            if not ids:
+                return deleted
+            with engine.begin() as conn:
+                deleted += conn.execute(delete(usage).where(usage.c.id.in_(ids), _month_filter(month))).rowcount
+            after = ids[-1]
+    finally:
+        archive.close()
+
+
+def archive_month(engine: Engine, month: datetime) -> int:
+    """Move one month of raw rows into its archive file; returns rows moved."""
+    month = truncate_month(month)
+    with engine.connect() as conn:
+        if conn.execute(select(TokenUsage.__table__.c.id).where(_month_filter(month)).limit(1)).first() is None:
+            return 0
+    copied = _copy_month(engine, month)
+    deleted = _delete_month(engine, month)
+    logger.info(f"[TokenArchive] Archived {month:%Y-%m}: {copied} rows copied, {deleted} deleted from token_usage")
+    return deleted
+
+
+def archive_cutoff() -> datetime:
+    """Rows before this time are past retention."""
+    return datetime.utcnow() - timedelta(days=TOKEN_USAGE_RETENTION_DAYS)
+
+
+def archive_old_usage(engine: Engine) -> int:
+    """Archive every whole month that is past retention; returns rows moved."""
+    cutoff = archive_cutoff()
+    with engine.connect() as conn:
+        first = conn.execute(select(func.min(TokenUsage.__table__.c.created_at))).scalar()
+    moved = 0
+    month = truncate_month(first) if first else None
+    while month is not None and next_month(month) <= cutoff:
+        moved += archive_month(engine, month)
+        month = next_month(month)
+    return moved
+
+
+def settle_archives(engine: Engine) -> int:
+    """Finish moves that were interrupted after their archive file was written."""
+    moved = 0
+    for month in archived_months():
+        moved += archive_month(engine, month)
+    return moved
+
+
+# ----------------------------------------------------------------------
+# Rollups over archived rows
+# ----------------------------------------------------------------------
+
+def aggregate_archives(starts: Dict[str, Optional[datetime]]) -> Tuple[int, Dict[str, List[Dict[str, Any]]]]:
+    """
+    Rollup rows for the archived months, grouped inside each archive file.
+
+    Args:
+        starts: Per rollup unit, the first bucket to produce (None = all)
+
+    Returns:
+        (archived raw rows read, {unit: rollup rows})
+    """
+    raw_rows = 0
+    rollups: Dict[str, List[Dict[str, Any]]] = {unit: [] for unit in ROLLUPS}
+    for month in archived_months():
+        if starts['month'] is not None and month < starts['month']:
+            continue
+        archive = sqlite3.connect(f"file:{archive_path(month)}?mode=ro", uri=True)
+        try:
+            raw_rows += archive.execute("SELECT count(*) FROM token_usage").fetchone()[0]
+            for unit, bucket in _ARCHIVE_BUCKETS.items():
+                start = starts[unit]
+                rows = archive.execute(
+                    f"SELECT {bucket}, coalesce(organization_id, 0), coalesce(user_id, 0), "
+                    f"coalesce(model_alias, ''), coalesce(request_type, ''), coalesce(success, 1), "
+                    f"count(*), coalesce(sum(input_tokens), 0), coalesce(sum(output_tokens), 0), "
+                    f"coalesce(sum(total_tokens), 0), coalesce(sum(total_cost), 0.0) "
+                    f"FROM token_usage WHERE ? IS NULL OR created_at >= ? GROUP BY 1, 2, 3, 4, 5, 6",
+                    (start and start.strftime(_DATETIME_FORMAT),) * 2
+                ).fetchall()
+                for row in rows:
+                    values = dict(zip(DIMENSIONS, row[1:6]), success=bool(row[5]))
+                    values.update(zip(MEASURES, row[6:]))
+                    rollups[unit].append({'bucket': datetime.strptime(row[0], _DATETIME_FORMAT), **values})
+        finally:
+            archive.close()
+    return raw_rows, rollups
+
+
+# ----------------------------------------------------------------------
+# Maintenance
+# ----------------------------------------------------------------------
+
+def prune_hourly_rollups(engine: Engine) -> int:
+    """Delete hourly rollups past HOURLY_RETENTION_DAYS; returns rows deleted."""
+    table = TokenUsageHourly.__table__
+    with engine.begin() as conn:
+        return conn.execute(delete(table).where(table.c.bucket < hourly_cutoff())).rowcount
+
+
+def vacuum_database(engine: Engine) -> Dict[str, Any]:
+    """
+    Return free SQLite pages to the file system.
+
+    Databases created with the default auto_vacuum=NONE are converted to
+    INCREMENTAL by one full VACUUM once enough pages are free (it rewrites
+    the file, needs as much free disk and blocks writers while it runs);
+    after that each run releases free pages a step at a time.
+
+    Returns:
+        {'mode', 'freed_pages', 'size_mb'}; empty if not SQLite
+    """
+    if engine.dialect.name != 'sqlite':
+        return {}
+
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        def pragma(statement: str):
+            return conn.exec_driver_sql(f"PRAGMA {statement}").scalar()
+
+        page_size = pragma("page_size")
+        free_before = pragma("freelist_count")
+        size_mb = pragma("page_count") * page_size / 1048576
+        if pragma("auto_vacuum") == 2:
+            mode = 'incremental'
+            cursor = conn.connection.dbapi_connection.cursor()
+            try:
+                while pragma("freelist_count"):
+                    # incremental_vacuum frees pages as the statement is stepped; fetchall() runs it out
+                    cursor.execute(f"PRAGMA incremental_vacuum({VACUUM_STEP_PAGES})").fetchall()
+            finally:
+                cursor.close()
+        elif free_before >= pragma("page_count") * VACUUM_CONVERT_FREE_RATIO:
+            from config.database import check_disk_space
+            if not check_disk_space(required_mb=int(size_mb) + 100):
+                logger.warning("[TokenArchive] Not enough disk space to VACUUM; skipping")
+                return {'mode': 'none', 'freed_pages': 0, 'size_mb': round(size_mb, 1)}
+            logger.info("[TokenArchive] Switching database to auto_vacuum=INCREMENTAL (full VACUUM)")
+            mode = 'full'
+            conn.exec_driver_sql("PRAGMA auto_vacuum=INCREMENTAL")
+            conn.exec_driver_sql("VACUUM")
+        else:
+            return {'mode': 'none', 'freed_pages': 0, 'size_mb': round(size_mb, 1)}
+        conn.exec_driver_sql("PRAGMA wal_checkpoint(TRUNCATE)").fetchall()
+        freed = free_before - pragma("freelist_count")
+        size_mb = round(pragma("page_count") * page_size / 1048576, 1)
+
+    logger.info(f"[TokenArchive] Vacuum ({mode}): freed {freed} pages, database now {size_mb} MB")
+    return {'mode': mode, 'freed_pages': freed, 'size_mb': size_mb}
+
+
+def run_maintenance(engine: Engine) -> Dict[str, Any]:
+    """Archive past-retention usage, prune hourly rollups and vacuum; returns what was done."""
+    result: Dict[str, Any] = {'archived_rows': 0}
+    if TOKEN_USAGE_ARCHIVE_ENABLED:
+        result['archived_rows'] = settle_archives(engine) + archive_old_usage(engine)
+    result['pruned_hourly_rows'] = prune_hourly_rollups(engine)
+    result['vacuum'] = vacuum_database(engine)
+    return result
+
+
+def get_next_maintenance_time() -> datetime:
+    now = datetime.now()
+    next_run = now.replace(hour=TOKEN_USAGE_MAINTENANCE_HOUR, minute=0, second=0, microsecond=0)
+    if now >= next_run:
+        next_run += timedelta(days=1)
+    return next_run
+
+
+async def start_token_usage_maintenance_scheduler():
+    """
+    Run token usage maintenance daily at TOKEN_USAGE_MAINTENANCE_HOUR.
+
+    Only worker 0 runs it. A run that finds a backup in progress waits for
+    it: the backup would copy a database that is being rewritten.
+    This function runs forever until cancelled.
+    """
+    from config.database import engine
+    from services.backup_scheduler import is_backup_in_progress
+
+    logger.info(
+        f"[TokenArchive] Scheduler started: daily at {TOKEN_USAGE_MAINTENANCE_HOUR:02d}:00, "
+        f"retention {TOKEN_USAGE_RETENTION_DAYS} days"
+        + ("" if TOKEN_USAGE_ARCHIVE_ENABLED else " (archival disabled)")
+    )
+    while True:
+        try:
+            next_run = get_next_maintenance_time()
+            await asyncio.sleep((next_run - datetime.now()).total_seconds())
+            while is_backup_in_progress():
+                await asyncio.sleep(60)
+
+            logger.info("[TokenArchive] Starting scheduled maintenance...")
+            try:
+                result = await asyncio.to_thread(run_maintenance, engine)
+                logger.info(f"[TokenArchive] Scheduled maintenance completed: {result}")
+            except Exception as e:
+                logger.error(f"[TokenArchive] Scheduled maintenance failed: {e}", exc_info=True)
+
+            # Wait a bit to avoid running twice in the same minute
+            await asyncio.sleep(60)
+        except asyncio.CancelledError:
+            logger.info("[TokenArchive] Scheduler stopped")
+            break
+        except Exception as e:
+            logger.error(f"[TokenArchive] Scheduler error: {e}", exc_info=True)
+            await asyncio.sleep(300)
@@ -0,0 +1,447 @@
+"""
+Token Usage Rollups
+===================
+
+Hourly, daily and monthly pre-aggregates of token_usage by organization,
+user, model and request type, so the admin dashboards read summary rows
+instead of summing the raw table on every page load.
+
+Maintenance:
+- apply_rollups(): TokenTracker calls it in the same transaction that
+  inserts a batch of raw rows (and when replaying its spill journal), so
+  the rollups never drift from token_usage
+- rebuild_rollups(): recomputes the rollups from token_usage and its
+  archive files (services/token_archive.py), all of it or from a given day
+  on, one month per transaction (scripts/rebuild_token_rollups.py, and once
+  on startup for databases whose token_usage predates the rollups)
+
+Reads:
+- sum_usage(): token sums for a window, optionally grouped by
+  organization, user or day. Windows are resolved to the hour: the partial
+  first day comes from the hourly table, the rest of that month from the
+  daily table and whole months from the monthly table. Hourly rows are only
+  kept for HOURLY_RETENTION_DAYS (longer than any dashboard window); older
+  windows start at the day instead
+
+@author lycosa9527
+@made_by MindSpring Team
+"""
+
+import logging
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import delete, func, insert, literal, select, true
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+
+from models.token_usage import TokenUsage, TokenUsageDaily, TokenUsageHourly, TokenUsageMonthly
+
+logger = logging.getLogger(__name__)
+
+DIMENSIONS = ('organization_id', 'user_id', 'model_alias', 'request_type', 'success')
+MEASURES = ('request_count', 'input_tokens', 'output_tokens', 'total_tokens', 'total_cost')
+ROLLUPS = {'hour': TokenUsageHourly, 'day': TokenUsageDaily, 'month': TokenUsageMonthly}
+HOURLY_RETENTION_DAYS = 100
+
+# SQL for the start of the hour/day/month containing created_at, per
+# dialect. On SQLite the text must match how SQLAlchemy stores DateTime, so
+# rebuilt buckets and the ones TokenTracker upserts are the same key
+_BUCKET_SQL = {
+    'sqlite': {
+        'hour': lambda column: func.strftime('%Y-%m-%d %H:00:00.000000', column),
+        'day': lambda column: func.strftime('%Y-%m-%d 00:00:00.000000', column),
+        'month': lambda column: func.strftime('%Y-%m-01 00:00:00.000000', column),
+    },
+    'postgresql': {
+        'hour': lambda column: func.date_trunc('hour', column),
+        'day': lambda column: func.date_trunc('day', column),
+        'month': lambda column: func.date_trunc('month', column),
+    },
+    'mysql': {
+        'hour': lambda column: func.date_format(column, '%Y-%m-%d %H:00:00'),
+        'day': lambda column: func.date_format(column, '%Y-%m-%d 00:00:00'),
+        'month': lambda column: func.date_format(column, '%Y-%m-01 00:00:00'),
+    },
+}
+_BUCKET_SQL['mariadb'] = _BUCKET_SQL['mysql']
+
+_GROUP_COLUMNS = {
+    'organization_id': lambda table: table.organization_id,
+    'user_id': lambda table: table.user_id,
+    'day': lambda table: table.bucket,
+}
+
+
+def _utc_naive(value: datetime) -> datetime:
+    """created_at is stored as naive UTC; align aware datetimes with it."""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def truncate_hour(value: datetime) -> datetime:
+    return _utc_naive(value).replace(minute=0, second=0, microsecond=0)
+
+
+def truncate_day(value: datetime) -> datetime:
+    return _utc_naive(value).replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def truncate_month(value: datetime) -> datetime:
+    return truncate_day(value).replace(day=1)
+
+
+def next_month(value: datetime) -> datetime:
+    return (truncate_month(value) + timedelta(days=32)).replace(day=1)
+
+
+_TRUNCATE = {'hour': truncate_hour, 'day': truncate_day, 'month': truncate_month}
+
+
+def hourly_cutoff() -> datetime:
+    """Oldest hourly bucket worth keeping."""
+    return truncate_day(datetime.utcnow()) - timedelta(days=HOURLY_RETENTION_DAYS)
+
+
+def _key(record: Dict[str, Any]) -> Tuple:
+    """Rollup dimensions of a raw record ("none" as 0 / '')."""
+    success = record.get('success')
+    return (
+        record.get('organization_id') or 0,
+        record.get('user_id') or 0,
+        record.get('model_alias') or '',
+        record.get('request_type') or '',
+        True if success is None else bool(success),
+    )
+
+
+def _accumulate(totals: Dict[Tuple, List], key: Tuple, values: Iterable) -> None:
+    current = totals.get(key)
+    if current is None:
+        totals[key] = list(values)
+    else:
+        for i, value in enumerate(values):
+            current[i] += value
+
+
+def _rows(totals: Dict[Tuple, List]) -> List[Dict[str, Any]]:
+    return [
+        {'bucket': key[0], **dict(zip(DIMENSIONS, key[1:])), **dict(zip(MEASURES, values))}
+        for key, values in totals.items()
+    ]
+
+
+def aggregate(records: Iterable[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
+    """Rollup rows per unit ('hour', 'day', 'month') for a batch of raw token_usage records."""
+    totals: Dict[str, Dict[Tuple, List]] = {unit: {} for unit in ROLLUPS}
+    for record in records:
+        created_at = record.get('created_at') or datetime.utcnow()
+        key = _key(record)
+        values = (
+            1,
+            record.get('input_tokens') or 0,
+            record.get('output_tokens') or 0,
+            record.get('total_tokens') or 0,
+            record.get('total_cost') or 0.0,
+        )
+        for unit, truncate in _TRUNCATE.items():
+            _accumulate(totals[unit], (truncate(created_at),) + key, values)
+    return {unit: _rows(unit_totals) for unit, unit_totals in totals.items()}
+
+
+# ----------------------------------------------------------------------
+# Writes
+# ----------------------------------------------------------------------
+
+def _upsert(conn: Connection, table, rows: List[Dict[str, Any]]) -> None:
+    """Add rows onto existing buckets (insert the ones that don't exist yet)."""
+    dialect = conn.dialect.name
+    if dialect in ('sqlite', 'postgresql'):
+        if dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        stmt = dialect_insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[column.name for column in table.primary_key],
+            set_={name: table.c[name] + stmt.excluded[name] for name in MEASURES}
+        )
+        conn.execute(stmt, rows)
+    elif dialect in ('mysql', 'mariadb'):
+        from sqlalchemy.dialects.mysql import insert as mysql_insert
+        stmt = mysql_insert(table)
+        stmt = stmt.on_duplicate_key_update({name: table.c[name] + stmt.inserted[name] for name in MEASURES})
+        conn.execute(stmt, rows)
+    else:
+        for row in rows:
+            where = [table.c.bucket == row['bucket']] + [table.c[name] == row[name] for name in DIMENSIONS]
+            result = conn.execute(
+                table.update().where(*where).values({name: table.c[name] + row[name] for name in MEASURES})
+            )
+            if result.rowcount == 0:
+                conn.execute(insert(table), row)
+
+
+def apply_rollups(conn: Connection, records: List[Dict[str, Any]]) -> None:
+    """Fold a batch of raw records into the rollups (call inside the batch's transaction)."""
+    if not records:
+        return
+    for unit, rows in aggregate(records).items():
+        _upsert(conn, ROLLUPS[unit].__table__, rows)
+
+
+def _rebuild_in_sql(conn: Connection, unit: str, start: datetime, end: datetime) -> int:
+    """INSERT ... SELECT one rollup from token_usage grouped in the database; returns rows written."""
+    usage = TokenUsage.__table__.c
+    bucket = _BUCKET_SQL[conn.dialect.name][unit](usage.created_at)
+    dimensions = (
+        func.coalesce(usage.organization_id, 0),
+        func.coalesce(usage.user_id, 0),
+        func.coalesce(usage.model_alias, ''),
+        func.coalesce(usage.request_type, ''),
+        func.coalesce(usage.success, true()),
+    )
+    query = select(
+        bucket, *dimensions,
+        func.count(literal(1)),
+        func.coalesce(func.sum(usage.input_tokens), 0),
+        func.coalesce(func.sum(usage.output_tokens), 0),
+        func.coalesce(func.sum(usage.total_tokens), 0),
+        func.coalesce(func.sum(usage.total_cost), 0.0),
+    ).where(usage.created_at >= start, usage.created_at < end).group_by(bucket, *dimensions)
+    table = ROLLUPS[unit].__table__
+    return conn.execute(insert(table).from_select(['bucket', *DIMENSIONS, *MEASURES], query)).rowcount
+
+
+def _rebuild_in_python(conn: Connection, starts: Dict[str, Optional[datetime]], month: datetime) -> Dict[str, int]:
+    """Same as _rebuild_in_sql for databases without a bucket expression."""
+    usage = TokenUsage.__table__
+    window = select(usage).where(usage.c.created_at >= month, usage.c.created_at < next_month(month))
+    written = {unit: 0 for unit in ROLLUPS}
+    for unit, rows in aggregate(dict(row._mapping) for row in conn.execute(window)).items():
+        rows = [row for row in rows if starts[unit] is None or row['bucket'] >= starts[unit]]
+        if rows:
+            conn.execute(insert(ROLLUPS[unit].__table__), rows)
+            written[unit] += len(rows)
+    return written
+
+
+def _rebuild_month(
+    conn: Connection,
+    month: datetime,
+    starts: Dict[str, Optional[datetime]],
+    archived: Dict[str, List[Dict[str, Any]]],
+    oldest: bool,
+    newest: bool
+) -> Tuple[int, Dict[str, int]]:
+    """
+    Replace one month of rollup buckets (call inside the month's transaction).
+
+    The oldest and newest months of a rebuild also clear any buckets before
+    and after the range. Returns the raw rows read and rows written per rollup.
+    """
+    end = next_month(month)
+    for unit, model in ROLLUPS.items():
+        table = model.__table__
+        bounds = []
+        if starts[unit] is not None or not oldest:
+            bounds.append(table.c.bucket >= max(month, starts[unit] or month))
+        if not newest:
+            bounds.append(table.c.bucket < end)
+        conn.execute(delete(table).where(*bounds))
+
+    usage = TokenUsage.__table__.c
+    raw_rows = conn.execute(
+        select(func.count(literal(1))).where(usage.created_at >= month, usage.created_at < end)
+    ).scalar() or 0
+
+    if conn.dialect.name in _BUCKET_SQL:
+        written = {
+            unit: _rebuild_in_sql(conn, unit, max(month, starts[unit] or month), end)
+            for unit in ROLLUPS
+        }
+    else:
+        written = _rebuild_in_python(conn, starts, month)
+
+    for unit, rows in archived.items():
+        if rows:
+            _upsert(conn, ROLLUPS[unit].__table__, rows)
+            written[unit] += len(rows)
+    return raw_rows, written
+
+
+def rebuild_rollups(
+    engine: Engine,
+    since: Optional[datetime] = None,
+    stop: Optional[threading.Event] = None
+) -> Dict[str, int]:
+    """
+    Recompute the rollups from token_usage and the archived months.
+
+    Runs one short transaction per month, newest first, so TokenTracker
+    batches are not held behind the whole rebuild: each batch lands either
+    before or after its month is rebuilt, and the oldest month is finished last.
+
+    Args:
+        engine: Database engine
+        since: Only rebuild from the day containing this time (None = everything);
+            the monthly rollup is rebuilt from the start of that month
+        stop: Set to stop after the month being rebuilt (older months are left as they were)
+
+    Returns:
+        Row counts: raw and archived rows read and rows written per rollup
+    """
+    from services.token_archive import aggregate_archives, settle_archives
+
+    start = truncate_day(since) if since else None
+    starts = {
+        # Hourly rows older than the retention are not kept
+        'hour': max(start, hourly_cutoff()) if start else hourly_cutoff(),
+        'day': start,
+        'month': truncate_month(start) if start else None,
+    }
+
+    # A month is read from its archive file only; finish interrupted moves
+    # so none of its rows are still in token_usage as well
+    settle_archives(engine)
+    archived_rows, archived = aggregate_archives(starts)
+    archived_by_month: Dict[datetime, Dict[str, List[Dict[str, Any]]]] = {}
+    for unit, rows in archived.items():
+        for row in rows:
+            archived_by_month.setdefault(truncate_month(row['bucket']), {u: [] for u in ROLLUPS})[unit].append(row)
+
+    usage = TokenUsage.__table__.c
+    bounds = select(func.min(usage.created_at), func.max(usage.created_at))
+    if starts['month'] is not None:
+        bounds = bounds.where(usage.created_at >= starts['month'])
+    with engine.connect() as conn:
+        first, last = conn.execute(bounds).one()
+    months = list(archived_by_month) + [truncate_month(datetime.utcnow())]
+    months += [truncate_month(first), truncate_month(last)] if first else []
+    oldest = starts['month'] or min(months)
+    newest = month = max(months)
+
+    raw_rows = 0
+    written = {unit: 0 for unit in ROLLUPS}
+    while month >= oldest:
+        if stop is not None and stop.is_set():
+            logger.info(f"[TokenRollups] Rebuild stopped before {month:%Y-%m}")
+            break
+        with engine.begin() as conn:
+            month_rows, month_written = _rebuild_month(
+                conn, month, starts, archived_by_month.get(month, {}),
+                oldest=month == oldest, newest=month == newest
+            )
+        raw_rows += month_rows
+        for unit, count in month_written.items():
+            written[unit] += count
+        month = truncate_month(month - timedelta(days=1))
+
+    counts = {'raw_rows': raw_rows, 'archived_rows': archived_rows, 'hourly_rows': written['hour'],
+              'daily_rows': written['day'], 'monthly_rows': written['month']}
+    logger.info(
+        f"[TokenRollups] Rebuilt rollups from {raw_rows} rows and {archived_rows} archived rows "
+        f"({counts['hourly_rows']} hourly, "
+        f"{counts['daily_rows']} daily, {counts['monthly_rows']} monthly)"
+    )
+    return counts
+
+
+def backfill_if_missing(engine: Engine, stop: Optional[threading.Event] = None) -> bool:
+    """
+    Build the rollups for a database whose token_usage predates them.
+
+    Checks whether the oldest raw row is covered rather than whether the
+    rollups are empty: a worker may already have added today's batches.
+    The oldest month is rebuilt last, so a backfill stopped early runs
+    again on the next start.
+    """
+    with engine.connect() as conn:
+        first_usage = conn.execute(select(func.min(TokenUsage.__table__.c.created_at))).scalar()
+        first_bucket = conn.execute(select(func.min(TokenUsageDaily.__table__.c.bucket))).scalar()
+    if first_usage is None or (first_bucket is not None and first_bucket <= truncate_day(first_usage)):
+        return False
+    rebuild_rollups(engine, stop=stop)
+    return True
+
+
+# ----------------------------------------------------------------------
+# Reads
+# ----------------------------------------------------------------------
+
+def _segments(since: Optional[datetime], by_day: bool):
+    """(model, start, end) ranges covering [since, now) with as few rows as possible."""
+    if since is None:
+        return [(TokenUsageDaily if by_day else TokenUsageMonthly, None, None)]
+    segments = []
+    day = truncate_day(since)
+    hour = truncate_hour(since)
+    if hour > day and hour >= hourly_cutoff():
+        day += timedelta(days=1)
+        segments.append((TokenUsageHourly, hour, day))
+    if by_day:
+        segments.append((TokenUsageDaily, day, None))
+    elif day == truncate_month(day):
+        segments.append((TokenUsageMonthly, day, None))
+    else:
+        segments.append((TokenUsageDaily, day, next_month(day)))
+        segments.append((TokenUsageMonthly, next_month(day), None))
+    return segments
+
+
+def sum_usage(
+    db: Session,
+    since: Optional[datetime] = None,
+    by: Optional[str] = None,
+    success_only: bool = True
+) -> Dict[Any, Dict[str, int]]:
+    """
+    Token sums from the rollups.
+
+    Args:
+        db: Database session
+        since: Start of the window (None = all time)
+        by: None, 'organization_id', 'user_id' or 'day'
+        success_only: Count successful requests only (as the dashboards do)
+
+    Returns:
+        {key: {input_tokens, output_tokens, total_tokens, request_count}};
+        the key is None without grouping, a date for 'day', else the id
+        (0 for usage without an organization / user)
+    """
+    results: Dict[Any, Dict[str, int]] = {}
+    for model, start, end in _segments(since, by_day=by == 'day'):
+        group_column = _GROUP_COLUMNS[by](model) if by else None
+        columns = [
+            func.sum(model.input_tokens),
+            func.sum(model.output_tokens),
+            func.sum(model.total_tokens),
+            func.sum(model.request_count),
+        ]
+        query = db.query(*([group_column] if group_column is not None else []), *columns)
+        if success_only:
+            query = query.filter(model.success == True)
+        if start is not None:
+            query = query.filter(model.bucket >= start)
+        if end is not None:
+            query = query.filter(model.bucket < end)
+        if group_column is not None:
+            query = query.group_by(group_column)
+
+        for row in query.all():
+            if group_column is None:
+                key, values = None, row
+            else:
+                key, values = row[0], row[1:]
+                if by == 'day':
+                    key = key.date()
+            if values[3] is None:
+                continue  # No rows in this segment
+            totals = results.setdefault(
+                key, {'input_tokens': 0, 'output_tokens': 0, 'total_tokens': 0, 'request_count': 0}
+            )
+            for name, value in zip(('input_tokens', 'output_tokens', 'total_tokens', 'request_count'), values):
+                totals[name] += int(value or 0)
+    return results
@@ -8,26 +8,129 @@ Records token consumption per user, per organization, and globally.
 Performance Optimizations:
 - Async queue-based batch writes
 - Non-blocking writes (don't slow down LLM responses)
-- Automatic batching (every N records or time interval)
-- Graceful degradation if queue is full
+- Automatic batching (every N records or time interval); a backlog is
+  drained into larger batches, up to MAX_BATCH_SIZE
+- Writes run in a worker thread as one Core executemany INSERT, so a flush
+  (and its WAL checkpoint) never stalls the event loop
+- Spill-to-disk journal: records that don't fit in the queue, or whose
+  batch could not be written, are appended to data/token_usage_spill/ and
+  replayed later, so bursts and database errors never lose billing records.
+  Queue overflow is held in a bounded in-memory buffer that the batch
+  worker spills from a worker thread, so tracking never does file I/O on
+  the event loop
+- Hourly/daily rollups (services/token_rollups.py) are updated in the same
+  transaction as each batch, for the admin dashboards
 
 Author: lycosa9527
 Made by: MindSpring Team
 """
 
+import json
 import logging
+import os
+import threading
+import time
 import uuid
 import asyncio
+from collections import deque
+from pathlib import Path
 from typing import Optional, Dict, Any, List
 from datetime import datetime
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import func, insert
 from sqlalchemy.exc import DatabaseError, OperationalError
 
 from models.token_usage import TokenUsage
+from services.token_rollups import apply_rollups
 
 logger = logging.getLogger(__name__)
 
+SPILL_DIR = Path("data") / "token_usage_spill"
+
+
+class SpillJournal:
+    """
+    Append-only JSON-lines files of token records waiting to be written.
+
+    Each worker appends to spill-<pid>.jsonl. To replay, the file is first
+    renamed to replay-<pid>-<id>.jsonl (an atomic claim, so new spills go to
+    a fresh file and two workers never replay the same file), written to the
+    database, then deleted. Files whose pid is no longer running were left
+    by a worker that exited or crashed and are claimed by whoever sees them.
+    """
+
+    def __init__(self, directory: Path = SPILL_DIR):
+        self.directory = Path(directory)
+        self.pid = os.getpid()
+        self._lock = threading.Lock()
+        self.pending = False  # This worker has spilled since its last claim
+        self.spilled = 0
+        self.replayed = 0
+
+    @property
+    def _active_path(self) -> Path:
+        return self.directory / f"spill-{self.pid}.jsonl"
+
+    def append(self, records: List[Dict[str, Any]]) -> None:
+        lines = ''.join(
+            json.dumps({**r, 'created_at': r['created_at'].isoformat()}, ensure_ascii=False) + '\n'
+            for r in records
+        )
+        with self._lock:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            with open(self._active_path, 'a', encoding='utf-8') as f:
+                f.write(lines)
+            self.spilled += len(records)
+            self.pending = True
+
+    @staticmethod
+    def _owner(path: Path) -> Optional[int]:
+        try:
+            return int(path.stem.split('-')[1])
+        except (IndexError, ValueError):
+            return None
+
+    def claim(self) -> List[Path]:
+        """Claim this worker's journal and any left by dead workers."""
+        if not self.directory.exists():
+            return []
+        import psutil
+        claimed = []
+        with self._lock:
+            self.pending = False
+            for path in sorted(self.directory.glob('*.jsonl')):
+                owner = self._owner(path)
+                if path.name.startswith('replay-') and owner == self.pid:
+                    claimed.append(path)  # A replay of ours that failed earlier
+                    continue
+                if owner != self.pid and (owner is None or psutil.pid_exists(owner)):
+                    continue
+                target = self.directory / f"replay-{self.pid}-{uuid.uuid4().hex[:8]}.jsonl"
+                try:
+                    os.rename(path, target)
+                except OSError:
+                    continue  # Claimed by another worker first
+                claimed.append(target)
+        return claimed
+
+    @staticmethod
+    def read(path: Path) -> List[Dict[str, Any]]:
+        records = []
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # A line torn by a crash mid-append: the rest of the file is still good
+                    logger.warning(f"[TokenTracker] Skipping unreadable spill line in {path.name}")
+                    continue
+                record['created_at'] = datetime.fromisoformat(record['created_at'])
+                records.append(record)
+        return records
+
 
 class TokenTracker:
     """
@@ -60,12 +163,20 @@ class TokenTracker:
     
     # Batch write configuration
     BATCH_SIZE = 10  # Write after N records
+    MAX_BATCH_SIZE = 500  # Largest batch when draining a backlog
     BATCH_INTERVAL = 5.0  # Write after N seconds
-    MAX_QUEUE_SIZE = 1000  # Max queue size before dropping records
+    MAX_QUEUE_SIZE = 1000  # Records held in memory; beyond this they spill to disk
+    MAX_OVERFLOW_SIZE = 10000  # Records awaiting a spill; beyond this they are dropped
+    SPILL_SCAN_INTERVAL = 60.0  # Seconds between checks for journals left by other workers
     
-    def __init__(self):
+    def __init__(self, spill_dir: Path = SPILL_DIR):
         """Initialize async queue and background worker"""
         self._queue: asyncio.Queue = asyncio.Queue(maxsize=self.MAX_QUEUE_SIZE)
+        self._journal = SpillJournal(spill_dir)
+        self._overflow: deque = deque()  # Queue overflow, spilled to the journal by the batch worker
+        self._overflowed = 0
+        self._dropped = 0
+        self._last_spill_scan = 0.0
         self._worker_task: Optional[asyncio.Task] = None
         self._batch_buffer: List[Dict[str, Any]] = []
         self._last_flush: float = asyncio.get_event_loop().time()
@@ -73,6 +184,12 @@ class TokenTracker:
         self._corruption_detected = False
         self._write_count = 0
         self._checkpoint_interval = 50  # Checkpoint every N writes
+        # Speculative work: tokens per open speculation session, and outcome counters
+        self._speculative_tokens: Dict[str, int] = {}
+        self._speculation_stats = {
+            'started': 0, 'hits': 0, 'misses': 0, 'cancelled': 0,
+            'tokens_used': 0, 'tokens_wasted': 0
+        }
     
     def _ensure_worker_started(self):
         """Start background worker if not already running"""
@@ -101,23 +218,36 @@ class TokenTracker:
                     )
                     self._batch_buffer.append(record)
                     
-                    # Check if batch is full
+                    # Drain the backlog so batches grow with it
+                    while len(self._batch_buffer) < self.MAX_BATCH_SIZE:
+                        try:
+                            self._batch_buffer.append(self._queue.get_nowait())
+                        except asyncio.QueueEmpty:
+                            break
+                    await self._spill_overflow()
+                    
+                    # Check if batch is full; a write that succeeded means the database can take spilled records too
                     if len(self._batch_buffer) >= self.BATCH_SIZE:
-                        await self._flush_batch()
+                        if await self._flush_batch():
+                            await self._replay_spilled()
                         
                 except asyncio.TimeoutError:
+                    await self._spill_overflow()
                     # Timeout - flush if we have records
                     if self._batch_buffer:
                         await self._flush_batch()
+                    # Idle: replay spilled records
+                    await self._replay_spilled()
                 
                 # Check if time interval passed
                 current_time = asyncio.get_event_loop().time()
                 if (current_time - self._last_flush) >= self.BATCH_INTERVAL:
-                    if self._batch_buffer:
-                        await self._flush_batch()
+                    if self._batch_buffer and await self._flush_batch():
+                        await self._replay_spilled()
                 
             except asyncio.CancelledError:
                 # Shutdown - flush remaining records
+                await self._spill_overflow()
                 if self._batch_buffer:
                     logger.info(f"[TokenTracker] Flushing {len(self._batch_buffer)} records on shutdown")
                     await self._flush_batch()
@@ -126,83 +256,136 @@ class TokenTracker:
                 logger.error(f"[TokenTracker] Batch worker error: {e}", exc_info=True)
                 await asyncio.sleep(1)  # Brief pause before retrying
     
-    async def _flush_batch(self):
-        """Flush batch buffer to database"""
-        if not self._batch_buffer:
-            return
+    def _insert_records(self, records: List[Dict[str, Any]]) -> None:
+        """Write records and their rollups in one transaction (runs in a worker thread)."""
+        from config.database import engine
+        with engine.begin() as conn:
+            conn.execute(insert(TokenUsage.__table__), records)
+            apply_rollups(conn, records)
+    
+    def _write_batch(self, records: List[Dict[str, Any]]) -> bool:
+        """
+        Write a batch, spilling it to the journal if it can't be written.
         
-        # If corruption detected, skip writes to prevent further issues
+        Runs in a worker thread. Returns True if the batch reached the database.
+        """
+        # If corruption detected, keep records on disk until the database is recovered
         if self._corruption_detected:
-            logger.warning(f"[TokenTracker] Skipping batch write - database corruption detected. {len(self._batch_buffer)} records dropped.")
-            self._batch_buffer.clear()
-            return
+            logger.warning(f"[TokenTracker] Database corruption detected - spilling {len(records)} records to journal")
+            self._journal.append(records)
+            return False
         
-        # Check disk space BEFORE clearing buffer (prevent data loss)
         try:
             from config.database import check_disk_space
             if not check_disk_space(required_mb=50):
-                logger.error("[TokenTracker] Insufficient disk space - skipping batch write")
-                # Don't clear buffer - records will be retried later
-                return
+                logger.error("[TokenTracker] Insufficient disk space - spilling batch to journal")
+                self._journal.append(records)
+                return False
         except Exception as e:
             logger.warning(f"[TokenTracker] Disk space check failed: {e}, proceeding with write")
         
-        # Now safe to clear buffer
+        try:
+            self._insert_records(records)
+        except (DatabaseError, OperationalError) as e:
+            error_msg = str(e).lower()
+            
+            # Detect corruption
+            if "malformed" in error_msg or "corrupt" in error_msg or "database disk image" in error_msg:
+                self._corruption_detected = True
+                logger.error(
+                    "[TokenTracker] DATABASE CORRUPTION DETECTED! "
+                    "Token tracking writes suspended to prevent further damage (records are journaled). "
+                    "Please run: python scripts/recover_database.py"
+                )
+            else:
+                logger.error(f"[TokenTracker] Database error during batch write, spilling to journal: {e}")
+            self._journal.append(records)
+            return False
+        except Exception as e:
+            logger.error(f"[TokenTracker] Batch write failed, spilling to journal: {e}", exc_info=True)
+            self._journal.append(records)
+            return False
+        
+        self._write_count += len(records)
+        total_tokens = sum(r['total_tokens'] for r in records)
+        logger.debug(f"[TokenTracker] Batch wrote {len(records)} records ({total_tokens} tokens)")
+        
+        # Periodic WAL checkpoint to prevent corruption
+        if self._write_count >= self._checkpoint_interval:
+            try:
+                from config.database import checkpoint_wal
+                checkpoint_wal()
+                self._write_count = 0
+            except Exception as e:
+                logger.warning(f"[TokenTracker] WAL checkpoint failed: {e}")
+        return True
+    
+    async def _flush_batch(self) -> bool:
+        """Flush batch buffer to database (off the event loop). Returns True if the batch was written."""
+        if not self._batch_buffer:
+            return False
+        
         records = self._batch_buffer.copy()
         self._batch_buffer.clear()
         self._last_flush = asyncio.get_event_loop().time()
         
         try:
-            
-            from config.database import SessionLocal
-            db = SessionLocal()
-            
+            return await asyncio.to_thread(self._write_batch, records)
+        except Exception as e:
+            logger.error(f"[TokenTracker] Failed to flush batch: {e}", exc_info=True)
+            return False
+    
+    def _spill_overflow_records(self) -> int:
+        """Append the queue overflow to the journal in one batch (runs in a worker thread)."""
+        records = []
+        while True:
             try:
-                # Bulk insert all records
-                usage_objects = []
-                for record in records:
-                    usage = TokenUsage(**record)
-                    usage_objects.append(usage)
-                
-                db.add_all(usage_objects)
-                db.commit()
-                
-                self._write_count += len(records)
-                total_tokens = sum(r['total_tokens'] for r in records)
-                logger.debug(f"[TokenTracker] Batch wrote {len(records)} records ({total_tokens} tokens)")
-                
-                # Periodic WAL checkpoint to prevent corruption
-                if self._write_count >= self._checkpoint_interval:
-                    try:
-                        from config.database import checkpoint_wal
-                        checkpoint_wal()
-                        self._write_count = 0
-                    except Exception as e:
-                        logger.warning(f"[TokenTracker] WAL checkpoint failed: {e}")
-                
-            except (DatabaseError, OperationalError) as e:
-                db.rollback()
-                error_msg = str(e).lower()
-                
-                # Detect corruption
-                if "malformed" in error_msg or "corrupt" in error_msg or "database disk image" in error_msg:
-                    self._corruption_detected = True
-                    logger.error(
-                        "[TokenTracker] DATABASE CORRUPTION DETECTED! "
-                        "Token tracking disabled to prevent further damage. "
-                        "Please run: python scripts/recover_database.py"
-                    )
-                else:
-                    logger.error(f"[TokenTracker] Database error during batch write: {e}", exc_info=True)
-                    
+                records.append(self._overflow.popleft())
+            except IndexError:
+                break
+        if records:
+            self._journal.append(records)
+        return len(records)
+    
+    async def _spill_overflow(self):
+        """Spill records that did not fit in the queue (off the event loop)."""
+        if not self._overflow:
+            return
+        try:
+            await asyncio.to_thread(self._spill_overflow_records)
+        except Exception as e:
+            logger.error(f"[TokenTracker] Failed to spill queue overflow: {e}", exc_info=True)
+    
+    def _replay_journal(self) -> int:
+        """Write claimed spill files to the database (runs in a worker thread)."""
+        replayed = 0
+        for path in self._journal.claim():
+            try:
+                records = self._journal.read(path)
+                # One transaction per file: a failure leaves the whole file for the next replay
+                self._insert_records(records)
+                path.unlink()
             except Exception as e:
-                db.rollback()
-                logger.error(f"[TokenTracker] Batch write failed: {e}", exc_info=True)
-            finally:
-                db.close()
-                
+                logger.warning(f"[TokenTracker] Spill replay of {path.name} failed, will retry: {e}")
+                break
+            replayed += len(records)
+        self._journal.replayed += replayed
+        if replayed:
+            logger.info(f"[TokenTracker] Replayed {replayed} spilled records")
+        return replayed
+    
+    async def _replay_spilled(self):
+        """Replay journaled records when this worker spilled some, or periodically for other workers' leftovers."""
+        if self._corruption_detected:
+            return
+        now = time.monotonic()
+        if not (self._journal.pending or now - self._last_spill_scan >= self.SPILL_SCAN_INTERVAL):
+            return
+        self._last_spill_scan = now
+        try:
+            await asyncio.to_thread(self._replay_journal)
         except Exception as e:
-            logger.error(f"[TokenTracker] Failed to flush batch: {e}", exc_info=True)
+            logger.warning(f"[TokenTracker] Spill replay failed: {e}")
     
     @staticmethod
     def generate_session_id() -> str:
@@ -224,6 +407,7 @@ class TokenTracker:
         endpoint_path: Optional[str] = None,
         response_time: Optional[float] = None,
         success: bool = True,
+        cache_hit: bool = False,
         db: Optional[Session] = None  # Optional for backward compatibility
     ) -> bool:
         """
@@ -247,10 +431,11 @@ class TokenTracker:
             endpoint_path: API endpoint path
             response_time: Response time in seconds
             success: Whether the request was successful
+            cache_hit: Served from the LLM response cache (recorded with zero tokens and cost)
             db: Database session (deprecated - kept for backward compatibility, not used)
             
         Returns:
-            True if queued successfully, False if queue is full
+            True if queued (or held for the spill journal), False on error or when dropped
         """
         try:
             # Ensure worker is started
@@ -262,6 +447,13 @@ class TokenTracker:
             if total_tokens is None:
                 total_tokens = input_tokens + output_tokens
             
+            # Cache hits consumed nothing from the provider
+            if cache_hit:
+                input_tokens = output_tokens = total_tokens = 0
+            
+            if session_id in self._speculative_tokens:
+                self._speculative_tokens[session_id] += total_tokens
+            
             # Calculate cost
             pricing = self.MODEL_PRICING.get(model_alias, {
                 'input': 0.4,
@@ -307,6 +499,7 @@ class TokenTracker:
                 'diagram_type': diagram_type,
                 'endpoint_path': endpoint_path,
                 'success': success,
+                'cache_hit': cache_hit,
                 'response_time': response_time,
                 'created_at': datetime.utcnow()
             }
@@ -325,20 +518,75 @@ class TokenTracker:
                 return True
                 
             except asyncio.QueueFull:
-                # Queue is full - log warning but don't block
-                logger.warning(
-                    f"[TokenTracker] Queue full! Dropping token record "
-                    f"({model_alias}, {input_tokens}+{output_tokens} tokens). "
-                    f"Consider increasing MAX_QUEUE_SIZE or BATCH_SIZE."
-                )
-                return False
+                # Queue is full - hold the record for the batch worker to journal to disk
+                if len(self._overflow) >= self.MAX_OVERFLOW_SIZE:
+                    self._dropped += 1
+                    if self._dropped % self.MAX_QUEUE_SIZE == 1:
+                        logger.error(
+                            f"[TokenTracker] Queue and overflow full, dropping token records "
+                            f"({self._dropped} dropped so far)"
+                        )
+                    return False
+                self._overflow.append(record)
+                self._overflowed += 1
+                if self._overflowed % self.MAX_QUEUE_SIZE == 1:
+                    logger.warning(
+                        f"[TokenTracker] Queue full, spilling token records to {self._journal.directory} "
+                        f"({self._overflowed} overflowed so far)"
+                    )
+                return True
                 
         except Exception as e:
             logger.error(f"[TokenTracker] Failed to queue usage record: {e}", exc_info=True)
             return False
     
+    def begin_speculation(self) -> str:
+        """
+        Open a speculation session for work started before it is known to be needed.
+        
+        Pass the returned ID as session_id to the speculative LLM calls; their
+        tokens are still recorded as usual, and are also counted towards the
+        speculation outcome reported by end_speculation().
+        """
+        session_id = f"spec_{uuid.uuid4().hex[:16]}"
+        self._speculative_tokens[session_id] = 0
+        self._speculation_stats['started'] += 1
+        return session_id
+    
+    def end_speculation(self, session_id: str, hit: bool, cancelled: bool = False):
+        """
+        Close a speculation session.
+        
+        Args:
+            session_id: ID from begin_speculation()
+            hit: The speculative result was used
+            cancelled: The speculative work was cancelled before it finished
+                (tokens a provider may bill for an aborted call are not known)
+        """
+        tokens = self._speculative_tokens.pop(session_id, None)
+        if tokens is None:
+            return
+        stats = self._speculation_stats
+        if hit:
+            stats['hits'] += 1
+            stats['tokens_used'] += tokens
+        else:
+            stats['misses'] += 1
+            stats['tokens_wasted'] += tokens
+            if cancelled:
+                stats['cancelled'] += 1
+    
+    def get_speculation_stats(self) -> Dict[str, Any]:
+        """Get speculation hit rate and the tokens spent on discarded work."""
+        stats = dict(self._speculation_stats)
+        finished = stats['hits'] + stats['misses']
+        stats['in_flight'] = len(self._speculative_tokens)
+        stats['hit_rate'] = round(stats['hits'] / finished, 4) if finished else 0.0
+        return stats
+    
     async def flush(self):
         """Manually flush pending records (useful for shutdown)"""
+        await self._spill_overflow()
         if self._batch_buffer:
             await self._flush_batch()
         # Also process any remaining items in queue
@@ -355,7 +603,7 @@ class TokenTracker:
         # Final WAL checkpoint on shutdown
         try:
             from config.database import checkpoint_wal
-            checkpoint_wal()
+            await asyncio.to_thread(checkpoint_wal)
         except Exception as e:
             logger.warning(f"[TokenTracker] Final WAL checkpoint failed: {e}")
 
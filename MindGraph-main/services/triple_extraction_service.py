@@ -8,14 +8,157 @@ Based on concept-map-new-master/llm/llm-manager.js
 @author MindGraph Team
 """
 
+import asyncio
 import logging
 import re
+import unicodedata
+from collections import Counter
 from typing import Dict, List, Optional, Tuple
 
+from config.settings import config
 from services.llm_service import llm_service
 
 logger = logging.getLogger(__name__)
 
+Triple = Tuple[str, str, str, str]
+
+# Sentence ends (zh/en) and paragraph breaks for chunking
+_SENTENCE_SPLIT = re.compile(r'(?<=[。！？!?；;])|(?<=\.)(?=\s)|(?=\n)')
+_LAYER_RELATION = re.compile(r'L(\d+)-L(\d+)')
+
+
+def normalize_concept(concept: str) -> str:
+    """
+    Matching key for a concept: full-width folded, case-insensitive, without
+    whitespace, punctuation or brackets ("人工智能（AI）" and "人工 智能(ai)" match).
+    """
+    text = unicodedata.normalize('NFKC', concept).casefold()
+    return ''.join(ch for ch in text if not ch.isspace() and not unicodedata.category(ch).startswith('P'))
+
+
+def split_text_into_chunks(text: str, max_chars: int, overlap_sentences: int = 1) -> List[str]:
+    """
+    Split text into chunks of whole sentences, at most max_chars each (a
+    single longer sentence becomes its own chunk).
+    
+    A chunk closes early at a paragraph break once it is half full, and each
+    chunk repeats the last overlap_sentences sentences of the previous one so
+    relations spanning the boundary are seen whole.
+    """
+    sentences = []
+    for piece in _SENTENCE_SPLIT.split(text):
+        if piece.strip():
+            sentences.append((piece.strip(), piece.startswith('\n')))
+    
+    chunks = []
+    current: List[str] = []
+    length = 0
+    for sentence, starts_paragraph in sentences:
+        full = length + len(sentence) > max_chars
+        paragraph_break = starts_paragraph and length >= max_chars // 2
+        if current and (full or paragraph_break):
+            chunks.append(current)
+            current = current[-overlap_sentences:] if overlap_sentences else []
+            length = sum(len(s) for s in current)
+            if length + len(sentence) > max_chars:
+                current, length = [], 0
+        current.append(sentence)
+        length += len(sentence)
+    if current and (not chunks or current != chunks[-1][-len(current):]):
+        chunks.append(current)
+    
+    separator = '' if re.search(r'[\u4e00-\u9fff]', text) else ' '
+    return [separator.join(chunk) for chunk in chunks]
+
+
+class ConceptAliasMap:
+    """
+    Maps every spelling of a concept to one display form: the first one seen
+    for its normalize_concept() key.
+    """
+    
+    def __init__(self):
+        self._canonical: Dict[str, str] = {}
+        self.aliases: Dict[str, str] = {}
+    
+    def canonical(self, concept: str) -> str:
+        concept = concept.strip()
+        key = normalize_concept(concept) or concept
+        display = self._canonical.setdefault(key, concept)
+        if concept != display:
+            self.aliases[concept] = display
+        return display
+
+
+def merge_chunk_triples(chunk_triples: List[List[Triple]]) -> List[Triple]:
+    """
+    Merge triples extracted from overlapping chunks.
+    
+    Concepts are canonicalized through one alias map. Each concept then gets
+    one layer: the one most chunks gave it (ties go to the higher layer), and
+    every triple's layer relation is rewritten from those layers. Triples that
+    now point from a lower layer to a higher one are dropped, as are self
+    loops and duplicate concept pairs.
+    """
+    aliases = ConceptAliasMap()
+    canonical_triples = []
+    layer_votes: Dict[str, Counter] = {}
+    for triples in chunk_triples:
+        for concept1, relation, concept2, layer_relation in triples:
+            concept1, concept2 = aliases.canonical(concept1), aliases.canonical(concept2)
+            match = _LAYER_RELATION.fullmatch(layer_relation)
+            if not match:
+                continue
+            for concept, layer in ((concept1, int(match.group(1))), (concept2, int(match.group(2)))):
+                layer_votes.setdefault(concept, Counter())[layer] += 1
+            canonical_triples.append((concept1, relation, concept2))
+    
+    layers = {
+        concept: min(votes, key=lambda layer: (-votes[layer], layer))
+        for concept, votes in layer_votes.items()
+    }
+    
+    merger = TripleMerger()
+    for concept1, relation, concept2 in canonical_triples:
+        layer1, layer2 = layers[concept1], layers[concept2]
+        if layer2 < layer1:
+            continue
+        merger.add([(concept1, relation, concept2, f"L{layer1}-L{layer2}")])
+    
+    if aliases.aliases:
+        logger.debug(f"[TripleExtractionService] Merged concept aliases: {aliases.aliases}")
+    return merger.triples
+
+
+class TripleMerger:
+    """
+    Merges triples from several extractions, dropping duplicates as they arrive.
+    
+    Two triples are duplicates when they link the same pair of concepts (in
+    either direction, ignoring case and whitespace); the first one wins.
+    """
+    
+    def __init__(self):
+        self.triples: List[Tuple[str, str, str, str]] = []
+        self._seen_pairs = set()
+    
+    @staticmethod
+    def _canonical(concept: str) -> str:
+        return normalize_concept(concept) or concept.strip()
+    
+    def add(self, triples: List[Tuple[str, str, str, str]]) -> List[Tuple[str, str, str, str]]:
+        """Add triples; returns the ones that were new."""
+        added = []
+        for triple in triples:
+            concept1, _, concept2, _ = triple
+            pair = frozenset((self._canonical(concept1), self._canonical(concept2)))
+            if len(pair) < 2 or pair in self._seen_pairs:
+                continue
+            self._seen_pairs.add(pair)
+            self.triples.append(triple)
+            added.append(triple)
+        return added
+
 
 class TripleExtractionService:
     """
@@ -34,7 +177,8 @@ class TripleExtractionService:
         intro_text: str,
         language: str = 'zh',
         model: str = 'qwen',
-        stream: bool = False
+        stream: bool = False,
+        chunked: Optional[bool] = None
     ) -> Dict[str, any]:
         """
         Extract triples from introduction text.
@@ -43,7 +187,10 @@ class TripleExtractionService:
             intro_text: Introduction text
             language: Language ('zh' or 'en')
             model: LLM model to use (default: 'qwen')
-            stream: Whether to stream the response
+            stream: Whether to stream the response (single prompt only)
+            chunked: Split the text into overlapping chunks extracted concurrently.
+                None chunks texts longer than TRIPLE_CHUNK_CHARS when
+                TRIPLE_CHUNKING_ENABLED
             
         Returns:
             Dict with 'success', 'triples', 'message' keys
@@ -57,6 +204,11 @@ class TripleExtractionService:
                 'message': '介绍文本不能为空'
             }
         
+        if chunked is None:
+            chunked = config.TRIPLE_CHUNKING_ENABLED and len(intro_text) > config.TRIPLE_CHUNK_CHARS
+        if chunked:
+            return await self._extract_triples_chunked(intro_text, language, model)
+        
         try:
             # Build prompt
             prompt = self._build_triple_prompt(intro_text, language)
@@ -119,6 +271,60 @@ class TripleExtractionService:
                 'message': '三元组提取失败'
             }
     
+    async def _extract_triples_chunked(self, intro_text: str, language: str, model: str) -> Dict[str, any]:
+        """Extract triples from overlapping chunks concurrently, then merge them."""
+        chunks = split_text_into_chunks(
+            intro_text, config.TRIPLE_CHUNK_CHARS, config.TRIPLE_CHUNK_OVERLAP_SENTENCES
+        )
+        semaphore = asyncio.Semaphore(config.TRIPLE_CHUNK_CONCURRENCY)
+        logger.info(f"[TripleExtractionService] Extracting triples from {len(chunks)} chunks")
+        
+        async def extract_chunk(chunk: str) -> str:
+            async with semaphore:
+                return await self.llm_service.chat(
+                    prompt=self._build_triple_prompt(chunk, language),
+                    model=model,  # Use user-selected model
+                    temperature=0.3,
+                    max_tokens=2000
+                )
+        
+        responses = await asyncio.gather(*(extract_chunk(chunk) for chunk in chunks), return_exceptions=True)
+        
+        chunk_triples = []
+        raw_responses = []
+        errors = []
+        for index, response in enumerate(responses):
+            if isinstance(response, Exception):
+                logger.warning(f"[TripleExtractionService] Chunk {index + 1}/{len(chunks)} failed: {response}")
+                errors.append(str(response))
+                continue
+            raw_responses.append(response or "")
+            chunk_triples.append(self._parse_triples_from_response(response or ""))
+        
+        triples = merge_chunk_triples(chunk_triples)
+        raw_response = "\n".join(raw_responses)
+        
+        if len(triples) == 0:
+            logger.warning("[TripleExtractionService] No triples extracted from any chunk")
+            return {
+                'success': False,
+                'error': errors[0] if errors and not raw_responses else 'No triples extracted',
+                'message': '未能从AI响应中解析到任何三元组',
+                'raw_response': raw_response
+            }
+        
+        logger.info(
+            f"[TripleExtractionService] Successfully extracted {len(triples)} triples "
+            f"from {len(chunks)} chunks ({len(errors)} failed)"
+        )
+        return {
+            'success': True,
+            'triples': triples,
+            'message': f'成功从文本中提取 {len(triples)} 个三元组',
+            'raw_response': raw_response,
+            'chunks': len(chunks)
+        }
+    
     def _build_triple_prompt(self, intro_text: str, language: str) -> str:
         """Build prompt for triple extraction."""
         if language == 'zh':
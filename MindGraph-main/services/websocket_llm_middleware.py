@@ -135,7 +135,7 @@ class WebSocketLLMMiddleware:
         # Apply rate limiting if enabled
         rate_limit_context = None
         if self.enable_rate_limiting and self.rate_limiter:
-            rate_limit_context = self.rate_limiter.__aenter__()
+            rate_limit_context = self.rate_limiter.limit(self.model_alias)
             await rate_limit_context.__aenter__()
         
         try:
@@ -43,8 +43,8 @@ class ModularJavaScriptManager:
         # Graph type to renderer module mapping
         self.graph_type_to_modules = {
             'mindmap': ['shared-utilities', 'mind-map-renderer', 'renderer-dispatcher'],
-            'concept_map': ['shared-utilities', 'concept-map-renderer', 'renderer-dispatcher'],
-            'conceptmap': ['shared-utilities', 'concept-map-renderer', 'renderer-dispatcher'],
+            'concept_map': ['shared-utilities', 'sugiyama-layout', 'concept-map-renderer', 'renderer-dispatcher'],
+            'conceptmap': ['shared-utilities', 'sugiyama-layout', 'concept-map-renderer', 'renderer-dispatcher'],
             'bubble_map': ['shared-utilities', 'bubble-map-renderer', 'renderer-dispatcher'],
             'double_bubble_map': ['shared-utilities', 'bubble-map-renderer', 'renderer-dispatcher'],
             'circle_map': ['shared-utilities', 'bubble-map-renderer', 'renderer-dispatcher'],
@@ -69,12 +69,22 @@ class ModularJavaScriptManager:
             'tree-renderer': 'tree-renderer.js',
             'flow-renderer': 'flow-renderer.js',
             'renderer-dispatcher': 'renderer-dispatcher.js',
+            'sugiyama-layout': 'sugiyama-layout.js',
 
         
             'brace-renderer': 'brace-renderer.js',
         
         }
         
+        # Modules that live in static/js/ rather than static/js/renderers/
+        self.core_module_files = {
+            'd3': 'd3.min.js',
+            'theme-config': 'theme-config.js',
+            'style-manager': 'style-manager.js',
+            'logger': 'logger.js',
+            'dynamic-renderer-loader': 'dynamic-renderer-loader.js',
+        }
+        
         # Cache for loaded modules
         self._module_cache = {}
         self._cache_stats = {
@@ -179,9 +189,9 @@ class ModularJavaScriptManager:
         self._cache_stats['cache_misses'] += 1
         
         try:
-            if module_name in ['style-manager', 'theme-config']:
+            if module_name in self.core_module_files:
                 # Core modules are in the parent directory
-                file_path = self.base_path / f"{module_name.replace('-', '_')}.js"
+                file_path = self.base_path / self.core_module_files[module_name]
             else:
                 # Renderer modules are in the renderers directory
                 filename = self.module_files.get(module_name, f"{module_name}.js")
@@ -276,6 +286,37 @@ class ModularJavaScriptManager:
         
         return module_contents, stats
     
+    def get_render_bundle(self, graph_type: str) -> List[Tuple[str, str]]:
+        """
+        Get every script a standalone (headless) render page needs, in load order.
+        
+        Unlike get_javascript_for_graph_type(), this includes d3, the logger and
+        the dynamic renderer loader so the page can render without fetching
+        anything from the server.
+        
+        Args:
+            graph_type: The graph type to build a bundle for
+            
+        Returns:
+            List[Tuple[str, str]]: (module name, module content) pairs
+        """
+        modules = ['d3', 'theme-config', 'style-manager', 'logger']
+        required = [m for m in self.get_required_modules(graph_type) if m != 'renderer-dispatcher']
+        if 'shared-utilities' in required:
+            required.remove('shared-utilities')
+            modules.append('shared-utilities')
+        modules.extend(required)
+        modules.extend(['dynamic-renderer-loader', 'renderer-dispatcher'])
+        
+        bundle = []
+        for module_name in modules:
+            content = self.load_module(module_name)
+            if content:
+                bundle.append((module_name, content))
+            else:
+                logger.warning(f"Render bundle for {graph_type} is missing module: {module_name}")
+        return bundle
+    
     def get_cache_statistics(self) -> Dict:
         """
         Get comprehensive cache statistics.
@@ -0,0 +1,7 @@
+"""
+Tests for Agents Module
+
+@author lycosa9527
+@made_by MindSpring Team
+"""
+
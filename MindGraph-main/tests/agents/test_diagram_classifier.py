@@ -0,0 +1,132 @@
+"""
+Unit Tests for the Local Diagram Type Classifier
+================================================
+
+@author lycosa9527
+@made_by MindSpring Team
+"""
+
+import pytest
+import sys
+from agents.core.diagram_classifier import (
+    DiagramTypeClassifier,
+    find_type_mentions,
+    has_topic,
+    load_training_samples,
+    normalize
+)
+from agents.main_agent import _detect_diagram_type_from_prompt
+from config.settings import config
+
+main_agent_module = sys.modules['agents.main_agent']
+
+
+@pytest.fixture(scope='module')
+def classifier():
+    return DiagramTypeClassifier()
+
+
+class TestDiagramTypeClassifier:
+    """Test keyword rules and the n-gram model."""
+
+    def test_training_samples_from_prompts(self):
+        """Test that every classification prompt example is parsed into the training set."""
+        samples = load_training_samples()
+        assert ("generate a flow map showing coffee making steps", 'flow_map') in samples
+        assert ("生成一个复流程图分析酒精灯爆炸", 'multi_flow_map') in samples
+        assert ("comparing and contrasting two things", 'double_bubble_map') in samples
+
+    @pytest.mark.parametrize('prompt, expected', [
+        ("generate a bubble map about double bubble maps", 'bubble_map'),
+        ("a mind map of bubble maps", 'mind_map'),
+        ("生成一个关于双气泡图的气泡图", 'bubble_map'),
+        ("生成一个关于思维导图的思维导图", 'mind_map'),
+        ("生成一个复流程图分析酒精灯爆炸", 'multi_flow_map'),
+        ("双气泡图比较苹果和橙子", 'double_bubble_map'),
+        ("Create a Flowchart for brewing tea", 'flow_map'),
+    ])
+    def test_explicit_names(self, classifier, prompt, expected):
+        """Test that the diagram being created wins over names used as the topic."""
+        result = classifier.classify(prompt)
+        assert result['diagram_type'] == expected
+        assert result['source'] == 'keyword'
+        assert result['confidence'] >= 0.9
+
+    def test_topic_only_names_defer_to_llm(self, classifier):
+        """Test that a prompt naming diagrams only as its topic gets no local answer."""
+        assert find_type_mentions(normalize("explain the parts of mind maps")) == [('mind_map', True)]
+        assert classifier.classify("explain the parts of mind maps")['diagram_type'] is None
+
+    @pytest.mark.parametrize('prompt, expected', [
+        ("compare cats and dogs", 'double_bubble_map'),
+        ("比较猫和狗", 'double_bubble_map'),
+        ("制作咖啡的步骤", 'flow_map'),
+        ("causes and effects of world war 2", 'multi_flow_map'),
+        ("人体的组成部分", 'brace_map'),
+    ])
+    def test_intent_without_names(self, classifier, prompt, expected):
+        """Test the n-gram model on prompts that state intent but no diagram name."""
+        result = classifier.classify(prompt)
+        assert result['source'] == 'ngram'
+        assert result['diagram_type'] == expected
+        assert result['confidence'] >= config.LOCAL_CLASSIFIER_MIN_CONFIDENCE
+
+    @pytest.mark.parametrize('prompt, expected', [
+        ("气泡图", False),
+        ("生成一个思维导图", False),
+        ("Create a mind map", False),
+        ("气泡图描述苹果", True),
+        ("a mind map of bubble maps", True),
+        ("generate a tree map for animal classification", True),
+    ])
+    def test_has_topic(self, prompt, expected):
+        """Test that diagram names and request wording alone are not a topic."""
+        assert has_topic(normalize(prompt)) is expected
+
+    def test_topic_only_prompt_low_confidence(self, classifier):
+        """Test that a bare topic stays below the default threshold."""
+        assert classifier.classify("solar system")['confidence'] < 0.85
+
+
+class TestDetectionShortCircuit:
+    """Test the local classifier in _detect_diagram_type_from_prompt."""
+
+    @pytest.fixture
+    def llm_calls(self, monkeypatch):
+        from services.llm_service import llm_service
+        calls = []
+
+        async def fake_chat(prompt, **kwargs):
+            calls.append(prompt)
+            return "mind_map"
+
+        monkeypatch.setattr(llm_service, 'chat', fake_chat)
+        monkeypatch.setattr(main_agent_module, 'get_diagram_classifier', lambda: DiagramTypeClassifier())
+        return calls
+
+    @pytest.mark.asyncio
+    async def test_confident_prompt_skips_llm(self, llm_calls):
+        """Test that a clear prompt is answered without an LLM call."""
+        result = await _detect_diagram_type_from_prompt("generate a tree map for animal classification", 'en')
+        assert result == {'diagram_type': 'tree_map', 'clarity': 'clear', 'has_topic': True}
+        assert llm_calls == []
+
+    @pytest.mark.asyncio
+    async def test_unclear_prompt_falls_back(self, llm_calls):
+        """Test that a low-confidence prompt still goes to the LLM."""
+        result = await _detect_diagram_type_from_prompt("the french revolution", 'en')
+        assert result['diagram_type'] == 'mind_map'
+        assert len(llm_calls) == 1
+
+    @pytest.mark.asyncio
+    async def test_bare_diagram_name_falls_back(self, llm_calls):
+        """Test that a diagram name without a topic gets the LLM's unclear-prompt handling."""
+        await _detect_diagram_type_from_prompt("气泡图", 'zh')
+        assert len(llm_calls) == 1
+
+    @pytest.mark.asyncio
+    async def test_disabled(self, llm_calls, monkeypatch):
+        """Test that LOCAL_CLASSIFIER_ENABLED=false always asks the LLM."""
+        monkeypatch.setattr(type(config), 'LOCAL_CLASSIFIER_ENABLED', property(lambda self: False))
+        await _detect_diagram_type_from_prompt("generate a tree map for animal classification", 'en')
+        assert len(llm_calls) == 1
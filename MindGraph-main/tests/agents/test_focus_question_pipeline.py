@@ -0,0 +1,119 @@
+"""
+Unit Tests for the Streaming Focus Question Concept Map Pipeline
+================================================================
+
+@author lycosa9527
+@made_by MindSpring Team
+"""
+
+import asyncio
+import pytest
+from agents.concept_maps.concept_map_agent import ConceptMapAgent
+from services.introduction_service import introduction_service
+from services.triple_extraction_service import TripleMerger, triple_extraction_service
+
+
+def _patch_introduction(monkeypatch, chunks, delay=0.0):
+    async def fake_stream(keyword, language='zh', model='qwen'):
+        for chunk in chunks:
+            await asyncio.sleep(delay)
+            yield chunk
+
+    monkeypatch.setattr(introduction_service, 'generate_introduction_stream', fake_stream)
+
+
+class TestIntroductionParagraphs:
+    """Test sentence-by-sentence paragraph streaming."""
+
+    @pytest.mark.asyncio
+    async def test_paragraphs_split_on_line_breaks_and_sentence_cap(self, monkeypatch):
+        """Test that paragraphs end at line breaks or after max_sentences sentences."""
+        _patch_introduction(monkeypatch, ["对于光合作用，可以", "从四个方面分析。第一", "句。\n\n一。二。三。四", "。五。尾巴"])
+        paragraphs = [
+            p async for p in introduction_service.generate_introduction_paragraphs("光合作用", max_sentences=4)
+        ]
+        assert paragraphs == ["对于光合作用，可以从四个方面分析。第一句。", "一。二。三。四。", "五。尾巴"]
+
+    @pytest.mark.asyncio
+    async def test_english_period_waits_for_next_character(self, monkeypatch):
+        """Test that an English period split across chunks still ends the sentence."""
+        _patch_introduction(monkeypatch, ["Plants use light.", " They make sugar", ".\nSecond part"])
+        paragraphs = [
+            p async for p in introduction_service.generate_introduction_paragraphs("x", language='en')
+        ]
+        assert paragraphs == ["Plants use light. They make sugar.", "Second part"]
+
+
+class TestTripleMerger:
+    """Test incremental triple deduplication."""
+
+    def test_drops_duplicate_pairs(self):
+        """Test that a pair linked twice (either direction, any case/spacing) is kept once."""
+        merger = TripleMerger()
+        assert len(merger.add([('Light', 'drives', 'Photosynthesis', 'L2-L1'), ('A', 'has', 'B', 'L1-L2')])) == 2
+        added = merger.add([
+            ('photosynthesis', 'needs', 'light', 'L1-L2'),
+            ('A ', 'includes', 'C', 'L1-L2'),
+            ('C', 'is', 'C', 'L2-L2'),
+        ])
+        assert added == [('A ', 'includes', 'C', 'L1-L2')]
+        assert len(merger.triples) == 3
+
+
+class TestFocusQuestionPipeline:
+    """Test extraction running while the introduction streams."""
+
+    @pytest.fixture
+    def extraction_calls(self, monkeypatch):
+        calls = []
+
+        async def fake_extract(intro_text, language='zh', model='qwen', stream=False):
+            calls.append(intro_text)
+            index = len(calls)
+            return {
+                'success': True,
+                'triples': [('光合作用', '包括', f'阶段{index}', 'L1-L2'), ('光合作用', '需要', '光', 'L1-L2')]
+            }
+
+        monkeypatch.setattr(triple_extraction_service, 'extract_triples', fake_extract)
+        return calls
+
+    @pytest.mark.asyncio
+    async def test_partial_maps_before_introduction_finishes(self, monkeypatch, extraction_calls):
+        """Test that the first partial map arrives before the last paragraph is written."""
+        _patch_introduction(monkeypatch, ["对于光合作用，可以从四个方面分析。第一段。\n", "第二段。\n", "第三段。"], delay=0.05)
+        agent = ConceptMapAgent(model='qwen')
+        events = [e async for e in agent.generate_from_focus_question_stream("光合作用", 'zh')]
+        kinds = [e['event'] for e in events]
+
+        assert kinds.index('partial') < max(i for i, kind in enumerate(kinds) if kind == 'introduction')
+        assert kinds[-1] == 'complete'
+        # Later paragraphs carry the opening sentence for layer context
+        assert extraction_calls[1] == "对于光合作用，可以从四个方面分析。第二段。"
+        complete = events[-1]
+        assert complete['success'] is True
+        assert complete['spec']['_introduction'].count('\n\n') == 2
+        assert [e['triple_count'] for e in events if e['event'] == 'partial'] == [2, 3, 4]
+
+    @pytest.mark.asyncio
+    async def test_non_streaming_makes_one_extraction_call(self, monkeypatch, extraction_calls):
+        """Test that generate_from_focus_question extracts triples from the whole introduction at once."""
+        intro = "对于光合作用，可以从四个方面分析。\n\n第二段。\n\n第三段。"
+
+        async def fake_intro(keyword, language='zh', model='qwen', stream=False):
+            return {'success': True, 'text': intro}
+
+        monkeypatch.setattr(introduction_service, 'generate_introduction', fake_intro)
+        result = await ConceptMapAgent(model='qwen').generate_from_focus_question("光合作用", 'zh')
+        assert result['success'] is True
+        assert result['diagram_type'] == 'concept_map'
+        assert extraction_calls == [intro]
+
+    @pytest.mark.asyncio
+    async def test_empty_introduction_is_an_error(self, monkeypatch, extraction_calls):
+        """Test that an empty introduction stream fails without calling extraction."""
+        _patch_introduction(monkeypatch, [""])
+        events = [e async for e in ConceptMapAgent(model='qwen').generate_from_focus_question_stream("光合作用", 'zh')]
+        assert events[-1]['success'] is False
+        assert 'introduction' in events[-1]['error']
+        assert extraction_calls == []
@@ -0,0 +1,79 @@
+"""
+Unit Tests for Async Learning Agent
+===================================
+
+@author lycosa9527
+@made_by MindSpring Team
+"""
+
+import pytest
+import asyncio
+from agents.learning.learning_agent import LearningAgent
+
+
+class FakeQwenLLM:
+    """Async LLM double that records how many calls overlap."""
+
+    def __init__(self, delay=0.05):
+        self.delay = delay
+        self.active = 0
+        self.max_active = 0
+        self.calls = 0
+
+    async def _acall(self, prompt, stop=None, **tracking):
+        self.calls += 1
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            await asyncio.sleep(self.delay)
+            if '正确性' in prompt:
+                return "正确性: 正确\n置信度: 0.9\n理由: 同义词"
+            return f"question {self.calls}"
+        finally:
+            self.active -= 1
+
+    def _call(self, prompt, stop=None):
+        raise AssertionError("sync _call must not be used from async code")
+
+
+SPEC = {'topic': 'Plants', 'attributes': ['water', 'sunlight', 'soil', 'air', 'seeds', 'leaves']}
+NODES = [f'attribute_{i}' for i in range(6)]
+
+
+class TestLearningAgent:
+    """Test suite for the async LearningAgent."""
+
+    @pytest.fixture
+    def agent(self):
+        agent = LearningAgent(language='en')
+        agent.llm = FakeQwenLLM()
+        return agent
+
+    @pytest.mark.asyncio
+    async def test_generate_questions_concurrent_and_bounded(self, agent):
+        """Test that questions fan out concurrently, capped at max_concurrency."""
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        questions = [q async for q in agent.generate_questions(NODES, 'bubble_map', SPEC, max_concurrency=3)]
+        elapsed = loop.time() - started
+
+        assert sorted(q['node_id'] for q in questions) == sorted(NODES)
+        assert agent.llm.max_active == 3
+        # 6 calls of 50ms with 3 in flight: about 2 rounds, not 6
+        assert elapsed < 0.25
+
+    @pytest.mark.asyncio
+    async def test_generate_questions_streams_as_ready(self, agent):
+        """Test that the first question arrives before the rest are generated."""
+        stream = agent.generate_questions(NODES, 'bubble_map', SPEC, max_concurrency=1)
+        first = await stream.__anext__()
+        assert first['node_id'] in NODES
+        assert agent.llm.calls < len(NODES)
+        await stream.aclose()
+
+    @pytest.mark.asyncio
+    async def test_validate_answer_async(self, agent):
+        """Test that semantic validation awaits the LLM."""
+        result = await agent.validate_answer("太阳", "阳光", "植物需要什么？", {}, language='zh')
+        assert result['correct'] is True
+        assert result['confidence'] == 0.9
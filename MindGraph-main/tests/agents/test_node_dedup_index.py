@@ -0,0 +1,78 @@
+"""
+Unit Tests for Node Palette Dedup Index
+=======================================
+
+@author lycosa9527
+@made_by MindSpring Team
+"""
+
+import random
+from difflib import SequenceMatcher
+from agents.thinking_modes.node_palette import CircleMapPaletteGenerator
+from agents.thinking_modes.node_palette.dedup_index import NodeDedupIndex
+
+_ALPHABET = "光合作用植物叶绿体能量的是在abcdefghij klmno"
+
+
+def _random_text(rng):
+    return ''.join(rng.choice(_ALPHABET) for _ in range(rng.randint(1, 24)))
+
+
+def _mutate(text, rng):
+    chars = list(text)
+    for _ in range(rng.randint(0, 3)):
+        position = rng.randrange(len(chars) + 1)
+        roll = rng.random()
+        if roll < 0.4:
+            chars.insert(position, rng.choice(_ALPHABET))
+        elif chars and roll < 0.7:
+            chars.pop(min(position, len(chars) - 1))
+        elif chars:
+            chars[min(position, len(chars) - 1)] = rng.choice(_ALPHABET)
+    return ''.join(chars)
+
+
+class TestNodeDedupIndex:
+    """Test that the index gives the same answers as a full SequenceMatcher scan."""
+
+    def test_matches_linear_scan(self):
+        """Test duplicate/unique decisions against ratio() > 0.85 over every seen text."""
+        rng = random.Random(3)
+        index = NodeDedupIndex(threshold=0.85)
+        seen = []
+        # Enough texts to cross several reindexes
+        for _ in range(1500):
+            text = _mutate(rng.choice(seen), rng) if seen and rng.random() < 0.6 else _random_text(rng)
+            expected = text in seen or any(SequenceMatcher(None, text, s).ratio() > 0.85 for s in seen)
+            match = index.find_similar(text)
+            assert (text in index or match is not None) == expected, text
+            if match:
+                assert SequenceMatcher(None, text, match[0]).ratio() == match[1] > 0.85
+            if not expected:
+                seen.append(text)
+                index.add(text)
+        assert len(index) == len(seen)
+
+    def test_short_texts(self):
+        """Test that texts too short for the bigram filter still match."""
+        index = NodeDedupIndex()
+        index.add("光合")
+        assert "光合" in index
+        assert index.find_similar("光合作") is None
+        index.add("光合作用植物")
+        assert index.find_similar("光合作用植物s")[0] == "光合作用植物"
+
+
+class TestDeduplicateNode:
+    """Test dedup against a session index in the palette generator."""
+
+    def test_exact_fuzzy_unique(self):
+        """Test the (is_unique, match_type, similarity) tuples."""
+        generator = CircleMapPaletteGenerator()
+        seen = NodeDedupIndex()
+        assert generator._deduplicate_node("Photosynthesis in plants", seen) == (True, 'unique', 0.0)
+        assert generator._deduplicate_node("photosynthesis, in plants!", seen) == (False, 'exact', 1.0)
+        is_unique, match_type, similarity = generator._deduplicate_node("Photosynthesis in plant", seen)
+        assert (is_unique, match_type) == (False, 'fuzzy') and similarity > 0.85
+        assert generator._deduplicate_node("Cellular respiration", seen)[0] is True
+        assert len(seen) == 2
@@ -0,0 +1,69 @@
+"""
+Unit Tests for Node Palette Session State
+=========================================
+
+@author lycosa9527
+@made_by MindSpring Team
+"""
+
+import pytest
+
+from agents.thinking_modes.node_palette.flow_map_palette import FlowMapPaletteGenerator
+from services.session_store import SessionStoreManager
+
+
+class FakeLLMService:
+    """Streams the given lines from every model."""
+
+    def __init__(self, lines):
+        self.lines = lines
+
+    async def stream_progressive(self, models, **kwargs):
+        for model in models:
+            for line in self.lines:
+                yield {'event': 'token', 'llm': model, 'token': f"{line}\n"}
+            yield {'event': 'complete', 'llm': model}
+
+
+@pytest.fixture
+def sessions(tmp_path):
+    """A sqlite store shared by every generator, as across workers."""
+    manager = SessionStoreManager()
+    manager.configure(backend='sqlite', ttl_seconds=3600, max_entries=100, max_mb=10,
+                      db_path=tmp_path / "sessions.db")
+    yield manager.store('node_palette:FlowMapPaletteGenerator')
+    manager.close()
+
+
+def _worker(sessions, lines):
+    generator = FlowMapPaletteGenerator()
+    generator.sessions = sessions
+    generator.llm_models = ['qwen']
+    generator.llm_service = FakeLLMService(lines)
+    return generator
+
+
+async def _steps(generator, **kwargs):
+    return [
+        event['node'] async for event in generator.generate_batch('s1', 'Making tea', **kwargs)
+        if event['event'] == 'node_generated'
+    ]
+
+
+class TestPaletteSessionState:
+    """Test that stage and step sequence live in the shared session."""
+
+    async def test_stage_and_sequence_shared_across_workers(self, sessions):
+        first = await _steps(_worker(sessions, ["Boil water", "Warm the pot"]),
+                             stage='steps', stage_data={'dimension': 'Order'})
+        second = await _steps(_worker(sessions, ["Add tea leaves", "Pour water"]), stage='steps')
+
+        assert [node['sequence'] for node in first + second] == [1, 2, 3, 4]
+        stage_info = sessions['s1']['stage_info']
+        assert stage_info == {'stage': 'steps', 'dimension': 'Order'}
+
+    async def test_end_session_drops_state(self, sessions):
+        generator = _worker(sessions, ["Boil water"])
+        await _steps(generator, stage='steps')
+        generator.end_session('s1')
+        assert 's1' not in sessions
@@ -0,0 +1,119 @@
+"""
+Unit Tests for Speculative Prompt-Based Generation
+==================================================
+
+@author lycosa9527
+@made_by MindSpring Team
+"""
+
+import asyncio
+import pytest
+import sys
+from agents.main_agent import agent_graph_workflow_with_styles
+from config.settings import config
+from services.token_tracker import TokenTracker
+
+main_agent_module = sys.modules['agents.main_agent']
+
+
+@pytest.fixture
+async def tracker(monkeypatch):
+    tracker = TokenTracker()
+    tracker._initialized = True  # No background DB writer in unit tests
+    monkeypatch.setattr('services.token_tracker.get_token_tracker', lambda: tracker)
+    return tracker
+
+
+def _patch_detection(monkeypatch, result, delay=0.05):
+    async def fake_detect(*args, **kwargs):
+        await asyncio.sleep(delay)
+        return result
+
+    monkeypatch.setattr(main_agent_module, '_detect_diagram_type_from_prompt', fake_detect)
+
+
+class TestSpeculativeGeneration:
+    """Test topic extraction started alongside diagram type detection."""
+
+    @pytest.mark.asyncio
+    async def test_topic_overlaps_detection(self, monkeypatch, tracker):
+        """Test that the topic is extracted while detection runs and counted as a hit."""
+        _patch_detection(monkeypatch, {'diagram_type': 'flow_map', 'clarity': 'clear', 'has_topic': True})
+        started = []
+
+        async def fake_topic(*args, session_id=None, **kwargs):
+            started.append(session_id)
+            await tracker.track_usage('qwen', 30, 5, session_id=session_id)
+            return 'Coffee'
+
+        monkeypatch.setattr(main_agent_module, '_extract_topic_from_prompt', fake_topic)
+        result = await agent_graph_workflow_with_styles("steps to make coffee", language='en')
+
+        assert result['success'] is True
+        assert result['extracted_topic'] == 'Coffee'
+        assert result['diagram_type'] == 'flow_map'
+        assert started[0].startswith('spec_')
+        stats = tracker.get_speculation_stats()
+        assert stats['hits'] == 1 and stats['misses'] == 0
+        assert stats['tokens_used'] == 35 and stats['in_flight'] == 0
+
+    @pytest.mark.asyncio
+    async def test_rejected_prompt_cancels_topic(self, monkeypatch, tracker):
+        """Test that a prompt rejected by detection cancels the speculative topic extraction."""
+        _patch_detection(monkeypatch, {'diagram_type': 'mind_map', 'clarity': 'very_unclear', 'has_topic': False})
+        cancelled = asyncio.Event()
+
+        async def fake_topic(*args, **kwargs):
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        monkeypatch.setattr(main_agent_module, '_extract_topic_from_prompt', fake_topic)
+        result = await agent_graph_workflow_with_styles("???", language='en')
+        await asyncio.sleep(0)
+
+        assert result['show_guidance'] is True
+        assert cancelled.is_set()
+        stats = tracker.get_speculation_stats()
+        assert stats['misses'] == 1 and stats['cancelled'] == 1 and stats['hit_rate'] == 0.0
+
+    @pytest.mark.asyncio
+    async def test_finished_discarded_topic_counts_wasted_tokens(self, monkeypatch, tracker):
+        """Test that tokens of a speculative call that finished before rejection are reported as wasted."""
+        _patch_detection(monkeypatch, {'diagram_type': 'mind_map', 'clarity': 'very_unclear', 'has_topic': False})
+
+        async def fake_topic(*args, session_id=None, **kwargs):
+            await tracker.track_usage('qwen', 40, 8, session_id=session_id)
+            return 'Topic'
+
+        monkeypatch.setattr(main_agent_module, '_extract_topic_from_prompt', fake_topic)
+        await agent_graph_workflow_with_styles("???", language='en')
+
+        stats = tracker.get_speculation_stats()
+        assert stats['misses'] == 1 and stats['cancelled'] == 0
+        assert stats['tokens_wasted'] == 48
+
+    @pytest.mark.asyncio
+    async def test_disabled_runs_sequentially(self, monkeypatch, tracker):
+        """Test that SPECULATIVE_GENERATION_ENABLED=false extracts the topic after detection."""
+        monkeypatch.setattr(type(config), 'SPECULATIVE_GENERATION_ENABLED', property(lambda self: False))
+        order = []
+
+        async def fake_detect(*args, **kwargs):
+            order.append('detect')
+            return {'diagram_type': 'tree_map', 'clarity': 'clear', 'has_topic': True}
+
+        async def fake_topic(*args, session_id=None, **kwargs):
+            order.append('topic')
+            assert session_id is None
+            return 'Animals'
+
+        monkeypatch.setattr(main_agent_module, '_detect_diagram_type_from_prompt', fake_detect)
+        monkeypatch.setattr(main_agent_module, '_extract_topic_from_prompt', fake_topic)
+        result = await agent_graph_workflow_with_styles("classify animals", language='en')
+
+        assert result['extracted_topic'] == 'Animals'
+        assert order == ['detect', 'topic']
+        assert tracker.get_speculation_stats()['started'] == 0
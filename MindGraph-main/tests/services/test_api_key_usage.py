@@ -0,0 +1,130 @@
+"""
+Unit Tests for API Key Usage Accounting
+=======================================
+
+@author lycosa9527
+@made_by MindSpring Team
+"""
+
+import threading
+import pytest
+from types import SimpleNamespace
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+import config.database
+from models.auth import Base, APIKey
+from services.api_key_usage import APIKeyUsageTracker
+from services.principal_cache import snapshot
+
+
+@pytest.fixture
+def db(monkeypatch, tmp_path):
+    """File database shared by every tracker (one tracker per simulated worker)."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'keys.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine)
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    monkeypatch.setattr(config.database, 'SessionLocal', session_factory)
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    trackers = []
+
+    def make_tracker():
+        tracker = APIKeyUsageTracker()
+        trackers.append(tracker)
+        return tracker
+
+    def add_key(quota_limit):
+        session = session_factory()
+        record = APIKey(key=f"mg_{quota_limit}", name="Dify", quota_limit=quota_limit, usage_count=0, is_active=True)
+        session.add(record)
+        session.commit()
+        key_record = snapshot(record)
+        session.close()
+        return key_record
+
+    def usage(key_id):
+        session = session_factory()
+        try:
+            record = session.get(APIKey, key_id)
+            return record.usage_count, record.last_used_at
+        finally:
+            session.close()
+
+    yield SimpleNamespace(make_tracker=make_tracker, add_key=add_key, usage=usage, statements=statements)
+    for tracker in trackers:
+        tracker.shutdown()
+    engine.dispose()
+
+
+def _request(tracker, key_record):
+    if tracker.reserve(key_record):
+        tracker.settle(key_record)
+        return True
+    return False
+
+
+class TestAPIKeyUsageTracker:
+    """Test reserve-then-settle quota accounting and batched writes."""
+
+    def test_unlimited_key_writes_in_batches(self, db):
+        """Test that usage of an unlimited key is only written on flush."""
+        tracker = db.make_tracker()
+        key_record = db.add_key(None)
+        db.statements.clear()
+        for _ in range(100):
+            assert _request(tracker, key_record)
+        assert db.statements == []
+        assert db.usage(key_record['id'])[0] == 0
+        assert tracker.flush() == 1
+        usage_count, last_used_at = db.usage(key_record['id'])
+        assert usage_count == 100 and last_used_at is not None
+
+    def test_quota_exact_under_concurrency(self, db):
+        """Test that concurrent requests in one worker admit exactly the quota."""
+        tracker = db.make_tracker()
+        key_record = db.add_key(200)
+        admitted = []
+
+        def client():
+            admitted.append(sum(_request(tracker, key_record) for _ in range(50)))
+
+        threads = [threading.Thread(target=client) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert sum(admitted) == 200
+        tracker.flush()
+        assert db.usage(key_record['id'])[0] == 200
+
+    def test_quota_never_exceeded_across_workers(self, db):
+        """Test that leases from two workers never pass the quota, and unused leases are returned."""
+        worker_a, worker_b = db.make_tracker(), db.make_tracker()
+        key_record = db.add_key(100)
+        admitted = sum(_request(worker, key_record) for _ in range(30) for worker in (worker_a, worker_b))
+        assert admitted == 60
+        # Leased blocks are counted until returned
+        assert db.usage(key_record['id'])[0] >= 60
+        worker_a.flush()
+        worker_b.flush()
+        assert db.usage(key_record['id'])[0] == 60
+        admitted += sum(_request(worker, key_record) for _ in range(40) for worker in (worker_a, worker_b))
+        worker_a.flush()
+        worker_b.flush()
+        admitted += sum(_request(worker, key_record) for _ in range(10) for worker in (worker_a, worker_b))
+        assert admitted == 100
+        assert worker_a.rejections + worker_b.rejections > 0
+        worker_a.flush()
+        worker_b.flush()
+        assert db.usage(key_record['id'])[0] == 100
+
+    def test_leases_amortize_writes(self, db):
+        """Test that a key far from its quota takes one write per leased block, not per request."""
+        tracker = db.make_tracker()
+        key_record = db.add_key(100000)
+        db.statements.clear()
+        for _ in range(200):
+            assert _request(tracker, key_record)
+        updates = [s for s in db.statements if s.lstrip().upper().startswith("UPDATE")]
+        assert len(updates) == 200 // tracker.MAX_LEASE
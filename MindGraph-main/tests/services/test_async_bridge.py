@@ -0,0 +1,83 @@
+"""
+Unit Tests for Async Bridge
+===========================
+
+@author lycosa9527
+@made_by MindSpring Team
+"""
+
+import pytest
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from services.async_bridge import AsyncBridge
+
+
+async def loop_and_thread():
+    await asyncio.sleep(0)
+    return asyncio.get_running_loop(), threading.get_ident()
+
+
+class TestAsyncBridge:
+    """Test suite for AsyncBridge."""
+
+    @pytest.fixture
+    def bridge(self):
+        bridge = AsyncBridge()
+        yield bridge
+        bridge.shutdown()
+
+    def test_background_loop_reused(self, bridge):
+        """Test that sync calls without a main loop share one background loop thread."""
+        first_loop, first_thread = bridge.run(loop_and_thread())
+        second_loop, second_thread = bridge.run(loop_and_thread())
+        assert first_loop is second_loop
+        assert first_thread == second_thread != threading.get_ident()
+        assert bridge.get_stats()['background_calls'] == 2
+
+    @pytest.mark.asyncio
+    async def test_worker_threads_use_main_loop(self, bridge):
+        """Test that calls from worker threads run on the registered main loop."""
+        main = asyncio.get_running_loop()
+        bridge.set_main_loop(main)
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            futures = [executor.submit(bridge.run, loop_and_thread(), 5.0) for _ in range(4)]
+            results = await asyncio.gather(*[asyncio.wrap_future(f) for f in futures])
+
+        assert all(loop is main for loop, _ in results)
+        assert bridge.get_stats()['main_loop_calls'] == 4
+
+    @pytest.mark.asyncio
+    async def test_call_from_main_loop_thread_does_not_deadlock(self, bridge):
+        """Test that sync code running on the main loop is sent to the background loop."""
+        main = asyncio.get_running_loop()
+        bridge.set_main_loop(main)
+
+        loop, _ = bridge.run(loop_and_thread(), timeout=5.0)
+        assert loop is not main
+        assert bridge.get_stats()['background_calls'] == 1
+
+    def test_timeout_cancels(self, bridge):
+        """Test that a slow coroutine times out and is cancelled."""
+        cancelled = threading.Event()
+
+        async def slow():
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        with pytest.raises(TimeoutError):
+            bridge.run(slow(), timeout=0.05)
+        assert cancelled.wait(1.0)
+        assert bridge.get_stats()['timeouts'] == 1
+
+    def test_exception_propagates(self, bridge):
+        """Test that the coroutine's exception reaches the sync caller."""
+        async def broken():
+            raise ValueError("bad")
+
+        with pytest.raises(ValueError):
+            bridge.run(broken())
@@ -0,0 +1,170 @@
+"""
+Unit Tests for Browser Pool
+============================
+
+@author lycosa9527
+@made_by MindSpring Team
+"""
+
+import pytest
+import asyncio
+from services.browser import BrowserPool, BrowserPoolBusyError, _PooledBrowser
+
+
+class FakeBrowser:
+    """Stand-in for a Playwright Browser."""
+
+    def __init__(self):
+        self.connected = True
+        self.closed = False
+
+    def is_connected(self):
+        return self.connected
+
+    async def close(self):
+        self.closed = True
+        self.connected = False
+
+
+class FakeBrowserPool(BrowserPool):
+    """Pool that hands out fake browsers instead of launching Chromium."""
+
+    async def _launch(self):
+        self._total_launches += 1
+        return _PooledBrowser(FakeBrowser(), root_pids=[])
+
+
+class TestBrowserPool:
+    """Test suite for BrowserPool."""
+
+    @pytest.mark.asyncio
+    async def test_reuses_warm_browser(self):
+        """Test that sequential leases reuse the same browser."""
+        pool = FakeBrowserPool(size=1, max_renders=10)
+        await pool.start(prewarm=1)
+
+        first = await pool.acquire()
+        await pool.release(first, 0.1)
+        second = await pool.acquire()
+        await pool.release(second, 0.1)
+
+        assert first is second
+        stats = pool.get_stats()
+        assert stats['total_launches'] == 1
+        assert stats['total_leases'] == 2
+        assert stats['idle'] == 1
+
+    @pytest.mark.asyncio
+    async def test_recycles_after_max_renders(self):
+        """Test that a browser is closed after max_renders renders."""
+        pool = FakeBrowserPool(size=1, max_renders=2)
+
+        for _ in range(2):
+            pooled = await pool.acquire()
+            await pool.release(pooled, 0.1)
+
+        assert pooled.browser.closed
+        assert pool.get_stats()['recycles']['max_renders'] == 1
+        assert pool.get_stats()['idle'] == 0
+
+    @pytest.mark.asyncio
+    async def test_unhealthy_browser_replaced(self):
+        """Test that a disconnected idle browser is replaced on checkout."""
+        pool = FakeBrowserPool(size=1)
+        await pool.start(prewarm=1)
+        pool._idle[0].browser.connected = False
+
+        pooled = await pool.acquire()
+        assert pooled.browser.connected
+        assert pool.get_stats()['recycles']['unhealthy'] == 1
+        await pool.release(pooled, 0.1)
+
+    @pytest.mark.asyncio
+    async def test_bounded_queue_rejects(self):
+        """Test that waiters beyond max_queue are rejected."""
+        pool = FakeBrowserPool(size=1, max_queue=1, acquire_timeout=5)
+        held = await pool.acquire()
+
+        waiter = asyncio.create_task(pool.acquire())
+        await asyncio.sleep(0)
+
+        with pytest.raises(BrowserPoolBusyError):
+            await pool.acquire()
+
+        await pool.release(held, 0.1)
+        pooled = await waiter
+        await pool.release(pooled, 0.1)
+        assert pool.get_stats()['total_rejected'] == 1
+
+    @pytest.mark.asyncio
+    async def test_acquire_timeout(self):
+        """Test that waiting longer than acquire_timeout raises."""
+        pool = FakeBrowserPool(size=1, acquire_timeout=0.05)
+        held = await pool.acquire()
+
+        with pytest.raises(BrowserPoolBusyError):
+            await pool.acquire()
+
+        await pool.release(held, 0.1)
+        assert pool.get_stats()['in_use'] == 0
+
+
+class TestChromiumResolution:
+    """Test suite for the persistent Chromium resolution cache."""
+
+    @pytest.fixture
+    def two_browsers(self, tmp_path, monkeypatch):
+        """Two fake Chromium binaries and a counting version prober."""
+        import services.browser as browser_module
+
+        local_bin = tmp_path / "local-chrome"
+        managed_bin = tmp_path / "ms-playwright-chrome"
+        local_bin.write_text("local")
+        managed_bin.write_text("managed")
+        probes = []
+
+        def fake_version(path):
+            probes.append(path)
+            return "140.0.0.1" if path == str(local_bin) else "141.0.0.1"
+
+        monkeypatch.setattr(browser_module, '_CHROMIUM_CACHE_FILE', tmp_path / "chromium_cache.json")
+        monkeypatch.setattr(browser_module, '_get_local_chromium_executable', lambda: str(local_bin))
+        monkeypatch.setattr(browser_module, '_get_playwright_chromium_executable', lambda: str(managed_bin))
+        monkeypatch.setattr(browser_module, '_get_chromium_version', fake_version)
+        monkeypatch.setattr(browser_module, '_resolved', False)
+        monkeypatch.setattr(browser_module, '_resolved_executable', None)
+        monkeypatch.setattr(browser_module, '_resolution_stats', dict(browser_module._resolution_stats))
+        return browser_module, local_bin, managed_bin, probes
+
+    def test_resolves_once_per_process(self, two_browsers):
+        """Test that lookups after startup never probe again."""
+        browser_module, _, managed_bin, probes = two_browsers
+
+        assert browser_module.resolve_chromium_executable() == str(managed_bin)
+        assert len(probes) == 2
+
+        for _ in range(5):
+            assert browser_module._get_best_chromium_executable() == str(managed_bin)
+        assert len(probes) == 2
+
+    def test_disk_cache_skips_probes(self, two_browsers):
+        """Test that a new process reuses persisted versions for unchanged binaries."""
+        browser_module, _, managed_bin, probes = two_browsers
+
+        browser_module.resolve_chromium_executable()
+        browser_module.resolve_chromium_executable(force=True)
+
+        assert len(probes) == 2
+        assert browser_module.get_chromium_resolution_stats()['source'] == 'disk_cache'
+
+    def test_changed_binary_is_reprobed(self, two_browsers):
+        """Test that a binary with a new mtime is probed again."""
+        import os
+        browser_module, local_bin, _, probes = two_browsers
+
+        browser_module.resolve_chromium_executable()
+        st = os.stat(local_bin)
+        os.utime(local_bin, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+        browser_module.resolve_chromium_executable(force=True)
+
+        assert probes.count(str(local_bin)) == 2
@@ -8,12 +8,22 @@ Unit Tests for Error Handler
 
 import pytest
 import asyncio
+import sys
 from services.error_handler import (
     error_handler,
+    parse_retry_after,
     LLMServiceError,
     LLMTimeoutError,
-    LLMValidationError
+    LLMValidationError,
+    LLMRateLimitError
 )
+from services.dashscope_error_parser import parse_and_raise_dashscope_error
+from services.llm_response_cache import LLMResponseCache
+from services.llm_service import LLMService
+from services.rate_limiter import LLMRateLimiter
+
+# services/__init__ re-exports the llm_service instance under the module's name
+llm_service_module = sys.modules['services.llm_service']
 
 
 class TestErrorHandler:
@@ -115,5 +125,105 @@ class TestErrorHandler:
                 "Failure!",
                 validator=custom_validator
             )
+    
+    def test_parse_retry_after(self):
+        """Test Retry-After parsing (seconds, milliseconds, missing, garbage)."""
+        assert parse_retry_after({'Retry-After': '3'}) == 3.0
+        assert parse_retry_after({'retry-after-ms': '250'}) == 0.25
+        assert parse_retry_after({}) is None
+        assert parse_retry_after(None) is None
+        assert parse_retry_after({'Retry-After': 'soon'}) is None
+    
+    def test_parser_attaches_retry_after(self):
+        """Test that a parsed 429 carries the provider's backoff hint."""
+        with pytest.raises(LLMRateLimitError) as exc_info:
+            parse_and_raise_dashscope_error(
+                429, '{"error": {"message": "Rate limit exceeded"}}',
+                {'error': {'message': 'Rate limit exceeded'}},
+                headers={'Retry-After': '2'}
+            )
+        assert exc_info.value.retry_after == 2.0
+    
+    @pytest.mark.asyncio
+    async def test_with_retry_honors_retry_after(self):
+        """Test that a Retry-After hint replaces the default 5s rate-limit backoff."""
+        call_count = 0
+        
+        async def limited_once():
+            nonlocal call_count
+            call_count += 1
+            if call_count == 1:
+                raise LLMRateLimitError("429", retry_after=0.05)
+            return "Success"
+        
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        assert await error_handler.with_retry(limited_once, max_retries=2) == "Success"
+        assert loop.time() - started < 1.0
+    
+    @pytest.mark.asyncio
+    async def test_with_retry_shared_budget(self):
+        """Test that attempts and backoff share one time budget."""
+        call_count = 0
+        
+        async def slow_then_limited():
+            nonlocal call_count
+            call_count += 1
+            raise LLMRateLimitError("429", retry_after=5.0)
+        
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        with pytest.raises(LLMServiceError) as exc_info:
+            await error_handler.with_retry(slow_then_limited, max_retries=3, timeout=1.0)
+        # The 5s hint does not fit in the 1s budget: give up instead of sleeping
+        assert call_count == 1
+        assert loop.time() - started < 0.5
+        assert isinstance(exc_info.value.__cause__, LLMRateLimitError)
+        
+        async def hang():
+            await asyncio.sleep(10)
+        
+        with pytest.raises(LLMServiceError) as exc_info:
+            await error_handler.with_retry(hang, max_retries=3, timeout=0.2)
+        assert isinstance(exc_info.value.__cause__, LLMTimeoutError)
 
 
+class FlakyClient:
+    """Rate-limited on its first call, then answers."""
+    
+    def __init__(self):
+        self.calls = 0
+    
+    async def chat_completion(self, messages, temperature=None, max_tokens=1000, **kwargs):
+        self.calls += 1
+        if self.calls == 1:
+            raise LLMRateLimitError("429", retry_after=0.3)
+        return {'content': 'ok', 'usage': {}}
+
+
+class FakeTokenTracker:
+    async def track_usage(self, **kwargs):
+        return True
+
+
+class TestRetryOutsideRateLimiter:
+    """Test that LLMService retries do not hold a rate limiter slot."""
+    
+    @pytest.mark.asyncio
+    async def test_slot_released_during_backoff(self, monkeypatch):
+        """Test that another request runs while the first one is backing off."""
+        service = LLMService()
+        service.response_cache = LLMResponseCache(enabled=False)
+        service.singleflight.enabled = False
+        service.rate_limiter = LLMRateLimiter(qpm_limit=1000, concurrent_limit=1)
+        flaky = FlakyClient()
+        monkeypatch.setattr(service.client_manager, 'get_client', lambda model: flaky)
+        monkeypatch.setattr(llm_service_module, 'get_token_tracker', lambda: FakeTokenTracker())
+        
+        backing_off = asyncio.create_task(service.chat("first", model='qwen'))
+        await asyncio.sleep(0.05)
+        # The single slot is free while the first request sleeps on Retry-After
+        second = await asyncio.wait_for(service.chat("second", model='qwen'), timeout=0.2)
+        assert second == 'ok'
+        assert await backing_off == 'ok'
+        assert flaky.calls == 3
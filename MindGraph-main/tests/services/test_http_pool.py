@@ -0,0 +1,99 @@
+"""
+Unit Tests for Pooled LLM HTTP Sessions
+=======================================
+
+@author lycosa9527
+@made_by MindSpring Team
+"""
+
+import pytest
+import asyncio
+from aiohttp import web
+from clients.http_pool import HTTPSessionPool
+
+
+@pytest.fixture
+async def echo_server():
+    """Local HTTP server standing in for a provider endpoint."""
+    async def handle(request):
+        return web.json_response({'ok': True})
+
+    app = web.Application()
+    app.router.add_post('/chat', handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    yield f"http://127.0.0.1:{port}/chat"
+    await runner.cleanup()
+
+
+class TestHTTPSessionPool:
+    """Test suite for HTTPSessionPool."""
+
+    @pytest.mark.asyncio
+    async def test_session_shared_per_provider(self):
+        """Test that one provider gets one session and others get their own."""
+        pool = HTTPSessionPool()
+        first = pool.get_session('dashscope')
+        assert pool.get_session('dashscope') is first
+        assert pool.get_session('other') is not first
+        assert pool.get_stats()['providers']['dashscope']['sessions_created'] == 1
+        await pool.close()
+        assert first.closed
+
+    @pytest.mark.asyncio
+    async def test_connections_reused(self, echo_server):
+        """Test that sequential requests reuse one keep-alive connection."""
+        pool = HTTPSessionPool()
+        for _ in range(5):
+            session = pool.get_session('dashscope')
+            async with session.post(echo_server, json={}) as response:
+                assert (await response.json())['ok']
+
+        stats = pool.get_stats()['providers']['dashscope']
+        assert stats['requests'] == 5
+        assert stats['connections_created'] == 1
+        assert stats['connections_reused'] == 4
+        assert stats['reuse_rate_percent'] == 80.0
+        await pool.close()
+
+    @pytest.mark.asyncio
+    async def test_per_host_limit(self, echo_server):
+        """Test that concurrent requests never open more than limit_per_host connections."""
+        pool = HTTPSessionPool(limit_per_host=2)
+
+        async def call():
+            session = pool.get_session('dashscope')
+            async with session.post(echo_server, json={}) as response:
+                await response.read()
+
+        await asyncio.gather(*[call() for _ in range(10)])
+        stats = pool.get_stats()['providers']['dashscope']
+        assert stats['connections_created'] <= 2
+        assert stats['requests'] == 10
+        await pool.close()
+
+    @pytest.mark.asyncio
+    async def test_recreated_after_close(self):
+        """Test that a closed pool hands out a fresh session on next use."""
+        pool = HTTPSessionPool()
+        first = pool.get_session('dashscope')
+        await pool.close()
+        second = pool.get_session('dashscope')
+        assert second is not first and not second.closed
+        assert pool.get_stats()['providers']['dashscope']['open_sessions'] == 1
+        await pool.close()
+
+    def test_close_all_without_loop(self):
+        """Test that sync cleanup drops sessions left by a finished loop."""
+        pool = HTTPSessionPool()
+
+        async def use():
+            return pool.get_session('dashscope')
+
+        session = asyncio.run(use())
+        pool.close_all()
+        assert pool.get_stats()['providers']['dashscope']['open_sessions'] == 0
+        assert session.closed
@@ -0,0 +1,149 @@
+"""
+Unit Tests for LLM Response Cache
+=================================
+
+@author lycosa9527
+@made_by MindSpring Team
+"""
+
+import pytest
+import sys
+import time
+from services.llm_response_cache import LLMResponseCache, SQLiteResponseCacheStore, make_cache_key
+from services.llm_service import LLMService
+
+# services/__init__ re-exports the llm_service instance under the module's name
+llm_service_module = sys.modules['services.llm_service']
+
+
+class FakeClient:
+    """Counts provider calls and returns a fixed response."""
+
+    def __init__(self):
+        self.calls = 0
+
+    async def chat_completion(self, messages, temperature=None, max_tokens=1000, **kwargs):
+        self.calls += 1
+        return {'content': f"answer {self.calls}", 'usage': {'prompt_tokens': 10, 'completion_tokens': 5, 'total_tokens': 15}}
+
+
+class FakeTokenTracker:
+    def __init__(self):
+        self.records = []
+
+    async def track_usage(self, **kwargs):
+        self.records.append(kwargs)
+        return True
+
+
+class TestLLMResponseCache:
+    """Test suite for LLMResponseCache."""
+
+    def test_key_covers_request_fields(self):
+        """Test that every field that shapes the response changes the key."""
+        base = make_cache_key('qwen', 'topic', 'sys', 0.3, 1000)
+        assert base == make_cache_key('qwen', 'topic', 'sys', 0.3, 1000)
+        assert base != make_cache_key('deepseek', 'topic', 'sys', 0.3, 1000)
+        assert base != make_cache_key('qwen', 'other', 'sys', 0.3, 1000)
+        assert base != make_cache_key('qwen', 'topic', None, 0.3, 1000)
+        assert base != make_cache_key('qwen', 'topic', 'sys', 0.1, 1000)
+        assert base != make_cache_key('qwen', 'topic', 'sys', 0.3, 2000)
+
+    def test_temperature_bypass(self):
+        """Test that high or unspecified temperatures bypass the cache."""
+        cache = LLMResponseCache(enabled=True, max_temperature=0.5)
+        assert cache.is_cacheable(0.3)
+        assert cache.is_cacheable(0.5)
+        assert not cache.is_cacheable(0.7)
+        assert not cache.is_cacheable(None)
+        assert cache.get_stats()['bypassed'] == 2
+        assert not LLMResponseCache(enabled=False).is_cacheable(0.1)
+
+    @pytest.mark.asyncio
+    async def test_ttl_expiry(self):
+        """Test that entries expire after the TTL."""
+        cache = LLMResponseCache(enabled=True, ttl_seconds=0.05)
+        await cache.put('k', 'hello', {'total_tokens': 3})
+        assert (await cache.get('k'))['content'] == 'hello'
+        time.sleep(0.06)
+        assert await cache.get('k') is None
+
+    @pytest.mark.asyncio
+    async def test_lru_bound(self):
+        """Test that the memory tier evicts the least recently used entry."""
+        cache = LLMResponseCache(enabled=True, max_entries=2)
+        await cache.put('a', '1')
+        await cache.put('b', '2')
+        await cache.get('a')
+        await cache.put('c', '3')
+        assert await cache.get('b') is None
+        assert await cache.get('a') is not None
+        assert cache.get_stats()['evictions'] == 1
+
+    @pytest.mark.asyncio
+    async def test_shared_tier_across_workers(self, tmp_path):
+        """Test that a response stored by one worker is served to another."""
+        db_path = tmp_path / "cache.db"
+        first = LLMResponseCache(enabled=True, store=SQLiteResponseCacheStore(db_path))
+        second = LLMResponseCache(enabled=True, store=SQLiteResponseCacheStore(db_path))
+
+        await first.put('k', 'shared answer', {'total_tokens': 15})
+        hit = await second.get('k')
+        assert hit == {'content': 'shared answer', 'usage': {'total_tokens': 15}}
+        stats = second.get_stats()
+        assert stats['shared_hits'] == 1 and stats['tokens_saved'] == 15
+
+        # Promoted to memory: next hit does not touch SQLite
+        await second.get('k')
+        assert second.get_stats()['memory_hits'] == 1
+        first.close()
+        second.close()
+
+    @pytest.mark.asyncio
+    async def test_shared_tier_failure_falls_through(self, tmp_path):
+        """Test that a broken shared tier counts as a miss, not an error."""
+        store = SQLiteResponseCacheStore(tmp_path / "cache.db")
+        cache = LLMResponseCache(enabled=True, store=store)
+        store.close()
+        assert await cache.get('k') is None
+        await cache.put('k', 'v')
+        assert cache.get_stats()['store_errors'] == 2
+
+
+class TestLLMServiceResponseCache:
+    """Test the cache layer in LLMService.chat."""
+
+    @pytest.fixture
+    def service(self, monkeypatch):
+        service = LLMService()
+        service.response_cache = LLMResponseCache(enabled=True, max_temperature=0.5)
+        client = FakeClient()
+        tracker = FakeTokenTracker()
+        monkeypatch.setattr(service.client_manager, 'get_client', lambda model: client)
+        monkeypatch.setattr(llm_service_module, 'get_token_tracker', lambda: tracker)
+        return service, client, tracker
+
+    @pytest.mark.asyncio
+    async def test_identical_request_served_from_cache(self, service):
+        """Test that the second identical request skips the provider and costs nothing."""
+        service, client, tracker = service
+        first = await service.chat("topic", model='qwen', temperature=0.3, user_id=7)
+        second = await service.chat("topic", model='qwen', temperature=0.3, user_id=7)
+
+        assert first == second == "answer 1"
+        assert client.calls == 1
+        assert tracker.records[0]['input_tokens'] == 10
+        assert tracker.records[1]['cache_hit'] is True
+        assert tracker.records[1]['input_tokens'] == 0 and tracker.records[1]['output_tokens'] == 0
+        assert tracker.records[1]['user_id'] == 7
+
+    @pytest.mark.asyncio
+    async def test_creative_and_opted_out_requests_not_cached(self, service):
+        """Test that high temperature and use_cache=False always reach the provider."""
+        service, client, tracker = service
+        await service.chat("topic", model='qwen', temperature=0.9)
+        await service.chat("topic", model='qwen', temperature=0.9)
+        await service.chat("topic", model='qwen', temperature=0.3, use_cache=False)
+        await service.chat("topic", model='qwen', temperature=0.3, use_cache=False)
+        assert client.calls == 4
+        assert not any(r.get('cache_hit') for r in tracker.records)
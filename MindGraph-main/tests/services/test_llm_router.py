@@ -0,0 +1,176 @@
+"""
+Unit Tests for Latency-Aware Model Routing
+==========================================
+
+@author lycosa9527
+@made_by MindSpring Team
+"""
+
+import pytest
+import sys
+from services.llm_router import ModelRouter, is_failover_error, parse_routes, parse_route_slos
+from services.llm_response_cache import LLMResponseCache
+from services.llm_service import LLMService
+from services.performance_tracker import PerformanceTracker
+from services.error_handler import (
+    LLMServiceError,
+    LLMContentFilterError,
+    LLMProviderError,
+    LLMTimeoutError
+)
+
+# services/__init__ re-exports the llm_service instance under the module's name
+llm_service_module = sys.modules['services.llm_service']
+
+
+class ModelClient:
+    """Provider double for one model; fails the first `failures` calls."""
+
+    def __init__(self, name, failures=0, error=None, tokens=('a', 'b')):
+        self.name = name
+        self.failures = failures
+        self.error = error or LLMProviderError("upstream 503", provider=name)
+        self.tokens = tokens
+        self.calls = 0
+
+    async def chat_completion(self, messages, temperature=None, max_tokens=1000, **kwargs):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise self.error
+        return {'content': f"from {self.name}", 'usage': {'prompt_tokens': 1, 'completion_tokens': 1, 'total_tokens': 2}}
+
+    async def async_stream_chat_completion(self, messages, temperature=None, max_tokens=1000, **kwargs):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise self.error
+        for token in self.tokens:
+            yield {'type': 'token', 'content': token}
+
+
+class FakeTokenTracker:
+    async def track_usage(self, **kwargs):
+        return True
+
+
+def record(tracker, model, duration, count=10):
+    for _ in range(count):
+        tracker.record_request(model=model, duration=duration, success=True)
+
+
+class TestModelRouter:
+    """Test suite for ModelRouter ordering."""
+
+    def test_parse_routes_and_slos(self):
+        """Test the LLM_ROUTES / LLM_ROUTE_SLOS formats."""
+        routes = parse_routes("generation=qwen, deepseek,kimi; classification=qwen-turbo;broken")
+        assert routes == {'generation': ['qwen', 'deepseek', 'kimi'], 'classification': ['qwen-turbo']}
+        assert parse_route_slos("generation=10,classification=2.5,bad=x") == {
+            'generation': 10.0, 'classification': 2.5
+        }
+
+    def test_order_by_slo_then_latency(self):
+        """Test SLO-meeting models first by p50, then unknown, then SLO violators."""
+        tracker = PerformanceTracker()
+        record(tracker, 'qwen', 12.0)
+        record(tracker, 'deepseek', 4.0)
+        record(tracker, 'kimi', 2.0)
+        router = ModelRouter(tracker, routes={'gen': ['qwen', 'doubao', 'deepseek', 'kimi']}, slos={'gen': 8.0})
+
+        name, models = router.resolve('gen')
+        assert router.order(name, models) == ['kimi', 'deepseek', 'doubao', 'qwen']
+
+    def test_open_circuit_skipped(self):
+        """Test that models with an open circuit are left out."""
+        tracker = PerformanceTracker(failure_threshold=2)
+        for _ in range(2):
+            tracker.record_request(model='qwen', duration=1.0, success=False, error='down')
+        router = ModelRouter(tracker)
+
+        assert router.order('adhoc', ['qwen', 'deepseek']) == ['deepseek']
+        assert router.get_stats()['usage']['adhoc']['skipped_open_circuit'] == 1
+
+    def test_unknown_route(self):
+        """Test that an unconfigured route name is rejected."""
+        with pytest.raises(ValueError):
+            ModelRouter(PerformanceTracker()).resolve('missing')
+
+    def test_failover_errors(self):
+        """Test that request-caused errors do not fail over, even when wrapped."""
+        assert is_failover_error(LLMServiceError("wrapped"))
+        assert is_failover_error(LLMTimeoutError("slow"))
+        try:
+            try:
+                raise LLMContentFilterError("blocked")
+            except LLMContentFilterError as e:
+                raise LLMServiceError("Chat failed") from e
+        except LLMServiceError as wrapped:
+            assert not is_failover_error(wrapped)
+
+
+class TestLLMServiceRouting:
+    """Test route= in LLMService.chat and chat_stream."""
+
+    @pytest.fixture
+    def service(self, monkeypatch):
+        service = LLMService()
+        service.response_cache = LLMResponseCache(enabled=False)
+        service.performance_tracker = PerformanceTracker(failure_threshold=2)
+        service.router = ModelRouter(service.performance_tracker, routes={'gen': ['qwen', 'deepseek']})
+        clients = {'qwen': ModelClient('qwen'), 'deepseek': ModelClient('deepseek')}
+        monkeypatch.setattr(service.client_manager, 'get_client', lambda model: clients[model])
+        monkeypatch.setattr(llm_service_module, 'get_token_tracker', lambda: FakeTokenTracker())
+        return service, clients
+
+    @pytest.mark.asyncio
+    async def test_failover_on_retryable_error(self, service):
+        """Test that a provider error moves the request to the next model with one attempt each."""
+        service, clients = service
+        clients['qwen'].failures = 10
+
+        assert await service.chat("topic", route='gen') == "from deepseek"
+        assert clients['qwen'].calls == 1
+        assert service.router.get_stats()['usage']['gen']['failovers'] == 1
+
+    @pytest.mark.asyncio
+    async def test_open_circuit_not_called(self, service):
+        """Test that a model with an open circuit is skipped without a call."""
+        service, clients = service
+        for _ in range(2):
+            service.performance_tracker.record_request(model='qwen', duration=1.0, success=False, error='down')
+
+        assert await service.chat("topic", route=['qwen', 'deepseek']) == "from deepseek"
+        assert clients['qwen'].calls == 0
+
+    @pytest.mark.asyncio
+    async def test_all_circuits_open(self, service):
+        """Test that a route with no callable model fails fast."""
+        service, clients = service
+        for model in ('qwen', 'deepseek'):
+            for _ in range(2):
+                service.performance_tracker.record_request(model=model, duration=1.0, success=False, error='down')
+
+        with pytest.raises(LLMServiceError):
+            await service.chat("topic", route='gen')
+        assert clients['qwen'].calls == clients['deepseek'].calls == 0
+
+    @pytest.mark.asyncio
+    async def test_content_filter_not_failed_over(self, service):
+        """Test that a rejected prompt is not resent to the next model."""
+        service, clients = service
+        clients['qwen'].failures = 1
+        clients['qwen'].error = LLMContentFilterError("blocked")
+
+        with pytest.raises(LLMServiceError):
+            await service.chat("topic", route='gen')
+        assert clients['deepseek'].calls == 0
+
+    @pytest.mark.asyncio
+    async def test_stream_failover_before_first_token(self, service):
+        """Test that a stream failing before any token continues on the next model."""
+        service, clients = service
+        service.singleflight.enabled = False
+        clients['qwen'].failures = 1
+
+        chunks = [chunk async for chunk in service.chat_stream("topic", route='gen')]
+        assert chunks == ['a', 'b']
+        assert clients['deepseek'].calls == 1
@@ -0,0 +1,264 @@
+"""
+Unit Tests for LLM Request Coalescing
+=====================================
+
+@author lycosa9527
+@made_by MindSpring Team
+"""
+
+import pytest
+import asyncio
+import sys
+from services.llm_singleflight import SingleFlight
+from services.llm_response_cache import LLMResponseCache
+from services.llm_service import LLMService
+from services.error_handler import LLMServiceError, LLMInvalidParameterError
+
+# services/__init__ re-exports the llm_service instance under the module's name
+llm_service_module = sys.modules['services.llm_service']
+
+
+class SlowClient:
+    """Provider double: slow enough for callers to overlap."""
+
+    def __init__(self, delay=0.05, tokens=('a', 'b', 'c', 'd')):
+        self.delay = delay
+        self.tokens = tokens
+        self.calls = 0
+        self.streams = 0
+
+    async def chat_completion(self, messages, temperature=None, max_tokens=1000, **kwargs):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return {'content': 'shared answer', 'usage': {'prompt_tokens': 10, 'completion_tokens': 5, 'total_tokens': 15}}
+
+    async def async_stream_chat_completion(self, messages, temperature=None, max_tokens=1000, **kwargs):
+        self.streams += 1
+        for token in self.tokens:
+            await asyncio.sleep(self.delay)
+            yield {'type': 'token', 'content': token}
+        yield {'type': 'usage', 'usage': {'prompt_tokens': 10, 'completion_tokens': 4, 'total_tokens': 14}}
+
+
+class FakeTokenTracker:
+    def __init__(self):
+        self.records = []
+
+    async def track_usage(self, **kwargs):
+        self.records.append(kwargs)
+        return True
+
+
+class TestSingleFlight:
+    """Test suite for SingleFlight."""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_calls_share_one_upstream(self):
+        """Test that concurrent callers with one key run fn once."""
+        flight = SingleFlight()
+        calls = 0
+
+        async def fn():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.02)
+            return 'result'
+
+        results = await asyncio.gather(*[flight.do('k', fn) for _ in range(10)])
+        assert results == ['result'] * 10
+        assert calls == 1
+        stats = flight.get_stats()
+        assert stats['coalesced_calls'] == 9
+        assert stats['upstream_calls_saved'] == 9
+        assert stats['in_flight_calls'] == 0
+
+        # Finished calls are not reused
+        await flight.do('k', fn)
+        assert calls == 2
+
+    @pytest.mark.asyncio
+    async def test_error_shared_by_all_callers(self):
+        """Test that every caller sees the upstream exception."""
+        flight = SingleFlight()
+
+        async def fn():
+            await asyncio.sleep(0.01)
+            raise RuntimeError("upstream down")
+
+        results = await asyncio.gather(*[flight.do('k', fn) for _ in range(3)], return_exceptions=True)
+        assert all(isinstance(r, RuntimeError) for r in results)
+
+    @pytest.mark.asyncio
+    async def test_leader_cancel_does_not_cancel_followers(self):
+        """Test that the upstream call survives its first caller leaving."""
+        flight = SingleFlight()
+
+        async def fn():
+            await asyncio.sleep(0.05)
+            return 'done'
+
+        leader = asyncio.create_task(flight.do('k', fn))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(flight.do('k', fn))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        assert await follower == 'done'
+
+    @pytest.mark.asyncio
+    async def test_stream_fan_out_with_replay(self):
+        """Test that a late subscriber replays earlier chunks, then follows live."""
+        flight = SingleFlight()
+        upstream = 0
+
+        async def source():
+            nonlocal upstream
+            upstream += 1
+            for i in range(5):
+                await asyncio.sleep(0.02)
+                yield i
+
+        async def collect():
+            return [chunk async for chunk in flight.stream('k', source)]
+
+        first = asyncio.create_task(collect())
+        await asyncio.sleep(0.05)  # Upstream has emitted a couple of chunks
+        second = asyncio.create_task(collect())
+        assert await first == [0, 1, 2, 3, 4]
+        assert await second == [0, 1, 2, 3, 4]
+        assert upstream == 1
+        stats = flight.get_stats()
+        assert stats['coalesced_streams'] == 1
+        assert stats['replayed_chunks'] >= 1
+
+    @pytest.mark.asyncio
+    async def test_stream_cancelled_when_all_subscribers_leave(self):
+        """Test that the upstream stream is closed once nobody is reading."""
+        flight = SingleFlight()
+        closed = asyncio.Event()
+
+        async def source():
+            try:
+                while True:
+                    await asyncio.sleep(0.01)
+                    yield 'x'
+            finally:
+                closed.set()
+
+        stream = flight.stream('k', source)
+        assert await stream.__anext__() == 'x'
+        await stream.aclose()
+        await asyncio.wait_for(closed.wait(), timeout=1.0)
+        assert flight.get_stats()['in_flight_streams'] == 0
+
+
+class TestLLMServiceCoalescing:
+    """Test coalescing in LLMService.chat and chat_stream."""
+
+    @pytest.fixture
+    def service(self, monkeypatch):
+        service = LLMService()
+        service.response_cache = LLMResponseCache(enabled=False)
+        client = SlowClient()
+        tracker = FakeTokenTracker()
+        monkeypatch.setattr(service.client_manager, 'get_client', lambda model: client)
+        monkeypatch.setattr(llm_service_module, 'get_token_tracker', lambda: tracker)
+        return service, client, tracker
+
+    @pytest.mark.asyncio
+    async def test_chat_coalesced(self, service):
+        """Test that identical concurrent chats make one provider call and bill once."""
+        service, client, tracker = service
+        results = await asyncio.gather(*[
+            service.chat("same topic", model='qwen', temperature=0.2, user_id=i) for i in range(5)
+        ])
+        assert results == ['shared answer'] * 5
+        assert client.calls == 1
+        billed = [r for r in tracker.records if not r.get('cache_hit')]
+        assert len(billed) == 1 and billed[0]['input_tokens'] == 10
+        assert sorted(r['user_id'] for r in tracker.records) == [0, 1, 2, 3, 4]
+        assert service.singleflight.get_stats()['coalesced_calls'] == 4
+
+    @pytest.mark.asyncio
+    async def test_chat_stream_coalesced(self, service):
+        """Test that identical concurrent streams share one upstream stream."""
+        service, client, tracker = service
+
+        async def collect(user_id):
+            return ''.join([
+                c async for c in service.chat_stream("same topic", model='qwen', temperature=0.2, user_id=user_id)
+            ])
+
+        first = asyncio.create_task(collect(1))
+        await asyncio.sleep(0.08)
+        second = asyncio.create_task(collect(2))
+        assert await first == await second == 'abcd'
+        assert client.streams == 1
+        billed = [r for r in tracker.records if not r.get('cache_hit')]
+        assert len(billed) == 1 and billed[0]['user_id'] == 1
+        assert [r['user_id'] for r in tracker.records if r.get('cache_hit')] == [2]
+
+    @pytest.mark.asyncio
+    async def test_different_requests_not_coalesced(self, service):
+        """Test that different prompts or models go upstream separately."""
+        service, client, tracker = service
+        await asyncio.gather(
+            service.chat("topic one", model='qwen', temperature=0.2),
+            service.chat("topic two", model='qwen', temperature=0.2),
+            service.chat("topic one", model='deepseek', temperature=0.2)
+        )
+        assert client.calls == 3
+
+    @pytest.mark.asyncio
+    async def test_disabled(self, service):
+        """Test that coalescing can be switched off."""
+        service, client, tracker = service
+        service.singleflight.enabled = False
+        await asyncio.gather(*[service.chat("same topic", model='qwen', temperature=0.2) for _ in range(3)])
+        assert client.calls == 3
+
+    @pytest.mark.asyncio
+    async def test_high_temperature_not_coalesced(self, service):
+        """Test that creative requests (e.g. regenerate) each get their own answer."""
+        service, client, tracker = service
+        await asyncio.gather(*[service.chat("same topic", model='qwen', temperature=0.9) for _ in range(3)])
+        assert client.calls == 3
+        assert not any(r.get('cache_hit') for r in tracker.records)
+
+    @pytest.mark.asyncio
+    async def test_cancelled_leader_still_tracked(self, service):
+        """Test that usage and cache are recorded when the caller that started the call is gone."""
+        service, client, tracker = service
+        service.response_cache = LLMResponseCache(enabled=True)
+        leader = asyncio.create_task(service.chat("same topic", model='qwen', temperature=0.2, user_id=1))
+        await asyncio.sleep(0.01)
+        joiner = asyncio.create_task(service.chat("same topic", model='qwen', temperature=0.2, user_id=2))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+
+        assert await joiner == 'shared answer'
+        assert client.calls == 1
+        billed = [r for r in tracker.records if not r.get('cache_hit')]
+        assert len(billed) == 1 and billed[0]['input_tokens'] == 10
+        assert await service.chat("same topic", model='qwen', temperature=0.2) == 'shared answer'
+        assert client.calls == 1  # Served from the cache the shared call filled
+
+    @pytest.mark.asyncio
+    async def test_shared_failure_recorded_once(self, service, monkeypatch):
+        """Test that one upstream failure counts once in performance metrics."""
+        service, client, tracker = service
+        failures = []
+
+        async def broken(*args, **kwargs):
+            await asyncio.sleep(0.02)
+            raise LLMInvalidParameterError("bad request")
+
+        monkeypatch.setattr(client, 'chat_completion', broken)
+        monkeypatch.setattr(
+            service.performance_tracker, 'record_request',
+            lambda **kwargs: failures.append(kwargs) if not kwargs.get('success') else None
+        )
+        results = await asyncio.gather(
+            *[service.chat("same topic", model='qwen', temperature=0.2) for _ in range(3)], return_exceptions=True
+        )
+        assert all(isinstance(r, LLMServiceError) for r in results)
+        assert len(failures) == 1
@@ -8,7 +8,9 @@ Unit Tests for Multi-LLM Orchestration
 
 import pytest
 import asyncio
-from services.llm_service import llm_service
+from services.llm_service import llm_service, LLMService
+from services.performance_tracker import PerformanceTracker
+from services.error_handler import LLMServiceError
 
 
 class TestMultiLLMOrchestration:
@@ -158,3 +160,82 @@ class TestMultiLLMOrchestration:
         assert tasks_completed[2] == 'task0'
         print(f"Completion order: {tasks_completed}")
 
+
+class TestHedgedRace:
+    """Test suite for hedged generate_race (no real API calls)."""
+    
+    @pytest.fixture
+    def service(self, monkeypatch):
+        """LLMService whose chat() answers after a per-model delay."""
+        service = LLMService()
+        service.performance_tracker = PerformanceTracker()
+        delays = {}
+        calls = []
+        
+        async def fake_chat(prompt, model, **kwargs):
+            calls.append(model)
+            delay = delays[model]
+            if isinstance(delay, Exception):
+                raise delay
+            await asyncio.sleep(delay)
+            return f"{model} answer"
+        
+        monkeypatch.setattr(service, 'chat', fake_chat)
+        return service, delays, calls
+    
+    def _history(self, tracker, model, duration, count=10):
+        for _ in range(count):
+            tracker.record_request(model=model, duration=duration, success=True)
+    
+    @pytest.mark.asyncio
+    async def test_fast_primary_no_hedge(self, service):
+        """Test that only the fastest model is called when it answers within p90."""
+        service, delays, calls = service
+        self._history(service.performance_tracker, 'slow', 1.0)
+        self._history(service.performance_tracker, 'fast', 0.2)
+        delays.update({'slow': 0.01, 'fast': 0.05})
+        
+        result = await service.generate_race("q", models=['slow', 'fast'], hedged=True)
+        assert result['llm'] == 'fast'
+        assert result['success'] is True and result['hedged'] is False
+        assert calls == ['fast']
+        stats = service.performance_tracker.get_hedge_stats()['fast']
+        assert stats['hedged'] == 0
+    
+    @pytest.mark.asyncio
+    async def test_slow_primary_hedged(self, service):
+        """Test that a backup is launched past the primary's p90 and the loser is cancelled."""
+        service, delays, calls = service
+        self._history(service.performance_tracker, 'fast', 0.05)
+        self._history(service.performance_tracker, 'backup', 0.5)
+        delays.update({'fast': 2.0, 'backup': 0.05})
+        
+        result = await asyncio.wait_for(
+            service.generate_race("q", models=['backup', 'fast'], hedged=True), timeout=1.0
+        )
+        assert result['llm'] == 'backup'
+        assert result['hedged'] is True
+        assert calls == ['fast', 'backup']
+        stats = service.performance_tracker.get_hedge_stats()['fast']
+        assert stats['hedge_hit_rate_percent'] == 100.0
+    
+    @pytest.mark.asyncio
+    async def test_failed_primary_fails_over(self, service):
+        """Test that a failed primary launches the backup without waiting for the cutoff."""
+        service, delays, calls = service
+        self._history(service.performance_tracker, 'primary', 0.1)
+        delays.update({'primary': RuntimeError("down"), 'backup': 0.01})
+        
+        result = await asyncio.wait_for(
+            service.generate_race("q", models=['primary', 'backup'], hedged=True), timeout=1.0
+        )
+        assert result['llm'] == 'backup'
+    
+    @pytest.mark.asyncio
+    async def test_all_fail(self, service):
+        """Test that the hedged race raises when every model fails."""
+        service, delays, calls = service
+        delays.update({'a': RuntimeError("down"), 'b': RuntimeError("down")})
+        with pytest.raises(LLMServiceError):
+            await service.generate_race("q", models=['a', 'b'], hedged=True)
+        assert calls == ['a', 'b']
@@ -167,6 +167,33 @@ class TestPerformanceTracker:
         fastest = self.tracker.get_fastest_model(['unknown-model'])
         assert fastest is None
     
+    def test_latency_percentile(self):
+        """Test p90 over the recent window, with a minimum sample count."""
+        for duration in [1.0, 2.0, 3.0, 4.0]:
+            self.tracker.record_request(model='test-model', duration=duration, success=True)
+        assert self.tracker.get_latency_percentile('test-model', 90) is None
+        
+        for duration in range(5, 11):
+            self.tracker.record_request(model='test-model', duration=float(duration), success=True)
+        assert self.tracker.get_latency_percentile('test-model', 90) == 9.0
+        assert self.tracker.get_latency_percentile('test-model', 50) == 5.0
+        assert self.tracker.get_latency_percentile('unknown-model', 90) is None
+    
+    def test_hedge_stats(self):
+        """Test hedge rate and hedge hit rate per primary model."""
+        self.tracker.record_hedge('fast-model', hedged=False)
+        self.tracker.record_hedge('fast-model', hedged=False)
+        self.tracker.record_hedge('fast-model', hedged=True, backup_won=True)
+        self.tracker.record_hedge('fast-model', hedged=True, backup_won=False)
+        
+        stats = self.tracker.get_hedge_stats()['fast-model']
+        assert stats['requests'] == 4
+        assert stats['hedge_rate_percent'] == 50.0
+        assert stats['hedge_hit_rate_percent'] == 50.0
+        
+        self.tracker.reset_metrics()
+        assert self.tracker.get_hedge_stats() == {}
+    
     def test_success_rate_calculation(self):
         """Test success rate calculation."""
         model = 'test-model'
@@ -0,0 +1,109 @@
+"""
+Unit Tests for PNG Render Cache
+================================
+
+@author lycosa9527
+@made_by MindSpring Team
+"""
+
+import pytest
+from services.png_render_cache import (
+    PNGRenderCache,
+    make_render_key,
+    cache_filename,
+    parse_cache_filename
+)
+
+
+class TestRenderKey:
+    """Test suite for content-addressed render keys."""
+
+    def test_key_ignores_dict_order(self):
+        """Test that equivalent specs with different key order share a key."""
+        a = make_render_key('bubble_map', {'topic': 'A', 'attributes': ['x', 'y']}, 1200, 800, 2, 'v1')
+        b = make_render_key('bubble_map', {'attributes': ['x', 'y'], 'topic': 'A'}, 1200, 800, 2, 'v1')
+        assert a == b
+
+    def test_key_changes_with_render_params(self):
+        """Test that size, scale, type and render version are part of the key."""
+        base = make_render_key('bubble_map', {'topic': 'A'}, 1200, 800, 2, 'v1')
+        assert base != make_render_key('bubble_map', {'topic': 'A'}, 1200, 800, 3, 'v1')
+        assert base != make_render_key('bubble_map', {'topic': 'A'}, 1000, 800, 2, 'v1')
+        assert base != make_render_key('circle_map', {'topic': 'A'}, 1200, 800, 2, 'v1')
+        assert base != make_render_key('bubble_map', {'topic': 'A'}, 1200, 800, 2, 'v2')
+
+    def test_filename_round_trip(self):
+        """Test that only render cache filenames parse back to keys."""
+        key = make_render_key('bubble_map', {'topic': 'A'}, 1200, 800, 2)
+        assert parse_cache_filename(cache_filename(key)) == key
+        assert parse_cache_filename('dingtalk_abcd1234_1700000000.png') is None
+
+
+class TestPNGRenderCache:
+    """Test suite for PNGRenderCache."""
+
+    @pytest.mark.asyncio
+    async def test_memory_hit(self, tmp_path):
+        """Test that a stored PNG is returned from memory and counted as saved."""
+        cache = PNGRenderCache(directory=tmp_path)
+        await cache.put('a' * 64, b'png-bytes')
+
+        assert await cache.get('a' * 64) == b'png-bytes'
+        stats = cache.get_stats()
+        assert stats['memory_hits'] == 1
+        assert stats['bytes_saved'] == len(b'png-bytes')
+        assert (tmp_path / cache_filename('a' * 64)).exists()
+
+    @pytest.mark.asyncio
+    async def test_disk_hit_survives_new_instance(self, tmp_path):
+        """Test that another worker finds the PNG on disk and promotes it."""
+        await PNGRenderCache(directory=tmp_path).put('b' * 64, b'shared')
+
+        cache = PNGRenderCache(directory=tmp_path)
+        assert await cache.get('b' * 64) == b'shared'
+        assert cache.get_stats()['disk_hits'] == 1
+        assert cache.get_memory('b' * 64) == b'shared'
+
+    @pytest.mark.asyncio
+    async def test_miss_counts(self, tmp_path):
+        """Test that unknown keys are misses."""
+        cache = PNGRenderCache(directory=tmp_path)
+        assert await cache.get('c' * 64) is None
+        assert cache.get_stats()['misses'] == 1
+        assert cache.get_stats()['hit_rate_percent'] == 0.0
+
+    @pytest.mark.asyncio
+    async def test_memory_lru_eviction(self, tmp_path):
+        """Test that the memory tier evicts least recently used entries."""
+        cache = PNGRenderCache(directory=tmp_path, memory_max_bytes=10)
+        await cache.put('1' * 64, b'aaaaa')
+        await cache.put('2' * 64, b'bbbbb')
+        await cache.get('1' * 64)
+        await cache.put('3' * 64, b'ccccc')
+
+        assert cache.get_memory('1' * 64) is not None
+        assert cache.get_memory('2' * 64) is None
+        assert cache.get_stats()['memory']['evictions'] == 1
+
+    @pytest.mark.asyncio
+    async def test_disk_size_eviction(self, tmp_path):
+        """Test that the disk tier stays within its byte budget."""
+        cache = PNGRenderCache(directory=tmp_path, memory_max_bytes=0, disk_max_bytes=10)
+        await cache.put('1' * 64, b'aaaaa')
+        await cache.put('2' * 64, b'bbbbb')
+        await cache.put('3' * 64, b'ccccc')
+
+        stats = cache.get_stats()
+        assert stats['disk']['bytes'] <= 10
+        assert stats['disk']['evictions'] == 1
+        assert not (tmp_path / cache_filename('1' * 64)).exists()
+
+    @pytest.mark.asyncio
+    async def test_disabled_cache(self, tmp_path):
+        """Test that a disabled cache never returns hits but still writes files on request."""
+        cache = PNGRenderCache(directory=tmp_path, enabled=False)
+        await cache.put('d' * 64, b'png')
+        assert await cache.get('d' * 64) is None
+
+        filename = await cache.ensure_file('d' * 64, b'png')
+        assert (tmp_path / filename).read_bytes() == b'png'
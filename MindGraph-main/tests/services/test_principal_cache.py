@@ -0,0 +1,162 @@
+"""
+Unit Tests for Principal Cache
+==============================
+
+@author lycosa9527
+@made_by MindSpring Team
+"""
+
+import pytest
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import config.database
+import utils.auth as auth
+from models.auth import Base, User, Organization, APIKey
+from services.api_key_usage import APIKeyUsageTracker
+from services.principal_cache import PrincipalCache
+
+
+@pytest.fixture
+def db(monkeypatch, tmp_path):
+    """In-memory database with one organization, one user and one API key; counts SQL statements."""
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(engine)
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    monkeypatch.setattr(config.database, 'SessionLocal', session_factory)
+    monkeypatch.setattr(auth, 'principal_cache', PrincipalCache(epoch_path=tmp_path / "auth_cache.epoch"))
+    usage = APIKeyUsageTracker()
+    monkeypatch.setattr(auth, 'api_key_usage', usage)
+    monkeypatch.setattr(auth, 'AUTH_MODE', 'standard')
+
+    session = session_factory()
+    org = Organization(code="TEST-001", name="Test School", is_active=True)
+    session.add(org)
+    session.commit()
+    session.add(User(phone="13800000000", password_hash="x", name="Teacher", organization_id=org.id))
+    session.add(APIKey(key="mg_test", name="Dify", quota_limit=100, usage_count=0, is_active=True))
+    session.commit()
+
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    yield SimpleNamespace(session=session, statements=statements)
+    usage.shutdown()
+    session.close()
+
+
+def _credentials(session):
+    user = session.query(User).first()
+    return HTTPAuthorizationCredentials(scheme="Bearer", credentials=auth.create_access_token(user))
+
+
+def _request():
+    return SimpleNamespace(cookies={}, url=SimpleNamespace(path="/api/generate_graph"))
+
+
+class TestPrincipalCache:
+    """Test cached principal resolution in the auth dependencies."""
+
+    def test_steady_state_skips_database(self, db):
+        """Test that repeat requests resolve user and organization without SQL."""
+        credentials = _credentials(db.session)
+        db.statements.clear()
+        first = auth.get_current_user(_request(), credentials)
+        assert len(db.statements) == 2  # user, organization
+        db.statements.clear()
+        for _ in range(5):
+            user = auth.get_current_user(_request(), credentials)
+            assert auth.get_current_user_or_api_key(_request(), credentials, None).id == first.id
+        assert db.statements == []
+        assert (user.id, user.phone, user.organization_id) == (first.id, first.phone, first.organization_id)
+
+    def test_returned_users_are_independent(self, db):
+        """Test that mutating one request's user does not leak into the next."""
+        credentials = _credentials(db.session)
+        auth.get_current_user(_request(), credentials)
+        auth.get_current_user(_request(), credentials).name = "changed"
+        assert auth.get_current_user(_request(), credentials).name == "Teacher"
+
+    def test_organization_lock_evicts(self, db):
+        """Test that locking or expiring an organization takes effect on the next request."""
+        credentials = _credentials(db.session)
+        auth.get_current_user(_request(), credentials)
+        org = db.session.query(Organization).first()
+        org.is_active = False
+        db.session.commit()
+        auth.principal_cache.invalidate_organization(org.id)
+        with pytest.raises(HTTPException) as excinfo:
+            auth.get_current_user(_request(), credentials)
+        assert excinfo.value.status_code == 403
+
+        org.is_active = True
+        org.expires_at = datetime.utcnow() - timedelta(days=1)
+        db.session.commit()
+        auth.principal_cache.invalidate_organization(org.id)
+        with pytest.raises(HTTPException):
+            auth.get_current_user(_request(), credentials)
+
+    def test_lockout_evicts(self, db):
+        """Test that account lockouts evict the cached user."""
+        credentials = _credentials(db.session)
+        auth.get_current_user(_request(), credentials)
+        user = db.session.query(User).first()
+        auth.lock_account(user, db.session)
+        assert auth.get_current_user(_request(), credentials).locked_until is not None
+
+    def test_api_key_cached_and_revoked(self, db):
+        """Test API key validation from the cache, quota tracking and revocation."""
+        assert auth.get_current_user_or_api_key(_request(), None, "mg_test") is None
+        db.statements.clear()
+        auth.get_current_user_or_api_key(_request(), None, "mg_test")
+        # Validated from the cache, counted against the quota leased on the first request
+        assert db.statements == []
+
+        key_record = db.session.query(APIKey).first()
+        key_record.is_active = False
+        db.session.commit()
+        auth.principal_cache.invalidate_api_key(key_record.key)
+        with pytest.raises(HTTPException) as excinfo:
+            auth.get_current_user_or_api_key(_request(), None, "mg_test")
+        assert excinfo.value.status_code == 401
+
+
+class TestCrossWorkerInvalidation:
+    """Test the shared epoch file between two workers' caches."""
+
+    def test_invalidation_clears_other_workers(self, tmp_path):
+        worker_a = PrincipalCache(epoch_path=tmp_path / "auth_cache.epoch")
+        worker_b = PrincipalCache(epoch_path=tmp_path / "auth_cache.epoch")
+        worker_a.put_organization(1, {'is_active': True, 'expires_at': None})
+        worker_b.put_organization(1, {'is_active': True, 'expires_at': None})
+        worker_b.put_organization(2, {'is_active': True, 'expires_at': None})
+
+        worker_a.invalidate_organization(1)
+        assert worker_a.get_organization(1) == (False, None)
+        assert worker_b.get_organization(1) == (False, None)
+        assert worker_b.get_organization(2) == (False, None)
+        assert worker_b.get_stats()['epoch_clears'] == 1
+
+        # Local-only invalidation leaves other workers alone
+        worker_b.put_organization(2, {'is_active': True, 'expires_at': None})
+        worker_a.invalidate_user(7, broadcast=False)
+        assert worker_b.get_organization(2)[0] is True
+
+    def test_ttl_and_lru(self, tmp_path, monkeypatch):
+        cache = PrincipalCache(ttl_seconds=30, max_entries=2, epoch_path=tmp_path / "auth_cache.epoch")
+        clock = [1000.0]
+        monkeypatch.setattr('services.principal_cache.time.monotonic', lambda: clock[0])
+        cache.put_organization(1, None)
+        cache.put_organization(2, None)
+        cache.get_organization(1)
+        cache.put_organization(3, None)  # evicts 2, the least recently used
+        assert [cache.get_organization(org_id)[0] for org_id in (1, 2, 3)] == [True, False, True]
+        clock[0] += 31
+        assert cache.get_organization(1)[0] is False
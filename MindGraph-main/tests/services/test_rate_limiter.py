@@ -125,3 +125,131 @@ class TestRateLimiter:
         print(f"Initial stats: {stats}")
 
 
+
+
+class TestRateLimiterScheduling:
+    """Test suite for FIFO dispatch and per-model/provider buckets."""
+    
+    @pytest.mark.asyncio
+    async def test_fifo_order(self):
+        """Test that queued waiters are granted in arrival order."""
+        limiter = DashscopeRateLimiter(qpm_limit=100, concurrent_limit=1)
+        order = []
+        
+        async def task(i):
+            async with limiter:
+                order.append(i)
+                await asyncio.sleep(0.01)
+        
+        await asyncio.gather(*[task(i) for i in range(6)])
+        assert order == list(range(6))
+    
+    @pytest.mark.asyncio
+    async def test_wakes_on_release_without_polling(self):
+        """Test that a waiter is granted as soon as a slot is released."""
+        limiter = DashscopeRateLimiter(qpm_limit=100, concurrent_limit=1)
+        await limiter.acquire()
+        
+        waiter = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+        assert not waiter.done()
+        
+        await limiter.release()
+        await asyncio.wait_for(waiter, timeout=0.05)
+        await limiter.release()
+    
+    @pytest.mark.asyncio
+    async def test_qpm_window_wakes_on_expiry(self):
+        """Test that a QPM-blocked waiter wakes when the window frees, not on a poll tick."""
+        limiter = DashscopeRateLimiter(qpm_limit=2, concurrent_limit=10, window_seconds=0.2)
+        start = time.monotonic()
+        for _ in range(3):
+            await limiter.acquire()
+            await limiter.release()
+        elapsed = time.monotonic() - start
+        
+        assert 0.19 <= elapsed < 0.35
+        assert limiter.get_stats()['total_waits'] == 1
+    
+    @pytest.mark.asyncio
+    async def test_providers_isolated(self):
+        """Test that a saturated provider does not block another provider."""
+        limiter = DashscopeRateLimiter(
+            qpm_limit=100,
+            concurrent_limit=1,
+            provider_limits={'hunyuan': (100, 1)}
+        )
+        await limiter.acquire('qwen')
+        blocked = asyncio.create_task(limiter.acquire('deepseek'))
+        await asyncio.sleep(0)
+        
+        await asyncio.wait_for(limiter.acquire('hunyuan'), timeout=0.05)
+        assert not blocked.done()
+        
+        await limiter.release('qwen')
+        await asyncio.wait_for(blocked, timeout=0.05)
+        stats = limiter.get_stats()
+        assert stats['providers']['dashscope']['active_requests'] == 1
+        assert stats['providers']['hunyuan']['active_requests'] == 1
+    
+    @pytest.mark.asyncio
+    async def test_model_bucket(self):
+        """Test that a per-model bucket limits one model without limiting its provider."""
+        limiter = DashscopeRateLimiter(
+            qpm_limit=100,
+            concurrent_limit=10,
+            model_limits={'kimi': (100, 1)}
+        )
+        await limiter.acquire('kimi')
+        blocked = asyncio.create_task(limiter.acquire('kimi'))
+        await asyncio.sleep(0)
+        
+        await asyncio.wait_for(limiter.acquire('qwen'), timeout=0.05)
+        assert not blocked.done()
+        assert limiter.get_stats()['models']['kimi']['active_requests'] == 1
+        
+        await limiter.release('kimi')
+        await asyncio.wait_for(blocked, timeout=0.05)
+    
+    @pytest.mark.asyncio
+    async def test_cancelled_waiter_frees_queue(self):
+        """Test that cancelling a queued waiter does not leak a slot or block the queue."""
+        limiter = DashscopeRateLimiter(qpm_limit=100, concurrent_limit=1)
+        await limiter.acquire()
+        
+        cancelled = asyncio.create_task(limiter.acquire())
+        behind = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        await asyncio.sleep(0)
+        
+        await limiter.release()
+        await asyncio.wait_for(behind, timeout=0.05)
+        await limiter.release()
+        assert limiter.get_stats()['active_requests'] == 0
+        assert limiter.get_stats()['queue_depth'] == 0
+    
+    @pytest.mark.asyncio
+    async def test_histograms_in_stats(self):
+        """Test that wait-time and queue-depth histograms are reported."""
+        limiter = DashscopeRateLimiter(qpm_limit=100, concurrent_limit=1)
+        
+        async def task():
+            async with limiter:
+                await asyncio.sleep(0.01)
+        
+        await asyncio.gather(*[task() for _ in range(4)])
+        stats = limiter.get_stats()
+        assert sum(stats['wait_histogram'].values()) == 4
+        assert sum(stats['queue_depth_histogram'].values()) == 4
+        assert stats['max_queue_depth'] == 3
+        assert stats['wait_p99'] >= stats['wait_p50']
+    
+    def test_parse_model_limits(self):
+        """Test parsing of LLM_MODEL_RATE_LIMITS."""
+        from services.rate_limiter import parse_model_limits
+        assert parse_model_limits('qwen-plus=300/50, kimi=60/10,bad') == {
+            'qwen-plus': (300, 50),
+            'kimi': (60, 10)
+        }
+        assert parse_model_limits('') == {}
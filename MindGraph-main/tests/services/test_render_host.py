@@ -0,0 +1,58 @@
+"""
+Unit Tests for PNG Render Host Pages
+=====================================
+
+@author lycosa9527
+@made_by MindSpring Team
+"""
+
+from services.render_host import RenderHostCache
+
+
+class TestRenderHost:
+    """Test suite for RenderHostCache."""
+
+    def test_page_is_self_contained(self):
+        """Test that the host page inlines scripts instead of loading them over HTTP."""
+        cache = RenderHostCache()
+        page = cache.get_page('bubble_map')
+
+        assert '<script src=' not in page
+        assert 'localhost' not in page
+        for module in ('d3', 'theme-config', 'style-manager', 'shared-utilities',
+                       'bubble-map-renderer', 'dynamic-renderer-loader', 'renderer-dispatcher'):
+            assert f'data-module="{module}"' in page
+        assert 'window.mindgraphRender' in page
+
+    def test_concept_map_includes_layout(self):
+        """Test that concept maps get the Sugiyama layout inlined."""
+        page = RenderHostCache().get_page('concept_map')
+        assert 'data-module="sugiyama-layout"' in page
+        assert page.index('data-module="sugiyama-layout"') < page.index('data-module="concept-map-renderer"')
+
+    def test_built_once_per_type(self):
+        """Test that aliases share one cached page and repeat calls are hits."""
+        cache = RenderHostCache()
+        first = cache.get_page('mindmap')
+        second = cache.get_page('mind_map')
+
+        assert first is second
+        stats = cache.get_stats()
+        assert stats['builds'] == 1
+        assert stats['hits'] == 1
+
+    def test_version_lookup_is_not_a_hit(self):
+        """Test that a render (version lookup plus page) counts one hit."""
+        cache = RenderHostCache()
+        version = cache.get_version('bubble_map')
+        cache.get_page('bubble_map')
+        assert cache.get_version('bubble_map') == version
+        cache.get_page('bubble_map')
+
+        stats = cache.get_stats()
+        assert stats['builds'] == 1
+        assert stats['hits'] == 2
+
+    def test_script_close_tags_escaped(self):
+        """Test that inlined content cannot terminate its script element."""
+        assert RenderHostCache._escape_script("var s = '</script>';") == "var s = '<\\/script>';"
@@ -0,0 +1,143 @@
+"""
+Unit Tests for Session Store
+============================
+
+@author lycosa9527
+@made_by MindSpring Team
+"""
+
+import threading
+
+import pytest
+from services.session_store import (
+    MemorySessionBackend,
+    SessionStoreManager,
+    SQLiteSessionBackend,
+    measure_size,
+)
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def manager(request, tmp_path, monkeypatch):
+    """A manager per backend, pruning on every sqlite write."""
+    monkeypatch.setattr(SQLiteSessionBackend, 'PRUNE_EVERY', 1)
+    manager = SessionStoreManager()
+    manager.configure(backend=request.param, ttl_seconds=3600, max_entries=3, max_mb=1,
+                      db_path=tmp_path / "sessions.db")
+    yield manager
+    manager.close()
+
+
+class TestSessionStore:
+    """Test the dict-like store over both backends."""
+
+    def test_round_trip(self, manager):
+        """Test get/set/pop and that values survive the backend."""
+        store = manager.store('palette')
+        store.set('s1', {'batches': 1, 'nodes': ['a']})
+        assert 's1' in store
+        assert store.get('s1') == {'batches': 1, 'nodes': ['a']}
+        assert store.get('missing') is None
+        with pytest.raises(KeyError):
+            store['missing']
+        assert store.touch('s1')
+        assert not store.touch('missing')
+        assert store.pop('s1')['batches'] == 1
+        assert 's1' not in store
+        assert store.pop('s1', 'gone') == 'gone'
+
+    def test_namespaces_are_separate(self, manager):
+        """Test that the same key in two namespaces holds two sessions."""
+        manager.store('voice').set('s1', 'voice')
+        manager.store('learning').set('s1', 'learning')
+        assert manager.store('voice')['s1'] == 'voice'
+        assert manager.store('learning')['s1'] == 'learning'
+
+    def test_lru_by_entries(self, manager):
+        """Test that the least recently used session goes first past max_entries."""
+        store = manager.store('palette')
+        for key in ('s1', 's2', 's3'):
+            store.set(key, key)
+        store.get('s1')  # touch: s2 is now the oldest
+        if manager.backend.shared:
+            # sqlite orders by last_access; keep timestamps distinct
+            manager.backend._connect().execute(
+                "UPDATE sessions SET last_access = last_access - 10 WHERE key = 's2'"
+            )
+        store.set('s4', 's4')
+        assert sorted(store.keys()) == ['s1', 's3', 's4']
+        assert store.get_stats()['evictions']['lru'] == 1
+
+    def test_lru_by_bytes(self, manager):
+        """Test that max_bytes bounds the pickled size of a namespace."""
+        store = manager.store('palette')
+        blob = 'x' * (400 * 1024)
+        store.set('s1', blob)
+        store.set('s2', blob)
+        store.set('s3', blob)
+        stats = store.get_stats()
+        assert stats['entries'] == 2
+        assert stats['resident_bytes'] <= manager.max_bytes
+        assert stats['evictions']['lru'] == 1
+
+    async def test_async_access(self, manager, monkeypatch):
+        """Test the async methods, and that only the sqlite backend leaves the event loop thread."""
+        store = manager.store('voice')
+        threads = set()
+        get = manager.backend.get
+        monkeypatch.setattr(manager.backend, 'get', lambda *args: threads.add(threading.get_ident()) or get(*args))
+        await store.aset('s1', {'turns': 1})
+        assert await store.aget('s1') == {'turns': 1}
+        assert await store.atouch('s1')
+        assert await store.aitems() == [('s1', {'turns': 1})]
+        assert await store.apop('s1') == {'turns': 1}
+        assert await store.aget('s1', 'gone') == 'gone'
+        assert (threading.get_ident() in threads) != manager.backend.shared
+
+    def test_stats(self, manager):
+        """Test per-namespace and total stats."""
+        store = manager.store('thinking_mode:circle_map')
+        store.set('s1', [1, 2, 3])
+        store.get('s1')
+        store.get('s2')
+        stats = manager.get_stats()
+        assert stats['backend'] == ('sqlite' if manager.backend.shared else 'memory')
+        namespace = stats['namespaces']['thinking_mode:circle_map']
+        assert (namespace['entries'], namespace['hits'], namespace['misses'], namespace['writes']) == (1, 1, 1, 1)
+        assert namespace['resident_bytes'] == measure_size([1, 2, 3])
+
+
+class TestBackends:
+    """Test expiry and sharing at the backend level with explicit clocks."""
+
+    @pytest.mark.parametrize('backend_class', [MemorySessionBackend, SQLiteSessionBackend])
+    def test_idle_expiry(self, backend_class, tmp_path, monkeypatch):
+        """Test that idle sessions expire and reads and touches refresh the idle clock."""
+        monkeypatch.setattr(SQLiteSessionBackend, 'PRUNE_EVERY', 1)
+        backend = backend_class() if backend_class is MemorySessionBackend else backend_class(db_path=tmp_path / "s.db")
+        backend.set('ns', 'idle', 1, now=0)
+        backend.set('ns', 'active', 2, now=0)
+        assert backend.get('ns', 'active', now=50, ttl=60) == 2
+        assert backend.touch('ns', 'active', now=100, ttl=60)
+        assert not backend.contains('ns', 'idle', now=70, ttl=60)
+        assert not backend.touch('ns', 'idle', now=70, ttl=60)
+        assert backend.keys('ns', now=130, ttl=60) == ['active']
+        assert backend.prune('ns', now=130, ttl=60, max_entries=10, max_bytes=1 << 20) == {'expired': 1, 'lru': 0}
+        assert backend.usage('ns')[0] == 1
+        backend.close()
+
+    def test_sqlite_shared_between_workers(self, tmp_path):
+        """Test that two backends on one database see each other's sessions."""
+        worker_a = SQLiteSessionBackend(db_path=tmp_path / "s.db")
+        worker_b = SQLiteSessionBackend(db_path=tmp_path / "s.db")
+        worker_a.set('voice', 's1', {'messages': ['hi']}, now=0)
+        assert worker_b.get('voice', 's1', now=1, ttl=60) == {'messages': ['hi']}
+        worker_b.delete('voice', 's1')
+        assert not worker_a.contains('voice', 's1', now=2, ttl=60)
+        worker_a.close()
+        worker_b.close()
+
+    def test_unknown_backend_falls_back_to_memory(self):
+        manager = SessionStoreManager()
+        manager.configure(backend='redis')
+        assert isinstance(manager.backend, MemorySessionBackend)
@@ -0,0 +1,107 @@
+"""
+Unit Tests for Shared (Cross-Worker) Rate Limiter
+==================================================
+
+@author lycosa9527
+@made_by MindSpring Team
+"""
+
+import pytest
+import asyncio
+import time
+from services.shared_rate_limiter import SharedRateLimiter, SQLiteRateLimitStore
+
+
+def make_worker(db_path, **kwargs):
+    """A limiter with its own store connection, like one uvicorn worker."""
+    window = kwargs.pop('window_seconds', 60.0)
+    store = SQLiteRateLimitStore(db_path=db_path, window_seconds=window)
+    return SharedRateLimiter(store=store, poll_interval=0.01, window_seconds=window, **kwargs)
+
+
+class TestSharedRateLimiter:
+    """Test suite for SharedRateLimiter."""
+
+    @pytest.mark.asyncio
+    async def test_concurrency_shared_across_workers(self, tmp_path):
+        """Test that two workers together never exceed the concurrent limit."""
+        db_path = tmp_path / "rl.db"
+        workers = [make_worker(db_path, qpm_limit=1000, concurrent_limit=2) for _ in range(2)]
+        active = 0
+        max_active = 0
+
+        async def task(limiter):
+            nonlocal active, max_active
+            async with limiter.limit('qwen'):
+                active += 1
+                max_active = max(max_active, active)
+                await asyncio.sleep(0.02)
+                active -= 1
+
+        await asyncio.gather(*[task(workers[i % 2]) for i in range(8)])
+        assert max_active == 2
+        for limiter in workers:
+            await limiter.close()
+
+    @pytest.mark.asyncio
+    async def test_qpm_shared_across_workers(self, tmp_path):
+        """Test that the QPM window is one budget for all workers."""
+        db_path = tmp_path / "rl.db"
+        first = make_worker(db_path, qpm_limit=3, concurrent_limit=10, window_seconds=0.3)
+        second = make_worker(db_path, qpm_limit=3, concurrent_limit=10, window_seconds=0.3)
+
+        for limiter in (first, second, first):
+            await limiter.acquire()
+            await limiter.release()
+
+        start = time.monotonic()
+        await second.acquire()
+        await second.release()
+        assert time.monotonic() - start >= 0.2
+        assert second.get_stats()['total_waits'] == 1
+        await first.close()
+        await second.close()
+
+    @pytest.mark.asyncio
+    async def test_dead_worker_leases_reclaimed(self, tmp_path):
+        """Test that leases left by a crashed worker stop counting."""
+        db_path = tmp_path / "rl.db"
+        store = SQLiteRateLimitStore(db_path=db_path, reclaim_interval=0)
+        # Lease from a process that no longer exists
+        store._conn.execute(
+            "INSERT INTO rl_lease (bucket, pid, pid_started, acquired_at) VALUES (?, ?, ?, ?)",
+            ('dashscope', 999999, 1.0, time.time())
+        )
+        limiter = SharedRateLimiter(store=store, qpm_limit=100, concurrent_limit=1, poll_interval=0.01)
+
+        await asyncio.wait_for(limiter.acquire(), timeout=1.0)
+        assert limiter.get_stats()['active_requests'] == 1
+        await limiter.release()
+        await limiter.close()
+
+    @pytest.mark.asyncio
+    async def test_close_returns_leases(self, tmp_path):
+        """Test that shutdown frees this worker's in-flight slots."""
+        db_path = tmp_path / "rl.db"
+        leaving = make_worker(db_path, qpm_limit=100, concurrent_limit=1)
+        staying = make_worker(db_path, qpm_limit=100, concurrent_limit=1)
+
+        await leaving.acquire()
+        waiter = asyncio.create_task(staying.acquire())
+        await asyncio.sleep(0.05)
+        assert not waiter.done()
+
+        await leaving.close()
+        await asyncio.wait_for(waiter, timeout=1.0)
+        await staying.release()
+        await staying.close()
+
+    @pytest.mark.asyncio
+    async def test_store_failure_fails_open(self, tmp_path):
+        """Test that a broken store admits requests instead of blocking LLM calls."""
+        limiter = make_worker(tmp_path / "rl.db", qpm_limit=1, concurrent_limit=1)
+        limiter._store.close()
+
+        await asyncio.wait_for(limiter.acquire(), timeout=1.0)
+        await limiter.release()
+        assert limiter.get_stats()['store_errors'] == 1
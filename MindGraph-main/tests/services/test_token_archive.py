@@ -0,0 +1,182 @@
+"""
+Unit Tests for Token Usage Retention and Archival
+=================================================
+
+@author lycosa9527
+@made_by MindSpring Team
+"""
+
+import sqlite3
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import sessionmaker
+
+import config.database
+import services.token_archive as token_archive
+from models.auth import Base
+from models.token_usage import TokenUsage, TokenUsageHourly
+from services.token_archive import (
+    archive_month, archive_old_usage, archive_path, archived_months, prune_hourly_rollups, vacuum_database
+)
+from services.token_rollups import next_month, rebuild_rollups, sum_usage, truncate_month
+from services.token_tracker import TokenTracker
+
+NOW = datetime.utcnow().replace(minute=0, second=0, microsecond=0)
+
+
+@pytest.fixture
+def engine(monkeypatch, tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'usage.db'}", connect_args={"check_same_thread": False})
+    with engine.connect() as conn:
+        conn.exec_driver_sql("PRAGMA journal_mode=WAL")
+    Base.metadata.create_all(engine)
+    monkeypatch.setattr(config.database, 'engine', engine)
+    monkeypatch.setattr(token_archive, 'ARCHIVE_DIR', tmp_path / "archive")
+    monkeypatch.setattr(token_archive, 'TOKEN_USAGE_RETENTION_DAYS', 60)
+    monkeypatch.setattr(token_archive, 'BATCH_SIZE', 100)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def db(engine):
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+async def tracker(engine, tmp_path):
+    return TokenTracker(spill_dir=tmp_path / "spill")
+
+
+def _record(created_at, user_id=1, tokens=100, success=True):
+    return {
+        'user_id': user_id, 'organization_id': 1, 'session_id': None, 'conversation_id': None,
+        'model_provider': 'dashscope', 'model_name': 'qwen-plus-latest', 'model_alias': 'qwen',
+        'input_tokens': tokens // 2, 'output_tokens': tokens - tokens // 2, 'total_tokens': tokens,
+        'input_cost': 0.0, 'output_cost': 0.0, 'total_cost': tokens * 1e-6,
+        'request_type': 'diagram_generation', 'diagram_type': None, 'endpoint_path': None,
+        'success': success, 'cache_hit': False, 'response_time': None, 'created_at': created_at,
+    }
+
+
+def _workload():
+    """A year of usage, one row every 5 hours."""
+    return [
+        _record(NOW - timedelta(hours=hours_ago, minutes=-10), user_id=hours_ago % 4 + 1,
+                tokens=hours_ago % 97 + 1, success=hours_ago % 11 != 0)
+        for hours_ago in range(0, 365 * 24, 5)
+    ]
+
+
+def _raw_count(engine):
+    with engine.connect() as conn:
+        return conn.execute(select(func.count()).select_from(TokenUsage.__table__)).scalar()
+
+
+def _archived_count():
+    total = 0
+    for month in archived_months():
+        with sqlite3.connect(archive_path(month)) as archive:
+            total += archive.execute("SELECT count(*) FROM token_usage").fetchone()[0]
+    return total
+
+
+class TestTokenArchive:
+    """Test archival, rebuilds over archives and vacuum."""
+
+    async def test_archives_whole_months_past_retention(self, tracker, engine, db):
+        """Test that only whole months older than the retention leave token_usage."""
+        records = _workload()
+        tracker._insert_records(records)
+        totals = sum_usage(db)
+
+        moved = archive_old_usage(engine)
+        cutoff = NOW - timedelta(days=60)
+        expected = [r for r in records if next_month(r['created_at']) <= cutoff]
+        assert moved == len(expected) == _archived_count()
+        assert _raw_count(engine) == len(records) - moved
+        assert max(archived_months()) < truncate_month(cutoff)
+        assert not list(archive_path(NOW).parent.glob("*.tmp"))
+        assert archive_old_usage(engine) == 0
+        assert sum_usage(db) == totals  # Dashboards read the rollups
+
+    async def test_rebuild_reads_archives(self, tracker, engine, db):
+        """Test that rebuilt rollups still include archived months."""
+        tracker._insert_records(_workload())
+        totals = sum_usage(db, success_only=False)
+        by_day = sum_usage(db, by='day')
+        archive_old_usage(engine)
+
+        counts = rebuild_rollups(engine)
+        assert counts['raw_rows'] + counts['archived_rows'] == len(_workload())
+        assert sum_usage(db, success_only=False) == totals
+        assert sum_usage(db, by='day') == by_day
+
+        rebuild_rollups(engine, since=min(archived_months()) + timedelta(days=40))
+        assert sum_usage(db, by='day') == by_day
+
+    async def test_interrupted_move_is_finished(self, tracker, engine, db, monkeypatch):
+        """Test that rows copied but not yet deleted are neither lost nor counted twice."""
+        tracker._insert_records(_workload())
+        totals = sum_usage(db, success_only=False)
+        month = truncate_month(NOW - timedelta(days=200))
+        with monkeypatch.context() as interrupted:
+            interrupted.setattr(token_archive, '_delete_month', lambda *args: 0)
+            archive_month(engine, month)
+        assert _raw_count(engine) == len(_workload())
+
+        counts = rebuild_rollups(engine)  # Finishes the move first
+        assert counts['raw_rows'] + counts['archived_rows'] == len(_workload())
+        assert sum_usage(db, success_only=False) == totals
+
+    async def test_rows_arriving_during_move_are_kept(self, tracker, engine, db, monkeypatch):
+        """Test that rows written after a month was copied are not deleted unarchived."""
+        tracker._insert_records(_workload())
+        totals = sum_usage(db, success_only=False)
+        month = truncate_month(NOW - timedelta(days=200))
+        copy_month = token_archive._copy_month
+        late = [_record(month + timedelta(minutes=1)), _record(next_month(month) - timedelta(minutes=1))]
+
+        def copy_then_late_rows(engine, month):
+            copied = copy_month(engine, month)
+            tracker._insert_records(late)  # A spill-journal replay racing the move
+            return copied
+
+        with monkeypatch.context() as racing:
+            racing.setattr(token_archive, '_copy_month', copy_then_late_rows)
+            moved = archive_month(engine, month)
+        assert _raw_count(engine) == len(_workload()) - moved + len(late)
+
+        assert archive_month(engine, month) == len(late)
+        assert _raw_count(engine) + _archived_count() == len(_workload()) + len(late)
+        counts = rebuild_rollups(engine)
+        assert counts['raw_rows'] + counts['archived_rows'] == len(_workload()) + len(late)
+        assert sum_usage(db, success_only=False)[None]['request_count'] == totals[None]['request_count'] + len(late)
+
+    async def test_prune_hourly_rollups(self, tracker, engine, db):
+        tracker._insert_records(_workload())
+        assert prune_hourly_rollups(engine) > 0
+        oldest = db.query(func.min(TokenUsageHourly.bucket)).scalar()
+        assert oldest >= NOW.replace(hour=0) - timedelta(days=100)
+
+    async def test_vacuum_returns_free_pages(self, tracker, engine):
+        """Test the one-time switch to incremental vacuum, then incremental runs."""
+        tracker._insert_records(_workload())
+        assert vacuum_database(engine)['mode'] == 'none'  # Nothing worth a full VACUUM yet
+
+        archive_old_usage(engine)
+        result = vacuum_database(engine)
+        assert result['mode'] == 'full'
+        with engine.connect() as conn:
+            assert conn.exec_driver_sql("PRAGMA auto_vacuum").scalar() == 2
+            assert conn.exec_driver_sql("PRAGMA freelist_count").scalar() == 0
+
+        with engine.begin() as conn:
+            conn.execute(TokenUsage.__table__.delete())
+        result = vacuum_database(engine)
+        assert result['mode'] == 'incremental'
+        assert result['freed_pages'] > 0
@@ -0,0 +1,173 @@
+"""
+Unit Tests for Token Usage Rollups
+==================================
+
+@author lycosa9527
+@made_by MindSpring Team
+"""
+
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+
+import config.database
+from models.auth import Base
+from models.token_usage import TokenUsageDaily, TokenUsageHourly, TokenUsageMonthly
+from services.token_rollups import backfill_if_missing, rebuild_rollups, sum_usage
+from services.token_tracker import TokenTracker
+
+NOW = datetime.utcnow().replace(minute=0, second=0, microsecond=0)
+TODAY = NOW.replace(hour=0)
+
+
+@pytest.fixture
+def engine(monkeypatch, tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'usage.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine)
+    monkeypatch.setattr(config.database, 'engine', engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def db(engine):
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+async def tracker(engine, tmp_path):
+    return TokenTracker(spill_dir=tmp_path / "spill")
+
+
+def _record(created_at, user_id=1, organization_id=1, tokens=100, success=True, model_alias='qwen'):
+    return {
+        'user_id': user_id, 'organization_id': organization_id, 'session_id': None, 'conversation_id': None,
+        'model_provider': 'dashscope', 'model_name': 'qwen-plus-latest', 'model_alias': model_alias,
+        'input_tokens': tokens // 2, 'output_tokens': tokens - tokens // 2, 'total_tokens': tokens,
+        'input_cost': 0.0, 'output_cost': 0.0, 'total_cost': tokens * 1e-6,
+        'request_type': 'diagram_generation', 'diagram_type': None, 'endpoint_path': None,
+        'success': success, 'cache_hit': False, 'response_time': None, 'created_at': created_at,
+    }
+
+
+def _workload():
+    """Usage over the past 70 days, including anonymous and failed requests."""
+    records = []
+    for hours_ago in range(0, 70 * 24, 7):
+        created_at = NOW - timedelta(hours=hours_ago, minutes=-10)
+        records.append(_record(created_at, user_id=hours_ago % 3 + 1, tokens=hours_ago + 10))
+        records.append(_record(created_at, user_id=None, organization_id=None, tokens=5, model_alias='kimi'))
+        records.append(_record(created_at, tokens=1000, success=False))
+    return records
+
+
+def _snapshot(engine):
+    """Rollup rows (cost rounded: float sums depend on the order they are added in)."""
+    with engine.connect() as conn:
+        return {
+            table.name: sorted(tuple(row)[:-1] + (round(row.total_cost, 9),) for row in conn.execute(select(table)))
+            for table in (TokenUsageHourly.__table__, TokenUsageDaily.__table__, TokenUsageMonthly.__table__)
+        }
+
+
+class TestTokenRollups:
+    """Test incremental maintenance, rebuilds and reads."""
+
+    async def test_batches_update_rollups(self, tracker, db):
+        """Test that each written batch is folded into the hourly and daily buckets."""
+        tracker._insert_records([_record(NOW + timedelta(minutes=5), tokens=100)])
+        tracker._insert_records([
+            _record(NOW + timedelta(minutes=20), tokens=50),
+            _record(NOW - timedelta(hours=1), tokens=7),
+        ])
+        hourly = db.query(TokenUsageHourly).filter(TokenUsageHourly.bucket == NOW).one()
+        assert (hourly.request_count, hourly.total_tokens) == (2, 150)
+        daily = db.query(TokenUsageDaily).all()
+        assert sum(row.request_count for row in daily) == 3
+
+    async def test_reads_match_raw_totals(self, tracker, db):
+        """Test windowed and grouped sums against the records they come from."""
+        records = _workload()
+        tracker._insert_records(records)
+        successful = [r for r in records if r['success']]
+
+        def expected(since=None, key=None):
+            totals = {}
+            for r in successful:
+                if since is None or r['created_at'] >= since:
+                    group = key(r) if key else None
+                    totals[group] = totals.get(group, 0) + r['total_tokens']
+            return totals
+
+        def totals(usage):
+            return {key: value['total_tokens'] for key, value in usage.items()}
+
+        week_ago = NOW - timedelta(days=7)  # On the hour: hourly rollup for the partial day
+        assert totals(sum_usage(db, since=week_ago)) == expected(week_ago)
+        assert totals(sum_usage(db)) == expected()
+        assert totals(sum_usage(db, since=week_ago, by='user_id')) == expected(week_ago, lambda r: r['user_id'] or 0)
+        assert totals(sum_usage(db, by='organization_id')) == expected(key=lambda r: r['organization_id'] or 0)
+        month_ago = TODAY - timedelta(days=30)  # Daily rollup, then monthly from the next month on
+        assert totals(sum_usage(db, since=month_ago)) == expected(month_ago)
+        assert totals(sum_usage(db, since=month_ago, by='day')) == expected(
+            month_ago, lambda r: r['created_at'].date()
+        )
+        assert sum_usage(db, since=NOW + timedelta(days=1)) == {}
+
+    async def test_failed_requests_counted_separately(self, tracker, db):
+        tracker._insert_records([_record(NOW, tokens=10), _record(NOW, tokens=30, success=False)])
+        assert sum_usage(db)[None]['total_tokens'] == 10
+        assert sum_usage(db, success_only=False)[None] == {
+            'input_tokens': 20, 'output_tokens': 20, 'total_tokens': 40, 'request_count': 2
+        }
+
+    async def test_rebuild_matches_incremental(self, tracker, engine):
+        """Test that rebuilding from token_usage reproduces the incremental rollups."""
+        tracker._insert_records(_workload())
+        incremental = _snapshot(engine)
+        counts = rebuild_rollups(engine)
+        assert _snapshot(engine) == incremental
+        assert counts['raw_rows'] == len(_workload())
+
+        # A partial rebuild leaves older days alone
+        counts = rebuild_rollups(engine, since=TODAY - timedelta(days=2))
+        assert _snapshot(engine) == incremental
+        assert counts['raw_rows'] < len(_workload())
+
+    async def test_backfill_once(self, tracker, engine, db):
+        """Test that history predating the rollups is built once, even after new batches."""
+        tracker._insert_records(_workload())
+        with engine.begin() as conn:
+            for table in (TokenUsageHourly.__table__, TokenUsageDaily.__table__, TokenUsageMonthly.__table__):
+                conn.execute(table.delete())
+        tracker._insert_records([_record(NOW)])  # A worker already wrote today's usage
+        assert backfill_if_missing(engine) is True
+        assert backfill_if_missing(engine) is False
+        assert sum_usage(db, success_only=False)[None]['request_count'] == len(_workload()) + 1
+        assert min(sum_usage(db, by='day')) == min(r['created_at'] for r in _workload()).date()
+
+    async def test_stopped_backfill_reruns(self, tracker, engine, db):
+        """Test that a backfill stopped between months is redone on the next start."""
+        tracker._insert_records(_workload())
+        incremental = _snapshot(engine)
+        with engine.begin() as conn:
+            for table in (TokenUsageHourly.__table__, TokenUsageDaily.__table__, TokenUsageMonthly.__table__):
+                conn.execute(table.delete())
+
+        class StopAfterFirstMonth(threading.Event):
+            checks = 0
+
+            def is_set(self):
+                self.checks += 1
+                return self.checks > 1
+
+        assert backfill_if_missing(engine, stop=StopAfterFirstMonth()) is True
+        assert 0 < len(_snapshot(engine)['token_usage_daily']) < len(incremental['token_usage_daily'])
+        assert backfill_if_missing(engine) is True
+        assert _snapshot(engine) == incremental
+        assert backfill_if_missing(engine) is False
@@ -0,0 +1,175 @@
+"""
+Unit Tests for TokenTracker Batch Writes
+========================================
+
+@author lycosa9527
+@made_by MindSpring Team
+"""
+
+import asyncio
+import time
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.exc import OperationalError
+
+import config.database
+from models.auth import Base
+from models.token_usage import TokenUsage
+from services.token_tracker import SpillJournal, TokenTracker
+
+
+@pytest.fixture
+def engine(monkeypatch, tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'usage.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine)
+    monkeypatch.setattr(config.database, 'engine', engine)
+    monkeypatch.setattr(config.database, 'check_disk_space', lambda required_mb=100: True)
+    monkeypatch.setattr(config.database, 'checkpoint_wal', lambda: True)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+async def tracker(engine, tmp_path):
+    tracker = TokenTracker(spill_dir=tmp_path / "spill")
+    yield tracker
+    if tracker._worker_task:
+        tracker._worker_task.cancel()
+        await asyncio.gather(tracker._worker_task, return_exceptions=True)
+
+
+def _rows(engine):
+    with engine.connect() as conn:
+        return conn.execute(select(func.count(), func.sum(TokenUsage.total_tokens)).select_from(TokenUsage)).one()
+
+
+async def _track(tracker, count):
+    for i in range(count):
+        await tracker.track_usage(model_alias='qwen', input_tokens=10, output_tokens=5, user_id=1)
+
+
+class TestTokenTrackerWrites:
+    """Test batched Core inserts, off-loop flushing and the spill journal."""
+
+    async def test_batch_written(self, tracker, engine):
+        """Test that queued records reach the database on flush."""
+        await _track(tracker, 25)
+        await tracker.flush()
+        assert tuple(_rows(engine)) == (25, 25 * 15)
+
+    async def test_flush_does_not_block_event_loop(self, tracker, monkeypatch):
+        """Test that a slow database write runs while the event loop keeps serving."""
+        insert_records = tracker._insert_records
+
+        def slow_insert(records):
+            time.sleep(0.3)
+            insert_records(records)
+
+        monkeypatch.setattr(tracker, '_insert_records', slow_insert)
+        await _track(tracker, 5)
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        task = asyncio.create_task(ticker())
+        await tracker.flush()
+        task.cancel()
+        assert ticks >= 10
+
+    async def test_queue_full_spills_instead_of_dropping(self, tracker, engine):
+        """Test that records past the queue bound are journaled off the event loop and replayed."""
+        tracker._queue = asyncio.Queue(maxsize=5)
+        await _track(tracker, 20)
+        # Held in memory: tracking itself does no file I/O
+        assert len(tracker._overflow) == 15
+        assert tracker._journal.spilled == 0
+        await tracker.flush()
+        assert tracker._journal.spilled == 15
+        assert _rows(engine)[0] == 5
+        await tracker._replay_spilled()
+        assert _rows(engine)[0] == 20
+        assert not list(tracker._journal.directory.glob('*.jsonl'))
+
+    async def test_overflow_is_bounded(self, tracker, monkeypatch):
+        """Test that records past both bounds are dropped and counted."""
+        tracker._queue = asyncio.Queue(maxsize=5)
+        monkeypatch.setattr(tracker, 'MAX_OVERFLOW_SIZE', 10)
+        results = [
+            await tracker.track_usage(model_alias='qwen', input_tokens=10, output_tokens=5, user_id=1)
+            for _ in range(20)
+        ]
+        assert results.count(False) == 5
+        assert (len(tracker._overflow), tracker._dropped) == (10, 5)
+        await tracker.flush()
+        assert tracker._journal.spilled == 10
+
+    async def test_failed_write_spills_and_replays(self, tracker, engine, monkeypatch):
+        """Test that a batch the database rejects is kept on disk and written later."""
+        insert_records = tracker._insert_records
+        failures = [OperationalError("INSERT", {}, Exception("database is locked"))]
+
+        def flaky_insert(records):
+            if failures:
+                raise failures.pop()
+            insert_records(records)
+
+        monkeypatch.setattr(tracker, '_insert_records', flaky_insert)
+        await _track(tracker, 8)
+        await tracker.flush()
+        assert _rows(engine)[0] == 0
+        await tracker._replay_spilled()
+        assert _rows(engine)[0] == 8
+
+    async def test_spill_replayed_under_steady_traffic(self, tracker, engine, monkeypatch):
+        """Test that spilled records are replayed after the next good write, without waiting for idle."""
+        monkeypatch.setattr(tracker, 'BATCH_INTERVAL', 60.0)  # The worker never goes idle
+        insert_records = tracker._insert_records
+        failures = [OperationalError("INSERT", {}, Exception("database is locked"))]
+
+        def flaky_insert(records):
+            if failures:
+                raise failures.pop()
+            insert_records(records)
+
+        monkeypatch.setattr(tracker, '_insert_records', flaky_insert)
+        await _track(tracker, tracker.BATCH_SIZE)
+        for _ in range(100):
+            if tracker._journal.pending:
+                break
+            await asyncio.sleep(0.01)
+        assert tracker._journal.pending
+        await _track(tracker, tracker.BATCH_SIZE)
+        for _ in range(100):
+            if _rows(engine)[0] == 2 * tracker.BATCH_SIZE:
+                break
+            await asyncio.sleep(0.01)
+        assert _rows(engine)[0] == 2 * tracker.BATCH_SIZE
+        assert not tracker._journal.pending
+
+    async def test_orphaned_journal_claimed_once(self, tracker, engine, tmp_path):
+        """Test that a dead worker's journal is replayed by exactly one worker."""
+        dead_worker = SpillJournal(tmp_path / "spill")
+        dead_worker.pid = 2 ** 22 + 4321  # Not a running process
+        record = {
+            'user_id': 1, 'organization_id': None, 'session_id': 's', 'conversation_id': None,
+            'model_provider': 'dashscope', 'model_name': 'qwen-plus-latest', 'model_alias': 'qwen',
+            'input_tokens': 1, 'output_tokens': 1, 'total_tokens': 2, 'input_cost': 0.0,
+            'output_cost': 0.0, 'total_cost': 0.0, 'request_type': 'diagram_generation',
+            'diagram_type': None, 'endpoint_path': None, 'success': True, 'cache_hit': False,
+            'response_time': None, 'created_at': datetime.utcnow(),
+        }
+        dead_worker.append([record, record])
+        other_worker = SpillJournal(tmp_path / "spill")
+        other_worker.pid = 2 ** 22 + 4322
+        claimed = tracker._journal.claim()
+        assert len(claimed) == 1
+        assert other_worker.claim() == []
+        assert len(SpillJournal.read(claimed[0])) == 2
+        assert tracker._replay_journal() == 2
+        assert _rows(engine)[0] == 2
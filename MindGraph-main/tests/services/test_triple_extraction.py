@@ -0,0 +1,140 @@
+"""
+Unit Tests for Chunked Triple Extraction
+========================================
+
+@author lycosa9527
+@made_by MindSpring Team
+"""
+
+import asyncio
+import pytest
+from config.settings import config
+from services.triple_extraction_service import (
+    TripleExtractionService,
+    merge_chunk_triples,
+    normalize_concept,
+    split_text_into_chunks
+)
+
+
+class TestChunking:
+    """Test sentence/paragraph chunking with overlap."""
+
+    def test_chunks_overlap_by_one_sentence(self):
+        """Test that each chunk starts with the last sentence of the previous one."""
+        chunks = split_text_into_chunks("A b c. D e f. G h i. J k.", 14, overlap_sentences=1)
+        assert chunks == ["A b c. D e f.", "D e f. G h i.", "G h i. J k."]
+
+    def test_paragraph_break_closes_half_full_chunk(self):
+        """Test that a chunk at least half full ends at a paragraph break."""
+        chunks = split_text_into_chunks("一一一一。二二二二。\n三三三三。", 16, overlap_sentences=0)
+        assert chunks == ["一一一一。二二二二。", "三三三三。"]
+
+    def test_short_text_is_one_chunk(self):
+        """Test that text within the limit is not split."""
+        assert split_text_into_chunks("光合作用需要光。", 100) == ["光合作用需要光。"]
+
+
+class TestMergeChunkTriples:
+    """Test concept canonicalization and layer merging across chunks."""
+
+    def test_normalize_concept(self):
+        """Test that width, case, spacing and punctuation don't change the key."""
+        assert normalize_concept("人工智能（AI）") == normalize_concept(" 人工 智能(ai)")
+
+    def test_aliases_and_layers_merged(self):
+        """Test that spellings merge and each concept keeps its majority layer."""
+        triples = merge_chunk_triples([
+            [('AI', '包括', '机器学习', 'L1-L2'), ('机器学习', '包括', '深度学习', 'L2-L3')],
+            [
+                ('ai', '包含', '机器 学习', 'L1-L2'),
+                ('机器学习', '应用于', '图像识别', 'L3-L4'),
+                ('深度学习', '属于', '机器学习', 'L3-L2'),
+            ],
+        ])
+        assert triples == [
+            ('AI', '包括', '机器学习', 'L1-L2'),
+            ('机器学习', '包括', '深度学习', 'L2-L3'),
+            ('机器学习', '应用于', '图像识别', 'L2-L4'),
+        ]
+
+    def test_reverse_after_relayering_dropped(self):
+        """Test that a triple pointing to a higher layer after merging is dropped."""
+        triples = merge_chunk_triples([
+            [('A', 'r', 'B', 'L1-L2'), ('A', 'r', 'C', 'L1-L2')],
+            [('C', 'r', 'A', 'L2-L3')],
+        ])
+        assert ('C', 'r', 'A', 'L2-L1') not in triples
+        assert len(triples) == 2
+
+
+class TestChunkedExtraction:
+    """Test concurrent extraction through llm_service."""
+
+    @pytest.fixture
+    def chunk_chars(self, monkeypatch):
+        def set_chunk_chars(value):
+            monkeypatch.setattr(type(config), 'TRIPLE_CHUNK_CHARS', property(lambda self: value))
+        return set_chunk_chars
+
+    @pytest.mark.asyncio
+    async def test_failed_chunk_does_not_fail_text(self, monkeypatch, chunk_chars):
+        """Test that triples from the other chunks survive one failed chunk."""
+        service = TripleExtractionService()
+
+        async def fake_chat(prompt, **kwargs):
+            if '第三句' in prompt:
+                raise RuntimeError("boom")
+            return "(光合作用, 需要, 光, L1-L2)\n(光合作用, 产生, 氧气, L1-L2)"
+
+        monkeypatch.setattr(service.llm_service, 'chat', fake_chat)
+        chunk_chars(10)
+        result = await service.extract_triples("第一句光合作用。第二句叶绿体。第三句氧气。", language='zh', chunked=True)
+
+        assert result['success'] is True
+        assert result['chunks'] == 3
+        assert result['triples'] == [('光合作用', '需要', '光', 'L1-L2'), ('光合作用', '产生', '氧气', 'L1-L2')]
+
+    @pytest.mark.asyncio
+    async def test_long_text_chunked_automatically(self, monkeypatch, chunk_chars):
+        """Test that texts over TRIPLE_CHUNK_CHARS are split into concurrent calls."""
+        service = TripleExtractionService()
+        calls = []
+        in_flight = []
+        peak = []
+
+        async def fake_chat(prompt, **kwargs):
+            calls.append(prompt)
+            index = len(calls)
+            in_flight.append(prompt)
+            peak.append(len(in_flight))
+            await asyncio.sleep(0.01)
+            in_flight.remove(prompt)
+            return f"(主题, 包括, 方面{index}, L1-L2)"
+
+        monkeypatch.setattr(service.llm_service, 'chat', fake_chat)
+        chunk_chars(200)
+        text = "这是一个很长的句子，用来测试分块提取三元组的功能是否正常。" * 20
+        result = await service.extract_triples(text, language='zh')
+
+        assert result['success'] is True
+        assert result['chunks'] == len(calls) > 1
+        assert max(peak) > 1
+        assert len(result['triples']) == len(calls)
+
+    @pytest.mark.asyncio
+    async def test_short_text_single_prompt(self, monkeypatch):
+        """Test that short texts keep the single-prompt path."""
+        service = TripleExtractionService()
+        calls = []
+
+        async def fake_chat(prompt, **kwargs):
+            calls.append(prompt)
+            return "(主题, 包括, 方面, L1-L2)"
+
+        monkeypatch.setattr(service.llm_service, 'chat', fake_chat)
+        result = await service.extract_triples("主题包括方面。", language='zh')
+
+        assert result['success'] is True
+        assert len(calls) == 1
+        assert 'chunks' not in result
@@ -0,0 +1,90 @@
+"""
+Unit Tests for Voice Session Context Persistence
+================================================
+
+@author lycosa9527
+@made_by MindSpring Team
+"""
+
+import pytest
+
+import routers.voice as voice
+from services.session_store import SessionStoreManager
+
+
+class FakeWebSocket:
+    def __init__(self):
+        self.sent = []
+
+    async def send_json(self, message):
+        self.sent.append(message)
+
+
+class FakeAgent:
+    async def process_command(self, command_text, **kwargs):
+        return {'action': 'add_node', 'target': command_text, 'confidence': 0.9}
+
+    def update_diagram_state(self, diagram_data):
+        pass
+
+
+@pytest.fixture
+def sessions(monkeypatch, tmp_path):
+    """The voice store on the sqlite backend, which hands out copies."""
+    manager = SessionStoreManager()
+    manager.configure(backend='sqlite', ttl_seconds=3600, max_entries=100, max_mb=10,
+                      db_path=tmp_path / "sessions.db")
+    store = manager.store('voice')
+    monkeypatch.setattr(voice, 'voice_sessions', store)
+    monkeypatch.setattr(voice.voice_agent_manager, 'get_or_create', lambda session_id: FakeAgent())
+    store.set('voice_1', {
+        'session_id': 'voice_1', 'user_id': None, 'diagram_session_id': 'diagram_1',
+        'diagram_type': 'circle_map', 'active_panel': 'none', 'conversation_history': [],
+        'context': {'diagram_type': 'circle_map', 'diagram_data': {'children': []}},
+    })
+    yield store
+    manager.close()
+
+
+class TestVoiceSessionContext:
+    """Test that command edits survive between commands."""
+
+    async def test_consecutive_commands_see_earlier_edits(self, sessions):
+        websocket = FakeWebSocket()
+        assert await voice.run_session_command(websocket, 'voice_1', 'apple', is_text_message=True)
+        assert await voice.run_session_command(websocket, 'voice_1', 'pear', is_text_message=True)
+
+        children = sessions['voice_1']['context']['diagram_data']['children']
+        assert [node['text'] for node in children] == ['apple', 'pear']
+        assert [node['id'] for node in children] == ['context_0', 'context_1']
+        assert [message['updates'] for message in websocket.sent] == [[{'text': 'apple'}], [{'text': 'pear'}]]
+
+    async def test_context_update_during_command_wins(self, sessions, monkeypatch):
+        """Test that a command does not overwrite a context the client replaced meanwhile."""
+        process_voice_command = voice.process_voice_command
+
+        async def replaced_midway(websocket, voice_session_id, *args, **kwargs):
+            session = sessions[voice_session_id]
+            session['context'] = {'diagram_type': 'circle_map', 'diagram_data': {'children': []}}
+            session['context_version'] = session.get('context_version', 0) + 1
+            sessions.set(voice_session_id, session)
+            return await process_voice_command(websocket, voice_session_id, *args, **kwargs)
+
+        monkeypatch.setattr(voice, 'process_voice_command', replaced_midway)
+        assert await voice.run_session_command(FakeWebSocket(), 'voice_1', 'apple', is_text_message=True)
+        assert sessions['voice_1']['context']['diagram_data']['children'] == []
+    
+    async def test_command_reads_session_once(self, sessions, monkeypatch):
+        """Test that the command path gets the session passed in instead of re-reading it."""
+        reads = []
+        get = sessions.get
+        monkeypatch.setattr(sessions, 'get', lambda key, default=None: reads.append(key) or get(key, default))
+        assert await voice.run_session_command(FakeWebSocket(), 'voice_1', 'apple', is_text_message=True)
+        # One read for the command, one to write its edits back
+        assert len(reads) == 2
+
+    async def test_expired_session_skips_command(self, sessions):
+        sessions.pop('voice_1')
+        websocket = FakeWebSocket()
+        assert not await voice.run_session_command(websocket, 'voice_1', 'apple', is_text_message=True)
+        assert websocket.sent == []
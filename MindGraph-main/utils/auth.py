@@ -26,6 +26,8 @@ from Crypto.Util.Padding import unpad
 
 from models.auth import User, Organization, APIKey
 from config.database import get_db
+from services.principal_cache import principal_cache, organization_status, snapshot
+from services.api_key_usage import api_key_usage
 
 import logging
 
@@ -347,6 +349,10 @@ def get_current_user(
     # Enterprise Mode: Skip authentication, return enterprise user
     # This is for deployments behind VPN/SSO where network auth is sufficient
     if AUTH_MODE == "enterprise":
+        user_id = principal_cache.get_enterprise_user_id()
+        user = principal_cache.get_user(user_id) if user_id is not None else None
+        if user:
+            return user
         db = SessionLocal()
         try:
             org = db.query(Organization).filter(
@@ -375,6 +381,8 @@ def get_current_user(
                 db.refresh(user)
                 logger.info("Created enterprise mode user")
             
+            principal_cache.put_user(user)
+            principal_cache.put_enterprise_user_id(user.id)
             # Detach user from session so it can be used after close
             db.expunge(user)
             return user
@@ -409,42 +417,51 @@ def get_current_user(
             detail="Invalid token payload"
         )
     
-    # Create session, query, and close immediately
-    db = SessionLocal()
-    try:
-        user = db.query(User).filter(User.id == int(user_id)).first()
-        
-        if not user:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="User not found"
-            )
-        
-        # Check organization status (locked or expired)
-        if user.organization_id:
-            org = db.query(Organization).filter(Organization.id == user.organization_id).first()
-            if org:
-                # Check if organization is locked
-                is_active = org.is_active if hasattr(org, 'is_active') else True
-                if not is_active:
+    user = principal_cache.get_user(int(user_id))
+    org_cached, org_status = False, None
+    if user and user.organization_id:
+        org_cached, org_status = principal_cache.get_organization(user.organization_id)
+    
+    if not user or (user.organization_id and not org_cached):
+        # Create session, query, and close immediately
+        db = SessionLocal()
+        try:
+            if not user:
+                db_user = db.query(User).filter(User.id == int(user_id)).first()
+                if not db_user:
                     raise HTTPException(
-                        status_code=status.HTTP_403_FORBIDDEN,
-                        detail="Organization account is locked. Please contact support."
+                        status_code=status.HTTP_401_UNAUTHORIZED,
+                        detail="User not found"
                     )
-                
-                # Check if organization subscription has expired
-                if hasattr(org, 'expires_at') and org.expires_at:
-                    if org.expires_at < datetime.utcnow():
-                        raise HTTPException(
-                            status_code=status.HTTP_403_FORBIDDEN,
-                            detail="Organization subscription has expired. Please contact support."
-                        )
+                principal_cache.put_user(db_user)
+                # Detach user from session so it can be used after close
+                db.expunge(db_user)
+                user = db_user
+            if user.organization_id:
+                org = db.query(Organization).filter(Organization.id == user.organization_id).first()
+                org_status = organization_status(org)
+                principal_cache.put_organization(user.organization_id, org_status)
+        finally:
+            db.close()  # Release connection immediately
+    
+    # Check organization status (locked or expired)
+    if user.organization_id and org_status:
+        # Check if organization is locked
+        if not org_status['is_active']:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Organization account is locked. Please contact support."
+            )
         
-        # Detach user from session so it can be used after close
-        db.expunge(user)
-        return user
-    finally:
-        db.close()  # Release connection immediately
+        # Check if organization subscription has expired
+        if org_status['expires_at']:
+            if org_status['expires_at'] < datetime.utcnow():
+                raise HTTPException(
+                    status_code=status.HTTP_403_FORBIDDEN,
+                    detail="Organization subscription has expired. Please contact support."
+                )
+    
+    return user
 
 
 def get_user_from_cookie(token: str, db: Session) -> Optional[User]:
@@ -828,6 +845,7 @@ def lock_account(user: User, db: Session):
     """Lock user account for LOCKOUT_DURATION_MINUTES"""
     user.locked_until = datetime.utcnow() + timedelta(minutes=LOCKOUT_DURATION_MINUTES)
     db.commit()
+    principal_cache.invalidate_user(user.id)
     logger.warning(f"Account locked: {user.phone}")
 
 
@@ -837,12 +855,15 @@ def reset_failed_attempts(user: User, db: Session):
     user.locked_until = None
     user.last_login = datetime.utcnow()
     db.commit()
+    # Login bookkeeping only: no need to flush other workers
+    principal_cache.invalidate_user(user.id, broadcast=False)
 
 
 def increment_failed_attempts(user: User, db: Session):
     """Increment failed login attempts"""
     user.failed_login_attempts += 1
     db.commit()
+    principal_cache.invalidate_user(user.id, broadcast=False)
     
     if user.failed_login_attempts >= MAX_LOGIN_ATTEMPTS:
         lock_account(user, db)
@@ -883,9 +904,27 @@ def is_admin(current_user: User) -> bool:
 # API Key Management
 # ============================================================================
 
+def _get_api_key_record(api_key: str, db: Session) -> Optional[dict]:
+    """Column snapshot of an active API key (principal cache, then database)"""
+    key_record = principal_cache.get_api_key(api_key)
+    if key_record is None:
+        # Query database for key
+        db_record = db.query(APIKey).filter(
+            APIKey.key == api_key,
+            APIKey.is_active == True
+        ).first()
+        
+        if not db_record:
+            return None
+        
+        principal_cache.put_api_key(api_key, db_record)
+        key_record = snapshot(db_record)
+    return key_record
+
+
 def validate_api_key(api_key: str, db: Session) -> bool:
     """
-    Validate API key and check quota
+    Validate API key and reserve one request of its quota
     
     Returns True if valid and within quota
     Raises HTTPException if quota exceeded
@@ -894,43 +933,36 @@ def validate_api_key(api_key: str, db: Session) -> bool:
     if not api_key:
         return False
     
-    # Query database for key
-    key_record = db.query(APIKey).filter(
-        APIKey.key == api_key,
-        APIKey.is_active == True
-    ).first()
-    
+    key_record = _get_api_key_record(api_key, db)
     if not key_record:
         logger.warning(f"Invalid API key attempted: {api_key[:12]}...")
         return False
     
     # Check expiration
-    if key_record.expires_at and key_record.expires_at < datetime.utcnow():
-        logger.warning(f"Expired API key used: {key_record.name}")
+    if key_record['expires_at'] and key_record['expires_at'] < datetime.utcnow():
+        logger.warning(f"Expired API key used: {key_record['name']}")
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="API key has expired"
         )
     
-    # Check quota
-    if key_record.quota_limit and key_record.usage_count >= key_record.quota_limit:
-        logger.warning(f"API key quota exceeded: {key_record.name}")
+    # Check quota (atomic across workers, see services/api_key_usage.py)
+    if not api_key_usage.reserve(key_record):
+        logger.warning(f"API key quota exceeded: {key_record['name']}")
         raise HTTPException(
             status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-            detail=f"API key quota exceeded. Limit: {key_record.quota_limit}"
+            detail=f"API key quota exceeded. Limit: {key_record['quota_limit']}"
         )
     
     return True
 
 
 def track_api_key_usage(api_key: str, db: Session):
-    """Increment usage counter for API key"""
-    key_record = db.query(APIKey).filter(APIKey.key == api_key).first()
+    """Count a validated request against its API key (written to the database in batches)"""
+    key_record = _get_api_key_record(api_key, db)
     if key_record:
-        key_record.usage_count += 1
-        key_record.last_used_at = datetime.utcnow()
-        db.commit()
-        logger.info(f"API key used: {key_record.name} (usage: {key_record.usage_count}/{key_record.quota_limit or 'unlimited'})")
+        api_key_usage.settle(key_record)
+        logger.debug(f"API key used: {key_record['name']} (quota: {key_record['quota_limit'] or 'unlimited'})")
 
 
 def get_current_user_or_api_key(
@@ -975,20 +1007,24 @@ def get_current_user_or_api_key(
             user_id = payload.get("sub")
             
             if user_id:
-                # Create session, query, and close immediately
-                db = SessionLocal()
-                try:
-                    user = db.query(User).filter(User.id == int(user_id)).first()
-                    if user:
-                        # Detach user from session so it can be used after close
-                        db.expunge(user)
-                        worker_id = os.getenv('UVICORN_WORKER_ID', 'main')
-                        # Include endpoint path for clarity when multiple parallel requests come in
-                        endpoint = request.url.path if request else 'unknown'
-                        logger.debug(f"Authenticated teacher: {user.name} (ID: {user.id}, Phone: {user.phone}) [Worker: {worker_id}] [{endpoint}]")
-                        return user  # Authenticated teacher - full access
-                finally:
-                    db.close()  # Release connection immediately
+                user = principal_cache.get_user(int(user_id))
+                if not user:
+                    # Create session, query, and close immediately
+                    db = SessionLocal()
+                    try:
+                        user = db.query(User).filter(User.id == int(user_id)).first()
+                        if user:
+                            principal_cache.put_user(user)
+                            # Detach user from session so it can be used after close
+                            db.expunge(user)
+                    finally:
+                        db.close()  # Release connection immediately
+                if user:
+                    worker_id = os.getenv('UVICORN_WORKER_ID', 'main')
+                    # Include endpoint path for clarity when multiple parallel requests come in
+                    endpoint = request.url.path if request else 'unknown'
+                    logger.debug(f"Authenticated teacher: {user.name} (ID: {user.id}, Phone: {user.phone}) [Worker: {worker_id}] [{endpoint}]")
+                    return user  # Authenticated teacher - full access
         except HTTPException:
             # Invalid JWT, try API key instead
             pass